@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark isodatetime.data.TimePoint arithmetic over long periods.
+
+Compare the old TimePoint normalisation, which steps over each day, month
+and year to tick over an overflowing unit, with the current one, which goes
+via day numbers (days since Jan 1, 1 A.D.), in each calendar mode. The
+operations represent the cycle arithmetic of long climate runs:
+* Add days, hours or months spanning up to 2 centuries to a date-time.
+* Subtract and compare date-times up to 4 centuries apart.
+The old code is timed on the first OLD-N operations only. Check that both
+give identical results for those operations.
+
+Usage: isodatetime_arithmetic.py [N-OPERATIONS [OLD-N]]
+
+N-OPERATIONS defaults to running both 100000 and 1000000 operations.
+
+"""
+
+import os
+import random
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from isodatetime.data import (
+    CALENDAR, Duration, TimePoint, get_days_in_year, get_is_leap_year,
+    get_weeks_in_year, iter_months_days, util)
+
+
+POOL_SIZE = 1000
+
+
+class OldTimePoint(TimePoint):
+    """TimePoint with the old tick over, month addition and subtraction."""
+
+    def copy(self):
+        dummy_timepoint = OldTimePoint(is_empty_instance=True)
+        for attr in self.DATA_ATTRIBUTES:
+            setattr(dummy_timepoint, attr, getattr(self, attr))
+        dummy_timepoint.time_zone = self.time_zone.copy()
+        return dummy_timepoint
+
+    def __cmp__(self, other):
+        if self.get_props() == other.get_props():
+            return 0
+        other = other.copy()
+        other.set_time_zone(self.get_time_zone())
+        my_datetime = list(self.get_calendar_date()) + [
+            self.get_second_of_day()]
+        other_datetime = list(other.get_calendar_date()) + [
+            other.get_second_of_day()]
+        return cmp(my_datetime, other_datetime)
+
+    def __sub__(self, other):
+        if not isinstance(other, TimePoint):
+            return self.__add__(other * -1)
+        other = other.copy()
+        other.set_time_zone(self.get_time_zone())
+        my_year, my_day_of_year = _old_get_ordinal_date_from_calendar_date(
+            *self.get_calendar_date())
+        other_year, other_day_of_year = (
+            _old_get_ordinal_date_from_calendar_date(
+                *other.get_calendar_date()))
+        diff_day = my_day_of_year - other_day_of_year
+        if my_year > other_year:
+            diff_day += _old_get_days_in_year_range(
+                other_year, my_year - 1, calendar_mode=CALENDAR.mode)
+        else:
+            diff_day -= _old_get_days_in_year_range(
+                my_year, other_year - 1, calendar_mode=CALENDAR.mode)
+        if diff_day < 0:
+            return -1 * (other - self)
+        my_hour, my_minute, my_second = self.get_hour_minute_second()
+        other_hour, other_minute, other_second = (
+            other.get_hour_minute_second())
+        diff_hour = my_hour - other_hour
+        diff_minute = my_minute - other_minute
+        diff_second = my_second - other_second
+        if diff_second < 0:
+            diff_minute -= 1
+            diff_second += CALENDAR.SECONDS_IN_MINUTE
+        if diff_minute < 0:
+            diff_hour -= 1
+            diff_minute += CALENDAR.MINUTES_IN_HOUR
+        if diff_hour < 0:
+            diff_day -= 1
+            diff_hour += CALENDAR.HOURS_IN_DAY
+        return Duration(
+            days=diff_day, hours=diff_hour, minutes=diff_minute,
+            seconds=diff_second)
+
+    def _add_months(self, num_months):
+        for _ in range(abs(num_months)):
+            if num_months > 0:
+                self.month_of_year += 1
+                if self.month_of_year > CALENDAR.MONTHS_IN_YEAR:
+                    self.month_of_year -= CALENDAR.MONTHS_IN_YEAR
+                    self.year += 1
+            if num_months < 0:
+                self.month_of_year -= 1
+                if self.month_of_year < 1:
+                    self.month_of_year += CALENDAR.MONTHS_IN_YEAR
+                    self.year -= 1
+            month_index = (self.month_of_year - 1) % CALENDAR.MONTHS_IN_YEAR
+            if get_is_leap_year(self.year):
+                max_day_in_new_month = (
+                    CALENDAR.DAYS_IN_MONTHS_LEAP[month_index])
+            else:
+                max_day_in_new_month = (
+                    CALENDAR.DAYS_IN_MONTHS[month_index])
+            if self.day_of_month > max_day_in_new_month:
+                self.day_of_month = max_day_in_new_month
+        self._tick_over()
+
+    def _tick_over(self):
+        if (self.hour_of_day is not None and
+                self.minute_of_hour is not None):
+            hours_remainder = self.hour_of_day - int(self.hour_of_day)
+            self.hour_of_day -= hours_remainder
+            self.minute_of_hour += (
+                hours_remainder * CALENDAR.MINUTES_IN_HOUR)
+        if (self.minute_of_hour is not None and
+                self.second_of_minute is not None):
+            minutes_remainder = self.minute_of_hour - int(self.minute_of_hour)
+            self.minute_of_hour -= minutes_remainder
+            self.second_of_minute += (
+                minutes_remainder * CALENDAR.SECONDS_IN_MINUTE)
+        if self.second_of_minute is not None:
+            num_minutes, seconds = divmod(self.second_of_minute,
+                                          CALENDAR.SECONDS_IN_MINUTE)
+            self.minute_of_hour += num_minutes
+            self.second_of_minute = seconds
+        if self.minute_of_hour is not None:
+            num_hours, minutes = divmod(self.minute_of_hour,
+                                        CALENDAR.MINUTES_IN_HOUR)
+            self.hour_of_day += num_hours
+            self.minute_of_hour = minutes
+        if self.hour_of_day is not None:
+            num_days, hours = divmod(self.hour_of_day, CALENDAR.HOURS_IN_DAY)
+            num_days = int(num_days)
+            if self.day_of_week is not None:
+                self.day_of_week += num_days
+            elif self.day_of_month is not None:
+                self.day_of_month += num_days
+            elif self.day_of_year is not None:
+                self.day_of_year += num_days
+            self.hour_of_day = hours
+        if self.day_of_week is not None:
+            num_weeks, days = divmod(
+                self.day_of_week - 1, CALENDAR.DAYS_IN_WEEK)
+            self.week_of_year += num_weeks
+            self.day_of_week = days + 1
+        if self.day_of_month is not None:
+            self._tick_over_day_of_month()
+        if self.day_of_year is not None:
+            while self.day_of_year < 1:
+                days_in_last_year = get_days_in_year(self.year - 1)
+                self.day_of_year += days_in_last_year
+                self.year -= 1
+            while self.day_of_year > get_days_in_year(self.year):
+                days_in_next_year = get_days_in_year(self.year + 1)
+                self.day_of_year -= days_in_next_year
+                self.year += 1
+        if self.week_of_year is not None:
+            while self.week_of_year < 1:
+                weeks_in_last_year = get_weeks_in_year(self.year - 1)
+                self.week_of_year += weeks_in_last_year
+                self.year -= 1
+            while self.week_of_year > get_weeks_in_year(self.year):
+                weeks_in_this_year = get_weeks_in_year(self.year)
+                self.week_of_year -= weeks_in_this_year
+                self.year += 1
+        if self.month_of_year is not None:
+            while self.month_of_year < 1:
+                self.month_of_year += CALENDAR.MONTHS_IN_YEAR
+                self.year -= 1
+            while self.month_of_year > CALENDAR.MONTHS_IN_YEAR:
+                self.month_of_year -= CALENDAR.MONTHS_IN_YEAR
+                self.year += 1
+
+    def _tick_over_day_of_month(self):
+        if self.day_of_month < 1:
+            num_days = 2
+            for month, day in iter_months_days(
+                    self.year,
+                    month_of_year=self.month_of_year,
+                    day_of_month=1, in_reverse=True):
+                num_days -= 1
+                if num_days == self.day_of_month:
+                    self.month_of_year = month
+                    self.day_of_month = day
+                    break
+            else:
+                start_year = self.year
+                while num_days != self.day_of_month:
+                    start_year -= 1
+                    for month, day in iter_months_days(
+                            start_year, in_reverse=True):
+                        num_days -= 1
+                        if num_days == self.day_of_month:
+                            break
+                self.year = start_year
+                self.month_of_year = month
+                self.day_of_month = day
+        else:
+            month_index = (self.month_of_year - 1) % CALENDAR.MONTHS_IN_YEAR
+            if get_is_leap_year(self.year):
+                max_day_in_month = CALENDAR.DAYS_IN_MONTHS_LEAP[month_index]
+            else:
+                max_day_in_month = CALENDAR.DAYS_IN_MONTHS[month_index]
+            if self.day_of_month > max_day_in_month:
+                num_days = 0
+                for month, day in iter_months_days(
+                        self.year,
+                        month_of_year=self.month_of_year,
+                        day_of_month=1):
+                    num_days += 1
+                    if num_days == self.day_of_month:
+                        self.month_of_year = month
+                        self.day_of_month = day
+                        break
+                else:
+                    start_year = self.year
+                    while num_days != self.day_of_month:
+                        start_year += 1
+                        for month, day in iter_months_days(start_year):
+                            num_days += 1
+                            if num_days == self.day_of_month:
+                                self.year = start_year
+                                self.month_of_year = month
+                                self.day_of_month = day
+                                return
+
+
+def _old_get_ordinal_date_from_calendar_date(year, month_of_year,
+                                             day_of_month):
+    """The old get_ordinal_date_from_calendar_date."""
+    iter_num_days = 0
+    for iter_month, iter_day in iter_months_days(year):
+        iter_num_days += 1
+        if iter_month == month_of_year and iter_day == day_of_month:
+            return year, iter_num_days
+
+
+@util.cache_results
+def _old_get_days_in_year_range(start_year, end_year, calendar_mode=None):
+    """The old _get_days_in_year_range."""
+    if start_year == end_year:
+        return get_days_in_year(start_year)
+    if start_year > end_year:
+        return 0
+    days = (end_year + 1 - start_year) * CALENDAR.DAYS_IN_YEAR
+    diff_days_leap = (CALENDAR.DAYS_IN_YEAR_LEAP - CALENDAR.DAYS_IN_YEAR)
+    for factor, is_leap_factor in CALENDAR.LEAP_YEAR_FACTOR_TRUTHS:
+        num_corrections = 0
+        if start_year % factor == 0:
+            num_corrections += 1
+        if end_year != start_year and end_year % factor == 0:
+            num_corrections += 1
+        factor_start_year = start_year + 1
+        while (factor_start_year % factor != 0 and
+               factor_start_year < end_year):
+            factor_start_year += 1
+        if factor_start_year < end_year:
+            num_corrections += 1
+            num_corrections += (
+                end_year - (factor_start_year + 1)) / factor
+        if is_leap_factor:
+            days += num_corrections * diff_days_leap
+        else:
+            days -= num_corrections * diff_days_leap
+    return days
+
+
+def get_pools(timepoint_class):
+    """Return (date-times, durations) to choose operands from."""
+    rand = random.Random(1)
+    timepoints = []
+    durations = []
+    for _ in range(POOL_SIZE):
+        month_of_year = rand.randint(1, CALENDAR.MONTHS_IN_YEAR)
+        timepoints.append(timepoint_class(
+            year=rand.randint(1850, 2250),
+            month_of_year=month_of_year,
+            day_of_month=rand.randint(
+                1, CALENDAR.DAYS_IN_MONTHS[month_of_year - 1]),
+            hour_of_day=rand.choice([0, 6, 12, 18]),
+            minute_of_hour=0, second_of_minute=0))
+        durations.append(rand.choice([
+            Duration(days=rand.randint(-73000, 73000)),
+            Duration(hours=rand.randint(-1750000, 1750000)),
+            Duration(months=rand.randint(-2400, 2400))]))
+    return timepoints, durations
+
+
+def run(timepoint_class, n_operations):
+    """Do n_operations, return (elapsed, results of some operations)."""
+    timepoints, durations = get_pools(timepoint_class)
+    results = []
+    start = time()
+    for i in xrange(n_operations):
+        timepoint = timepoints[i % POOL_SIZE]
+        operation = i % 4
+        if operation == 0:
+            result = timepoint + durations[i % POOL_SIZE]
+        elif operation == 1:
+            result = timepoint - durations[(i + 1) % POOL_SIZE]
+        elif operation == 2:
+            result = timepoint - timepoints[(i * 7 + 1) % POOL_SIZE]
+        else:
+            result = cmp(timepoint, timepoints[(i * 7 + 1) % POOL_SIZE])
+        if i < POOL_SIZE:
+            results.append(str(result))
+    return time() - start, results
+
+
+def main():
+    """Run benchmark."""
+    n_operations_list = [100000, 1000000]
+    old_n_operations = 1000
+    if len(sys.argv) > 1:
+        n_operations_list = [int(sys.argv[1])]
+    if len(sys.argv) > 2:
+        old_n_operations = int(sys.argv[2])
+    for mode in [CALENDAR.MODE_GREGORIAN, CALENDAR.MODE_360,
+                 CALENDAR.MODE_365, CALENDAR.MODE_366]:
+        CALENDAR.set_mode(mode)
+        old_elapsed, old_results = run(OldTimePoint, old_n_operations)
+        old_rate = old_n_operations / old_elapsed
+        print "%-9s old %8d ops %9.0f ops/s" % (
+            mode, old_n_operations, old_rate)
+        for n_operations in n_operations_list:
+            new_elapsed, new_results = run(TimePoint, n_operations)
+            n_results = min(len(old_results), len(new_results))
+            assert old_results[:n_results] == new_results[:n_results]
+            new_rate = n_operations / new_elapsed
+            print "%-9s new %8d ops %9.0f ops/s (%5.1fx)" % (
+                mode, n_operations, new_rate, new_rate / old_rate)
+    CALENDAR.set_mode()
+
+
+if __name__ == "__main__":
+    main()
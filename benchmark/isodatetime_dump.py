@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark isodatetime.dumpers.TimePointDumper.
+
+Dump cycle points in some common formats, as "rose date --print-format"
+does, with:
+* The old dumper, which analyses the format on every call.
+* TimePointDumper.dump, which compiles each format once.
+* TimePointDumper.dump_many.
+Check that all give identical results.
+
+Usage: isodatetime_dump.py [N-POINTS]
+
+"""
+
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from isodatetime.dumpers import TimePointDumper, TimePointDumperBoundsError
+from isodatetime.parsers import TimeRecurrenceParser
+from isodatetime import parser_spec, util
+
+
+FORMATS = ["CCYYMMDDThhmmZ", "CCYY-MM-DDThh:mm:ss+01:00", "CCYY-Www-D",
+           "%Y-%m-%dT%H:%M:%S%z", "CCYY-DDDThhZ"]
+
+
+class OldTimePointDumper(TimePointDumper):
+    """TimePointDumper with the old dump and strftime."""
+
+    def dump(self, timepoint, formatting_string):
+        if "%" in formatting_string:
+            try:
+                return self.strftime(timepoint, formatting_string)
+            except TimePointDumperBoundsError:
+                raise
+            except ValueError:
+                pass
+        expression, properties, custom_time_zone = (
+            self._old_get_expression_and_properties(formatting_string))
+        return self._dump_expression_with_properties(
+            timepoint, expression, properties,
+            custom_time_zone=custom_time_zone
+        )
+
+    def strftime(self, timepoint, formatting_string):
+        split_format = parser_spec.REC_SPLIT_STRFTIME_DIRECTIVE.split(
+            formatting_string)
+        expression = ""
+        properties = []
+        for item in split_format:
+            if parser_spec.REC_STRFTIME_DIRECTIVE_TOKEN.search(item):
+                item_expression, item_properties = (
+                    parser_spec.translate_strftime_token(item))
+                expression += item_expression
+                properties += item_properties
+            else:
+                expression += item
+        return self._dump_expression_with_properties(
+            timepoint, expression, properties)
+
+    def _dump_expression_with_properties(self, timepoint, expression,
+                                         properties, custom_time_zone=None):
+        if not timepoint.truncated:
+            if "week_of_year" in properties or "day_of_week" in properties:
+                if not ("month_of_year" in properties or
+                        "day_of_month" in properties or
+                        "day_of_year" in properties):
+                    timepoint = timepoint.copy().to_week_date()
+            elif (timepoint.get_is_week_date() and (
+                    "month_of_year" in properties or
+                    "day_of_month" in properties or
+                    "day_of_year" in properties)):
+                timepoint = timepoint.copy().to_calendar_date()
+        if custom_time_zone is not None:
+            timepoint = timepoint.copy()
+            if custom_time_zone == (0, 0):
+                timepoint.set_time_zone_to_utc()
+            else:
+                current_time_zone = timepoint.get_time_zone()
+                new_time_zone = current_time_zone.copy()
+                new_time_zone.hours = int(custom_time_zone[0])
+                new_time_zone.minutes = int(custom_time_zone[1])
+                new_time_zone.unknown = False
+                timepoint.set_time_zone(new_time_zone)
+        property_map = {}
+        for property_ in properties:
+            property_map[property_] = timepoint.get(property_)
+            if (property_ == "century" and
+                    ("expanded_year_digits" not in properties or
+                     not self.num_expanded_year_digits)):
+                min_value = 0
+                max_value = 9999
+            elif property_ == "expanded_year_digits":
+                max_value = (10 ** (self.num_expanded_year_digits + 4)) - 1
+                min_value = -max_value
+            else:
+                continue
+            value = timepoint.year
+            if not (min_value <= value <= max_value):
+                raise TimePointDumperBoundsError(
+                    "year", value, min_value, max_value)
+        return expression % property_map
+
+    @util.cache_results
+    def _old_get_expression_and_properties(self, formatting_string):
+        return self._get_expression_and_properties(formatting_string)
+
+
+def main():
+    """Run benchmark."""
+    n_points = 100000
+    if len(sys.argv) > 1:
+        n_points = int(sys.argv[1])
+    timepoints = list(TimeRecurrenceParser().parse(
+        "R%d/20180101T0000Z/PT6H" % n_points))
+    for format_ in FORMATS:
+        print format_
+        results = None
+        for name, dumper in [
+                ("old", OldTimePointDumper()),
+                ("dump", TimePointDumper()),
+                ("dump_many", TimePointDumper())]:
+            start = time()
+            if name == "dump_many":
+                strings = dumper.dump_many(timepoints, format_)
+            else:
+                strings = [dumper.dump(timepoint, format_)
+                           for timepoint in timepoints]
+            rate = n_points / (time() - start)
+            if results is None:
+                results = strings
+                old_rate = rate
+            assert strings == results
+            print "  %-9s %8d points %9.0f points/s (%5.1fx)" % (
+                name, n_points, rate, rate / old_rate)
+
+
+if __name__ == "__main__":
+    main()
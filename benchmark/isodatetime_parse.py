@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the parse throughput of isodatetime.parsers.TimePointParser.
+
+Parse cycle points in the common Rose/Cylc forms, e.g. "20180101T0000Z" and
+"2018-01-01T00:00Z", as "rose date" and the task environment do, with:
+* The old parser, which searches the expressions of each format and type for
+  every string, timed on the first OLD-N parses only.
+* The current parser with no cache of results, so it only uses the
+  recognisers of the shapes of previous strings.
+* The current parser with a warm cache of results.
+Check that all give identical results. Also time the creation of parsers,
+which used to compile the regular expressions of each format and type every
+time.
+
+Usage: isodatetime_parse.py [N-PARSES [OLD-N [N-DISTINCT]]]
+
+"""
+
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from isodatetime.data import Duration, TimePoint
+from isodatetime.parsers import TimePointParser
+
+
+FORMATS = ["CCYYMMDDThhmmZ", "CCYY-MM-DDThh:mmZ", "CCYYMMDDThh",
+           "CCYY-MM-DDThh:mm:ss+01:00", "CCYYMMDD"]
+
+
+class OldTimePointParser(TimePointParser):
+    """TimePointParser with no caches."""
+
+    def _generate_regexes(self):
+        self._generate_regex_maps()
+
+    def parse(self, timepoint_string, dump_format=None, dump_as_parsed=False):
+        date_info, time_info, parsed_expr = self._search_info(
+            timepoint_string)[0]
+        if dump_as_parsed:
+            dump_format = parsed_expr
+        return self._create_timepoint_from_info(
+            date_info, time_info, dump_format=dump_format,
+            truncated_dump_format=dump_format)
+
+
+def get_strings(n_distinct):
+    """Return n_distinct cycle point strings in the FORMATS."""
+    strings = []
+    timepoint = TimePoint(year=2018, month_of_year=1, day_of_month=1,
+                          time_zone_hour=0, time_zone_minute=0)
+    duration = Duration(hours=6)
+    for i in range(n_distinct):
+        timepoint.dump_format = FORMATS[i % len(FORMATS)]
+        strings.append(str(timepoint))
+        timepoint += duration
+    return strings
+
+
+def run(parser, strings, n_parses):
+    """Parse n_parses of strings, return (elapsed, results)."""
+    results = []
+    start = time()
+    for i in xrange(n_parses):
+        result = parser.parse(strings[i % len(strings)], dump_as_parsed=True)
+        if i < len(strings):
+            results.append(str(result))
+    return time() - start, results
+
+
+def main():
+    """Run benchmark."""
+    n_parses = 100000
+    old_n_parses = 5000
+    n_distinct = 1000
+    if len(sys.argv) > 1:
+        n_parses = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        old_n_parses = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        n_distinct = int(sys.argv[3])
+    strings = get_strings(n_distinct)
+    for parser_class in OldTimePointParser, TimePointParser:
+        start = time()
+        for _ in range(10):
+            parser_class(assumed_time_zone=(0, 0))
+        print "%-19s %8.4f s/parser" % (
+            parser_class.__name__, (time() - start) / 10)
+    old_elapsed, old_results = run(
+        OldTimePointParser(assumed_time_zone=(0, 0)), strings, old_n_parses)
+    old_rate = old_n_parses / old_elapsed
+    print "old    %8d parses %9.0f parses/s" % (old_n_parses, old_rate)
+    max_size = TimePointParser.RESULT_CACHE.max_size
+    for name, results_max_size in [("shapes", 0), ("warm", max_size)]:
+        TimePointParser.RESULT_CACHE.clear()
+        TimePointParser.RESULT_CACHE.max_size = results_max_size
+        TimePointParser.SHAPE_CACHE.clear()
+        elapsed, results = run(TimePointParser(assumed_time_zone=(0, 0)),
+                               strings, n_parses)
+        n_results = min(len(old_results), len(results))
+        assert results[:n_results] == old_results[:n_results]
+        rate = n_parses / elapsed
+        print "%-6s %8d parses %9.0f parses/s (%5.1fx)" % (
+            name, n_parses, rate, rate / old_rate)
+        for cache_name, cache in [
+                ("results", TimePointParser.RESULT_CACHE),
+                ("shapes", TimePointParser.SHAPE_CACHE)]:
+            print "       %-7s cache hit rate %5.1f%%" % (
+                cache_name, cache.get_hit_rate() * 100)
+
+
+if __name__ == "__main__":
+    main()
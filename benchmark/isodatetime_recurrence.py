@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the expansion of isodatetime.data.TimeRecurrence points.
+
+Expand recurrences of cycle points, as housekeeping and archive planning
+do for a window of cycles, with:
+* The iterator, which creates a TimePoint for each point. It is timed on the
+  first OLD-N points only.
+* TimeRecurrence.get_day_numbers_and_seconds.
+* TimeRecurrence.dump_points.
+Check that all give identical results for the first OLD-N points.
+
+Usage: isodatetime_recurrence.py [N-POINTS [OLD-N]]
+
+"""
+
+from itertools import islice
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from isodatetime.parsers import TimeRecurrenceParser
+
+
+EXPRESSIONS = ["R/18500101T0000Z/PT6H", "R/18500131T0000Z/P1M"]
+
+
+def main():
+    """Run benchmark."""
+    n_points = 1000000
+    old_n_points = 10000
+    if len(sys.argv) > 1:
+        n_points = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        old_n_points = int(sys.argv[2])
+    for expression in EXPRESSIONS:
+        recurrence = TimeRecurrenceParser().parse(expression)
+        print expression
+        start = time()
+        old_points = list(islice(recurrence, old_n_points))
+        old_rate = old_n_points / (time() - start)
+        print "  iterator     %8d points %9.0f points/s" % (
+            old_n_points, old_rate)
+
+        start = time()
+        day_numbers, seconds = recurrence.get_day_numbers_and_seconds(
+            n_points)
+        rate = n_points / (time() - start)
+        print "  arrays       %8d points %9.0f points/s (%5.1fx)" % (
+            n_points, rate, rate / old_rate)
+        assert list(day_numbers[:old_n_points]) == [
+            point.get_day_number() for point in old_points]
+        assert list(seconds[:old_n_points]) == [
+            point.get_second_of_day() for point in old_points]
+
+        start = time()
+        strings = recurrence.dump_points(old_n_points)
+        rate = old_n_points / (time() - start)
+        print "  dump_points  %8d points %9.0f points/s" % (
+            old_n_points, rate)
+        assert strings == [str(point) for point in old_points]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the running of rose_ana analysis tasks.
+
+Run N-TASKS analysis tasks, each of which compares the numbers of a
+generated results file with those of a generated KGO file and enters the
+comparison in the KGO database buffer, as a KGO comparison app does, with:
+* One process, the default.
+* A pool of NPROC processes, "[rose-ana]nproc=NPROC".
+Check that both report the same messages, results and KGO database entries.
+
+Usage: rose_ana_nproc.py [N-TASKS [NPROC]]
+
+"""
+
+import os
+import sys
+from StringIO import StringIO
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.apps.rose_ana import AnalysisTask, KGODatabase, RoseAnaApp
+from rose.config import ConfigNode
+from rose.reporter import Reporter, ReporterContext
+
+
+N_VALUES = 200000
+
+
+class CompareNumbers(AnalysisTask):
+    """Compare generated numbers against generated KGO numbers."""
+
+    def run_analysis(self):
+        seed = int(self.options["seed"])
+        kgo = "\n".join(
+            repr((seed * i) % 1009 / 7.0) for i in range(N_VALUES))
+        result = "\n".join(
+            repr((seed * i) % 1009 / 7.0 + (seed % 2 and i == seed))
+            for i in range(N_VALUES))
+        n_diffs = 0
+        for kgo_value, value in zip(kgo.split(), result.split()):
+            if abs(float(kgo_value) - float(value)) > 1.0e-6:
+                n_diffs += 1
+        self.parent.reporter("{0} values differ".format(n_diffs))
+        self.passed = not n_diffs
+        self.parent.kgo_db.enter_comparison(
+            self.options["full_task_name"], "kgo.txt", "result.txt",
+            " OK " if self.passed else "FAIL", "CompareNumbers")
+
+
+def get_app(n_tasks, nproc):
+    """Return (app, output handle) with n_tasks tasks."""
+    app = RoseAnaApp.__new__(RoseAnaApp)
+    app.rose_conf = ConfigNode()
+    app.rose_conf.set(["rose-ana", "nproc"], str(nproc))
+    handle = StringIO()
+    app.reporter = Reporter(contexts={
+        "stdout": ReporterContext(None, Reporter.DEFAULT, handle)})
+    app.kgo_db = KGODatabase()
+    app.kgo_db.enter_task(
+        "rose_ana_benchmark", KGODatabase.TASK_STATUS_RUNNING)
+    app.analysis_tasks = []
+    for i in range(n_tasks):
+        app.analysis_tasks.append(CompareNumbers(app, {
+            "full_task_name": "CompareNumbers({0})".format(i),
+            "seed": str(i * 37 % N_VALUES)}))
+    return app, handle
+
+
+def main():
+    """Run benchmark."""
+    n_tasks = 36
+    nproc = 6
+    if len(sys.argv) > 1:
+        n_tasks = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        nproc = int(sys.argv[2])
+    results = None
+    for name, run_nproc in [("serial", 1), ("pool", nproc)]:
+        app, handle = get_app(n_tasks, run_nproc)
+        start = time()
+        passes = [passed for _, passed, _ in app._run_tasks()]
+        elapsed = time() - start
+        run_results = (
+            handle.getvalue(), passes, app.kgo_db.statement_buffer)
+        if results is None:
+            results = run_results
+            old_elapsed = elapsed
+        assert run_results == results
+        print "%-6s %3d tasks %2d processes %8.3f s (%5.1fx)" % (
+            name, n_tasks, run_nproc, elapsed, old_elapsed / elapsed)
+    print "%d tasks did not pass" % passes.count(False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rose.checksum.get_checksum on a directory tree.
+
+Compare the old serial checksum of a tree with the new one, which reads
+files in a thread pool, and with the new one reusing a checksum cache in
+memory and in a database file.
+
+Usage: rose_checksum.py [N-FILES [FILE-KILOBYTES]]
+
+"""
+
+import hashlib
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+import rose.checksum
+from rose.checksum import ChecksumCache, get_checksum, get_checksum_func
+
+
+def old_get_checksum(name):
+    """The old serial implementation of get_checksum for a tree."""
+    checksum_func = lambda source, *_: old_get_hexdigest("md5", source)
+    path_and_checksum_list = []
+    name = os.path.normpath(name)
+    for dirpath, _, filenames in os.walk(name):
+        path = dirpath[len(name) + 1:]
+        path_and_checksum_list.append((path, None, None))
+        for filename in filenames:
+            filepath = os.path.join(path, filename)
+            source = os.path.join(name, filepath)
+            checksum = checksum_func(source, name)
+            mode = os.stat(os.path.realpath(source)).st_mode
+            path_and_checksum_list.append((filepath, checksum, mode))
+    return path_and_checksum_list
+
+
+def old_get_hexdigest(algorithm, source):
+    """The old implementation of _get_hexdigest."""
+    hashobj = hashlib.new(algorithm)
+    handle = open(source)
+    f_bsize = os.statvfs(handle.name).f_bsize
+    while True:
+        bytes_ = handle.read(f_bsize)
+        if not bytes_:
+            break
+        hashobj.update(bytes_)
+    handle.close()
+    return hashobj.hexdigest()
+
+
+def create_tree(root, n_files, size):
+    """Create "n_files" files of "size" bytes in 10 sub-directories."""
+    old_time = time() - 3600
+    for i in range(n_files):
+        sub_dir = os.path.join(root, "d%02d" % (i % 10))
+        if not os.path.isdir(sub_dir):
+            os.makedirs(sub_dir)
+        path = os.path.join(sub_dir, "f%06d" % i)
+        with open(path, "wb") as handle:
+            handle.write(os.urandom(size))
+        os.utime(path, (old_time, old_time))
+
+
+def main():
+    """Run benchmark."""
+    n_files = 2000
+    size = 64 * 1024
+    if len(sys.argv) > 1:
+        n_files = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        size = int(sys.argv[2]) * 1024
+    work_dir = mkdtemp()
+    try:
+        root = os.path.join(work_dir, "tree")
+        db_path = os.path.join(work_dir, "checksum.db")
+        create_tree(root, n_files, size)
+        checksum_func = get_checksum_func("md5")
+        results = {}
+        for label, func in [
+                ("old serial", lambda: old_get_checksum(root)),
+                ("new, no cache", lambda: get_checksum(root, checksum_func)),
+                ("new, memory cache", lambda: get_checksum(root,
+                                                           checksum_func)),
+                ("new, cache file", lambda: get_checksum(root,
+                                                         checksum_func))]:
+            if label == "new, no cache":
+                rose.checksum._CACHE = ChecksumCache(db_path)
+            elif label == "new, cache file":
+                # Simulate a new process, with an empty memory cache
+                rose.checksum._CACHE = ChecksumCache(db_path)
+            t_0 = time()
+            results[label] = sorted(func())
+            elapsed = time() - t_0
+            print "%-20s %8.3fs %10.1f files/s %8.1f MB/s" % (
+                label, elapsed, n_files / elapsed,
+                n_files * size / elapsed / 1024 / 1024)
+        for label, result in results.items():
+            assert result == results["old serial"], label
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Micro-benchmarks of rose.config.ConfigLoader.load.
+
+Compare the old line by line loader with the current loader on generated
+configurations that represent:
+* A STASH-like application configuration, with many small sections.
+* A namelist application configuration, with long array values written one
+  element per continuation line.
+* A suite configuration, with many top level settings and comments.
+Check that both loaders give identical results.
+
+Usage: rose_config_load.py [SCALE [N-TIMES]]
+
+"""
+
+import os
+from StringIO import StringIO
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigLoader, ConfigNode, ConfigSyntaxError, dump
+
+
+class OldConfigLoader(ConfigLoader):
+    """The old loader, which reads and sets one line at a time."""
+
+    def load(self, source, node=None, default_comments=None):
+        if node is None:
+            node = ConfigNode()
+        handle, file_name = self._get_file_and_name(source)
+        keys = []  # Currently position under root node
+        type_ = None  # Type of current node, section or option?
+        comments = None  # Comments associated with next node
+        line_num = 0
+        # Note: "for line in handle:" hangs for sys.stdin
+        while True:
+            line = handle.readline()
+            if not line:
+                break
+            line_num += 1
+            # White space and comments
+            if line.isspace():
+                comments = []
+                continue
+            elif line.lstrip().startswith(self.char_comment):
+                if comments is None:
+                    node.comments.append(self._comment_strip(line))
+                else:
+                    comments.append(self._comment_strip(line))
+                continue
+            # Handle option continuation.
+            if type_ == self.TYPE_OPTION and line[0].isspace():
+                value = node.get(keys[:]).value
+                value_cont = line.strip()
+                if value_cont.startswith(self.char_assign):
+                    value_cont = value_cont[1:]
+                node.set(keys[:], value + "\n" + value_cont)
+                continue
+            # Match a section header?
+            match = self.RE_SECTION.match(line)
+            if match:
+                head, section, state = match.group("head", "section", "state")
+                bad_index = self._check_section_value(section)
+                if bad_index > -1:
+                    raise ConfigSyntaxError(
+                        ConfigSyntaxError.BAD_CHAR,
+                        file_name, line_num, len(head) + bad_index, line)
+                # Find position under root node
+                if type_ == self.TYPE_OPTION:
+                    keys.pop()
+                if keys:
+                    keys.pop()
+                section = section.strip()
+                if section:
+                    keys.append(section)
+                    type_ = self.TYPE_SECTION
+                else:
+                    keys = []
+                    type_ = None
+                section_node = node.get(keys[:])
+                if section_node is None:
+                    node.set(keys[:], {}, state, comments)
+                else:
+                    section_node.state = state
+                    if comments:
+                        section_node.comments += comments
+                comments = []
+                continue
+            # Match the start of an option setting?
+            match = self.re_option.match(line)
+            if not match:
+                raise ConfigSyntaxError(
+                    ConfigSyntaxError.BAD_SYNTAX, file_name, line_num, 0, line)
+            option, value, state = match.group("option", "value", "state")
+            if type_ == self.TYPE_OPTION:
+                keys.pop()
+            keys.append(option)
+            type_ = self.TYPE_OPTION
+            value = value.strip()
+            if comments is not None and default_comments is not None:
+                comments += default_comments
+            node.set(keys[:], value.strip(), state, comments)
+            comments = []
+        return node
+
+
+def get_stash_conf(scale):
+    """Return text of a STASH-like configuration."""
+    lines = ["meta=um-atmos/vn10.7", "", "[command]", "default=um-atmos", ""]
+    for i in range(500 * scale):
+        lines += [
+            "[namelist:umstash_streq(%04d_%08x)]" % (i, i * 7919),
+            "dom_name='DIALL'",
+            "isec=%d" % (i % 50),
+            "item=%d" % i,
+            "package='Standard diagnostics'",
+            "tim_name='T6H'",
+            "use_name='UPA'",
+            "",
+            "#Profile for diagnostic %d" % i,
+            "[!namelist:umstash_time(t%04d)]" % i,
+            "iend=-1",
+            "ifre=6",
+            "istr=0",
+            "",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def get_namelist_conf(scale):
+    """Return text of a namelist configuration with long array values."""
+    lines = ["[command]", "default=model.exe", ""]
+    for i in range(20):
+        lines.append("[namelist:arrays%d]" % i)
+        for j in range(5):
+            lines.append("values_%d=%d.0," % (j, j))
+            for k in range(100 * scale):
+                lines.append("         =%d.%d," % (k, j))
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def get_suite_conf(scale):
+    """Return text of a suite configuration."""
+    lines = ["[jinja2:suite.rc]"]
+    for i in range(1000 * scale):
+        lines += ["# Setting number %d" % i,
+                  "!SETTING_%06d='value %d'" % (i, i),
+                  ""]
+    return "\n".join(lines) + "\n"
+
+
+def time_load(loader, text, n_times):
+    """Return (mean seconds, node) to load text n_times."""
+    elapsed = 0.0
+    for _ in range(n_times):
+        handle = StringIO(text)
+        t_0 = time()
+        node = loader.load(handle)
+        elapsed += time() - t_0
+    return elapsed / n_times, node
+
+
+def main():
+    """Run benchmark."""
+    scale = 4
+    n_times = 5
+    if len(sys.argv) > 1:
+        scale = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    for label, get_conf in [("stash", get_stash_conf),
+                            ("namelist arrays", get_namelist_conf),
+                            ("suite", get_suite_conf)]:
+        text = get_conf(scale)
+        old_elapsed, old_node = time_load(OldConfigLoader(), text, n_times)
+        new_elapsed, new_node = time_load(ConfigLoader(), text, n_times)
+        old_out = StringIO()
+        dump(old_node, old_out)
+        new_out = StringIO()
+        dump(new_node, new_out)
+        assert old_out.getvalue() == new_out.getvalue()
+        print "%-16s %6.1fKB old %8.4fs new %8.4fs (%4.1fx)" % (
+            label, len(text) / 1024.0, old_elapsed, new_elapsed,
+            old_elapsed / new_elapsed)
+
+
+if __name__ == "__main__":
+    main()
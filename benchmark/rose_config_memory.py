@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the memory use and speed of large configurations.
+
+Generate a STASH-like application configuration, with many sections of the
+same options, and measure:
+* The memory used by the loaded configuration, compared with the same
+  configuration where, as before, every node has its own comments list and
+  every section and option name is a separate string.
+* The time to load the configuration.
+* The time to copy the configuration, with copy.deepcopy, compared with the
+  generic deepcopy of ConfigNode.
+* The time to diff the configuration with a modified copy.
+Memory is measured as the total size of the distinct objects referred to by
+the configuration.
+
+Usage: rose_config_memory.py [N-SECTIONS [N-TIMES]]
+
+"""
+
+import copy
+import os
+from StringIO import StringIO
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigLoader, ConfigNode, ConfigNodeDiff
+
+
+STASH_OPTIONS = [
+    ("dom_name", "'DIAG'"), ("isec", "0"), ("item", "%d"),
+    ("package", "'Diagnostics'"), ("tim_name", "'T6H'"),
+    ("use_name", "'UPA'")]
+
+
+def get_stash_conf(n_sections):
+    """Return the text of a STASH-like configuration."""
+    lines = ["meta=um-atmos/vn10.7\n"]
+    for i in range(n_sections):
+        lines.append("\n[namelist:umstash_streq(%08x)]\n" % i)
+        for key, value in STASH_OPTIONS:
+            if "%" in value:
+                value %= i
+            lines.append("%s=%s\n" % (key, value))
+    return "".join(lines)
+
+
+def get_size(node):
+    """Return the size in bytes of node and the objects it refers to.
+
+    Count each distinct object once, so shared objects, such as interned
+    keys, are only counted once. Do not create comments lists that have not
+    been used.
+
+    """
+    seen = set()
+    size = 0
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, ConfigNode):
+            stack.extend([item.value, item.state, item._comments])
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return size
+
+
+def make_old_style(node):
+    """Give each node its own comments list and its own key strings."""
+    node.comments = list(node.comments)
+    if isinstance(node.value, dict):
+        node.value = dict(
+            ("".join(list(key)), make_old_style(child))
+            for key, child in node.value.items())
+    return node
+
+
+def time_call(func, n_times):
+    """Call func n_times, return (elapsed, result of last call)."""
+    start = time()
+    for _ in range(n_times):
+        result = func()
+    return time() - start, result
+
+
+def generic_deepcopy(node):
+    """Copy node with the generic copy.deepcopy, via __getstate__."""
+    deepcopy_method = ConfigNode.__deepcopy__
+    del ConfigNode.__deepcopy__
+    try:
+        return copy.deepcopy(node)
+    finally:
+        ConfigNode.__deepcopy__ = deepcopy_method
+
+
+def main():
+    """Run benchmark."""
+    n_sections = 20000
+    n_times = 3
+    if len(sys.argv) > 1:
+        n_sections = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    text = get_stash_conf(n_sections)
+    n_nodes = n_sections * (len(STASH_OPTIONS) + 1) + 2
+    print "%d nodes, %.1fMB of text" % (n_nodes, len(text) / 1048576.0)
+    elapsed, node = time_call(
+        lambda: ConfigLoader().load(StringIO(text)), n_times)
+    print "load             %8.4fs" % elapsed
+    new_size = get_size(node)
+    old_size = get_size(make_old_style(copy.deepcopy(node)))
+    print "memory       old %6.1fMB (%3d B/node) new %6.1fMB (%3d B/node)" % (
+        old_size / 1048576.0, old_size / n_nodes,
+        new_size / 1048576.0, new_size / n_nodes)
+    old_elapsed, old_copy = time_call(lambda: generic_deepcopy(node), n_times)
+    new_elapsed, new_copy = time_call(lambda: copy.deepcopy(node), n_times)
+    assert old_copy == node and new_copy == node
+    print "copy         old %8.4fs new %8.4fs (%4.1fx)" % (
+        old_elapsed, new_elapsed, old_elapsed / new_elapsed)
+    for keys, sub_node in new_copy.walk():
+        if keys[-1] == "item" and int(sub_node.value) % 100 == 0:
+            sub_node.value = "-1"
+    diff = ConfigNodeDiff()
+    elapsed, _ = time_call(
+        lambda: diff.set_from_configs(node, new_copy), n_times)
+    assert len(diff.get_modified()) == (n_sections + 99) // 100
+    print "diff             %8.4fs" % elapsed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Micro-benchmarks of rose.config.ConfigNode traversals.
+
+Compare the old implementations with the current ones on a generated
+configuration with 50k settings, for:
+* ConfigNode.walk.
+* ConfigNode.__eq__, on two equal configurations.
+* ConfigNodeDiff.set_from_configs, on two configurations that differ by 1%
+  of their settings.
+Check that the old and the current implementations give identical results.
+
+Usage: rose_config_node.py [N-SETTINGS [N-TIMES]]
+
+"""
+
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigNode, ConfigNodeDiff
+
+
+def old_walk(self, keys=None, no_ignore=False):
+    """The old ConfigNode.walk, which looks up each node from the root."""
+    if keys is None:
+        keys = []
+    start_node = self.get(keys, no_ignore)
+    stack = [(keys, start_node)]
+    if start_node is None:
+        stack = []
+    while stack:
+        node_keys, node = stack.pop(0)
+        if isinstance(node.value, dict):
+            for key in node.value.keys():
+                child_keys = node_keys + [key]
+                subnode = self.get(child_keys, no_ignore)
+                if subnode is not None:
+                    stack.insert(0, (child_keys, subnode))
+        if node_keys == keys:
+            continue
+        if len(node_keys) == 1 and not isinstance(node.value, dict):
+            null_node_keys = [""] + node_keys
+            yield (null_node_keys, node)
+        else:
+            yield (node_keys, node)
+
+
+def old_eq(self, other):
+    """The old ConfigNode.__eq__, which walks and looks up both nodes."""
+    if self is other:
+        return True
+    try:
+        for keys_1, node_1 in old_walk(self, no_ignore=True):
+            node_2 = other.get(keys_1, no_ignore=True)
+            if (type(node_1) != type(node_2) or
+                    (not isinstance(node_1.value, dict) and
+                     node_1.value != node_2.value) or
+                    node_1.comments != node_2.comments):
+                return False
+        for keys_2, node_2 in old_walk(other, no_ignore=True):
+            if self.get(keys_2, no_ignore=True) is None:
+                return False
+    except AttributeError:  # Should handle "other is None"
+        return False
+    return True
+
+
+def old_set_from_configs(self, config_node_1, config_node_2):
+    """The old ConfigNodeDiff.set_from_configs, which flattens both nodes."""
+    settings_1 = {}
+    settings_2 = {}
+    for config_node, settings in [(config_node_1, settings_1),
+                                  (config_node_2, settings_2)]:
+        for keys, node in old_walk(config_node):
+            value = node.value
+            if type(node.value) is dict:
+                value = None
+            settings[tuple(keys)] = (value, node.state, node.comments)
+    for keys in set(settings_2) - set(settings_1):
+        self.set_added_setting(keys, settings_2[keys])
+    for keys in set(settings_1) - set(settings_2):
+        self.set_removed_setting(keys, settings_1[keys])
+    for keys in set(settings_1).intersection(set(settings_2)):
+        if settings_1[keys] != settings_2[keys]:
+            self.set_modified_setting(keys, settings_1[keys],
+                                      settings_2[keys])
+
+
+def get_conf(n_settings, modified=False):
+    """Return a configuration with n_settings in sections of 20 settings."""
+    node = ConfigNode()
+    for i in range(n_settings):
+        value = "value %d" % i
+        state = ""
+        if i % 37 == 0:
+            state = ConfigNode.STATE_USER_IGNORED
+        if modified and i % 100 == 0:
+            value = "modified value %d" % i
+        if modified and i % 100 == 1:
+            continue
+        node.set(["namelist:nml%d" % (i // 20), "item%d" % i], value, state,
+                 ["Comment on item %d" % i])
+    for i in range(n_settings // 50):
+        node.set(["top%d" % i], "value %d" % i)
+    return node
+
+
+def time_call(func, n_times):
+    """Call func n_times, return (elapsed, result of last call)."""
+    start = time()
+    for _ in range(n_times):
+        result = func()
+    return time() - start, result
+
+
+def get_diff(set_from_configs, conf_1, conf_2):
+    """Return the diff of conf_1 and conf_2 as lists."""
+    diff = ConfigNodeDiff()
+    set_from_configs(diff, conf_1, conf_2)
+    return diff.get_added(), diff.get_removed(), diff.get_modified()
+
+
+def main():
+    """Run benchmark."""
+    n_settings = 50000
+    n_times = 3
+    if len(sys.argv) > 1:
+        n_settings = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    conf_1 = get_conf(n_settings)
+    conf_2 = get_conf(n_settings)
+    conf_3 = get_conf(n_settings, modified=True)
+    for label, old_func, new_func in [
+            ("walk",
+             lambda: [keys for keys, _ in old_walk(conf_1)],
+             lambda: [keys for keys, _ in conf_1.walk()]),
+            ("walk no_ignore",
+             lambda: [keys for keys, _ in old_walk(conf_1, no_ignore=True)],
+             lambda: [keys for keys, _ in conf_1.walk(no_ignore=True)]),
+            ("__eq__",
+             lambda: old_eq(conf_1, conf_2),
+             lambda: conf_1 == conf_2),
+            ("set_from_configs",
+             lambda: get_diff(old_set_from_configs, conf_1, conf_3),
+             lambda: get_diff(
+                 ConfigNodeDiff.set_from_configs.im_func, conf_1, conf_3))]:
+        old_elapsed, old_result = time_call(old_func, n_times)
+        new_elapsed, new_result = time_call(new_func, n_times)
+        assert old_result == new_result
+        print "%-16s %d settings old %8.4fs new %8.4fs (%5.1fx)" % (
+            label, n_settings, old_elapsed, new_elapsed,
+            old_elapsed / new_elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the cache of parsed configuration files of ConfigTreeLoader.
+
+Generate a metadata-like configuration tree, where a versioned metadata
+directory imports a large common metadata directory, then load the tree
+repeatedly, as "rose macro" or "rose config-edit" do for each application of
+a suite:
+* With no cache, so every file is parsed on every load.
+* With the in-memory cache of the process.
+* With a fresh cache on a cache directory for every load, which is how later
+  commands see the cache of earlier ones.
+Check that all loads give identical results.
+
+Usage: rose_config_tree_load.py [N-SECTIONS [N-TIMES]]
+
+"""
+
+import os
+from shutil import rmtree
+from StringIO import StringIO
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigLoaderCache, dump
+from rose.config_tree import ConfigTreeLoader
+
+
+def write_meta_tree(work_dir, n_sections):
+    """Write a metadata tree with a common and a versioned directory."""
+    common_dir = os.path.join(work_dir, "common")
+    vn_dir = os.path.join(work_dir, "vn1.0")
+    for dir_ in common_dir, vn_dir:
+        os.mkdir(dir_)
+    handle = open(os.path.join(common_dir, "rose-meta.conf"), "w")
+    for i in range(n_sections):
+        handle.write(
+            "[namelist:nml%d=item%d]\n" % (i % 50, i) +
+            "# Comment on item %d.\n" % i +
+            "description=Item %d of the common metadata\n" % i +
+            "help=This is item %d.\n    =It has a long help text.\n" % i +
+            "range=0:%d\n" % (i + 10) +
+            "type=integer\n\n")
+    handle.close()
+    handle = open(os.path.join(vn_dir, "rose-meta.conf"), "w")
+    handle.write("import=common\n\n")
+    for i in range(0, n_sections, 10):
+        handle.write("[namelist:nml%d=item%d]\nrange=0:1\n\n" % (i % 50, i))
+    handle.close()
+    for dir_ in common_dir, vn_dir:
+        os.utime(os.path.join(dir_, "rose-meta.conf"), (1E9, 1E9))
+    return vn_dir
+
+
+def time_load(get_loader, conf_dir, n_times):
+    """Load the tree n_times, return (elapsed, dumped node)."""
+    start = time()
+    for _ in range(n_times):
+        conf_tree = get_loader().load(conf_dir, "rose-meta.conf")
+    elapsed = time() - start
+    out = StringIO()
+    dump(conf_tree.node, out)
+    return elapsed, out.getvalue()
+
+
+def main():
+    """Run benchmark."""
+    n_sections = 5000
+    n_times = 10
+    if len(sys.argv) > 1:
+        n_sections = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    work_dir = mkdtemp()
+    try:
+        vn_dir = write_meta_tree(work_dir, n_sections)
+        cache_dir = os.path.join(work_dir, "cache")
+        process_cache = ConfigLoaderCache()
+        results = []
+        for label, get_loader in [
+                ("no cache", lambda: ConfigTreeLoader(cache=None)),
+                ("process cache",
+                 lambda: ConfigTreeLoader(cache=process_cache)),
+                ("cache directory",
+                 lambda: ConfigTreeLoader(
+                     cache=ConfigLoaderCache(cache_dir)))]:
+            elapsed, text = time_load(get_loader, vn_dir, n_times)
+            results.append(text)
+            print "%-16s %d loads %8.4fs (%6.1f loads/s)" % (
+                label, n_times, elapsed, n_times / elapsed)
+        assert results[0] == results[1] == results[2]
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
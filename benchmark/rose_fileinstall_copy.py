@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the install of a large file target by file install.
+
+Compare the old install, which copied the source in a Python read/write
+loop then read the target again for its checksum, with the new install,
+which lets the kernel copy or clone the data and reuses the (cached)
+checksum of the source, and with the new install with hard links.
+
+Usage: rose_fileinstall_copy.py [MEGABYTES [N-TIMES]]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+os.environ.setdefault("ROSE_NS", "rose")
+os.environ.setdefault("ROSE_UTIL", "benchmark")
+
+from rose.checksum import get_checksum
+from rose.config import ConfigNode
+from rose.config_processor import ConfigProcessorsManager
+from rose.config_processors.fileinstall import ConfigProcessorForFile, Loc
+from rose.config_tree import ConfigTree
+
+
+def old_target_install(target):
+    """The old install of a file target from a single source."""
+    source = target.dep_locs[0]
+    handle = open(target.name, "wb")
+    f_bsize = os.statvfs(source.cache).f_bsize
+    source_handle = open(source.cache)
+    while True:
+        bytes_ = source_handle.read(f_bsize)
+        if not bytes_:
+            break
+        handle.write(bytes_)
+    source_handle.close()
+    handle.close()
+    os.chmod(target.name, os.stat(source.cache).st_mode)
+    for path, checksum, access_mode in get_checksum(target.name):
+        target.add_path(path, checksum, access_mode)
+
+
+def main():
+    """Run benchmark."""
+    size = 512
+    n_times = 3
+    if len(sys.argv) > 1:
+        size = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    work_dir = mkdtemp()
+    try:
+        source_name = os.path.join(work_dir, "source.bin")
+        with open(source_name, "wb") as handle:
+            for _ in range(size):
+                handle.write(os.urandom(1024 * 1024))
+        old_time = time() - 3600
+        os.utime(source_name, (old_time, old_time))
+        # As parsed by the "fs" location handler
+        checksum = get_checksum(source_name)[0][1]
+        processor = ConfigProcessorForFile(manager=ConfigProcessorsManager())
+        for label, hardlink in [
+                ("old", None), ("new", "false"), ("new, hardlink", "true")]:
+            conf_tree = ConfigTree()
+            conf_tree.node = ConfigNode()
+            conf_tree.node.set(
+                ["rose.config_processors.fileinstall", "hardlink"], hardlink)
+            elapsed = 0.0
+            for i in range(n_times):
+                source = Loc(source_name, "fs")
+                source.cache = source_name
+                source.loc_type = source.TYPE_BLOB
+                target = Loc(os.path.join(work_dir, "target%d.bin" % i),
+                             None, [source])
+                t_0 = time()
+                if hardlink is None:
+                    old_target_install(target)
+                else:
+                    processor._target_install(target, conf_tree, work_dir)
+                elapsed += time() - t_0
+                assert target.paths[0].checksum == checksum
+                os.unlink(target.name)
+            print "%-15s %8.3fs %10.1f MB/s" % (
+                label, elapsed / n_times, size * n_times / elapsed)
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
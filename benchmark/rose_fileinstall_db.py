@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the file install database, LocDAO, of a synthetic app.
+
+Each target of the app is a file installed from its own source file. Time
+the queued updates of all the locations, then the lookup of all the sources
+and targets, which is what happens before any file is installed on the next
+run. Compare the old one query per table per location lookups and the
+default journal mode with the new bulk load and WAL mode.
+
+Usage: rose_fileinstall_db.py [N-TARGETS]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config_processors.fileinstall import Loc, LocDAO
+
+
+class OldLocDAO(LocDAO):
+    """LocDAO with the old default journal mode and per location lookups."""
+
+    def get_conn(self):
+        if self.conn is None:
+            import sqlite3
+            self.conn = sqlite3.connect(self.file_name)
+        return self.conn
+
+    def select(self, name):
+        conn = self.get_conn()
+        row = conn.execute("""SELECT real_name,scheme,mode,loc_type,key""" +
+                           """ FROM locs WHERE name=?""", [name]).fetchone()
+        if row is None:
+            return
+        loc = Loc(name)
+        loc.real_name, loc.scheme, loc.mode, loc.loc_type, loc.key = row
+        for row in conn.execute(
+                """SELECT path,checksum FROM paths WHERE name=?""",
+                [name]):
+            path, checksum_str = row
+            checksum = None
+            access_mode = None
+            if checksum_str:
+                checksum_items = checksum_str.rsplit(":", 1)
+                checksum = checksum_items.pop(0)
+                if checksum_items:
+                    access_mode = int(checksum_items.pop(0))
+            loc.add_path(path, checksum, access_mode)
+        for row in conn.execute(
+                """SELECT dep_name FROM dep_names WHERE name=?""", [name]):
+            dep_name, = row
+            if loc.dep_locs is None:
+                loc.dep_locs = []
+            loc.dep_locs.append(self.select(dep_name))
+        return loc
+
+
+def get_locs(n_targets):
+    """Return a list of sources and targets."""
+    locs = []
+    for i in range(n_targets):
+        source = Loc("/src/etc/source%06d.txt" % i, "fs")
+        source.loc_type = source.TYPE_BLOB
+        source.add_path("", "%032x" % i, 0100644)
+        target = Loc("target%06d.txt" % i, "fs", [source])
+        target.loc_type = target.TYPE_BLOB
+        target.mode = "auto"
+        target.add_path("", "%032x" % i, 0100644)
+        locs.extend([source, target])
+    return locs
+
+
+def time_dao(dao_class, locs):
+    """Return (seconds to update, seconds to select) for all locs."""
+    dao = dao_class()
+    dao.create()
+    dao.update_locs.extend(locs)
+    t_0 = time()
+    dao.execute_queued_items()
+    t_update = time() - t_0
+    dao.close()
+    dao = dao_class()
+    t_0 = time()
+    for loc in locs:
+        prev_loc = dao.select(loc.name)
+        assert prev_loc.paths == loc.paths
+    t_select = time() - t_0
+    dao.close()
+    return t_update, t_select
+
+
+def main():
+    """Run benchmark."""
+    n_targets = 5000
+    if len(sys.argv) > 1:
+        n_targets = int(sys.argv[1])
+    locs = get_locs(n_targets)
+    cwd = os.getcwd()
+    for dao_class, label in [(OldLocDAO, "old"), (LocDAO, "new")]:
+        work_dir = mkdtemp()
+        os.chdir(work_dir)
+        try:
+            t_update, t_select = time_dao(dao_class, locs)
+        finally:
+            os.chdir(cwd)
+            rmtree(work_dir)
+        print "%-4s update %8.3fs, select %8.3fs (%.1f locations/s)" % (
+            label, t_update, t_select, len(locs) / t_select)
+
+
+if __name__ == "__main__":
+    main()
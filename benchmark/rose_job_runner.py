@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rose.job_runner.JobRunner on a directed acyclic graph of jobs.
+
+Compare the old runner, which polled its results every 0.05s, with the
+completion driven runner using process and thread workers. Each job sleeps
+for a given number of milliseconds to represent a short I/O bound job.
+
+Usage: rose_job_runner.py [N-JOBS [JOB-MILLISECONDS]]
+
+"""
+
+from multiprocessing import Pool
+import os
+import random
+import sys
+from time import sleep, time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.job_runner import (
+    JobManager, JobProxy, JobRunner, JobRunnerNotCompletedError,
+    JobRunnerWorkerEventHandler)
+
+
+class Context(object):
+    """A minimal job context."""
+
+    def __init__(self, name):
+        self.name = name
+        self.result = None
+
+    def __str__(self):
+        return self.name
+
+    def update(self, other):
+        """Update with the result of "other"."""
+        self.result = other.result
+
+
+class JobProcessor(object):
+    """A job processor that sleeps for a fixed duration in each job."""
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.n_done = 0
+
+    def handle_event(self, *args):
+        """Ignore events."""
+        pass
+
+    def process_job(self, job):
+        """Sleep and set a result."""
+        sleep(self.duration)
+        job.context.result = job.name
+
+    def post_process_job(self, job):
+        """Count completed jobs."""
+        self.n_done += 1
+
+    def set_event_handler(self, event_handler):
+        """Ignore event handler."""
+        pass
+
+
+def _old_job_run(job_processor, job_proxy, *args):
+    """The old helper of the runner, run a job in a worker process."""
+    event_handler = JobRunnerWorkerEventHandler()
+    job_processor.set_event_handler(event_handler)
+    try:
+        job_processor.process_job(job_proxy, *args)
+    except Exception as exc:
+        job_proxy.exc = exc
+    finally:
+        job_processor.set_event_handler(None)
+    return (job_proxy, event_handler.events)
+
+
+class OldJobRunner(JobRunner):
+    """The old runner, which polls its results.
+
+    The old runner also sent each JobProxy with its links to other jobs to
+    the worker, which pickles much of the graph and overflows the recursion
+    limit on a deep graph. Send an unlinked JobProxy here, so only the cost
+    of polling is measured.
+
+    """
+
+    POLL_DELAY = 0.05
+
+    def run(self, job_manager, *args):
+        pool = Pool(processes=min(self.nproc, len(job_manager.jobs)))
+        results = {}
+        while job_manager.has_jobs():
+            for name, result in results.items():
+                if result.ready():
+                    results.pop(name)
+                    job_proxy = result.get()[0]
+                    job = job_manager.put_job(job_proxy)
+                    if job_proxy.exc is None:
+                        self.job_processor.post_process_job(job, *args)
+            while job_manager.has_ready_jobs():
+                job = job_manager.get_job()
+                if job is None:
+                    break
+                job_run_args = [self.job_processor,
+                                JobProxy(job.context)] + list(args)
+                results[job.name] = pool.apply_async(
+                    _old_job_run, job_run_args)
+            if results:
+                sleep(self.POLL_DELAY)
+        if job_manager.get_dead_jobs():
+            raise JobRunnerNotCompletedError(job_manager.get_dead_jobs())
+
+    __call__ = run
+
+
+def get_jobs(n_jobs):
+    """Return a DAG of "n_jobs" jobs, each depends on up to 3 earlier ones."""
+    rand = random.Random(n_jobs)
+    jobs = {}
+    names = []
+    for i in range(n_jobs):
+        name = "job%06d" % i
+        job = JobProxy(Context(name))
+        for dep_name in set(rand.sample(names, min(len(names), 3))):
+            job.pending_for[dep_name] = jobs[dep_name]
+        jobs[name] = job
+        names.append(name)
+    return jobs
+
+
+def time_run(runner_class, n_jobs, duration, **kwargs):
+    """Return (seconds, n_done) to run "n_jobs" jobs."""
+    job_processor = JobProcessor(duration)
+    runner = runner_class(job_processor, **kwargs)
+    jobs = get_jobs(n_jobs)
+    t_0 = time()
+    runner(JobManager(jobs))
+    return time() - t_0, job_processor.n_done
+
+
+def main():
+    """Run benchmark."""
+    n_jobs = 1000
+    duration = 0.001
+    if len(sys.argv) > 1:
+        n_jobs = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        duration = float(sys.argv[2]) / 1000.0
+    for label, runner_class, kwargs in [
+            ("old polling runner", OldJobRunner, {}),
+            ("process workers", JobRunner,
+             {"worker_type": JobRunner.WORKER_PROCESS}),
+            ("thread workers", JobRunner,
+             {"worker_type": JobRunner.WORKER_THREAD})]:
+        elapsed, n_done = time_run(runner_class, n_jobs, duration, **kwargs)
+        print "%-20s %8.3fs %10.1f jobs/s (%d done)" % (
+            label, elapsed, n_done / elapsed, n_done)
+
+
+if __name__ == "__main__":
+    main()
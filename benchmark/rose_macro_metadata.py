@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the lookup of metadata by the built-in validator macros.
+
+Generate an app configuration and metadata with many duplicate namelists,
+some with modifiers, in the style of the UM. Run the built-in validators, as
+"rose macro -V" does, with:
+* The old lookup, which strips the id with regular expressions and merges
+  the properties of the metadata sections on every call, and the old
+  ValueChecker, which deep copies the result.
+* The current lookup, which indexes the metadata.
+Check that both report the same problems. Time the lookup of the metadata of
+each setting on its own too.
+
+Usage: rose_macro_metadata.py [N-NAMELISTS [N-OPTIONS]]
+
+"""
+
+import copy
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+import rose
+from rose.config import ConfigNode
+import rose.macro
+from rose.macro import (REC_ID_STRIP_DUPL, REC_MODIFIER,
+                        REC_ID_SINGLE_ELEMENT)
+import rose.macros
+
+
+PROPERTIES = [
+    [("type", "integer"), ("range", "0:100")],
+    [("type", "real"), ("length", ":")],
+    [("type", "logical")],
+    [("values", "1, 2, 3")],
+    [("type", "character"), ("pattern", "^'\\w*'$")],
+]
+VALUES = ["42", "1.5, 2.5, 3.5", ".true.", "2", "'abc'"]
+
+
+def get_config_and_meta(n_namelists, n_options):
+    """Return (config, meta_config) with n_namelists namelists."""
+    config = ConfigNode()
+    meta_config = ConfigNode()
+    for base in ["namelist:domain", "namelist:run{ocean}"]:
+        meta_config.set([base, "duplicate"], "true")
+        meta_config.set([base, "title"], base)
+        for j in range(n_options):
+            meta_section = "%s=opt_%d" % (REC_MODIFIER.sub("", base), j)
+            meta_config.set([meta_section, "title"], "Option %d" % j)
+            meta_config.set([meta_section, "compulsory"], "true")
+            for key, value in PROPERTIES[j % len(PROPERTIES)]:
+                meta_config.set([meta_section, key], value)
+        for i in range(n_namelists // 2):
+            section = "%s(%d)" % (base, i + 1)
+            for j in range(n_options):
+                value = VALUES[j % len(VALUES)]
+                if (i + j) % 97 == 0:
+                    value = "-1"
+                config.set([section, "opt_%d" % j], value)
+    return config, meta_config
+
+
+def old_get_metadata_for_config_id(setting_id, meta_config):
+    """The old get_metadata_for_config_id."""
+    metadata = {}
+    if rose.CONFIG_DELIMITER in setting_id:
+        section, option = setting_id.split(rose.CONFIG_DELIMITER, 1)
+        search_option = REC_ID_STRIP_DUPL.sub("", option)
+    else:
+        section = setting_id
+        option = None
+    search_id = REC_ID_STRIP_DUPL.sub("", setting_id)
+    no_modifier_id = REC_MODIFIER.sub("", search_id)
+    if no_modifier_id != search_id:
+        node = meta_config.get([no_modifier_id], no_ignore=True)
+        if node is not None:
+            for opt, opt_node in node.value.items():
+                if not opt_node.is_ignored():
+                    metadata.update({opt: opt_node.value})
+            if option is None and rose.META_PROP_TITLE in metadata:
+                modifier = search_id.replace(no_modifier_id, "")
+                metadata[rose.META_PROP_TITLE] += " " + modifier
+            if (setting_id != search_id and
+                    rose.META_PROP_DUPLICATE in metadata):
+                metadata.pop(rose.META_PROP_DUPLICATE)
+    node = meta_config.get([search_id], no_ignore=True)
+    if node is not None:
+        for opt, opt_node in node.value.items():
+            if not opt_node.is_ignored():
+                metadata.update({opt: opt_node.value})
+    if rose.META_PROP_TITLE in metadata:
+        if option is None:
+            if search_id != setting_id:
+                metadata.pop(rose.META_PROP_TITLE)
+        elif search_option != option:
+            index = option.replace(search_option, "")
+            metadata[rose.META_PROP_TITLE] += " " + index
+    if (rose.META_PROP_LENGTH in metadata and
+            option is not None and search_option != option and
+            REC_ID_SINGLE_ELEMENT.search(option)):
+        metadata.pop(rose.META_PROP_LENGTH)
+    metadata.update({'id': setting_id})
+    return metadata
+
+
+def get_old_validate_id(validate_id):
+    """Return ValueChecker._validate_id, with the old deep copy."""
+
+    def old_validate_id(self, var_id, value, meta_config):
+        """ValueChecker._validate_id, with the old deep copy."""
+        get_metadata = rose.macro.get_metadata_for_config_id
+        rose.macro.get_metadata_for_config_id = (
+            lambda *args: copy.deepcopy(get_metadata(*args)))
+        try:
+            return validate_id(self, var_id, value, meta_config)
+        finally:
+            rose.macro.get_metadata_for_config_id = get_metadata
+
+    return old_validate_id
+
+
+def main():
+    """Run benchmark."""
+    n_namelists = 400
+    n_options = 50
+    if len(sys.argv) > 1:
+        n_namelists = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_options = int(sys.argv[2])
+    config, meta_config = get_config_and_meta(n_namelists, n_options)
+    setting_ids = [rose.CONFIG_DELIMITER.join(keys)
+                   for keys, _ in config.walk()]
+    get_metadata = rose.macro.get_metadata_for_config_id
+    value_checker_class = rose.macros.value.ValueChecker
+    validate_id = value_checker_class.__dict__["_validate_id"]
+    results = None
+    for name, run_get_metadata, run_validate_id in [
+            ("old", old_get_metadata_for_config_id,
+             get_old_validate_id(validate_id)),
+            ("indexed", get_metadata, validate_id)]:
+        rose.macro.get_metadata_for_config_id = run_get_metadata
+        value_checker_class._validate_id = run_validate_id
+        rose.macro.MetadataIndex.INDEXES.clear()
+        rose.macro.MetadataIndex.LAST_INDEX = None
+        try:
+            start = time()
+            reports = rose.macros.DefaultValidators().validate(
+                config, meta_config)
+            elapsed = time() - start
+        finally:
+            rose.macro.get_metadata_for_config_id = get_metadata
+            value_checker_class._validate_id = validate_id
+        start = time()
+        for setting_id in setting_ids:
+            run_get_metadata(setting_id, meta_config)
+        lookup_elapsed = time() - start
+        reports = [(report.section, report.option, report.value,
+                    report.info, report.is_warning) for report in reports]
+        if results is None:
+            results = reports
+            old_elapsed = elapsed
+            old_lookup_elapsed = lookup_elapsed
+        assert reports == results
+        print "%-8s %6d settings validate %8.3f s (%5.1fx)" % (
+            name, len(setting_ids), elapsed, old_elapsed / elapsed)
+        print "%-8s %6d settings lookup   %8.3f s (%5.1fx)" % (
+            name, len(setting_ids), lookup_elapsed,
+            old_lookup_elapsed / lookup_elapsed)
+    print "%d problems" % len(results)
+
+
+if __name__ == "__main__":
+    main()
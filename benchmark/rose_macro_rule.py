@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the evaluation of fail-if and warn-if metadata rules.
+
+Generate an app configuration and metadata with many namelists in the style
+of the UM, with rules like those of the demo "06-complex-rule" metadata:
+arithmetic, comparison against other settings, array elements, any(...),
+all(...) and len(...). Validate the configuration N-RUNS times, as
+"rose config-edit" does on each change, with FailureRuleChecker and:
+* The old evaluator, which pre-processes each rule into a Jinja2 template
+  and renders it for every evaluation.
+* The current evaluator, which compiles each rule once.
+Check that both report the same problems.
+
+Usage: rose_macro_rule.py [N-NAMELISTS [N-RUNS]]
+
+"""
+
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigNode
+import rose.macros.rule
+
+
+RULES = [
+    ("this < namelist:{0}=control_lt", "5", "integer"),
+    ("this != namelist:{0}=control_sum_1 + namelist:{0}=control_sum_2",
+     "6.5", "real"),
+    ("this % 2 == 1  # Not allowed to be odd", "3", "integer"),
+    ("this > 0; this * this * this > 1000", "4", "integer"),
+    ("this(2) != \"'0A'\" and this(4) == \"'0A'\"", "'0A', '2A', '0A', '0A'",
+     None),
+    ("any(namelist:{0}=control_array < this)", "6", "integer"),
+    ("all(this == 0)", "0, 0, 0, 1, 0", "integer"),
+    ("len(this) != len(namelist:{0}=control_array)", "1, 2, 3", "integer"),
+    ("\"D\" in this", "'ABCDEFG'", None),
+    ("namelist:{0}=l_switch == \".true.\" and this < 1.0e-3", "2.5e-4",
+     "real"),
+]
+
+
+def get_config_and_meta(n_namelists):
+    """Return (config, meta_config) with n_namelists namelists."""
+    config = ConfigNode()
+    meta_config = ConfigNode()
+    for i in range(n_namelists):
+        name = "run_{0:03d}".format(i)
+        for key, value in [
+                ("control_lt", str(i % 7)),
+                ("control_sum_1", "2.0"),
+                ("control_sum_2", str(i % 5)),
+                ("control_array", ", ".join(
+                    str(j) for j in range(i % 6 + 1))),
+                ("l_switch", ".true.")]:
+            config.set(["namelist:" + name, key], value)
+        for j, (rule, value, type_) in enumerate(RULES):
+            key = "test_var_{0}".format(j)
+            config.set(["namelist:" + name, key], value)
+            meta_section = "namelist:{0}={1}".format(name, key)
+            meta_config.set([meta_section, "fail-if"], rule.format(name))
+            if type_:
+                meta_config.set([meta_section, "type"], type_)
+            if "," in value:
+                meta_config.set([meta_section, "length"], ":")
+    return config, meta_config
+
+
+class OldRuleEvaluator(rose.macros.rule.RuleEvaluator):
+    """The old evaluator, which renders a Jinja2 template every time."""
+
+    def evaluate_rule(self, rule, setting_id, config, meta_config):
+        return self._evaluate_rule_template(
+            rule, setting_id, config, meta_config)
+
+
+def main():
+    """Run benchmark."""
+    n_namelists = 100
+    n_runs = 5
+    if len(sys.argv) > 1:
+        n_namelists = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_runs = int(sys.argv[2])
+    config, meta_config = get_config_and_meta(n_namelists)
+    n_rules = n_namelists * len(RULES)
+    evaluator_class = rose.macros.rule.RuleEvaluator
+    results = None
+    for name, run_evaluator_class in [
+            ("old", OldRuleEvaluator), ("compiled", evaluator_class)]:
+        rose.macros.rule.RuleEvaluator = run_evaluator_class
+        evaluator_class.COMPILED_RULES.clear()
+        try:
+            checker = rose.macros.rule.FailureRuleChecker()
+            start = time()
+            for _ in range(n_runs):
+                reports = checker.validate(config, meta_config)
+            elapsed = time() - start
+        finally:
+            rose.macros.rule.RuleEvaluator = evaluator_class
+        reports = [(report.section, report.option, report.value,
+                    report.info, report.is_warning) for report in reports]
+        if results is None:
+            results = reports
+            old_elapsed = elapsed
+        assert reports == results
+        print "%-8s %6d rules x %d runs %8.3f s (%5.1fx)" % (
+            name, n_rules, n_runs, elapsed, old_elapsed / elapsed)
+    print "%d problems" % len(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the transform and validation of metadata triggers.
+
+Generate an app configuration and metadata with N-TRIGGERS triggers, in
+chains of DEPTH levels where each setting triggers both settings of the next
+level, so that the chains share descendants. Run TriggerMacro.transform, as
+"rose macro --fix" and "rose config-edit" do, and TriggerMacro.validate,
+with:
+* The old macro, which ranks and updates the triggers by walking every path
+  through the chains, and validates a deep copy of the configuration.
+* The current macro, which ranks the triggers in topological order, visits
+  each trigger once per update, and validates the configuration in place.
+Check that both give identical states and reports.
+
+Usage: rose_macro_trigger.py [N-TRIGGERS [DEPTH]]
+
+"""
+
+import copy
+import os
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigNode
+import rose.macros.trigger
+
+
+def get_config_and_meta(n_triggers, depth):
+    """Return (config, meta_config) with about n_triggers triggers."""
+    config = ConfigNode()
+    meta_config = ConfigNode()
+    n_chains = max(1, n_triggers // (2 * depth + 1))
+    for i in range(n_chains):
+        section = "namelist:chain_%d" % i
+        leaf_section = "namelist:leaf_%d" % i
+        levels = [["root"]] + [
+            ["l%d_%d" % (level, j) for j in range(2)]
+            for level in range(1, depth + 1)]
+        for level, options in enumerate(levels):
+            for j, option in enumerate(options):
+                setting_id = section + "=" + option
+                if level == depth:
+                    trigger = leaf_section
+                else:
+                    trigger = "; ".join(
+                        "%s=%s: 1" % (section, child)
+                        for child in levels[level + 1])
+                meta_config.set([setting_id, "trigger"], trigger)
+                # Disable some chains part way down.
+                value = "0" if (i + level + j) % (depth + 3) == 0 else "1"
+                config.set([section, option], value)
+        meta_config.set([section])
+        meta_config.set([leaf_section])
+        meta_config.set([leaf_section + "=value"])
+        config.set([leaf_section, "value"], "1")
+    return config, meta_config
+
+
+class OldTriggerMacro(rose.macros.trigger.TriggerMacro):
+    """The old TriggerMacro, which walks every path through the triggers."""
+
+    def _setup_triggers(self, meta_config):
+        super(OldTriggerMacro, self)._setup_triggers(meta_config)
+        self._trigger_involved_ids = self.get_all_ids()
+
+    def transform(self, config, meta_config=None):
+        """Apply metadata trigger expressions to variables."""
+        self.reports = []
+        meta_config = self._load_meta_config(config, meta_config)
+        self._setup_triggers(meta_config)
+        self.enabled_dict = {}
+        self.ignored_dict = {}
+        enabled = rose.config.ConfigNode.STATE_NORMAL
+        trig_ignored = rose.config.ConfigNode.STATE_SYST_IGNORED
+        user_ignored = rose.config.ConfigNode.STATE_USER_IGNORED
+        state_map = {enabled: 'enabled     ',
+                     trig_ignored: 'trig-ignored',
+                     user_ignored: 'user-ignored'}
+        id_list = []
+        prev_ignoreds = {trig_ignored: [], user_ignored: []}
+        for keylist, node in config.walk():
+            if len(keylist) == 1:
+                n_id = keylist[0]
+            else:
+                n_id = self._get_id_from_section_option(*keylist)
+            id_list.append(n_id)
+            if node.state in prev_ignoreds:
+                prev_ignoreds[node.state].append(n_id)
+
+        ranked_ids = self._get_ranked_trigger_ids()
+        for rank, var_id in sorted(ranked_ids):
+            self.update(var_id, config, meta_config)
+
+        # Report any discrepancies in ignored status.
+        for var_id in id_list:
+            section, option = self._get_section_option_from_id(var_id)
+            node = config.get([section, option])
+            old, new = None, None
+            if var_id in self.ignored_dict:
+                node.state = trig_ignored
+                if not any([var_id in v for k, v in prev_ignoreds.items()]):
+                    old, new = state_map[enabled], state_map[trig_ignored]
+            elif var_id in prev_ignoreds[trig_ignored]:
+                node.state = enabled
+                old, new = state_map[trig_ignored], state_map[enabled]
+            elif (var_id in prev_ignoreds[user_ignored] and
+                  var_id in self._trigger_involved_ids):
+                node.state = enabled
+                old, new = state_map[user_ignored], state_map[enabled]
+            if old != new:
+                info = self.WARNING_STATE_CHANGED.format(old, new)
+                if option is None:
+                    value = None
+                else:
+                    value = node.value
+                self.add_report(section, option, value, info)
+        return config, self.reports
+
+    def update(self, var_id, config_data, meta_config):
+        """Update enabled and ignored ids starting with var_id.
+
+        var_id - a setting id to start the triggering update at.
+        If an id has duplicates (e.g. is part of a duplicate section),
+        update all duplicate ids.
+        config_data - a rose.config.ConfigNode or a dictionary that
+        looks like this:
+        {"sections":
+            {"namelist:foo": rose.section.Section instance,
+             "env": rose.section.Section instance},
+         "variables":
+            {"namelist:foo": [rose.variable.Variable instance,
+                              rose.variable.Variable instance],
+             "env": [rose.variable.Variable instance]
+            }
+        }
+        meta_config - a rose.config.ConfigNode.
+
+        """
+        config_sections = self._get_config_sections(config_data)
+        config_sections_duplicate_map = self._get_duplicate_config_sections(
+            config_data, config_sections=config_sections)
+        start_ids = [var_id]
+        alt_ids = self._get_id_duplicates(
+            var_id, config_data, meta_config,
+            config_sections_duplicate_map=config_sections_duplicate_map
+        )
+        if alt_ids:
+            start_ids = alt_ids
+        # For each id in our starting list, figure out if it itself is
+        # already effectively trigger-ignored.
+        id_stack = []
+        for start_id in start_ids:
+            is_ignored = True
+            if (start_id in self.enabled_dict and
+                    start_id not in self.ignored_dict):
+                # Definitely enabled.
+                is_ignored = False
+            if not sum([var_id in v for v in
+                        self.trigger_family_lookup.values()]):
+                # Not triggered by anything, so must be enabled.
+                is_ignored = False
+            section, option = self._get_section_option_from_id(start_id)
+            is_node_present = self._get_config_has_id(config_data, start_id)
+            if section in self.ignored_dict and option is not None:
+                # Parent section of an option is ignored, so option is.
+                is_ignored = True
+            # If the id is missing, anything it triggers should be ignored.
+            is_ignored = is_ignored or not is_node_present
+            id_stack.append((start_id, is_ignored))
+        update_id_list = []
+        while id_stack:
+            this_id, has_ignored_parent = id_stack[0]
+            # For each id, examine its duplicates (if any) and all children.
+            alt_ids = self._get_id_duplicates(
+                this_id, config_data, meta_config,
+                config_sections_duplicate_map=config_sections_duplicate_map
+            )
+            if alt_ids:
+                this_id = alt_ids.pop(0)
+            for alt_id in alt_ids:
+                id_stack.insert(1, (alt_id, has_ignored_parent))
+            is_duplicate = self._check_is_id_dupl(this_id, meta_config)
+            # Triggered sections need their options to trigger sub children.
+            if this_id in config_sections:
+                options = []
+                for option in self._get_config_section_options(config_data,
+                                                               this_id):
+                    skip_id = self._get_id_from_section_option(
+                        this_id, option)
+                    if skip_id in self.trigger_family_lookup:
+                        id_stack.insert(1, (skip_id, has_ignored_parent))
+            update_id_list.append(this_id)
+            if not self.check_is_id_trigger(this_id, meta_config):
+                id_stack.pop(0)
+                continue
+            if not has_ignored_parent:
+                section, option = self._get_section_option_from_id(this_id)
+                is_node_present = self._get_config_has_id(
+                    config_data, this_id)
+                value = self._get_config_id_value(
+                    config_data, this_id)
+                if option is None and is_node_present:
+                    value = True
+            # Check the children of this id
+            id_val_map = self._get_family_dict(
+                this_id, config_data, meta_config)
+            for child_id, vals in id_val_map.items():
+                if has_ignored_parent or value is None:
+                    help_text = self.IGNORED_STATUS_PARENT.format(this_id)
+                    self.ignored_dict.setdefault(child_id, {})
+                    self.ignored_dict[child_id].update({this_id: help_text})
+                    if child_id in self.enabled_dict:
+                        child_list = self.enabled_dict[child_id]
+                        if this_id in child_list:
+                            child_list.remove(this_id)
+                        if not child_list:
+                            self.enabled_dict.pop(child_id)
+                    id_stack.insert(1, (child_id, True))
+                else:  # Enabled parent
+                    if vals == [None]:
+                        # Enabled parent with a value, don't care what it is.
+                        self.enabled_dict.setdefault(child_id, [])
+                        if this_id not in self.enabled_dict[child_id]:
+                            self.enabled_dict[child_id].append(this_id)
+                        if this_id in self.ignored_dict.get(child_id, {}):
+                            self.ignored_dict[child_id].pop(this_id)
+                        if (child_id in self.ignored_dict and
+                                self.ignored_dict[child_id] == {}):
+                            self.ignored_dict.pop(child_id)
+                        id_stack.insert(1, (child_id, False))
+                    elif not self._check_values_ok(value, this_id, vals):
+                        # Enabled parent, with the wrong values.
+                        repr_value = self.PARENT_VALUE.format(value)
+                        if len(vals) == 1:
+                            help_text = self.IGNORED_STATUS_VALUE.format(
+                                this_id, repr_value, repr(vals[0]))
+                        else:
+                            help_text = self.IGNORED_STATUS_VALUES.format(
+                                this_id, repr_value, repr(vals))
+                        self.ignored_dict.setdefault(child_id, {})
+                        self.ignored_dict[child_id].update(
+                            {this_id: help_text})
+                        if child_id in self.enabled_dict:
+                            child_list = self.enabled_dict[child_id]
+                            if this_id in child_list:
+                                child_list.remove(this_id)
+                            if not child_list:
+                                self.enabled_dict.pop(child_id)
+                        id_stack.insert(1, (child_id, True))
+                    else:
+                        # Enabled parent, value is ok.
+                        self.enabled_dict.setdefault(child_id, [])
+                        if this_id not in self.enabled_dict[child_id]:
+                            self.enabled_dict[child_id].append(this_id)
+                        if this_id in self.ignored_dict.get(child_id, {}):
+                            self.ignored_dict[child_id].pop(this_id)
+                        if (child_id in self.ignored_dict and
+                                self.ignored_dict[child_id] == {}):
+                            self.ignored_dict.pop(child_id)
+                        id_stack.insert(1, (child_id, False))
+            id_stack.pop(0)
+        return update_id_list
+
+    def _get_ranked_trigger_ids(self):
+        """Return trigger ids with their maximum trigger chain depth.
+
+        We need these to update in breadth-first order to get the ignored
+        parent statuses correct and trickled down.
+
+        """
+        # Starting stack has each starting point id with a default depth of 0.
+        # The depth will be overwritten with whatever is the maximum depth
+        # eventually found for that id.
+        stack = [(id_, 0) for id_ in self.trigger_family_lookup]
+
+        # Create a dictionary to store the maximum depth (rank) for each id.
+        id_ranks = dict(stack)
+
+        # Loop over the stack, going down all possible trigger chains.
+        while stack:
+            parent_id, depth = stack.pop(0)
+            child_ids = self.trigger_family_lookup.get(parent_id, [])
+            for child_id in child_ids:
+                id_ranks.setdefault(child_id, depth + 1)
+                if depth + 1 > id_ranks[child_id]:
+                    id_ranks[child_id] = depth + 1
+                stack.append((child_id, depth + 1))
+        ranked_ids = []
+        for id_, rank in id_ranks.items():
+            ranked_ids.append((rank, id_))
+        ranked_ids.sort()
+        return ranked_ids
+
+    def validate(self, config, meta_config=None):
+        self.reports = []
+        if meta_config is None:
+            meta_config = rose.config.ConfigNode()
+        if not hasattr(self, 'trigger_family_lookup'):
+            self._setup_triggers(meta_config)
+        enabled = rose.config.ConfigNode.STATE_NORMAL
+        trig_ignored = rose.config.ConfigNode.STATE_SYST_IGNORED
+        user_ignored = rose.config.ConfigNode.STATE_USER_IGNORED
+        state_map = {enabled: 'enabled     ',
+                     trig_ignored: 'trig-ignored',
+                     user_ignored: 'user-ignored'}
+
+        invalid_trigger_reports = self.validate_dependencies(config,
+                                                             meta_config)
+        if invalid_trigger_reports:
+            return invalid_trigger_reports
+        macro_config = copy.deepcopy(config)
+        trig_config, reports = self.transform(macro_config, meta_config)
+        transform_reports = copy.deepcopy(reports)
+        del self.reports[:]
+        for report in transform_reports:
+            config_node = config.get([report.section, report.option])
+            trig_config_node = trig_config.get([report.section, report.option])
+            if report.option is None:
+                value = None
+            else:
+                value = trig_config_node.value
+            after_state_string = state_map[trig_config_node.state].strip()
+            info = self.ERROR_BAD_STATE.format(after_state_string)
+            self.add_report(report.section, report.option,
+                            value, info)
+        return self.reports
+
+    def get_all_ids(self):
+        """Return all setting ids involved in the triggers."""
+        ids = []
+        for trigger_id in self.trigger_family_lookup.keys():
+            ids.append(trigger_id)
+        for id_value_dict in self.trigger_family_lookup.values():
+            for triggered_id in id_value_dict:
+                if triggered_id not in ids:
+                    ids.append(triggered_id)
+        return ids
+
+
+def get_results(macro, config, reports):
+    """Return the states and reports of a run of a macro, to compare."""
+    states = [(keys, node.state) for keys, node in config.walk()]
+    enabled = dict((id_, set(parents))
+                   for id_, parents in macro.enabled_dict.items())
+    # The old validate walked a deep copy of the config, in a different order
+    reports = sorted((report.section, report.option, report.value,
+                      report.info) for report in reports)
+    return states, enabled, macro.ignored_dict, reports
+
+
+def main():
+    """Run benchmark."""
+    n_triggers = 10000
+    depth = 6
+    if len(sys.argv) > 1:
+        n_triggers = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        depth = int(sys.argv[2])
+    config, meta_config = get_config_and_meta(n_triggers, depth)
+    for method in ["transform", "validate"]:
+        results = None
+        for name, macro_class in [
+                ("old", OldTriggerMacro),
+                ("current", rose.macros.trigger.TriggerMacro)]:
+            run_config = copy.deepcopy(config)
+            macro = macro_class()
+            start = time()
+            if method == "transform":
+                reports = macro.transform(run_config, meta_config)[1]
+            else:
+                reports = macro.validate(run_config, meta_config)
+            elapsed = time() - start
+            run_results = get_results(macro, run_config, reports)
+            if results is None:
+                results = run_results
+                old_elapsed = elapsed
+            assert run_results == results
+            print "%-9s %-7s %6d triggers %8.3f s (%5.1fx)" % (
+                method, name, len(macro.trigger_family_lookup), elapsed,
+                old_elapsed / elapsed)
+        print "%d reports" % len(results[-1])
+
+
+if __name__ == "__main__":
+    main()
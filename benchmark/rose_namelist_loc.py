@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the namelist location handler of file install.
+
+Generate an app configuration with many indexed namelist sections, e.g.
+STASH requests, and files with "namelist:NAME(:)" and "namelist:NAME(INDEX)"
+sources. Time the parse of every source, as file install does before it
+decides what to install, and the pull of every source. Compare the old
+handler, which scans all sections for each call and builds each group by
+string concatenation, with the current handler, which uses an index of the
+sections and streams the groups. Check that both write the same namelists.
+
+Usage: rose_namelist_loc.py [N-SECTIONS [N-SOURCES]]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.config import ConfigNode, sort_settings
+from rose.config_processors.fileinstall import Loc
+from rose.config_tree import ConfigTree
+from rose.env import env_var_process
+from rose.loc_handlers.namelist import NamelistLocHandler, RE_NAMELIST_GROUP
+
+
+class OldNamelistLocHandler(NamelistLocHandler):
+    """The old handler, which scans all sections for each call."""
+
+    def parse(self, loc, conf_tree):
+        loc.scheme = self.SCHEME
+        loc.loc_type = loc.TYPE_BLOB
+        if loc.name.endswith("(:)"):
+            name = loc.name[0:-2]
+            sections = [k for k in conf_tree.node.value.keys()
+                        if k.startswith(name)]
+        else:
+            sections = [k for k in conf_tree.node.value.keys()
+                        if k == loc.name]
+        for section in list(sections):
+            section_value = conf_tree.node.get_value([section])
+            if section_value is None:
+                sections.remove(section)
+        if not sections:
+            raise ValueError(loc.name)
+        return sections
+
+    def pull(self, loc, conf_tree):
+        sections = self.parse(loc, conf_tree)
+        if loc.name.endswith("(:)"):
+            sections.sort(sort_settings)
+        f = open(loc.cache, "wb")
+        for section in sections:
+            section_value = conf_tree.node.get_value([section])
+            group = RE_NAMELIST_GROUP.match(section).group(1)
+            nlg = "&" + group + "\n"
+            for key, node in sorted(section_value.items()):
+                if node.state:
+                    continue
+                value = env_var_process(node.value)
+                nlg += "%s=%s,\n" % (key, value)
+            nlg += "/" + "\n"
+            f.write(nlg)
+        f.close()
+
+
+class Manager(object):
+    """A loc handlers manager that ignores events."""
+
+    def handle_event(self, *_):
+        """Ignore events."""
+        pass
+
+
+def get_conf_tree(n_sections):
+    """Return a ConfigTree with n_sections indexed namelist sections."""
+    conf_tree = ConfigTree()
+    node = conf_tree.node
+    for i in range(n_sections):
+        section = "namelist:group%d(%d)" % (i % 10, i)
+        for key, value in [("isec", "0"), ("item", str(i)),
+                           ("dom_name", "'DIAG'"), ("use_name", "'UPA'")]:
+            node.set([section, key], value)
+    node.set(["namelist:other", "switch"], ".true.")
+    return conf_tree
+
+
+def time_handler(handler, conf_tree, names, work_dir):
+    """Parse then pull each of names, return (parse time, pull time)."""
+    locs = []
+    start = time()
+    for i, name in enumerate(names):
+        loc = Loc(name)
+        handler.parse(loc, conf_tree)
+        loc.cache = os.path.join(work_dir, str(i))
+        locs.append(loc)
+    parse_elapsed = time() - start
+    start = time()
+    for loc in locs:
+        handler.pull(loc, conf_tree)
+    return parse_elapsed, time() - start
+
+
+def main():
+    """Run benchmark."""
+    n_sections = 20000
+    n_sources = 2000
+    if len(sys.argv) > 1:
+        n_sections = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_sources = int(sys.argv[2])
+    conf_tree = get_conf_tree(n_sections)
+    names = ["namelist:other"]
+    for i in range(n_sources - 11):
+        names.append("namelist:group%d(%d)" % (i % 10, i))
+    for i in range(10):
+        names.append("namelist:group%d(:)" % i)
+    old_dir = mkdtemp()
+    new_dir = mkdtemp()
+    try:
+        results = []
+        for label, handler, work_dir in [
+                ("old", OldNamelistLocHandler(Manager()), old_dir),
+                ("new", NamelistLocHandler(Manager()), new_dir)]:
+            parse_elapsed, pull_elapsed = time_handler(
+                handler, conf_tree, names, work_dir)
+            results.append((parse_elapsed, pull_elapsed))
+            print "%s: %d sources, %d sections: parse %8.4fs pull %8.4fs" % (
+                label, len(names), n_sections, parse_elapsed, pull_elapsed)
+        for i in range(len(names)):
+            assert (open(os.path.join(old_dir, str(i))).read() ==
+                    open(os.path.join(new_dir, str(i))).read())
+        print "parse %.1fx, pull %.1fx" % (
+            results[0][0] / results[1][0], results[0][1] / results[1][1])
+    finally:
+        rmtree(old_dir)
+        rmtree(new_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark the throughput of rose.formats.namelist.parse.
+
+Compare the old parser, which matches the remaining tail of a line against
+regular expressions built for each item, with the current tokenizer, on
+generated namelist files that represent:
+* Many groups of short scalar settings.
+* Groups of long arrays, each written on a single line.
+Check that both parsers give identical results.
+
+Usage: rose_namelist_parse.py [SCALE [N-TIMES]]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.formats.namelist import (
+    _rec, _handle_group, _handle_name, _handle_value, _PARSERS_FOR, parse)
+
+
+class _OldParseContext(object):
+    """The parser context of the old parser."""
+
+    def __init__(self):
+        self.files = []
+        self.handle = None
+        self.line = None
+        self.line_length = None
+        self.line_number = None
+        self.state = None
+        self.tail = None
+
+
+def old_parse(in_files):
+    """The old rose.formats.namelist.parse."""
+    handler_of = {"group-init": _handle_group,
+                  "name": _handle_name,
+                  "value": _handle_value,
+                  "value-repeat": _handle_value}
+    groups = []
+    ctx = _OldParseContext()
+    ctx.files += in_files
+    for tag, filename, data in iter(lambda: _old_parse_func(ctx), None):
+        if tag in handler_of:
+            handler_of[tag](groups, filename, data)
+    return groups
+
+
+def _old_parse_func(ctx):
+    """The old parser, which copies the tail of the line for each item."""
+    while ctx.files:
+        if ctx.handle is None:
+            ctx.handle = ctx.files[0]
+            if not isinstance(ctx.handle, file):
+                ctx.handle = open(ctx.handle, "r")
+            ctx.line_number = 0
+            ctx.state = ""
+        while ctx.handle is not None:
+            if ctx.tail:
+                for pattern, tag, next_state in _PARSERS_FOR[ctx.state]:
+                    rec = _rec(r"\A\s*(?:" + pattern + r")\s*(.*)\Z")
+                    match = rec.match(ctx.tail)
+                    if match:
+                        data = list(match.groups())
+                        ctx.tail = data.pop()
+                        if next_state is not None:
+                            ctx.state = next_state
+                        return [tag, ctx.handle.name, data]
+                e = SyntaxError()
+                e.filename = ctx.handle.name
+                e.lineno = ctx.line_number
+                e.offset = ctx.line_length - len(ctx.tail) + 1
+                e.text = ctx.line
+                raise e
+            else:
+                ctx.line = ctx.handle.readline()
+                ctx.line_number += 1
+                if ctx.line:
+                    ctx.line = ctx.line.rstrip()
+                    ctx.line_length = len(ctx.line)
+                    ctx.tail = ctx.line
+                    ctx.tail = ctx.tail.lstrip()
+                else:
+                    if ctx.files[0] != ctx.handle:
+                        ctx.handle.close()
+                    ctx.files.pop(0)
+                    ctx.handle = None
+    return None
+
+
+def get_scalar_namelist(scale):
+    """Return text of many groups of short scalar settings."""
+    lines = []
+    for i in range(scale * 200):
+        lines.append("&group%d\n" % (i % 20))
+        lines.append("l_switch=.true.,\n")
+        lines.append("i_count=%d,\n" % i)
+        lines.append("r_factor=%d.5e-3,\n" % i)
+        lines.append("c_name='name ''%d''',\n" % i)
+        lines.append("! A comment\n")
+        lines.append("z_pair=(1.0,-2.0),\n")
+        lines.append("/\n")
+    return "".join(lines)
+
+
+def get_array_namelist(scale):
+    """Return text of groups of long arrays on single lines."""
+    lines = []
+    for i in range(scale // 2 or 1):
+        lines.append("&arrays\n")
+        lines.append("reals=" + ",".join(
+            "%d.%de-2" % (j, i) for j in range(20000)) + ",\n")
+        lines.append("ints=" + ", ".join(str(j) for j in range(20000)) + "\n")
+        lines.append("repeats=" + ",".join(
+            "%d*%d" % (j % 7 + 1, j) for j in range(10000)) + ",\n")
+        lines.append("/\n")
+    return "".join(lines)
+
+
+def time_parse(parse_func, path, n_times):
+    """Parse the file at path n_times, return (elapsed, dumped groups)."""
+    start = time()
+    for _ in range(n_times):
+        groups = parse_func([path])
+    elapsed = time() - start
+    return elapsed, [(group.name, repr(group)) for group in groups]
+
+
+def main():
+    """Run benchmark."""
+    scale = 4
+    n_times = 3
+    if len(sys.argv) > 1:
+        scale = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_times = int(sys.argv[2])
+    work_dir = mkdtemp()
+    try:
+        for label, get_namelist in [("scalars", get_scalar_namelist),
+                                    ("long arrays", get_array_namelist)]:
+            path = os.path.join(work_dir, "namelist")
+            handle = open(path, "w")
+            handle.write(get_namelist(scale))
+            handle.close()
+            n_mbytes = os.stat(path).st_size * n_times / 1048576.0
+            old_elapsed, old_groups = time_parse(old_parse, path, n_times)
+            new_elapsed, new_groups = time_parse(parse, path, n_times)
+            assert old_groups == new_groups
+            print "%-12s old %6.3fMB/s new %6.3fMB/s (%4.1fx)" % (
+                label, n_mbytes / old_elapsed, n_mbytes / new_elapsed,
+                old_elapsed / new_elapsed)
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
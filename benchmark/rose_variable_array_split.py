@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rose.variable.array_split.
+
+Split array values of N-ELEMENTS elements, like the level heights and STASH
+lists of UM apps, and a long character value, as value checks, rule
+evaluation and "rose config-edit" do, with:
+* The old scanner, which builds each item character by character and
+  compares it with the whole value on each character.
+* The current splitter, which looks at the quote, escape and delimiter
+  characters only.
+Check that both give identical results.
+
+Usage: rose_variable_array_split.py [N-ELEMENTS]
+
+"""
+
+import os
+import re
+import sys
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+from rose.variable import array_split
+
+
+def get_values(n_elements):
+    """Return a list of (name, value, args) to split."""
+    return [
+        ("reals", ",".join(
+            "%.6f" % (20.0 * i + 0.5 * i * i) for i in range(n_elements)),
+         ()),
+        ("reals-space", " ".join(
+            "%.1f" % (0.5 * i) for i in range(n_elements)),
+         ()),
+        ("quoted", ", ".join(
+            "'stream_%d, %s'" % (i, "it''s" if i % 3 else "\"x\"")
+            for i in range(n_elements)),
+         ()),
+        ("escaped", ",".join(
+            "item\\,%d" % i for i in range(n_elements)),
+         (",", True)),
+        ("long-string", "'%s'" % ("Hello, world. " * n_elements), ()),
+    ]
+
+
+def old_scan_string(value, delim=',', remove_esc_char=False):
+    """The old scanner."""
+    item = ''
+    skip_inds = []
+    for quote_pair_match in re.finditer(r"""(''|"")$""", value):
+        skip_inds.extend([quote_pair_match.start(0), quote_pair_match.end(0)])
+    is_in_quotes = {'"': False, "'": False}
+    other_quote = {'"': "'", "'": '"'}
+    esc_char = "\\"
+    was_escaped = False
+    is_escaped = False
+    letter = None
+    for i, letter in enumerate(value):
+        if (letter in is_in_quotes and
+                i not in skip_inds and
+                not is_in_quotes[other_quote[letter]] and
+                not is_escaped):
+            is_in_quotes[letter] = not is_in_quotes[letter]
+        was_escaped = is_escaped
+        is_escaped = (letter == esc_char and not is_escaped)
+        if remove_esc_char and was_escaped and letter in (delim + esc_char):
+            item = item[:-1] + letter
+        elif (letter == delim and
+                not any(is_in_quotes.values()) and
+                not was_escaped):
+            yield item
+            item = ''
+        elif item + letter == value:
+            item += letter
+            yield item
+            item = ''
+        else:
+            item += letter
+    if (item or (letter == delim and
+                 not any(is_in_quotes.values()) and not was_escaped)):
+        yield item
+
+
+def old_array_split(value, only_this_delim=None, remove_esc_char=False):
+    """The old array_split."""
+    delim = ","
+    if only_this_delim is not None:
+        delim = only_this_delim
+    if delim not in value and only_this_delim is None:
+        delim = ' '
+    lex = old_scan_string(value.strip(), delim, remove_esc_char)
+    return [item.strip() for item in lex]
+
+
+def main():
+    """Run benchmark."""
+    n_elements = 10000
+    if len(sys.argv) > 1:
+        n_elements = int(sys.argv[1])
+    for name, value, args in get_values(n_elements):
+        results = None
+        for split_name, split in [
+                ("old", old_array_split), ("current", array_split)]:
+            start = time()
+            items = split(value, *args)
+            elapsed = time() - start
+            if results is None:
+                results = items
+                old_elapsed = elapsed
+            assert items == results
+            print "%-12s %-8s %6d elements %8.4f s (%7.1fx)" % (
+                name, split_name, len(items), elapsed, old_elapsed / elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rosie.db.DAO requests per second.
+
+Compare a long-lived DAO, which keeps its engine, connection pool and
+reflected tables, with the old behaviour of reconnecting and reflecting all
+tables on every call.
+
+Usage: rosie_db_connect.py [N-SUITES [N-CALLS]]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+import sqlalchemy as al
+from rosie.db import (
+    DAO, LATEST_TABLE_NAME, MAIN_TABLE_NAME, OPTIONAL_TABLE_NAME,
+    SEARCH_TABLE_NAME)
+from rosie.db_create import RosieDatabaseInitiator
+
+
+def create_db(db_url, n_suites):
+    """Create and populate a database with "n_suites" suites."""
+    initiator = RosieDatabaseInitiator()
+    initiator.create(db_url)
+    engine = al.create_engine(db_url)
+    metadata = al.MetaData(engine)
+    main = al.Table(MAIN_TABLE_NAME, metadata, autoload=True)
+    latest = al.Table(LATEST_TABLE_NAME, metadata, autoload=True)
+    optional = al.Table(OPTIONAL_TABLE_NAME, metadata, autoload=True)
+    main_rows = []
+    latest_rows = []
+    optional_rows = []
+    for i in range(n_suites):
+        idx = "aa%05d" % i
+        main_rows.append({
+            "idx": idx, "branch": "trunk", "revision": i + 1,
+            "owner": "fred", "project": "bench", "title": "Suite %d" % i,
+            "author": "fred", "date": 1000000 + i, "status": "A ",
+            "from_idx": None})
+        latest_rows.append({"idx": idx, "branch": "trunk", "revision": i + 1})
+        optional_rows.append({
+            "idx": idx, "branch": "trunk", "revision": i + 1,
+            "name": "description",
+            "value": "Experiment %d with resolution N%d" % (i, i % 7 * 96)})
+    engine.execute(main.insert(), main_rows)
+    engine.execute(latest.insert(), latest_rows)
+    engine.execute(optional.insert(), optional_rows)
+    # Rebuild the search index with the new content.
+    engine.execute("DROP TABLE %s" % SEARCH_TABLE_NAME)
+    initiator.create_search_index(db_url)
+
+
+def time_calls(dao, n_calls, reconnect):
+    """Return requests per second of "n_calls" mixed DAO calls."""
+    calls = [
+        lambda: dao.query([["and", "project", "eq", "bench"]]),
+        lambda: dao.get_known_keys(),
+        lambda: dao.get_optional_keys(),
+        lambda: dao.search("Suite 1"),
+    ]
+    start = time()
+    for i in range(n_calls):
+        if reconnect:
+            dao._dispose()
+        calls[i % len(calls)]()
+    return n_calls / (time() - start)
+
+
+def main():
+    """Run benchmark."""
+    n_suites = 100
+    n_calls = 1000
+    if len(sys.argv) > 1:
+        n_suites = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_calls = int(sys.argv[2])
+    work_dir = mkdtemp()
+    try:
+        db_url = "sqlite:///" + os.path.join(work_dir, "bench.db")
+        create_db(db_url, n_suites)
+        dao = DAO(db_url)
+        for reconnect, label in [(True, "reconnect per call"),
+                                 (False, "persistent DAO")]:
+            print "%-20s %10.1f requests/s" % (
+                label, time_calls(dao, n_calls, reconnect))
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
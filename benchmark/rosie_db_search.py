@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rosie.db.DAO.search with and without the search index.
+
+Usage: rosie_db_search.py [N-SUITES [N-CALLS]]
+
+"""
+
+import os
+from shutil import rmtree
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+import sqlalchemy as al
+from rosie.db import DAO, SEARCH_TABLE_NAME
+from rosie_db_connect import create_db
+
+
+WORDS_LIST = [["Experiment 12345"], ["N480"], ["aa00042"], ["fred", "Suite 7"]]
+
+
+def main():
+    """Run benchmark."""
+    n_suites = 20000
+    n_calls = 20
+    if len(sys.argv) > 1:
+        n_suites = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_calls = int(sys.argv[2])
+    work_dir = mkdtemp()
+    try:
+        like_db_url = "sqlite:///" + os.path.join(work_dir, "like.db")
+        create_db(like_db_url, n_suites)
+        al.create_engine(like_db_url).execute(
+            "DROP TABLE %s" % SEARCH_TABLE_NAME)
+        index_db_url = "sqlite:///" + os.path.join(work_dir, "index.db")
+        create_db(index_db_url, n_suites)
+        daos = [("LIKE scan", DAO(like_db_url)),
+                ("search index", DAO(index_db_url))]
+        for words in WORDS_LIST:
+            results = []
+            for label, dao in daos:
+                results.append(dao.search(words))
+                start = time()
+                for _ in range(n_calls):
+                    dao.search(words)
+                print "%-30s %-15s %8.1f searches/s, %d results" % (
+                    words, label, n_calls / (time() - start),
+                    len(results[-1]))
+            if results[0] != results[-1]:
+                print "ERROR: search results differ"
+    finally:
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Benchmark rosie.ws_client.RosieWSClient against a local stub server.
+
+Compare the old way of sending requests (a new process pool and new
+connections for each call, polling for results) with RosieWSClient, with
+and without its response cache.
+
+Usage: rosie_ws_client.py [N-PREFIXES [N-CALLS]]
+
+"""
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing import Pool
+import os
+from shutil import rmtree
+from SocketServer import ThreadingMixIn
+import sys
+from tempfile import mkdtemp
+from threading import Thread
+from time import sleep, time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib",
+                    "python"))
+
+import requests
+import simplejson
+
+
+DATA = simplejson.dumps([
+    {"idx": "aa%03d" % i, "branch": "trunk", "revision": 1, "owner": "fred",
+     "project": "bench", "title": "Suite %d" % i} for i in range(100)])
+ETAG = '"1"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    """Respond to any GET request with DATA, tagged with ETAG."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """Handle a GET request."""
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = DATA
+        if "/hello" in self.path:
+            data = simplejson.dumps("Hello")
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *_):
+        """Be quiet."""
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+
+    """A threaded stub server."""
+
+    daemon_threads = True
+
+
+def old_get(urls):
+    """Send requests as the old RosieWSClient._get did."""
+    pool = Pool(len(urls))
+    results = {}
+    for url in urls:
+        results[url] = pool.apply_async(
+            requests.get, [url], {"params": {"format": "json"}})
+    ret = []
+    while results:
+        for url, result in results.items():
+            if not result.ready():
+                continue
+            results.pop(url)
+            ret.append(simplejson.loads(result.get().text))
+        if results:
+            sleep(0.1)
+    pool.close()
+    pool.join()
+    return ret
+
+
+def main():
+    """Run benchmark."""
+    n_prefixes = 4
+    n_calls = 50
+    if len(sys.argv) > 1:
+        n_prefixes = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_calls = int(sys.argv[2])
+    server = StubServer(("localhost", 0), StubHandler)
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    root = "http://localhost:%d/" % server.server_address[1]
+    prefixes = ["p%d" % i for i in range(n_prefixes)]
+    work_dir = mkdtemp()
+    try:
+        start = time()
+        for _ in range(n_calls):
+            old_get([root + prefix + "/query" for prefix in prefixes])
+        print "%-25s %8.1f calls/s" % (
+            "process pool + polling", n_calls / (time() - start))
+
+        for cache_dir in [None, os.path.join(work_dir, "cache")]:
+            conf_dir = os.path.join(work_dir, "conf")
+            if not os.path.isdir(conf_dir):
+                os.mkdir(conf_dir)
+            handle = open(os.path.join(conf_dir, "rose.conf"), "w")
+            handle.write("[rosie-id]\n")
+            for prefix in prefixes:
+                handle.write("prefix-ws.%s=%s%s\n" % (prefix, root, prefix))
+            if cache_dir:
+                handle.write("ws-cache-dir=%s\n" % cache_dir)
+            handle.close()
+            os.environ.update({
+                "ROSE_CONF_PATH": conf_dir, "ROSE_NS": "rosie",
+                "ROSE_UTIL": "lookup"})
+            from rose.resource import ResourceLocator
+            ResourceLocator._DEFAULT_RESOURCE_LOCATOR = None
+            from rosie.ws_client import RosieWSClient
+            client = RosieWSClient(prefixes=list(prefixes))
+            start = time()
+            for _ in range(n_calls):
+                client.query(["project eq bench"])
+            label = "RosieWSClient"
+            if cache_dir:
+                label += " + cache"
+            print "%-25s %8.1f calls/s" % (label, n_calls / (time() - start))
+            client.close()
+    finally:
+        server.shutdown()
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -141,4 +141,98 @@ $(function() {
         }
     });
     $("#all_task_statuses").change();
+
+    // Paged view of a large log file
+    var file_paged = $("#file-container.file-paged");
+    var file_next_offset = 0;
+    var file_next_line = 1;
+    var file_is_partial = false;
+    var file_is_loading = false;
+    var file_follow_timer = null;
+    var FILE_PREFIXES = {
+        "[DEBUG]": "muted",
+        "[FAIL] ": "text-danger",
+        "[INFO] ": "text-info",
+        "[ OK ] ": "text-success",
+        "[WARN] ": "text-warning"
+    };
+    var REC_URL = /((https?):\/\/[^\s\(\)&\[\]\{\}]+)/g;
+    var file_append_page = function(page) {
+        if (file_is_partial) {
+            // Replace the unterminated last line
+            $("#file-lines > span:last").remove();
+            $("#file-line-numbers > span:last").remove();
+            file_next_line -= 1;
+        }
+        if (page.line != file_next_line) {
+            $("#file-lines").empty();
+            $("#file-line-numbers").empty();
+        }
+        var mode = file_paged.attr("data-mode");
+        var numbers = "";
+        var lines = "";
+        for (var i = 0; i < page.lines.length; i++) {
+            var n = page.line + i;
+            var line = page.lines[i];
+            var prefix = line.substr(0, 7);
+            if (line.length > 7 && FILE_PREFIXES[prefix]) {
+                line = '<span class="' + FILE_PREFIXES[prefix] + '">' +
+                    prefix + "</span>" + line.substr(7);
+            }
+            else if (mode != "tags") {
+                line = line.replace(REC_URL, '<a href="$1">$1</a>');
+            }
+            numbers += '<span><a id="' + n + '" class="line-number" href="#' +
+                n + '">' + n + "</a>\n</span>";
+            lines += "<span>" + line + "\n</span>";
+        }
+        $("#file-line-numbers").append(numbers);
+        $("#file-lines").append(lines);
+        file_next_line = page.line + page.lines.length;
+        file_is_partial = page.partial;
+        file_next_offset = page.next_offset;
+        $("#file-status").text(
+            file_next_offset.toString() + " of " + page.size.toString() +
+            " bytes");
+        $("#file-more").prop("disabled", file_next_offset >= page.size);
+    };
+    var file_load = function(method, data) {
+        if (file_is_loading) {
+            return;
+        }
+        file_is_loading = true;
+        data.path = file_paged.attr("data-path");
+        if (file_paged.attr("data-mode")) {
+            data.mode = file_paged.attr("data-mode");
+        }
+        $.getJSON(file_paged.attr("data-url").replace("{method}", method),
+                  data, file_append_page).always(function() {
+            file_is_loading = false;
+        });
+    };
+    if (file_paged.length) {
+        var hash_line = parseInt(window.location.hash.substr(1));
+        if (hash_line > 0) {
+            file_load("viewpage", {"line": hash_line});
+        }
+        else {
+            file_load("viewpage", {"offset": 0});
+        }
+        $("#file-more").click(function() {
+            file_load("viewpage", {"offset": file_next_offset});
+        });
+        $("#file-tail").click(function() {
+            file_load("viewtail", {});
+        });
+        $("#file-follow").change(function() {
+            if ($(this).prop("checked")) {
+                file_follow_timer = setInterval(function() {
+                    file_load("viewtail", {"offset": file_next_offset});
+                }, 5000);
+            }
+            else {
+                clearInterval(file_follow_timer);
+            }
+        });
+    }
 });
@@ -19,6 +19,10 @@
 """This provides ISO 8601 data model functionality."""
 
 
+from array import array
+import bisect
+from itertools import islice
+
 from . import dumpers
 from . import timezone
 from . import util
@@ -100,9 +104,28 @@ class Calendar(object):
             reversed(self.INDEXED_DAYS_IN_MONTHS))
         self.MONTHS_IN_YEAR = len(self.DAYS_IN_MONTHS)
         # No support for MONTHS_IN_YEAR_LEAP (some calendars...)
+        # Number of days in the year before the start of each month.
+        self.DAYS_BEFORE_MONTHS = [
+            sum(self.DAYS_IN_MONTHS[:i])
+            for i in range(self.MONTHS_IN_YEAR)]
+        self.DAYS_BEFORE_MONTHS_LEAP = [
+            sum(self.DAYS_IN_MONTHS_LEAP[:i])
+            for i in range(self.MONTHS_IN_YEAR)]
+        self.MIN_DAYS_IN_MONTH = min(
+            self.DAYS_IN_MONTHS + self.DAYS_IN_MONTHS_LEAP)
         self.DAYS_IN_YEAR = sum(self.DAYS_IN_MONTHS)
         self.ROUGH_DAYS_IN_YEAR = self.DAYS_IN_YEAR
         self.DAYS_IN_YEAR_LEAP = sum(self.DAYS_IN_MONTHS_LEAP)
+        # The leap year pattern repeats every LEAP_CYCLE_YEARS.
+        self.LEAP_CYCLE_YEARS = max(
+            factor for factor, _ in self.LEAP_YEAR_FACTOR_TRUTHS)
+        self.DAYS_IN_LEAP_CYCLE = self.LEAP_CYCLE_YEARS * self.DAYS_IN_YEAR
+        for factor, is_leap_factor in self.LEAP_YEAR_FACTOR_TRUTHS:
+            num_years = self.LEAP_CYCLE_YEARS / factor
+            if not is_leap_factor:
+                num_years *= -1
+            self.DAYS_IN_LEAP_CYCLE += num_years * (
+                self.DAYS_IN_YEAR_LEAP - self.DAYS_IN_YEAR)
         self.HOURS_IN_YEAR = self.DAYS_IN_YEAR * self.HOURS_IN_DAY
         self.MINUTES_IN_YEAR = self.DAYS_IN_YEAR * self.MINUTES_IN_DAY
         self.SECONDS_IN_YEAR = self.DAYS_IN_YEAR * self.SECONDS_IN_DAY
@@ -135,6 +158,7 @@ class BadInputError(ValueError):
     MISSING = "Missing input: {0} needs {1}"
     OUT_OF_BOUNDS = "Invalid input (out of bounds): {0}: {1}"
     RECURRENCE = "Invalid recurrence info: {0}"
+    RECURRENCE_UNBOUNDED = "Unbounded recurrence: {0}: needs number of points"
     TYPE = "Invalid type for {0}: {1}{2}"
     VALUES = "Invalid input for {0}: {1}: allowed: {2}"
 
@@ -302,6 +326,254 @@ class TimeRecurrence(object):
             else:
                 point = self.get_next(point)
 
+    def get_day_numbers_and_seconds(self, num_points=None):
+        """Return the points of this recurrence as 2 compact arrays.
+
+        Return (day_numbers, seconds), where day_numbers is an array("l")
+        of the day numbers of the points (see
+        get_day_number_from_ordinal_date), and seconds is an array("d") of
+        their seconds of day. Both are in the time zone of the first point.
+        The points are the same as those of __iter__, so that is where the
+        first point and the order come from.
+
+        Return the first num_points points. If num_points is None, return
+        all the points within the bounds of this recurrence. Raise
+        BadInputError if there is no bound.
+
+        Durations in days, weeks, hours, minutes and whole seconds, or in
+        months and years, are worked out in integer arithmetic, without
+        creating a TimePoint for each point.
+
+        """
+        info = self._get_arrays_info(num_points)
+        if info is not None:
+            return info[:2]
+        day_numbers = array("l")
+        seconds = array("d")
+        time_zone = None
+        for point in islice(self.__iter__(), num_points):
+            if time_zone is None:
+                time_zone = point.get_time_zone()
+            elif point.get_time_zone() != time_zone:
+                point = point.copy()
+                point.set_time_zone(time_zone)
+            day_numbers.append(point.get_day_number())
+            seconds.append(point.get_second_of_day())
+        return day_numbers, seconds
+
+    def dump_points(self, num_points=None):
+        """Return a list of the strings of the points of this recurrence.
+
+        num_points is as for get_day_numbers_and_seconds. The strings are
+        those of str(point) for each point of __iter__.
+
+        """
+        info = self._get_arrays_info(num_points)
+        if info is None:
+            return [str(point)
+                    for point in islice(self.__iter__(), num_points)]
+        day_numbers, seconds, points = info
+        point = points[0].copy()
+        if point.get_is_calendar_date():
+            get_date = get_calendar_date_from_day_number
+            date_attributes = ("year", "month_of_year", "day_of_month")
+        elif point.get_is_ordinal_date():
+            get_date = get_ordinal_date_from_day_number
+            date_attributes = ("year", "day_of_year")
+        else:
+            get_date = get_week_date_from_day_number
+            date_attributes = ("year", "week_of_year", "day_of_week")
+        strings = []
+        for i, (day_number, second_of_day) in enumerate(
+                zip(day_numbers, seconds)):
+            if i in points:
+                strings.append(str(points[i]))
+                continue
+            for attribute, value in zip(date_attributes,
+                                        get_date(day_number)):
+                setattr(point, attribute, value)
+            minute_of_day, point.second_of_minute = divmod(
+                int(second_of_day), CALENDAR.SECONDS_IN_MINUTE)
+            point.hour_of_day, point.minute_of_hour = divmod(
+                minute_of_day, CALENDAR.MINUTES_IN_HOUR)
+            strings.append(str(point))
+        return strings
+
+    def _get_arrays_info(self, num_points):
+        """Return (day_numbers, seconds, points) in integer arithmetic.
+
+        See get_day_numbers_and_seconds. points is {index: TimePoint, ...}
+        for the points that are not worked out in integer arithmetic, i.e.
+        the first point and a snapped end_point (see get_next). Return None
+        if the first point or the duration do not allow integer arithmetic.
+
+        """
+        in_reverse = self.start_point is None
+        if in_reverse:
+            first_point = self.end_point
+        else:
+            first_point = self.start_point
+        if num_points is None and not self._get_is_bounded(in_reverse):
+            raise BadInputError(BadInputError.RECURRENCE_UNBOUNDED, self)
+        bounds = [self.start_point, self.min_point,
+                  self.max_point, self.end_point]
+        if any(point is not None and point.truncated
+               for point in [first_point] + bounds):
+            return None
+        if any(not _get_is_whole_number(getattr(first_point, attr))
+               for attr in ("hour_of_day", "minute_of_hour",
+                            "second_of_minute")):
+            return None
+        values = dict((attr, getattr(self.duration, attr) or 0)
+                      for attr in self.duration.DATA_ATTRIBUTES)
+        if any(not _get_is_whole_number(value) for value in values.values()):
+            return None
+        for attr, value in values.items():
+            values[attr] = int(value)
+        step_months = values["years"] * CALENDAR.MONTHS_IN_YEAR + (
+            values["months"])
+        step_seconds = (
+            ((values["weeks"] * CALENDAR.DAYS_IN_WEEK + values["days"]) *
+             CALENDAR.SECONDS_IN_DAY) +
+            values["hours"] * CALENDAR.SECONDS_IN_HOUR +
+            values["minutes"] * CALENDAR.SECONDS_IN_MINUTE +
+            values["seconds"])
+        if step_months and (step_seconds or values["months"] < 0 or
+                            values["years"] < 0 or
+                            not first_point.get_is_calendar_date()):
+            return None
+        if step_seconds < 0:
+            return None
+
+        # Bounds, in seconds since the start of day number 0 in UTC.
+        lower_bound = None
+        upper_bound = None
+        for point in bounds[:2]:
+            if point is not None:
+                value = _get_utc_seconds(point)
+                if lower_bound is None or value > lower_bound:
+                    lower_bound = value
+        for point in bounds[2:]:
+            if point is not None:
+                value = _get_utc_seconds(point)
+                if upper_bound is None or value < upper_bound:
+                    upper_bound = value
+        offset = _get_time_zone_seconds(first_point.get_time_zone())
+        day_number = first_point.get_day_number()
+        second_of_day = int(first_point.get_second_of_day())
+        day_numbers = array("l")
+        seconds = array("d")
+        points = {0: first_point}
+        info = (day_numbers, seconds, points)
+        if num_points is not None and num_points <= 0:
+            return info
+        first_seconds = (
+            day_number * CALENDAR.SECONDS_IN_DAY + second_of_day - offset)
+        if ((lower_bound is not None and first_seconds < lower_bound) or
+                (upper_bound is not None and first_seconds > upper_bound)):
+            return info
+        day_numbers.append(day_number)
+        seconds.append(second_of_day)
+        if self.repetitions == 1 or not (step_seconds or step_months):
+            return info
+
+        if step_months:
+            self._extend_by_months(
+                info, values["months"], values["years"], lower_bound,
+                upper_bound, offset, num_points, in_reverse)
+            return info
+
+        if in_reverse:
+            step_seconds = -step_seconds
+            bound = lower_bound
+        else:
+            bound = upper_bound
+        if bound is None:
+            num_steps = num_points - 1
+        else:
+            num_steps = int((bound - first_seconds) // step_seconds)
+            if num_points is not None:
+                num_steps = min(num_steps, num_points - 1)
+        local_seconds = day_number * CALENDAR.SECONDS_IN_DAY + second_of_day
+        for i in xrange(1, num_steps + 1):
+            day_number, second_of_day = divmod(
+                local_seconds + i * step_seconds, CALENDAR.SECONDS_IN_DAY)
+            day_numbers.append(day_number)
+            seconds.append(second_of_day)
+        if (self.format_number == 1 and not in_reverse and
+                (num_points is None or len(day_numbers) < num_points)):
+            # See get_next: snap to an end_point within half a duration.
+            end_seconds = _get_utc_seconds(self.end_point)
+            next_seconds = first_seconds + (num_steps + 1) * step_seconds
+            if (next_seconds > end_seconds and
+                    2 * (next_seconds - end_seconds) < step_seconds and
+                    end_seconds <= upper_bound and
+                    (lower_bound is None or end_seconds >= lower_bound)):
+                day_number, second_of_day = divmod(
+                    int(end_seconds) + offset, CALENDAR.SECONDS_IN_DAY)
+                day_numbers.append(day_number)
+                seconds.append(second_of_day)
+                points[len(day_numbers) - 1] = self.end_point
+        return info
+
+    @staticmethod
+    def _extend_by_months(info, months, years, lower_bound, upper_bound,
+                          offset, num_points, in_reverse):
+        """Add points stepping in months and years to info.
+
+        Use the same day-of-month capping as TimePoint._add_months and
+        TimePoint.__add__.
+
+        """
+        day_numbers, seconds, points = info
+        second_of_day = seconds[0]
+        year, month_of_year, day_of_month = points[0].get_calendar_date()
+        if in_reverse:
+            months, years = -months, -years
+        month_step = 1
+        if months < 0:
+            month_step = -1
+        while num_points is None or len(day_numbers) < num_points:
+            if months:
+                num_steps = abs(months)
+                while num_steps and (
+                        day_of_month > CALENDAR.MIN_DAYS_IN_MONTH):
+                    num_steps -= 1
+                    num_years, month_index = divmod(
+                        month_of_year - 1 + month_step,
+                        CALENDAR.MONTHS_IN_YEAR)
+                    year += num_years
+                    month_of_year = month_index + 1
+                    day_of_month = min(
+                        day_of_month, _get_days_in_month(year, month_index))
+                num_years, month_index = divmod(
+                    month_of_year - 1 + month_step * num_steps,
+                    CALENDAR.MONTHS_IN_YEAR)
+                year += num_years
+                month_of_year = month_index + 1
+            if years:
+                year += years
+                day_of_month = min(
+                    day_of_month,
+                    _get_days_in_month(year, month_of_year - 1))
+            day_number = get_day_number_from_calendar_date(
+                year, month_of_year, day_of_month)
+            utc_seconds = (day_number * CALENDAR.SECONDS_IN_DAY +
+                           second_of_day - offset)
+            if ((lower_bound is not None and utc_seconds < lower_bound) or
+                    (upper_bound is not None and utc_seconds > upper_bound)):
+                break
+            day_numbers.append(day_number)
+            seconds.append(second_of_day)
+
+    def _get_is_bounded(self, in_reverse):
+        """Return whether __iter__ of this recurrence stops on its own."""
+        if self.repetitions == 1 or not self.duration:
+            return True
+        if in_reverse:
+            return self.min_point is not None
+        return self.end_point is not None or self.max_point is not None
+
     def __str__(self):
         if self.repetitions is None:
             prefix = "R/"
@@ -920,6 +1192,20 @@ class TimePoint(object):
                                                    self.week_of_year,
                                                    self.day_of_week)
 
+    def get_day_number(self):
+        """Return the number of days since Jan 1, 1 A.D. for this date."""
+        if self.get_is_calendar_date():
+            return get_day_number_from_calendar_date(self.year,
+                                                     self.month_of_year,
+                                                     self.day_of_month)
+        if self.get_is_ordinal_date():
+            return get_day_number_from_ordinal_date(self.year,
+                                                    self.day_of_year)
+        if self.get_is_week_date():
+            return (get_day_number_week_date_start(self.year) +
+                    (self.week_of_year - 1) * CALENDAR.DAYS_IN_WEEK +
+                    self.day_of_week - 1)
+
     def get(self, property_name):
         """Return a calculated value for property name."""
         if property_name == "expanded_year_digits":
@@ -1318,28 +1604,15 @@ class TimePoint(object):
             return 0
         other = other.copy()
         other.set_time_zone(self.get_time_zone())
-        if self.get_is_calendar_date():
-            my_date = self.get_calendar_date()
-            other_date = other.get_calendar_date()
-        else:
-            my_date = self.get_ordinal_date()
-            other_date = other.get_ordinal_date()
-        my_datetime = list(my_date) + [self.get_second_of_day()]
-        other_datetime = list(other_date) + [other.get_second_of_day()]
+        my_datetime = (self.get_day_number(), self.get_second_of_day())
+        other_datetime = (other.get_day_number(), other.get_second_of_day())
         return cmp(my_datetime, other_datetime)
 
     def __sub__(self, other):
         if isinstance(other, TimePoint):
             other = other.copy()
             other.set_time_zone(self.get_time_zone())
-            my_year, my_day_of_year = self.get_ordinal_date()
-            other_year, other_day_of_year = other.get_ordinal_date()
-            diff_year = my_year - other_year
-            diff_day = my_day_of_year - other_day_of_year
-            if my_year > other_year:
-                diff_day += get_days_in_year_range(other_year, my_year - 1)
-            else:
-                diff_day -= get_days_in_year_range(my_year, other_year - 1)
+            diff_day = self.get_day_number() - other.get_day_number()
             if diff_day < 0:
                 return -1 * (other - self)
             my_hour, my_minute, my_second = self.get_hour_minute_second()
@@ -1381,17 +1654,19 @@ class TimePoint(object):
             if self.get_is_week_date():
                 was_week_date = True
             self.to_calendar_date()
-        for i in range(abs(num_months)):
-            if num_months > 0:
-                self.month_of_year += 1
-                if self.month_of_year > CALENDAR.MONTHS_IN_YEAR:
-                    self.month_of_year -= CALENDAR.MONTHS_IN_YEAR
-                    self.year += 1
-            if num_months < 0:
-                self.month_of_year -= 1
-                if self.month_of_year < 1:
-                    self.month_of_year += CALENDAR.MONTHS_IN_YEAR
-                    self.year -= 1
+        # The day-of-month is capped in each month on the way, which can
+        # only make a difference until it fits in the shortest month.
+        num_steps = abs(num_months)
+        step = num_months / num_steps
+        while num_steps and self.day_of_month > CALENDAR.MIN_DAYS_IN_MONTH:
+            num_steps -= 1
+            self.month_of_year += step
+            if self.month_of_year > CALENDAR.MONTHS_IN_YEAR:
+                self.month_of_year -= CALENDAR.MONTHS_IN_YEAR
+                self.year += 1
+            if self.month_of_year < 1:
+                self.month_of_year += CALENDAR.MONTHS_IN_YEAR
+                self.year -= 1
             month_index = (self.month_of_year - 1) % CALENDAR.MONTHS_IN_YEAR
             if get_is_leap_year(self.year):
                 max_day_in_new_month = (
@@ -1402,6 +1677,11 @@ class TimePoint(object):
             if self.day_of_month > max_day_in_new_month:
                 # For example, when 31 March + 1 month = 30 April.
                 self.day_of_month = max_day_in_new_month
+        num_years, month_index = divmod(
+            self.month_of_year - 1 + step * num_steps,
+            CALENDAR.MONTHS_IN_YEAR)
+        self.year += num_years
+        self.month_of_year = month_index + 1
         self._tick_over()
         if was_ordinal_date:
             self.to_ordinal_date()
@@ -1450,83 +1730,33 @@ class TimePoint(object):
         if self.day_of_month is not None:
             self._tick_over_day_of_month()
         if self.day_of_year is not None:
-            while self.day_of_year < 1:
-                days_in_last_year = get_days_in_year(self.year - 1)
-                self.day_of_year += days_in_last_year
-                self.year -= 1
-            while self.day_of_year > get_days_in_year(self.year):
-                days_in_next_year = get_days_in_year(self.year + 1)
-                self.day_of_year -= days_in_next_year
-                self.year += 1
+            if not 1 <= self.day_of_year <= get_days_in_year(self.year):
+                self.year, self.day_of_year = get_ordinal_date_from_day_number(
+                    get_day_number_from_ordinal_date(
+                        self.year, self.day_of_year))
         if self.week_of_year is not None:
-            while self.week_of_year < 1:
-                weeks_in_last_year = get_weeks_in_year(self.year - 1)
-                self.week_of_year += weeks_in_last_year
-                self.year -= 1
-            while self.week_of_year > get_weeks_in_year(self.year):
-                weeks_in_this_year = get_weeks_in_year(self.year)
-                self.week_of_year -= weeks_in_this_year
-                self.year += 1
+            if not 1 <= self.week_of_year <= get_weeks_in_year(self.year):
+                self.year, self.week_of_year = get_week_date_from_day_number(
+                    get_day_number_week_date_start(self.year) +
+                    (self.week_of_year - 1) * CALENDAR.DAYS_IN_WEEK)[:2]
         if self.month_of_year is not None:
-            while self.month_of_year < 1:
-                self.month_of_year += CALENDAR.MONTHS_IN_YEAR
-                self.year -= 1
-            while self.month_of_year > CALENDAR.MONTHS_IN_YEAR:
-                self.month_of_year -= CALENDAR.MONTHS_IN_YEAR
-                self.year += 1
+            num_years, month_index = divmod(
+                self.month_of_year - 1, CALENDAR.MONTHS_IN_YEAR)
+            self.year += num_years
+            self.month_of_year = month_index + 1
 
     def _tick_over_day_of_month(self):
-        if self.day_of_month < 1:
-            num_days = 2
-            for month, day in iter_months_days(
-                    self.year,
-                    month_of_year=self.month_of_year,
-                    day_of_month=1, in_reverse=True):
-                num_days -= 1
-                if num_days == self.day_of_month:
-                    self.month_of_year = month
-                    self.day_of_month = day
-                    break
-            else:
-                start_year = self.year
-                while num_days != self.day_of_month:
-                    start_year -= 1
-                    for month, day in iter_months_days(
-                            start_year, in_reverse=True):
-                        num_days -= 1
-                        if num_days == self.day_of_month:
-                            break
-                self.year = start_year
-                self.month_of_year = month
-                self.day_of_month = day
+        month_index = (self.month_of_year - 1) % CALENDAR.MONTHS_IN_YEAR
+        if get_is_leap_year(self.year):
+            max_day_in_month = CALENDAR.DAYS_IN_MONTHS_LEAP[month_index]
         else:
-            month_index = (self.month_of_year - 1) % CALENDAR.MONTHS_IN_YEAR
-            if get_is_leap_year(self.year):
-                max_day_in_month = CALENDAR.DAYS_IN_MONTHS_LEAP[month_index]
-            else:
-                max_day_in_month = CALENDAR.DAYS_IN_MONTHS[month_index]
-            if self.day_of_month > max_day_in_month:
-                num_days = 0
-                for month, day in iter_months_days(
-                        self.year,
-                        month_of_year=self.month_of_year,
-                        day_of_month=1):
-                    num_days += 1
-                    if num_days == self.day_of_month:
-                        self.month_of_year = month
-                        self.day_of_month = day
-                        break
-                else:
-                    start_year = self.year
-                    while num_days != self.day_of_month:
-                        start_year += 1
-                        for month, day in iter_months_days(start_year):
-                            num_days += 1
-                            if num_days == self.day_of_month:
-                                self.year = start_year
-                                self.month_of_year = month
-                                self.day_of_month = day
-                                return
+            max_day_in_month = CALENDAR.DAYS_IN_MONTHS[month_index]
+        if not 1 <= self.day_of_month <= max_day_in_month:
+            self.year, self.month_of_year, self.day_of_month = (
+                get_calendar_date_from_day_number(
+                    get_day_number_from_calendar_date(
+                        self.year, self.month_of_year,
+                        int(self.day_of_month))))
 
     def __str__(self, override_custom_dump_format=False,
                 strftime_format=None):
@@ -1682,6 +1912,39 @@ def _format_remainder(float_time_number):
     return string
 
 
+def _get_days_in_month(year, month_index):
+    """Return the number of days in a month (from 0) of year."""
+    if get_is_leap_year(year):
+        return CALENDAR.DAYS_IN_MONTHS_LEAP[month_index]
+    return CALENDAR.DAYS_IN_MONTHS[month_index]
+
+
+def _get_is_whole_number(value):
+    """Return True if value is an int, or a float with no fraction."""
+    if isinstance(value, float):
+        return value.is_integer()
+    return isinstance(value, (int, long))
+
+
+def _get_time_zone_seconds(time_zone):
+    """Return the UTC offset of time_zone in seconds.
+
+    An unknown time zone has no offset, as for TimePoint comparisons.
+
+    """
+    if time_zone.unknown:
+        return 0
+    return (time_zone.hours * CALENDAR.SECONDS_IN_HOUR +
+            time_zone.minutes * CALENDAR.SECONDS_IN_MINUTE)
+
+
+def _get_utc_seconds(timepoint):
+    """Return the seconds since the start of day number 0 in UTC."""
+    return (timepoint.get_day_number() * CALENDAR.SECONDS_IN_DAY +
+            timepoint.get_second_of_day() -
+            _get_time_zone_seconds(timepoint.get_time_zone()))
+
+
 @util.cache_results
 def get_is_leap_year(year):
     """Return if year is a leap year."""
@@ -1692,14 +1955,25 @@ def get_is_leap_year(year):
     return year_is_leap
 
 
-def get_days_in_year_range(start_year, end_year):
-    """Return the number of days within this year range (inclusive)."""
-    return _get_days_in_year_range(start_year, end_year,
-                                   calendar_mode=CALENDAR.mode)
+def get_days_before_year(year):
+    """Return the number of days from Jan 1, 1 A.D. to the start of year.
 
+    This is negative for years before 1 A.D.
 
-@util.cache_results
-def _get_days_in_year_range(start_year, end_year, calendar_mode=None):
+    """
+    num_days = (year - 1) * CALENDAR.DAYS_IN_YEAR
+    diff_days_leap = CALENDAR.DAYS_IN_YEAR_LEAP - CALENDAR.DAYS_IN_YEAR
+    if diff_days_leap:
+        # Floor division counts the leap years before 1 A.D. as negative.
+        for factor, is_leap_factor in CALENDAR.LEAP_YEAR_FACTOR_TRUTHS:
+            if is_leap_factor:
+                num_days += ((year - 1) // factor) * diff_days_leap
+            else:
+                num_days -= ((year - 1) // factor) * diff_days_leap
+    return num_days
+
+
+def get_days_in_year_range(start_year, end_year):
     """Return the number of days within this year range (inclusive).
 
     If end_year > start_year, return the days in start_year plus
@@ -1711,32 +1985,10 @@ def _get_days_in_year_range(start_year, end_year, calendar_mode=None):
     If end_year < start_year, return 0.
 
     """
-    # Get the number of days discounting leap years.
-    if start_year == end_year:
-        return get_days_in_year(start_year)
     if start_year > end_year:
         return 0
-    days = (end_year + 1 - start_year) * CALENDAR.DAYS_IN_YEAR
-    diff_days_leap = (CALENDAR.DAYS_IN_YEAR_LEAP - CALENDAR.DAYS_IN_YEAR)
-    for factor, is_leap_factor in CALENDAR.LEAP_YEAR_FACTOR_TRUTHS:
-        num_corrections = 0
-        if start_year % factor == 0:
-            num_corrections += 1
-        if end_year != start_year and end_year % factor == 0:
-            num_corrections += 1
-        factor_start_year = start_year + 1
-        while (factor_start_year % factor != 0 and
-               factor_start_year < end_year):
-            factor_start_year += 1
-        if factor_start_year < end_year:
-            num_corrections += 1
-            num_corrections += (
-                end_year - (factor_start_year + 1)) / factor
-        if is_leap_factor:
-            days += num_corrections * diff_days_leap
-        else:
-            days -= num_corrections * diff_days_leap
-    return days
+    return get_days_before_year(end_year + 1) - get_days_before_year(
+        start_year)
 
 
 def get_days_in_year(year):
@@ -1754,19 +2006,100 @@ def _get_days_in_year(year, calendar_mode=None):
 
 def get_weeks_in_year(year):
     """Return the number of calendar weeks in this week date year."""
-    return _get_weeks_in_year(year, calendar_mode=CALENDAR.mode)
+    return (get_day_number_week_date_start(year + 1) -
+            get_day_number_week_date_start(year)) / CALENDAR.DAYS_IN_WEEK
 
 
-@util.cache_results
-def _get_weeks_in_year(year, calendar_mode=None):
-    """Return the number of calendar weeks in this week date year."""
-    cal_year, cal_ord_days = get_ordinal_date_week_date_start(year)
-    cal_year_next, cal_ord_days_next = get_ordinal_date_week_date_start(
-        year + 1)
-    diff_days = cal_ord_days_next - cal_ord_days
-    for intervening_year in xrange(cal_year, cal_year_next):
-        diff_days += get_days_in_year(intervening_year)
-    return diff_days / CALENDAR.DAYS_IN_WEEK
+def get_day_number_from_calendar_date(year, month_of_year, day_of_month):
+    """Return the day number of a calendar date.
+
+    See get_day_number_from_ordinal_date.
+
+    """
+    if get_is_leap_year(year):
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS_LEAP
+    else:
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS
+    return (get_days_before_year(year) +
+            days_before_months[month_of_year - 1] + day_of_month - 1)
+
+
+def get_day_number_from_ordinal_date(year, day_of_year):
+    """Return the day number of an ordinal date.
+
+    The day number is the number of days since Jan 1, 1 A.D., which has
+    the day number 0. Dates are added, subtracted and compared in
+    constant time in this form, whatever the number of years between
+    them.
+
+    """
+    return get_days_before_year(year) + day_of_year - 1
+
+
+def get_day_number_week_date_start(year):
+    """Return the day number of the start of (week date) year.
+
+    This is the first day of the week that contains the 4th of January.
+
+    """
+    ref_year, ref_day_of_year = CALENDAR.WEEK_DAY_START_REFERENCE["ordinal"]
+    ref_day_number = get_day_number_from_ordinal_date(
+        ref_year, ref_day_of_year)
+    day_number = get_day_number_from_ordinal_date(year, 4)
+    return day_number - (
+        (day_number - ref_day_number) % CALENDAR.DAYS_IN_WEEK)
+
+
+def get_calendar_date_from_day_number(day_number):
+    """Return the calendar date of a day number.
+
+    Returns the calendar year, calendar month, calendar day-of-month.
+
+    """
+    return get_calendar_date_from_ordinal_date(
+        *get_ordinal_date_from_day_number(day_number))
+
+
+def get_ordinal_date_from_day_number(day_number):
+    """Return the ordinal date of a day number.
+
+    Returns the ordinal year, ordinal day-of-year.
+
+    """
+    # Estimate the year from the mean year length, then correct it.
+    year = 1 + int(
+        (day_number * CALENDAR.LEAP_CYCLE_YEARS) //
+        CALENDAR.DAYS_IN_LEAP_CYCLE)
+    days_before_year = get_days_before_year(year)
+    while days_before_year > day_number:
+        year -= 1
+        days_before_year -= get_days_in_year(year)
+    while day_number - days_before_year >= get_days_in_year(year):
+        days_before_year += get_days_in_year(year)
+        year += 1
+    return year, day_number - days_before_year + 1
+
+
+def get_week_date_from_day_number(day_number):
+    """Return the week date of a day number.
+
+    Returns the week date year, week-of-year, day-of-week.
+
+    """
+    # A week date year is never more than one off its calendar year.
+    year = get_ordinal_date_from_day_number(day_number)[0]
+    start_day_number = get_day_number_week_date_start(year)
+    if day_number < start_day_number:
+        year -= 1
+        start_day_number = get_day_number_week_date_start(year)
+    else:
+        next_start_day_number = get_day_number_week_date_start(year + 1)
+        if day_number >= next_start_day_number:
+            year += 1
+            start_day_number = next_start_day_number
+    num_weeks, num_days = divmod(
+        day_number - start_day_number, CALENDAR.DAYS_IN_WEEK)
+    return year, num_weeks + 1, num_days + 1
 
 
 def get_calendar_date_from_ordinal_date(year, day_of_year):
@@ -1779,12 +2112,15 @@ def get_calendar_date_from_ordinal_date(year, day_of_year):
     day_of_year is an integer that denotes the ordinal day in the year.
 
     """
-    iter_num_days = 0
-    for iter_month, iter_day in iter_months_days(year):
-        iter_num_days += 1
-        if iter_num_days == day_of_year:
-            return year, iter_month, iter_day
-    raise ValueError("Bad ordinal date: %s-%03d" % (year, day_of_year))
+    if not 1 <= day_of_year <= get_days_in_year(year):
+        raise ValueError("Bad ordinal date: %s-%03d" % (year, day_of_year))
+    if get_is_leap_year(year):
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS_LEAP
+    else:
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS
+    month_of_year = bisect.bisect(days_before_months, day_of_year - 1)
+    return (year, month_of_year,
+            day_of_year - days_before_months[month_of_year - 1])
 
 
 def get_calendar_date_from_week_date(year, week_of_year, day_of_week):
@@ -1801,29 +2137,12 @@ def get_calendar_date_from_week_date(year, week_of_year, day_of_week):
     """
     num_days_week_year = (
         (week_of_year - 1) * CALENDAR.DAYS_IN_WEEK + day_of_week - 1)
-    start_year, start_month, start_day = (
-        get_calendar_date_week_date_start(year))
-    if num_days_week_year == 0:
-        return start_year, start_month, start_day
-    total_iter_days = 0
-    # Loop over the months and days left in the start year.
-    for iter_month, iter_day in iter_months_days(
-            start_year, month_of_year=start_month,
-            day_of_month=start_day + 1):
-        total_iter_days += 1
-        if num_days_week_year == total_iter_days:
-            return start_year, iter_month, iter_day
-    if start_year < year:
-        # We've only looped over the last year - now the current one.
-        for iter_month, iter_day in iter_months_days(year):
-            total_iter_days += 1
-            if num_days_week_year == total_iter_days:
-                return year, iter_month, iter_day
-    for iter_month, iter_day in iter_months_days(year + 1):
-        # Loop over the following year.
-        total_iter_days += 1
-        if num_days_week_year == total_iter_days:
-            return year + 1, iter_month, iter_day
+    if num_days_week_year >= 0:
+        cal_year, cal_month, cal_day_of_month = (
+            get_calendar_date_from_day_number(
+                get_day_number_week_date_start(year) + num_days_week_year))
+        if cal_year <= year + 1:
+            return cal_year, cal_month, cal_day_of_month
     raise ValueError("Bad week date: %s-W%02d-%s" % (year,
                                                      week_of_year,
                                                      day_of_week))
@@ -1842,14 +2161,18 @@ def get_ordinal_date_from_calendar_date(year, month_of_year, day_of_month):
     month_of_year.
 
     """
-    iter_num_days = 0
-    for iter_month, iter_day in iter_months_days(year):
-        iter_num_days += 1
-        if iter_month == month_of_year and iter_day == day_of_month:
-            return year, iter_num_days
-    raise ValueError("Bad calendar date: %s-%02d-%02d" % (year,
-                                                          month_of_year,
-                                                          day_of_month))
+    if get_is_leap_year(year):
+        days_in_months = CALENDAR.DAYS_IN_MONTHS_LEAP
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS_LEAP
+    else:
+        days_in_months = CALENDAR.DAYS_IN_MONTHS
+        days_before_months = CALENDAR.DAYS_BEFORE_MONTHS
+    if (not 1 <= month_of_year <= CALENDAR.MONTHS_IN_YEAR or
+            not 1 <= day_of_month <= days_in_months[month_of_year - 1]):
+        raise ValueError("Bad calendar date: %s-%02d-%02d" % (year,
+                                                              month_of_year,
+                                                              day_of_month))
+    return year, days_before_months[month_of_year - 1] + day_of_month
 
 
 def get_ordinal_date_from_week_date(year, week_of_year, day_of_week):
@@ -1886,51 +2209,9 @@ def get_week_date_from_calendar_date(year, month_of_year, day_of_month):
     above month_of_year.
 
     """
-    prev_start = get_calendar_date_week_date_start(year - 1)
-    this_start = get_calendar_date_week_date_start(year)
-    next_start = get_calendar_date_week_date_start(year + 1)
-
-    cal_date = (year, month_of_year, day_of_month)
-
-    if prev_start <= cal_date < this_start:
-        # This calendar date is in the previous week date year.
-        start_year, start_month, start_day = prev_start
-        week_date_start_year = year - 1
-    elif this_start <= cal_date < next_start:
-        # This calendar date is in the same week date year.
-        start_year, start_month, start_day = this_start
-        week_date_start_year = year
-    else:
-        # This calendar date is in the next week date year.
-        start_year, start_month, start_day = next_start
-        week_date_start_year = year + 1
-
-    total_iter_days = -1
-    # A week date year can theoretically span 3 calendar years...
-    for iter_month, iter_day in iter_months_days(start_year,
-                                                 month_of_year=start_month,
-                                                 day_of_month=start_day):
-        total_iter_days += 1
-        if (start_year == year and
-                iter_month == month_of_year and
-                iter_day == day_of_month):
-            week_of_year = (total_iter_days / CALENDAR.DAYS_IN_WEEK) + 1
-            day_of_week = (total_iter_days % CALENDAR.DAYS_IN_WEEK) + 1
-            return week_date_start_year, week_of_year, day_of_week
-
-    for iter_start_year in [start_year + 1, start_year + 2]:
-        # Look at following year when the calendar date is e.g. very early Jan.
-        for iter_month, iter_day in iter_months_days(iter_start_year):
-            total_iter_days += 1
-            if (iter_start_year == year and
-                    iter_month == month_of_year and
-                    iter_day == day_of_month):
-                week_of_year = (total_iter_days / CALENDAR.DAYS_IN_WEEK) + 1
-                day_of_week = (total_iter_days % CALENDAR.DAYS_IN_WEEK) + 1
-                return week_date_start_year, week_of_year, day_of_week
-    raise ValueError("Bad calendar date: %s-%02d-%02d" % (year,
-                                                          month_of_year,
-                                                          day_of_month))
+    return get_week_date_from_day_number(get_day_number_from_ordinal_date(
+        *get_ordinal_date_from_calendar_date(
+            year, month_of_year, day_of_month)))
 
 
 def get_week_date_from_ordinal_date(year, day_of_year):
@@ -1950,77 +2231,21 @@ def get_week_date_from_ordinal_date(year, day_of_year):
 
 def get_calendar_date_week_date_start(year):
     """Return the calendar date of the start of (week date) year."""
-    return _get_calendar_date_week_date_start(
-        year, calendar_mode=CALENDAR.mode)
-
-
-@util.cache_results
-def _get_calendar_date_week_date_start(year, calendar_mode=None):
-    """Return the calendar date of the start of (week date) year."""
-    ref_year, ref_month, ref_day = (
-        CALENDAR.WEEK_DAY_START_REFERENCE["calendar"])
-    ref_year, ref_ordinal_day = (
-        CALENDAR.WEEK_DAY_START_REFERENCE["ordinal"])
-    if year == ref_year:
-        return ref_year, ref_month, ref_day
-    # Calculate the weekday for 1 January in this calendar year.
-    days_diff = 0
-    if year > ref_year:
-        days_diff = 1 - ref_ordinal_day
-        days_diff += get_days_in_year_range(ref_year, year - 1)
-    elif ref_year > year:
-        days_diff = ref_ordinal_day - 2
-        days_diff += get_days_in_year_range(year, ref_year - 1)
-
-    weekdays_diff = (days_diff) % CALENDAR.DAYS_IN_WEEK
-    if year > ref_year:
-        day_of_week_start_year = weekdays_diff + 1
-    else:
-        # Jan 1 as day of week.
-        day_of_week_start_year = CALENDAR.DAYS_IN_WEEK - weekdays_diff
-    if day_of_week_start_year == 1:
-        return year, 1, 1
-    if day_of_week_start_year > 4:
-        # This week belongs to the previous year; get the next Monday.
-        day = 1 + (8 - day_of_week_start_year)
-        return year, 1, day
-    # The week starts in the previous year - get the previous Monday.
-    for month, day in iter_months_days(year - 1, in_reverse=True):
-        day_of_week_start_year -= 1
-        if day_of_week_start_year == 1:
-            return year - 1, month, day
+    return get_calendar_date_from_day_number(
+        get_day_number_week_date_start(year))
 
 
 def get_days_since_1_ad(year):
     """Return the number of days since Jan 1, 1 A.D. to the year end."""
-    return _get_days_since_1_ad(year, calendar_mode=CALENDAR.mode)
-
-
-@util.cache_results
-def _get_days_since_1_ad(year, calendar_mode=None):
-    """Return the number of days since Jan 1, 1 A.D. to the year end."""
-    if year == 1:
-        return get_days_in_year(year)
-    elif year < 1:
+    if year < 1:
         return 0
-    return get_days_in_year_range(1, year)
+    return get_days_before_year(year + 1)
 
 
 def get_ordinal_date_week_date_start(year):
     """Return the ordinal week date start for year (year, day-of-year)."""
-    return _get_ordinal_date_week_date_start(
-        year, calendar_mode=CALENDAR.mode)
-
-
-@util.cache_results
-def _get_ordinal_date_week_date_start(year, calendar_mode=None):
-    """Return the ordinal week date start for year (year, day-of-year)."""
-    cal_year, cal_month, cal_day = get_calendar_date_week_date_start(year)
-    total_days = 0
-    for iter_month, iter_day in iter_months_days(cal_year):
-        total_days += 1
-        if iter_month == cal_month and iter_day == cal_day:
-            return cal_year, total_days
+    return get_ordinal_date_from_day_number(
+        get_day_number_week_date_start(year))
 
 
 def get_timepoint_for_now():
@@ -68,7 +68,11 @@ class TimePointDumper(object):
 
     """
 
+    # Maximum number of compiled formats of each instance.
+    MAX_FORMATTERS = 10000
+
     def __init__(self, num_expanded_year_digits=2):
+        self._formatters = {}
         self._rec_formats = {"date": [], "time": [], "time_zone": []}
         self._time_designator = parser_spec.TIME_DESIGNATOR
         self.num_expanded_year_digits = num_expanded_year_digits
@@ -89,19 +93,16 @@ class TimePointDumper(object):
         TimePointParser internals. See TimePointParser.*_TRANSLATE_INFO.
 
         """
-        if "%" in formatting_string:
-            try:
-                return self.strftime(timepoint, formatting_string)
-            except TimePointDumperBoundsError:
-                raise
-            except ValueError:
-                pass
-        expression, properties, custom_time_zone = (
-            self._get_expression_and_properties(formatting_string))
-        return self._dump_expression_with_properties(
-            timepoint, expression, properties,
-            custom_time_zone=custom_time_zone
-        )
+        return self.get_formatter(formatting_string).dump(timepoint)
+
+    def dump_many(self, timepoints, formatting_string):
+        """Dump each timepoint according to formatting_string.
+
+        Return a list of strings. See dump.
+
+        """
+        dump = self.get_formatter(formatting_string).dump
+        return [dump(timepoint) for timepoint in timepoints]
 
     def strftime(self, timepoint, formatting_string):
         """Implement equivalent of Python 2's datetime.datetime.strftime.
@@ -109,68 +110,76 @@ class TimePointDumper(object):
         Dump timepoint based on the format given in formatting_string.
 
         """
-        split_format = parser_spec.REC_SPLIT_STRFTIME_DIRECTIVE.split(
-            formatting_string)
-        expression = ""
-        properties = []
-        for item in split_format:
-            if parser_spec.REC_STRFTIME_DIRECTIVE_TOKEN.search(item):
-                item_expression, item_properties = (
-                    parser_spec.translate_strftime_token(item))
-                expression += item_expression
-                properties += item_properties
-            else:
-                expression += item
-        return self._dump_expression_with_properties(
-            timepoint, expression, properties)
+        return self.get_strftime_formatter(formatting_string).dump(timepoint)
 
-    def _dump_expression_with_properties(self, timepoint, expression,
-                                         properties, custom_time_zone=None):
-        if not timepoint.truncated:
-            if "week_of_year" in properties or "day_of_week" in properties:
-                if not ("month_of_year" in properties or
-                        "day_of_month" in properties or
-                        "day_of_year" in properties):
-                    # We need the year to be in week years.
-                    timepoint = timepoint.copy().to_week_date()
-            elif (timepoint.get_is_week_date() and (
-                    "month_of_year" in properties or
-                    "day_of_month" in properties or
-                    "day_of_year" in properties)):
-                # We need the year to be in standard calendar years.
-                timepoint = timepoint.copy().to_calendar_date()
+    def get_formatter(self, formatting_string):
+        """Return a TimePointFormatter for formatting_string.
 
-        if custom_time_zone is not None:
-            timepoint = timepoint.copy()
-            if custom_time_zone == (0, 0):
-                timepoint.set_time_zone_to_utc()
-            else:
-                current_time_zone = timepoint.get_time_zone()
-                new_time_zone = current_time_zone.copy()
-                new_time_zone.hours = int(custom_time_zone[0])
-                new_time_zone.minutes = int(custom_time_zone[1])
-                new_time_zone.unknown = False
-                timepoint.set_time_zone(new_time_zone)
-        property_map = {}
-        for property_ in properties:
-            property_map[property_] = timepoint.get(property_)
-            if (property_ == "century" and
-                    ("expanded_year_digits" not in properties or
-                     not self.num_expanded_year_digits)):
-                min_value = 0
-                max_value = 9999
-            elif property_ == "expanded_year_digits":
-                max_value = (10 ** (self.num_expanded_year_digits + 4)) - 1
-                min_value = -max_value
+        See dump. Formatters are compiled once and cached by format.
+
+        """
+        key = (False, formatting_string)
+        formatter = self._formatters.get(key)
+        if formatter is None:
+            strftime_formatter = None
+            if "%" in formatting_string:
+                try:
+                    strftime_formatter = self.get_strftime_formatter(
+                        formatting_string)
+                except ValueError:
+                    pass
+            try:
+                expression, properties, custom_time_zone = (
+                    self._get_expression_and_properties(formatting_string))
+            except ValueError:
+                if strftime_formatter is None:
+                    raise
+                formatter = strftime_formatter
             else:
-                continue
-            value = timepoint.year
-            if not (min_value <= value <= max_value):
-                raise TimePointDumperBoundsError(
-                    "year", value, min_value, max_value)
-        return expression % property_map
+                formatter = TimePointFormatter(
+                    self, expression, properties, custom_time_zone)
+                if strftime_formatter is not None:
+                    # Try strftime first, as the dump method used to.
+                    formatter = TimePointFormatter(
+                        self, strftime_formatter.expression,
+                        strftime_formatter.properties, fallback=formatter)
+            self._put_formatter(key, formatter)
+        return formatter
+
+    def get_strftime_formatter(self, formatting_string):
+        """Return a TimePointFormatter for a strftime formatting_string.
+
+        See strftime. Formatters are compiled once and cached by format.
+
+        """
+        key = (True, formatting_string)
+        formatter = self._formatters.get(key)
+        if formatter is None:
+            split_format = parser_spec.REC_SPLIT_STRFTIME_DIRECTIVE.split(
+                formatting_string)
+            expression = ""
+            properties = []
+            for item in split_format:
+                if parser_spec.REC_STRFTIME_DIRECTIVE_TOKEN.search(item):
+                    item_expression, item_properties = (
+                        parser_spec.translate_strftime_token(item))
+                    expression += item_expression
+                    properties += item_properties
+                else:
+                    expression += item
+            formatter = TimePointFormatter(self, expression, properties)
+            self._put_formatter(key, formatter)
+        return formatter
+
+    def _put_formatter(self, key, formatter):
+        """Cache a formatter, dropping an arbitrary one if full."""
+        if len(self._formatters) >= self.MAX_FORMATTERS:
+            try:
+                self._formatters.popitem()
+            except KeyError:
+                pass
+        self._formatters[key] = formatter
 
-    @util.cache_results
     def _get_expression_and_properties(self, formatting_string):
         date_time_strings = formatting_string.split(
             self._time_designator)
@@ -228,3 +237,90 @@ class TimePointDumper(object):
         if "time_zone_hour" not in info and "time_zone_minute" not in info:
             return None
         return info.get("time_zone_hour", 0), info.get("time_zone_minute", 0)
+
+
+class TimePointFormatter(object):
+
+    """A format of a TimePointDumper, compiled for dumping many TimePoints.
+
+    Use TimePointDumper.get_formatter or get_strftime_formatter to get an
+    instance, then call its dump method with each TimePoint.
+
+    expression is a string to format with the "%" operator, using a dict of
+    the TimePoint properties in properties. custom_time_zone is (hours,
+    minutes) or None, see TimePointDumper.get_time_zone. If dumping raises
+    a ValueError other than a TimePointDumperBoundsError, dump with the
+    fallback formatter instead, if there is one.
+
+    """
+
+    def __init__(self, dumper, expression, properties, custom_time_zone=None,
+                 fallback=None):
+        self.expression = expression
+        self.properties = tuple(properties)
+        self.custom_time_zone = custom_time_zone
+        self.fallback = fallback
+        self._to_week_date = False
+        self._to_calendar_date = False
+        if "week_of_year" in properties or "day_of_week" in properties:
+            # We need the year to be in week years, unless the format
+            # needs calendar years.
+            self._to_week_date = not (
+                "month_of_year" in properties or
+                "day_of_month" in properties or
+                "day_of_year" in properties)
+        else:
+            self._to_calendar_date = (
+                "month_of_year" in properties or
+                "day_of_month" in properties or
+                "day_of_year" in properties)
+        self._year_bounds = []
+        for property_ in self.properties:
+            if (property_ == "century" and
+                    ("expanded_year_digits" not in properties or
+                     not dumper.num_expanded_year_digits)):
+                self._year_bounds.append((0, 9999))
+            elif property_ == "expanded_year_digits":
+                max_value = (10 ** (dumper.num_expanded_year_digits + 4)) - 1
+                self._year_bounds.append((-max_value, max_value))
+
+    def dump(self, timepoint):
+        """Return timepoint as a string in this format."""
+        if self.fallback is None:
+            return self._dump(timepoint)
+        try:
+            return self._dump(timepoint)
+        except TimePointDumperBoundsError:
+            raise
+        except ValueError:
+            return self.fallback.dump(timepoint)
+
+    def _dump(self, timepoint):
+        """Return timepoint as a string in this format."""
+        if not timepoint.truncated:
+            if self._to_week_date:
+                if not timepoint.get_is_week_date():
+                    timepoint = timepoint.copy().to_week_date()
+            elif self._to_calendar_date and timepoint.get_is_week_date():
+                timepoint = timepoint.copy().to_calendar_date()
+        if self.custom_time_zone is not None:
+            time_zone = timepoint.get_time_zone()
+            hours, minutes = self.custom_time_zone
+            if time_zone.hours != hours or time_zone.minutes != minutes:
+                timepoint = timepoint.copy()
+                if (hours, minutes) == (0, 0):
+                    timepoint.set_time_zone_to_utc()
+                else:
+                    new_time_zone = time_zone.copy()
+                    new_time_zone.hours = int(hours)
+                    new_time_zone.minutes = int(minutes)
+                    new_time_zone.unknown = False
+                    timepoint.set_time_zone(new_time_zone)
+        for min_value, max_value in self._year_bounds:
+            if not (min_value <= timepoint.year <= max_value):
+                raise TimePointDumperBoundsError(
+                    "year", timepoint.year, min_value, max_value)
+        property_map = {}
+        for property_ in self.properties:
+            property_map[property_] = timepoint.get(property_)
+        return self.expression % property_map
@@ -20,11 +20,17 @@
 
 import re
 import sre_constants
+import string
 
 from . import data
 from . import dumpers
 from . import parser_spec
 from . import timezone
+from . import util
+
+
+_SHAPE_TRANSLATION = string.maketrans(string.digits, "0" * len(string.digits))
+_REC_DIGIT = re.compile(r"[0-9]")
 
 
 class ISO8601SyntaxError(ValueError):
@@ -142,8 +148,20 @@ class TimePointParser(object):
     string for TimePoint instances. See data.TimePoint documentation
     for syntax.
 
+    Parsed results are shared between instances via RESULT_CACHE, keyed
+    by the input string, the parse arguments and the settings above. The
+    hits and misses attributes of RESULT_CACHE and SHAPE_CACHE count
+    their use.
+
     """
 
+    # Parsed TimePoint instances, copied on return.
+    RESULT_CACHE = util.LRUCache(10000)
+    # Regular expressions that recognise the shapes of previous inputs.
+    SHAPE_CACHE = util.LRUCache(1000)
+    # {(num_expanded_year_digits, allow_only_basic): regex maps, ...}
+    _REGEX_MAPS = {}
+
     def __init__(self, num_expanded_year_digits=2,
                  allow_truncated=False,
                  allow_only_basic=False,
@@ -160,6 +178,17 @@ class TimePointParser(object):
 
     def _generate_regexes(self):
         """Generate combined date time strings."""
+        key = (self.expanded_year_digits, self.allow_only_basic)
+        if key not in self._REGEX_MAPS:
+            self._generate_regex_maps()
+            self._REGEX_MAPS[key] = (self._date_regex_map,
+                                     self._time_regex_map,
+                                     self._time_zone_regex_map)
+        (self._date_regex_map, self._time_regex_map,
+         self._time_zone_regex_map) = self._REGEX_MAPS[key]
+
+    def _generate_regex_maps(self):
+        """Compile the regular expressions of each format and type."""
         date_map = parser_spec.DATE_EXPRESSIONS
         time_map = parser_spec.TIME_EXPRESSIONS
         time_zone_map = parser_spec.TIME_ZONE_EXPRESSIONS
@@ -232,12 +261,27 @@ class TimePointParser(object):
 
     def parse(self, timepoint_string, dump_format=None, dump_as_parsed=False):
         """Parse a user-supplied timepoint string."""
-        date_info, time_info, parsed_expr = self.get_info(timepoint_string)
-        if dump_as_parsed:
-            dump_format = parsed_expr
-        return self._create_timepoint_from_info(
-            date_info, time_info, dump_format=dump_format,
-            truncated_dump_format=dump_format)
+        key = (timepoint_string, dump_format, dump_as_parsed,
+               self.expanded_year_digits, self.allow_truncated,
+               self.allow_only_basic, self.assumed_time_zone,
+               self.default_to_unknown_time_zone, self.dump_format)
+        if (self.assumed_time_zone is None and
+                not self.default_to_unknown_time_zone):
+            # The result may be in the local time zone, which can change.
+            key += timezone.get_local_time_zone()
+        timepoint = self.RESULT_CACHE.get(key)
+        if timepoint is None:
+            date_info, time_info, parsed_expr = self.get_info(
+                timepoint_string)
+            if dump_as_parsed:
+                dump_format = parsed_expr
+            timepoint = self._create_timepoint_from_info(
+                date_info, time_info, dump_format=dump_format,
+                truncated_dump_format=dump_format)
+            self.RESULT_CACHE.put(key, timepoint)
+        new_timepoint = timepoint.copy()
+        new_timepoint.truncated_dump_format = timepoint.truncated_dump_format
+        return new_timepoint
 
     def _create_timepoint_from_info(self, date_info, time_info,
                                     dump_format=None,
@@ -423,10 +467,96 @@ class TimePointParser(object):
         raise ISO8601SyntaxError("time zone", time_zone_string)
 
     def get_info(self, timepoint_string):
-        """Return the date and time properties from a timepoint string."""
+        """Return the date and time properties from a timepoint string.
+
+        The date, time and time zone expressions that match a string only
+        depend on its shape (see get_shape). Remember the expressions of
+        each shape in SHAPE_CACHE, so later strings of the same shape are
+        matched against a single regular expression, instead of searching
+        the expressions of each format and type.
+
+        """
+        shape_key = (get_shape(timepoint_string), self.expanded_year_digits,
+                     self.allow_truncated, self.allow_only_basic)
+        recogniser = self.SHAPE_CACHE.get(shape_key)
+        if recogniser:
+            info = self._get_info_from_recogniser(
+                recogniser, timepoint_string)
+            if info is not None:
+                return info
+        info, exprs = self._search_info(timepoint_string)
+        if recogniser is None:
+            self.SHAPE_CACHE.put(shape_key, self._get_recogniser(*exprs))
+        return info
+
+    def _get_info_from_recogniser(self, recogniser, timepoint_string):
+        """Return get_info results from a recogniser of the string shape.
+
+        Return None if the recogniser does not match.
+
+        """
+        (regex, date_keys, time_keys, time_zone_keys, parsed_expr) = (
+            recogniser)
+        result = regex.match(timepoint_string)
+        if result is None:
+            return None
+        groups = result.groupdict()
+        if date_keys is None:
+            date_info = {"truncated": True}
+        else:
+            date_info = dict((key, groups[key]) for key in date_keys)
+        time_info = dict((key, groups[key]) for key in time_keys)
+        time_info.update(self.process_time_zone_info(
+            dict((key, groups[key]) for key in time_zone_keys)))
+        return date_info, time_info, parsed_expr
+
+    def _get_recogniser(self, date_expr, time_expr, time_zone_expr):
+        """Return a recogniser for strings matching the given expressions.
+
+        A time_expr of None means no time designator. A date_expr of ""
+        means a truncated date with no date properties.
+
+        Return False if the expressions cannot be combined.
+
+        """
+        regex = ""
+        date_keys = None
+        time_keys = ()
+        time_zone_keys = ()
+        parsed_expr = date_expr
+        if date_expr:
+            date_regex = self.parse_date_expression_to_regex(date_expr)
+            date_keys = tuple(re.compile(date_regex).groupindex)
+            regex += date_regex[1:-1]  # Remove "^" and "$".
+        if time_expr is not None:
+            time_regex = self.parse_time_expression_to_regex(time_expr)
+            time_keys = tuple(re.compile(time_regex).groupindex)
+            regex += re.escape(parser_spec.TIME_DESIGNATOR) + time_regex[1:-1]
+            parsed_expr += parser_spec.TIME_DESIGNATOR + time_expr
+        if time_zone_expr:
+            time_zone_regex = self.parse_time_zone_expression_to_regex(
+                time_zone_expr)
+            time_zone_keys = tuple(re.compile(time_zone_regex).groupindex)
+            regex += time_zone_regex[1:-1]
+            parsed_expr += time_zone_expr
+        try:
+            regex = re.compile("^" + regex + "$")
+        except sre_constants.error:
+            # E.g. the same group name in the date and the time.
+            return False
+        return regex, date_keys, time_keys, time_zone_keys, parsed_expr
+
+    def _search_info(self, timepoint_string):
+        """Return get_info results and the matching expressions.
+
+        Search the expressions of each format and type in turn.
+
+        """
         date_time_time_zone = timepoint_string.split(
             parser_spec.TIME_DESIGNATOR)
         parsed_expr = ""
+        time_expr = None
+        time_zone_expr = None
         if len(date_time_time_zone) == 1:
             date = date_time_time_zone[0]
             keys, date_info = self.get_date_info(date)
@@ -498,7 +628,8 @@ class TimePointParser(object):
             parsed_expr += parser_spec.TIME_DESIGNATOR + (
                 time_expr + time_zone_expr)
             time_info.update(time_zone_info)
-        return date_info, time_info, parsed_expr
+        return ((date_info, time_info, parsed_expr),
+                (date_expr, time_expr, time_zone_expr))
 
     def process_time_zone_info(self, time_zone_info=None):
         """Rationalise time zone data and set defaults if appropriate."""
@@ -599,6 +730,18 @@ class DurationParser(object):
         raise ISO8601SyntaxError("duration", expression)
 
 
+def get_shape(text):
+    """Return text with each digit replaced by "0".
+
+    The parser expressions only tell digits apart from other characters,
+    so strings of the same shape match the same expressions.
+
+    """
+    if isinstance(text, str):
+        return text.translate(_SHAPE_TRANSLATION)
+    return _REC_DIGIT.sub("0", text)
+
+
 def parse_timepoint_expression(timepoint_expression, **kwargs):
     """Return a data model that represents timepoint_expression."""
     parser = TimePointParser(**kwargs)
@@ -936,6 +936,38 @@ class TestSuite(unittest.TestCase):
                         start_year, end_year)
                 )
 
+    def test_day_number(self):
+        """Test the day number conversions for each calendar mode."""
+        for calendar_mode in ["gregorian", "360day", "365day", "366day"]:
+            data.CALENDAR.set_mode(calendar_mode)
+            day_number = data.get_days_before_year(-401)
+            for year in xrange(-401, 403):
+                for month, day in data.iter_months_days(year):
+                    self.assertEqual(
+                        data.get_day_number_from_calendar_date(
+                            year, month, day),
+                        day_number)
+                    self.assertEqual(
+                        data.get_calendar_date_from_day_number(day_number),
+                        (year, month, day))
+                    day_number += 1
+            for year in xrange(1990, 2011):
+                week_start = data.get_day_number_week_date_start(year)
+                self.assertEqual(
+                    data.get_week_date_from_day_number(week_start),
+                    (year, 1, 1))
+                self.assertEqual(
+                    data.get_week_date_from_day_number(week_start - 1),
+                    (year - 1, data.get_weeks_in_year(year - 1), 7))
+            data.CALENDAR.set_mode()
+        # Tick over an ordinal date into a leap year.
+        for days, ctrl_string in [(1, "2016-001T00:00:00Z"),
+                                  (36, "2016-036T00:00:00Z"),
+                                  (-365, "2014-365T00:00:00Z")]:
+            time_point = data.TimePoint(year=2015, day_of_year=365)
+            self.assertEqual(
+                str(time_point + data.Duration(days=days)), ctrl_string)
+
     def test_timeduration(self):
         """Test the duration class methods."""
         for test_props, method, method_args, ctrl_results in (
@@ -1183,6 +1215,48 @@ class TestSuite(unittest.TestCase):
             self.assertEqual(test_data, ctrl_data,
                              "UTC for " + expression)
 
+    def test_timepoint_parser_cache(self):
+        """Test the parse results and shape caches give the same results."""
+        parsers.TimePointParser.RESULT_CACHE.clear()
+        parsers.TimePointParser.SHAPE_CACHE.clear()
+        parser = parsers.TimePointParser(
+            allow_truncated=True,
+            default_to_unknown_time_zone=True)
+        for expression, timepoint_kwargs in get_timepointparser_tests(
+                allow_truncated=True):
+            ctrl_data = str(data.TimePoint(**timepoint_kwargs))
+            for _ in range(2):
+                self.assertEqual(
+                    str(parser.parse(expression)), ctrl_data, expression)
+                self.assertEqual(
+                    str(parser.parse(expression, dump_as_parsed=True)),
+                    expression, expression)
+            # A string of the same shape, parsed via the shape cache.
+            other_expression = expression.replace("0", "1")
+            parsers.TimePointParser.SHAPE_CACHE.clear()
+            try:
+                ctrl_data = str(parser.parse(other_expression))
+            except parsers.ISO8601SyntaxError:
+                continue
+            parsers.TimePointParser.RESULT_CACHE.clear()
+            parser.parse(expression)
+            self.assertEqual(
+                str(parser.parse(other_expression)), ctrl_data,
+                other_expression)
+        self.assertTrue(parsers.TimePointParser.SHAPE_CACHE.hits > 0)
+        # Returned time points are copies.
+        timepoint = parser.parse("2018-01-01T00:00Z")
+        timepoint.year = 2019
+        self.assertEqual(
+            str(parser.parse("2018-01-01T00:00Z")), "2018-01-01T00:00:00Z")
+        self.assertTrue(parsers.TimePointParser.RESULT_CACHE.hits > 0)
+        # The cache distinguishes the parser settings.
+        parser = parsers.TimePointParser(
+            allow_truncated=True, assumed_time_zone=(1, 0))
+        self.assertEqual(
+            str(parser.parse("2018-01-01T00:00")),
+            "2018-01-01T00:00:00+01:00")
+
     def test_timepoint_strftime_strptime(self):
         """Test the strftime/strptime for date/time expressions."""
         import datetime
@@ -1297,6 +1371,8 @@ class TestSuite(unittest.TestCase):
                     test_results.append(str(time_point))
                 self.assertEqual(test_results, ctrl_results,
                                  expression + "(%s)" % calendar_mode)
+                self.assertEqual(test_recurrence.dump_points(), ctrl_results,
+                                 expression + "(%s)" % calendar_mode)
             data.CALENDAR.set_mode()
             self.assertEqual(data.CALENDAR.mode,
                              data.Calendar.MODE_GREGORIAN)
@@ -1318,6 +1394,8 @@ class TestSuite(unittest.TestCase):
                     break
                 test_results.append(str(time_point))
             self.assertEqual(test_results, ctrl_results, expression)
+            self.assertEqual(
+                test_recurrence.dump_points(3), ctrl_results, expression)
             if test_recurrence.start_point is None:
                 forward_method = test_recurrence.get_prev
                 backward_method = test_recurrence.get_next
@@ -1355,6 +1433,48 @@ class TestSuite(unittest.TestCase):
                 self.assertEqual(test_is_member, ctrl_is_member,
                                  timepoint_expression + " in " + expression)
 
+    def test_timerecurrence_arrays(self):
+        """Test the batched points of recurring date/time series."""
+        parser = parsers.TimeRecurrenceParser()
+        point_parser = parsers.TimePointParser()
+        expressions = [
+            "R/2016-01-31T00Z/P1M", "R/2016-02-29T06Z/P1Y",
+            "R/2016-01-01T00:00Z/PT6H", "R/P1M/2016-03-31T00Z",
+            "R/2016-W01-1T00Z/P1W", "R/2016-001T00-01:30/PT7H",
+            "R4/2016-01-01T00Z/2016-01-02T00Z",
+            "R7/2016-01-01T00Z/2016-01-02T00Z",
+            "R/2016-01-01T00Z/P1M1D", "R/2016-01-01T00Z/PT1,5H"]
+        for calendar_mode in ["gregorian", "360day", "365day", "366day"]:
+            data.CALENDAR.set_mode(calendar_mode)
+            for expression in expressions:
+                test_recurrence = parser.parse(expression)
+                test_recurrence.min_point = point_parser.parse(
+                    "2016-01-01T03+01")
+                test_recurrence.max_point = point_parser.parse(
+                    "2016-12-31T06-05")
+                source = expression + "(%s)" % calendar_mode
+                ctrl_points = list(test_recurrence)
+                day_numbers, seconds = (
+                    test_recurrence.get_day_numbers_and_seconds())
+                self.assertEqual(
+                    (list(day_numbers), list(seconds)),
+                    ([point.get_day_number() for point in ctrl_points],
+                     [point.get_second_of_day() for point in ctrl_points]),
+                    source)
+                self.assertEqual(
+                    test_recurrence.dump_points(),
+                    [str(point) for point in ctrl_points],
+                    source)
+                self.assertEqual(
+                    test_recurrence.dump_points(5),
+                    [str(point) for point in ctrl_points[:5]],
+                    source)
+            data.CALENDAR.set_mode()
+        test_recurrence = parser.parse("R/2016-01-01T00Z/PT6H")
+        self.assertRaises(
+            data.BadInputError, test_recurrence.get_day_numbers_and_seconds)
+        self.assertEqual(len(test_recurrence.dump_points(10)), 10)
+
     def test_timerecurrence_parser(self):
         """Test the recurring date/time series parsing."""
         parser = parsers.TimeRecurrenceParser()
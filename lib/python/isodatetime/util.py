@@ -18,6 +18,9 @@
 
 """Provide an optimisation decorator and other utilities."""
 
+from collections import OrderedDict
+from threading import Lock
+
 
 MAX_CACHE_SIZE = 100000
 
@@ -43,3 +46,62 @@ def cache_results(func):
             cache[key] = results
             return results
     return wrap_func
+
+
+class LRUCache(object):
+
+    """A thread safe mapping that holds at most max_size items.
+
+    When full, adding an item drops the least recently used item. The hits
+    and misses attributes count the results of the get method.
+
+    """
+
+    def __init__(self, max_size=MAX_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        """Remove all items and reset the hit and miss counts."""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the item of key and mark it as recently used.
+
+        Return default if there is no item of key.
+
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items[key] = value
+            self.hits += 1
+            return value
+
+    def get_hit_rate(self):
+        """Return the fraction of calls to get that found an item."""
+        if not self.hits:
+            return 0.0
+        return float(self.hits) / (self.hits + self.misses)
+
+    def put(self, key, value):
+        """Add or replace the item of key."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
@@ -32,9 +32,10 @@ import time
 import traceback
 import fcntl
 from contextlib import contextmanager
+from multiprocessing import active_children, Array, Pool
 
 # Rose modules
-from rose.reporter import Reporter
+from rose.reporter import Event, Reporter
 from rose.resource import ResourceLocator
 from rose.app_run import BuiltinApp
 from rose.env import env_var_process
@@ -150,6 +151,54 @@ class KGODatabase(object):
         self.statement_buffer = []
 
 
+class BufferedReporter(Reporter):
+
+    """Keep the messages of an analysis task run in a worker process.
+
+    The messages are kept as arguments for the reporter of the app, so they
+    can be passed back to the main process and reported there in task order.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        Reporter.__init__(self, *args, **kwargs)
+        self.reports = []
+
+    def report(self, message, kind=None, level=None, prefix=None, clip=None):
+        """Keep a message, see Reporter.report for the arguments.
+
+        The message and a callable prefix are evaluated now, so everything
+        kept can be pickled.
+
+        """
+        if isinstance(message, Event):
+            if kind is None:
+                kind = message.kind
+            if level is None:
+                level = message.level
+        elif isinstance(message, Exception):
+            if kind is None:
+                kind = self.KIND_ERR
+            if level is None:
+                level = self.FAIL
+        if kind is None:
+            kind = self.KIND_OUT
+        if level is None:
+            level = self.DEFAULT
+        if callable(prefix):
+            prefix = prefix(kind, level)
+        if callable(message):
+            message = message()
+        if not isinstance(message, basestring):
+            try:
+                message = unicode(message)
+            except UnicodeDecodeError:
+                message = str(message)
+        self.reports.append((message, kind, level, prefix, clip))
+
+    __call__ = report
+
+
 class RoseAnaApp(BuiltinApp):
 
     """Run rosa ana as an application."""
@@ -158,6 +207,7 @@ class RoseAnaApp(BuiltinApp):
     _prefix_pass = "[ OK ] "
     _prefix_fail = "[FAIL] "
     _printbar_width = 80
+    WORKER_POLL_DELAY = 1.0  # seconds between checks for dead workers
 
     def run(self, app_runner, conf_tree, opts, args, uuid, work_files):
         """Implement the "rose ana" command"""
@@ -217,19 +267,11 @@ class RoseAnaApp(BuiltinApp):
         number_of_failures = 0
         task_error = False
         summary_status = []
-        for itask, task in enumerate(self.analysis_tasks):
-            # Report the name of the task and a banner line to aid readability.
-            self.titlebar("Running task #{0}".format(itask + 1))
-            self.reporter("Method: {0}".format(task.options["full_task_name"]))
-
-            # Since the run_analysis method is out of rose's control in many
-            # cases the safest thing to do is a blanket try/except; since we
-            # have no way of knowing what exceptions might be raised.
-            try:
-                task.run_analysis()
+        for itask, (task, passed, exception) in enumerate(self._run_tasks()):
+            if exception is None:
                 # In the case that the task didn't raise any exception,
                 # we can now check whether it passed or failed.
-                if task.passed:
+                if passed:
                     msg = "Task #{0} passed".format(itask + 1)
                     summary_status.append(("{0} ({1})".format(
                         msg, task.options["full_task_name"]),
@@ -243,7 +285,7 @@ class RoseAnaApp(BuiltinApp):
                         self._prefix_fail))
                     self.reporter(msg, prefix=self._prefix_fail)
 
-            except Exception as err:
+            else:
                 # If an exception was raised, print a traceback and treat it
                 # as a failure.
                 task_error = True
@@ -253,7 +295,6 @@ class RoseAnaApp(BuiltinApp):
                     msg, task.options["full_task_name"]),
                     self._prefix_fail))
                 self.reporter(msg + " (see stderr)", prefix=self._prefix_fail)
-                exception = traceback.format_exc()
                 self.reporter(msg, prefix=self._prefix_fail,
                               kind=self.reporter.KIND_ERR)
                 self.reporter(exception, prefix=self._prefix_fail,
@@ -286,6 +327,101 @@ class RoseAnaApp(BuiltinApp):
         if number_of_failures > 0:
             raise TestsFailedException(number_of_failures)
 
+    def _run_tasks(self):
+        """Run the analysis tasks and yield (task, passed, exception).
+
+        "exception" is the traceback of any exception raised by the task, or
+        None. Results are yielded in task order, after the output of each
+        task, so the caller can report them as they arrive.
+
+        If the "[rose-ana]nproc" setting of the Rose configuration is more
+        than 1, the tasks are run by a pool of "nproc" worker processes. The
+        reporter messages and KGO database entries of each task are kept by
+        its worker and passed back to this process, which reports them and
+        adds them to the KGO database buffer in task order, so the output is
+        the same as that of running the tasks one after another. If the
+        worker running a task dies, the task is reported as an error.
+
+        """
+        nproc_str = self.rose_conf.get_value(["rose-ana", "nproc"])
+        nproc = 1
+        if nproc_str:
+            nproc = int(env_var_process(nproc_str))
+        nproc = min(nproc, len(self.analysis_tasks))
+        if nproc <= 1:
+            for itask, task in enumerate(self.analysis_tasks):
+                self._report_task_start(itask, task)
+                passed, exception = self._run_task(task)
+                yield task, passed, exception
+            return
+
+        # Worker processes are forked, so they inherit the app and its tasks
+        # and only the task indices and results need to be sent around.
+        # Workers record their PID in task_pids as they start a task, so a
+        # task whose worker dies can be reported, rather than waited for
+        # forever.
+        task_pids = Array("i", len(self.analysis_tasks), lock=False)
+        pool = Pool(nproc, _init_worker, [self, task_pids])
+        try:
+            results = [
+                pool.apply_async(_run_task_in_worker, [itask])
+                for itask in range(len(self.analysis_tasks))]
+            is_worker_dead = False
+            for itask, task in enumerate(self.analysis_tasks):
+                result = results[itask]
+                pid = 0
+                while not result.ready():
+                    result.wait(self.WORKER_POLL_DELAY)
+                    pid = task_pids[itask]
+                    if (pid and not result.ready() and
+                            pid not in [p.pid for p in active_children()]):
+                        break
+                self._report_task_start(itask, task)
+                if result.ready():
+                    passed, exception, reports, statements = result.get()
+                    for report in reports:
+                        self.reporter(*report)
+                    if self.kgo_db is not None:
+                        self.kgo_db.statement_buffer.extend(statements)
+                else:
+                    is_worker_dead = True
+                    passed = False
+                    exception = "Worker process {0} died".format(pid)
+                task.passed = passed
+                yield task, passed, exception
+            if is_worker_dead:
+                # The pool waits for the results of all tasks on close
+                pool.terminate()
+            else:
+                pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def _report_task_start(self, itask, task):
+        """Report the name of a task and a banner line to aid readability."""
+        self.titlebar("Running task #{0}".format(itask + 1))
+        self.reporter("Method: {0}".format(task.options["full_task_name"]))
+
+    @staticmethod
+    def _run_task(task):
+        """Run an analysis task and return (passed, exception).
+
+        "exception" is the traceback of any exception raised by the task, or
+        None.
+
+        """
+        # Since the run_analysis method is out of rose's control in many
+        # cases the safest thing to do is a blanket try/except; since we
+        # have no way of knowing what exceptions might be raised.
+        try:
+            task.run_analysis()
+        except Exception:
+            return False, traceback.format_exc()
+        return task.passed, None
+
     def titlebar(self, title):
         sidebarlen = (self._printbar_width - len(title) + 1) / 2 - 1
         self.reporter("{0} {1} {0}".format("*" * sidebarlen, title))
@@ -497,6 +633,43 @@ class AnalysisTask(object):
             raise ValueError(msg.format(unhandled))
 
 
+def _init_worker(app, task_pids):
+    """Helper for RoseAnaApp, set the app of a worker process.
+
+    "task_pids" is the shared array of the PIDs of the workers of the tasks.
+
+    """
+    global _WORKER_APP, _WORKER_TASK_PIDS
+    _WORKER_APP = app
+    _WORKER_TASK_PIDS = task_pids
+
+
+def _run_task_in_worker(itask):
+    """Helper for RoseAnaApp, run an analysis task in a worker process.
+
+    Return (passed, exception, reports, statements), where "reports" are the
+    arguments of the messages reported by the task and "statements" are the
+    commands it added to the KGO database buffer. The messages include the
+    events of commands run by the task with "app_runner.popen".
+
+    """
+    _WORKER_TASK_PIDS[itask] = os.getpid()
+    app = _WORKER_APP
+    app.reporter = BufferedReporter()
+    app.app_runner.popen.event_handler = app.reporter
+    if app.kgo_db is not None:
+        app.kgo_db.statement_buffer = []
+    passed, exception = app._run_task(app.analysis_tasks[itask])
+    statements = []
+    if app.kgo_db is not None:
+        statements = app.kgo_db.statement_buffer
+    return passed, exception, app.reporter.reports, statements
+
+
+_WORKER_APP = None  # The RoseAnaApp of a worker process
+_WORKER_TASK_PIDS = None  # The PIDs of the workers of the tasks
+
+
 class TestsFailedException(Exception):
 
     """Exception raised if any rose-ana comparisons fail."""
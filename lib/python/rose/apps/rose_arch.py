@@ -27,7 +27,8 @@ from rose.app_run import (
     BuiltinApp,
     ConfigValueError,
     CompulsoryConfigValueError)
-from rose.checksum import get_checksum, get_checksum_func
+from rose.checksum import (
+    ChecksumCacheEvent, get_checksum, get_checksum_cache, get_checksum_func)
 from rose.env import env_var_process, UnboundEnvironmentVariableError
 from rose.popen import RosePopenError
 from rose.reporter import Event
@@ -101,11 +102,16 @@ class RoseArchApp(BuiltinApp):
         suite_dir = app_runner.suite_engine_proc.get_suite_dir(suite_name)
         cwd = os.getcwd()
         app_runner.fs_util.chdir(suite_dir)
+        checksum_cache = get_checksum_cache()
+        n_hits, n_misses = checksum_cache.hits, checksum_cache.misses
         try:
-            return self._run(dao, app_runner, conf_tree.node)
+            ret = self._run(dao, app_runner, conf_tree.node)
         finally:
             app_runner.fs_util.chdir(cwd)
             dao.close()
+        app_runner.handle_event(ChecksumCacheEvent(
+            checksum_cache.hits - n_hits, checksum_cache.misses - n_misses))
+        return ret
 
     def _run(self, dao, app_runner, config):
         """Transform and archive suite files.
@@ -33,6 +33,9 @@ import rose.config
 from rose.host_select import HostSelector
 from rose.resource import ResourceLocator
 from rose.bush_dao import RoseBushDAO
+from rose.bush_log import RoseBushLogIndex
+from rose.lru_cache import LRUCache
+from StringIO import StringIO
 import tarfile
 from tempfile import NamedTemporaryFile
 from time import gmtime, strftime
@@ -48,6 +51,7 @@ class RoseBushService(object):
     UTIL = "bush"
     TITLE = "Rose Bush"
 
+    CACHE_SIZE = 8
     CYCLES_PER_PAGE = 100
     JOBS_PER_PAGE = 15
     JOBS_PER_PAGE_MAX = 300
@@ -56,6 +60,7 @@ class RoseBushService(object):
     SEARCH_MODE_REGEX = "REGEX"
     SEARCH_MODE_TEXT = "TEXT"
     SUITES_PER_PAGE = 100
+    VIEW_PAGE_SIZE = 256 * 1024  # 256KB
     VIEW_SIZE_MAX = 10 * 1024 * 1024  # 10MB
 
     def __init__(self, *args, **kwargs):
@@ -70,6 +75,13 @@ class RoseBushService(object):
             if self.host_name and "." in self.host_name:
                 self.host_name = self.host_name.split(".", 1)[0]
         self.rose_version = ResourceLocator.default().get_version()
+        # Decoded members of job log archives, and job entries of log files.
+        cache_size = int(rose_conf.get_value(
+            ["rose-bush", "cache-size"], self.CACHE_SIZE))
+        self.tar_member_cache = LRUCache(cache_size)
+        self.job_entry_cache = LRUCache(cache_size)
+        # Line indexes of log files viewed in pages.
+        self.log_index_cache = LRUCache(cache_size)
         template_env = jinja2.Environment(loader=jinja2.FileSystemLoader(
             ResourceLocator.default().get_util_home(
                 "lib", "html", "template", "rose-bush")))
@@ -467,89 +479,95 @@ class RoseBushService(object):
         template = self.template_env.get_template("suites.html")
         return template.render(**data)
 
-    def get_file(self, user, suite, path, path_in_tar=None, mode=None):
-        """Returns file information / content or a cherrypy response."""
+    def get_file(self, user, suite, path, path_in_tar=None, mode=None,
+                 with_job_entry=True, with_paging=False):
+        """Returns file information / content or a cherrypy response.
+
+        Return (lines, job_entry, file_content, f_name) to view the file,
+        or a cherrypy response to serve it raw. If with_job_entry is False,
+        job_entry is always None. If with_paging is True, a text file
+        larger than view-size-max is not read, and lines is None, so it can
+        be viewed in pages with viewpage and viewtail.
+
+        Members of job log archives are read once, then kept in
+        self.tar_member_cache while the archive is unchanged. They are not
+        paged: a gzip stream cannot seek backwards without decompressing it
+        again from the start, so members larger than view-size-max are
+        served raw.
+
+        """
         f_name = self._get_user_suite_dir(user, suite, path)
         conf = ResourceLocator.default().get_conf()
         view_size_max = int(conf.get_value(
             ["rose-bush", "view-size-max"], self.VIEW_SIZE_MAX))
+        text = None
+        is_paged = False
         if path_in_tar:
-            tar_f = tarfile.open(f_name, "r:gz")
-            try:
-                tar_info = tar_f.getmember(path_in_tar)
-            except KeyError:
-                raise cherrypy.HTTPError(404)
-            f_size = tar_info.size
-            handle = tar_f.extractfile(path_in_tar)
-            if handle.read(2) == "#!":
-                mime = self.MIME_TEXT_PLAIN
-            else:
-                mime = mimetypes.guess_type(
-                    urllib.pathname2url(path_in_tar))[0]
-            handle.seek(0)
-            if (mode == "download" or
-                    f_size > view_size_max or
-                    mime and
-                    (not mime.startswith("text/") or mime.endswith("html"))):
-                temp_f = NamedTemporaryFile()
-                f_bsize = os.fstatvfs(temp_f.fileno()).f_bsize
-                while True:
-                    bytes_ = handle.read(f_bsize)
-                    if not bytes_:
-                        break
-                    temp_f.write(bytes_)
-                cherrypy.response.headers["Content-Type"] = mime
+            stat = os.stat(f_name)
+            tar_member_key = (
+                f_name, stat.st_mtime, stat.st_size, path_in_tar)
+            if mode != "download":
+                text = self.tar_member_cache.get(tar_member_key)
+            if text is None:
+                tar_f = tarfile.open(f_name, "r:gz")
                 try:
-                    return cherrypy.lib.static.serve_file(temp_f.name, mime)
-                finally:
-                    temp_f.close()
-            text = handle.read()
+                    tar_info = tar_f.getmember(path_in_tar)
+                except KeyError:
+                    raise cherrypy.HTTPError(404)
+                f_size = tar_info.size
+                handle = tar_f.extractfile(path_in_tar)
+                mime = self._get_mime(path_in_tar, handle)
+                if (mode == "download" or
+                        f_size > view_size_max or
+                        not self._get_is_viewable(mime)):
+                    temp_f = NamedTemporaryFile()
+                    f_bsize = os.fstatvfs(temp_f.fileno()).f_bsize
+                    while True:
+                        bytes_ = handle.read(f_bsize)
+                        if not bytes_:
+                            break
+                        temp_f.write(bytes_)
+                    cherrypy.response.headers["Content-Type"] = mime
+                    try:
+                        return cherrypy.lib.static.serve_file(
+                            temp_f.name, mime)
+                    finally:
+                        temp_f.close()
+                text = handle.read()
+                handle.close()
         else:
             f_size = os.stat(f_name).st_size
-            if open(f_name).read(2) == "#!":
-                mime = self.MIME_TEXT_PLAIN
-            else:
-                mime = mimetypes.guess_type(urllib.pathname2url(f_name))[0]
+            with open(f_name) as handle:
+                mime = self._get_mime(f_name, handle)
             if not mime:
                 mime = self.MIME_TEXT_PLAIN
+            is_paged = with_paging and f_size > view_size_max
             if (mode == "download" or
-                    f_size > view_size_max or
-                    mime and
-                    (not mime.startswith("text/") or mime.endswith("html"))):
+                    f_size > view_size_max and not is_paged or
+                    not self._get_is_viewable(mime)):
                 cherrypy.response.headers["Content-Type"] = mime
                 return cherrypy.lib.static.serve_file(f_name, mime)
-            text = open(f_name).read()
-        try:
-            if mode in [None, "text"]:
-                text = jinja2.escape(text)
-            lines = [unicode(line) for line in text.splitlines()]
-        except UnicodeDecodeError:
-            if path_in_tar:
-                handle.seek(0)
-                # file closed by cherrypy
-                return cherrypy.lib.static.serve_fileobj(
-                    handle, self.MIME_TEXT_PLAIN)
-            else:
-                return cherrypy.lib.static.serve_file(
-                    f_name, self.MIME_TEXT_PLAIN)
-        else:
+            if not is_paged:
+                text = open(f_name).read()
+        lines = None
+        if not is_paged:
+            try:
+                lines = self._get_lines(text, mode)
+            except UnicodeDecodeError:
+                if path_in_tar:
+                    return cherrypy.lib.static.serve_fileobj(
+                        StringIO(text), self.MIME_TEXT_PLAIN)
+                else:
+                    return cherrypy.lib.static.serve_file(
+                        f_name, self.MIME_TEXT_PLAIN)
             if path_in_tar:
-                handle.close()
+                self.tar_member_cache.put(tar_member_key, text)
         name = path
         if path_in_tar:
             name = "log/" + path_in_tar
         job_entry = None
-        if name.startswith("log/job"):
-            names = self.bush_dao.parse_job_log_rel_path(name)
-            if len(names) == 4:
-                cycle, task, submit_num, _ = names
-                entries = self.bush_dao.get_suite_job_entries(
-                    user, suite, [cycle], [task],
-                    None, None, None, None, None)[0]
-                for entry in entries:
-                    if entry["submit_num"] == int(submit_num):
-                        job_entry = entry
-                        break
+        if with_job_entry:
+            job_entry = self._get_job_entry(user, suite, name, f_name)
         if fnmatch(os.path.basename(path), "rose*.conf"):
             file_content = "rose-conf"
         else:
@@ -557,6 +575,74 @@ class RoseBushService(object):
 
         return lines, job_entry, file_content, f_name
 
+    @classmethod
+    def _get_mime(cls, name, handle):
+        """Return the MIME type of a file from its name and first bytes."""
+        if handle.read(2) == "#!":
+            mime = cls.MIME_TEXT_PLAIN
+        else:
+            mime = mimetypes.guess_type(urllib.pathname2url(name))[0]
+        handle.seek(0)
+        return mime
+
+    @staticmethod
+    def _get_is_viewable(mime):
+        """Return True if a file of this MIME type can be viewed as text."""
+        return (not mime or
+                mime.startswith("text/") and not mime.endswith("html"))
+
+    @staticmethod
+    def _get_lines(text, mode):
+        """Return the unicode lines of text, HTML escaped in text mode.
+
+        Raise UnicodeDecodeError if text cannot be decoded.
+
+        """
+        if mode in [None, "text"]:
+            text = jinja2.escape(text)
+        return [unicode(line) for line in text.splitlines()]
+
+    def _get_job_entry(self, user, suite, name, f_name):
+        """Return the job entry of a job log file, or None.
+
+        name -- the path of the log file relative to the suite directory.
+        f_name -- the path of the log file, or of its archive.
+
+        Entries are kept in self.job_entry_cache while the suite database
+        and the log file are unchanged.
+
+        """
+        if not name.startswith("log/job"):
+            return None
+        names = self.bush_dao.parse_job_log_rel_path(name)
+        if len(names) != 4:
+            return None
+        cycle, task, submit_num, _ = names
+        key = [user, suite, cycle, task, submit_num]
+        suite_dir = self._get_user_suite_dir(user, suite)
+        for key_f_name in [
+                f_name,
+                os.path.join(suite_dir, "log", "db"),
+                os.path.join(suite_dir, "cylc-suite.db")]:
+            try:
+                stat = os.stat(key_f_name)
+            except OSError:
+                key.append(None)
+            else:
+                key.append((stat.st_mtime, stat.st_size))
+        key = tuple(key)
+        if key in self.job_entry_cache:
+            return self.job_entry_cache.get(key)
+        job_entry = None
+        entries = self.bush_dao.get_suite_job_entries(
+            user, suite, [cycle], [task], None, None, None, None, None)[0]
+        for entry in entries:
+            if entry["submit_num"] == int(submit_num):
+                job_entry = entry
+                break
+        self.job_entry_cache.put(key, job_entry)
+        return job_entry
+
     def get_last_activity_time(self, user, suite):
         """Returns last activity time for a suite based on database stat"""
         for name in [os.path.join("log", "db"), "cylc-suite.db"]:
@@ -573,12 +659,11 @@ class RoseBushService(object):
         """Search a text log file."""
         # get file or serve raw data
         file_output = self.get_file(
-            user, suite, path, path_in_tar=path_in_tar, mode=mode)
-        if isinstance(file_output, tuple):
-            lines, _, file_content, _ = self.get_file(
-                user, suite, path, path_in_tar=path_in_tar, mode=mode)
-        else:
+            user, suite, path, path_in_tar=path_in_tar, mode=mode,
+            with_job_entry=False)
+        if not isinstance(file_output, tuple):
             return file_output
+        lines, _, file_content, _ = file_output
 
         template = self.template_env.get_template("view-search.html")
 
@@ -629,12 +714,11 @@ class RoseBushService(object):
         """View a text log file."""
         # get file or serve raw data
         file_output = self.get_file(
-            user, suite, path, path_in_tar=path_in_tar, mode=mode)
-        if isinstance(file_output, tuple):
-            lines, job_entry, file_content, f_name = self.get_file(
-                user, suite, path, path_in_tar=path_in_tar, mode=mode)
-        else:
+            user, suite, path, path_in_tar=path_in_tar, mode=mode,
+            with_paging=True)
+        if not isinstance(file_output, tuple):
             return file_output
+        lines, job_entry, file_content, f_name = file_output
 
         template = self.template_env.get_template("view.html")
 
@@ -661,6 +745,148 @@ class RoseBushService(object):
             task_status_groups=self.bush_dao.TASK_STATUS_GROUPS,
             **data)
 
+    @cherrypy.expose
+    def viewpage(self, user, suite, path, offset=None, line=None,
+                 max_bytes=None, mode=None):
+        """Return a page of lines of a text log file, in JSON.
+
+        Return the whole lines in at most max_bytes from the byte "offset",
+        normally the "next_offset" of a previous page, which may be inside
+        a line longer than max_bytes. Otherwise, return them from the start
+        of (1-based) "line".
+
+        """
+        if line:
+            line = self._get_int_arg(line, 1)
+        elif offset:
+            offset = self._get_int_arg(offset, 0)
+        handle, f_size, key = self._open_log(user, suite, path)
+        try:
+            index = self._get_log_index(key, handle, f_size)
+            if line:
+                offset = index.get_offset(handle, line - 1)
+            elif offset:
+                offset = min(offset, f_size)
+            else:
+                offset = 0
+            return self._get_log_page(
+                handle, index, offset, max_bytes, mode)
+        finally:
+            handle.close()
+
+    @cherrypy.expose
+    def viewtail(self, user, suite, path, offset=None, max_bytes=None,
+                 mode=None):
+        """Return the lines appended to a text log file, in JSON.
+
+        Return the whole lines in at most max_bytes from the byte "offset",
+        normally the "next_offset" of a previous page. Without "offset",
+        return the lines in the last max_bytes of the file. If the file has
+        shrunk below "offset", it has been rewritten, so start again.
+
+        """
+        if offset is not None:
+            offset = self._get_int_arg(offset, 0)
+        handle, f_size, key = self._open_log(user, suite, path)
+        try:
+            index = self._get_log_index(key, handle, f_size)
+            if offset is not None and offset > f_size:
+                offset = 0
+            elif offset is None:
+                start = max(f_size - self._get_view_page_size(max_bytes), 0)
+                i = index.get_line(handle, start)
+                offset = index.get_offset(handle, i)
+                if offset < start:
+                    offset = index.get_offset(handle, i + 1)
+            return self._get_log_page(
+                handle, index, offset, max_bytes, mode)
+        finally:
+            handle.close()
+
+    def _open_log(self, user, suite, path):
+        """Open a text log file.
+
+        Return (handle, size, key), where key identifies the log file and
+        its index in self.log_index_cache.
+
+        """
+        f_name = self._get_user_suite_dir(user, suite, path)
+        stat = os.stat(f_name)
+        handle = open(f_name, "rb")
+        f_size = stat.st_size
+        key = (f_name, stat.st_dev, stat.st_ino)
+        if not self._get_is_viewable(self._get_mime(f_name, handle)):
+            handle.close()
+            raise cherrypy.HTTPError(403)
+        return handle, f_size, key
+
+    def _get_log_index(self, key, handle, f_size):
+        """Return the line index of a log file, updated to f_size bytes."""
+        index = self.log_index_cache.get(key)
+        if index is None:
+            index = RoseBushLogIndex()
+            self.log_index_cache.put(key, index)
+        index.update(handle, f_size)
+        return index
+
+    def _get_view_page_size(self, max_bytes=None):
+        """Return max_bytes, or the default, as a size within view-size-max."""
+        conf = ResourceLocator.default().get_conf()
+        view_size_max = int(conf.get_value(
+            ["rose-bush", "view-size-max"], self.VIEW_SIZE_MAX))
+        if max_bytes:
+            return min(self._get_int_arg(max_bytes, 1), view_size_max)
+        return min(self.VIEW_PAGE_SIZE, view_size_max)
+
+    @staticmethod
+    def _get_int_arg(value, min_value):
+        """Return a request argument as an int no less than min_value.
+
+        Raise HTTP 400 if it is not an integer or it is out of bounds.
+
+        """
+        try:
+            value = int(value)
+        except ValueError:
+            raise cherrypy.HTTPError(400)
+        if value < min_value:
+            raise cherrypy.HTTPError(400)
+        return value
+
+    def _get_log_page(self, handle, index, offset, max_bytes, mode):
+        """Return JSON of the whole lines from offset in an indexed log.
+
+        "next_offset" is the start of the line after the page. An
+        unterminated last line is returned, flagged as "partial", but
+        "next_offset" stays at its start, so the next page or tail returns
+        it again, complete. A line longer than max_bytes is split.
+
+        """
+        size = index.size
+        handle.seek(offset)
+        text = handle.read(min(self._get_view_page_size(max_bytes),
+                               size - offset))
+        next_offset = offset + len(text)
+        partial = False
+        if text and not text.endswith("\n"):
+            end = text.rfind("\n") + 1
+            if end:
+                partial = next_offset == size
+                next_offset = offset + end
+                if not partial:
+                    text = text[:end]
+            elif next_offset == size:
+                partial = True
+                next_offset = offset
+        return simplejson.dumps({
+            "offset": offset,
+            "next_offset": next_offset,
+            "size": size,
+            "line": index.get_line(handle, offset) + 1,
+            "lines": self._get_lines(text.decode("utf-8", "replace"), mode),
+            "partial": partial,
+        })
+
     def _get_suite_logs_info(self, user, suite):
         """Return a dict with suite logs and Rosie suite info."""
         data = {"info": {}, "files": {}}
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Rose Bush: read pages of (possibly growing) log files by byte offset.
+
+Classes:
+    RoseBushLogIndex - a sparse index of the line offsets of a log file.
+
+"""
+
+from bisect import bisect_right
+from threading import Lock
+
+
+class RoseBushLogIndex(object):
+
+    """A sparse index of the byte offsets of the lines of a log file.
+
+    Record the offset of every "interval" lines, so the offset of any line,
+    or the line of any offset, can be found by reading at most "interval"
+    lines. Log files only grow, so an index can be extended with the bytes
+    appended since its last update. If a file shrinks, it is re-indexed.
+
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    INTERVAL = 1000
+
+    def __init__(self, interval=None):
+        if interval is None:
+            interval = self.INTERVAL
+        self.interval = interval
+        self.offsets = [0]  # offsets[i] is the offset of line i * interval
+        self.size = 0  # number of bytes indexed
+        self.n_lines = 0  # number of line breaks in the bytes indexed
+        self._lock = Lock()
+
+    def update(self, handle, size):
+        """Index the bytes of a file handle up to "size"."""
+        with self._lock:
+            if size < self.size:
+                self.offsets = [0]
+                self.size = 0
+                self.n_lines = 0
+            handle.seek(self.size)
+            while self.size < size:
+                chunk = handle.read(min(self.CHUNK_SIZE, size - self.size))
+                if not chunk:
+                    break
+                n_lines = chunk.count("\n")
+                pos = -1
+                i = self.n_lines
+                next_line = len(self.offsets) * self.interval
+                while i + n_lines >= next_line:
+                    # Find the break before line "next_line" in this chunk
+                    for _ in xrange(next_line - i):
+                        pos = chunk.find("\n", pos + 1)
+                    n_lines -= next_line - i
+                    i = next_line
+                    self.offsets.append(self.size + pos + 1)
+                    next_line += self.interval
+                self.n_lines = i + n_lines
+                self.size += len(chunk)
+
+    def get_offset(self, handle, line):
+        """Return the offset of (0-based) "line" in the indexed bytes.
+
+        Return the size of the indexed bytes if "line" is beyond the end.
+
+        """
+        if line >= self.n_lines:
+            if line == self.n_lines:
+                return self._get_last_line_offset(handle)
+            return self.size
+        i = line // self.interval
+        offset = self.offsets[i]
+        handle.seek(offset)
+        for _ in xrange(line - i * self.interval):
+            offset += len(handle.readline())
+        return offset
+
+    def get_line(self, handle, offset):
+        """Return the (0-based) line number at "offset"."""
+        offset = min(offset, self.size)
+        i = bisect_right(self.offsets, offset) - 1
+        handle.seek(self.offsets[i])
+        return (i * self.interval +
+                handle.read(offset - self.offsets[i]).count("\n"))
+
+    def _get_last_line_offset(self, handle):
+        """Return the offset of the line after the last line break."""
+        if not self.n_lines:
+            return 0
+        offset = self.get_offset(handle, self.n_lines - 1)
+        return offset + len(handle.readline())
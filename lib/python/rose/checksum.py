@@ -23,19 +23,148 @@
 import errno
 import hashlib
 import inspect
+from multiprocessing.pool import ThreadPool
 import os
+import sqlite3
+from threading import Lock
+from time import time
 
+from rose.reporter import Event
 from rose.resource import ResourceLocator
 
 
 _DEFAULT_DEFAULT_KEY = "md5"
 _DEFAULT_KEY = None
 _HASH_LENGTHS = None
+_CACHE = None
 
+BLOCK_SIZE_MIN = 65536
 MTIME_AND_SIZE = "mtime+size"
+NPROC = 4
 
 
-def get_checksum(name, checksum_func=None):
+class ChecksumCacheEvent(Event):
+    """Event raised to report the hits and misses of the checksum cache."""
+
+    LEVEL = Event.V
+
+    def __str__(self):
+        return "checksum cache: hits=%d, misses=%d" % self.args
+
+
+class ChecksumCache(object):
+    """Cache of checksums of files.
+
+    An entry is keyed on the path, inode, size and modified time of a file,
+    and the checksum algorithm, so a file that has not changed since its
+    checksum was calculated does not have to be read again.
+
+    Entries are kept in memory for the life of the process. If "db_path" is
+    specified, entries are also stored in an SQLite database file at this
+    path, so they can be used by other processes.
+
+    """
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS checksums (" +
+              "path TEXT, algorithm TEXT, inode INTEGER, size INTEGER, " +
+              "mtime_ns INTEGER, checksum TEXT, " +
+              "PRIMARY KEY(path, algorithm))")
+    # Don't store checksums of files modified this recently, in case they are
+    # modified again within the resolution of the file system time stamp.
+    RACY_TIME = 2.0
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        self.new_entries = []
+        self.conn = None
+        self.lock = Lock()
+
+    @classmethod
+    def get_key(cls, stat):
+        """Return the (inode, size, mtime_ns) key of a stat result."""
+        mtime_ns = getattr(stat, "st_mtime_ns", None)
+        if mtime_ns is None:
+            mtime_ns = int(round(stat.st_mtime * 1e9))
+        return (stat.st_ino, stat.st_size, mtime_ns)
+
+    def get(self, algorithm, path, stat):
+        """Return the cached checksum of "path" with "stat" or None."""
+        key = self.get_key(stat)
+        with self.lock:
+            entry = self.entries.get((path, algorithm))
+            if entry is None and self._connect():
+                try:
+                    row = self.conn.execute(
+                        "SELECT inode, size, mtime_ns, checksum" +
+                        " FROM checksums WHERE path=? AND algorithm=?",
+                        (path, algorithm)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    entry = (tuple(row[0:3]), row[3])
+                    self.entries[(path, algorithm)] = entry
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, algorithm, path, stat, checksum):
+        """Store the checksum of "path" with "stat"."""
+        if stat.st_mtime > time() - self.RACY_TIME:
+            return
+        key = self.get_key(stat)
+        with self.lock:
+            self.entries[(path, algorithm)] = (key, checksum)
+            if self.db_path:
+                self.new_entries.append(
+                    (path, algorithm) + key + (checksum,))
+
+    def dump(self):
+        """Write new entries to the database file, if relevant.
+
+        The cache is an optimisation, so failures are ignored.
+
+        """
+        with self.lock:
+            if not self.new_entries or not self._connect():
+                return
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO checksums VALUES" +
+                        " (?, ?, ?, ?, ?, ?)",
+                        self.new_entries)
+            except sqlite3.Error:
+                pass
+            self.new_entries = []
+
+    def _connect(self):
+        """Connect to the database file, if relevant.
+
+        Return True if connected.
+
+        """
+        if self.conn is None and self.db_path:
+            try:
+                db_dir = os.path.dirname(self.db_path)
+                if db_dir and not os.path.isdir(db_dir):
+                    os.makedirs(db_dir)
+                self.conn = sqlite3.connect(
+                    self.db_path, timeout=5.0, check_same_thread=False)
+                self.conn.text_factory = str
+                self.conn.execute(self.SCHEMA)
+                self.conn.commit()
+            except (OSError, sqlite3.Error):
+                self.conn = None
+                self.db_path = None
+        return self.conn is not None
+
+
+def get_checksum(name, checksum_func=None, nproc=None):
     """
     Calculate "checksum" of content in a file or directory called "name".
 
@@ -53,30 +182,89 @@ def get_checksum(name, checksum_func=None):
 
     If "name" does not exist, raise OSError.
 
+    If "checksum_func" is a hash function returned by get_checksum_func,
+    checksums are looked up in the cache returned by get_checksum_cache, and
+    files not in the cache are read by a pool of "nproc" threads (default is
+    NPROC).
+
     """
     if not os.path.exists(name):
         raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), name)
 
     if checksum_func is None:
         checksum_func = get_checksum_func()
-    path_and_checksum_list = []
+    # List of [path, checksum, mode, source, stat]
+    items = []
     if os.path.isfile(name):
-        checksum = checksum_func(name, "")
-        path_and_checksum_list.append(
-            ("", checksum, os.stat(os.path.realpath(name)).st_mode))
+        items.append(["", None, None, name, os.stat(name)])
+        root = ""
     else:  # if os.path.isdir(path):
         name = os.path.normpath(name)
-        path_and_checksum_list = []
+        root = name
         for dirpath, _, filenames in os.walk(name):
             path = dirpath[len(name) + 1:]
-            path_and_checksum_list.append((path, None, None))
+            items.append([path, None, None, None, None])
             for filename in filenames:
                 filepath = os.path.join(path, filename)
                 source = os.path.join(name, filepath)
-                checksum = checksum_func(source, name)
-                mode = os.stat(os.path.realpath(source)).st_mode
-                path_and_checksum_list.append((filepath, checksum, mode))
-    return path_and_checksum_list
+                items.append([filepath, None, None, source, os.stat(source)])
+
+    algorithm = getattr(checksum_func, "algorithm", None)
+    cache = None
+    if algorithm is not None:
+        cache = get_checksum_cache()
+    misses = []
+    for item in items:
+        source, stat = item[3:5]
+        if source is None:
+            continue
+        item[2] = stat.st_mode
+        if cache is None:
+            item[1] = checksum_func(source, root)
+            continue
+        item[3] = os.path.abspath(source)
+        item[1] = cache.get(algorithm, item[3], stat)
+        if item[1] is None:
+            misses.append(item)
+    if len(misses) > 1:
+        if nproc is None:
+            nproc = NPROC
+        pool = ThreadPool(min(nproc, len(misses)))
+        try:
+            checksums = pool.map(
+                _get_hexdigest_of_item, [(algorithm, item) for item in misses])
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        checksums = [
+            _get_hexdigest_of_item((algorithm, item)) for item in misses]
+    for item, checksum in zip(misses, checksums):
+        item[1] = checksum
+        cache.put(algorithm, item[3], item[4], checksum)
+    if misses:
+        cache.dump()
+    return [tuple(item[0:3]) for item in items]
+
+
+def get_checksum_cache():
+    """Return the checksum cache of this process.
+
+    If the site/user configuration "checksum-cache" setting specifies a
+    path, the cache is also stored in a database file at this path.
+
+    """
+    global _CACHE
+    if _CACHE is None:
+        db_path = ResourceLocator.default().get_conf().get_value(
+            ["checksum-cache"])
+        if db_path:
+            db_path = os.path.expanduser(os.path.expandvars(db_path))
+        _CACHE = ChecksumCache(db_path)
+    return _CACHE
 
 
 def get_checksum_func(algorithm=None):
@@ -98,7 +286,9 @@ def get_checksum_func(algorithm=None):
         return _mtime_and_size
     algorithm = algorithm.replace("sum", "")
     hashlib.new(algorithm)  # raise ValueError for a bad "algorithm" string
-    return lambda source, *_: _get_hexdigest(algorithm, source)
+    checksum_func = lambda source, *_: _get_hexdigest(algorithm, source)
+    checksum_func.algorithm = algorithm
+    return checksum_func
 
 
 def guess_checksum_algorithm(checksum):
@@ -123,19 +313,20 @@ def guess_checksum_algorithm(checksum):
     return _HASH_LENGTHS.get(len(checksum))
 
 
-def _get_hexdigest(algorithm, source):
+def _get_hexdigest(algorithm, source, block_size=None):
     """Load content of source into an hash object, and return its hexdigest."""
     hashobj = hashlib.new(algorithm)
     if hasattr(source, "read"):
         handle = source
     else:
         handle = open(source)
-    try:
-        f_bsize = os.statvfs(handle.name).f_bsize
-    except (AttributeError, OSError):
-        f_bsize = 4096
+    if block_size is None:
+        try:
+            block_size = os.statvfs(handle.name).f_bsize
+        except (AttributeError, OSError):
+            block_size = 4096
     while True:
-        bytes_ = handle.read(f_bsize)
+        bytes_ = handle.read(block_size)
         if not bytes_:
             break
         hashobj.update(bytes_)
@@ -143,6 +334,13 @@ def _get_hexdigest(algorithm, source):
     return hashobj.hexdigest()
 
 
+def _get_hexdigest_of_item(algorithm_and_item):
+    """Helper for get_checksum, return hexdigest of a file item."""
+    algorithm, item = algorithm_and_item
+    block_size = max(BLOCK_SIZE_MIN, getattr(item[4], "st_blksize", 0))
+    return _get_hexdigest(algorithm, item[3], block_size)
+
+
 def _mtime_and_size(source, root):
     """Return a string containing the name, its modified time and its size."""
     stat = os.stat(os.path.realpath(source))
@@ -72,6 +72,7 @@ Classes:
         rose.config.ConfigNodeDiff
         rose.config.ConfigDumper
         rose.config.ConfigLoader
+        rose.config.ConfigLoaderCache
 
 Functions:
     .. autosummary::
@@ -91,12 +92,16 @@ What about the standard library ConfigParser? Well, it is problematic:
 """
 
 import copy
+import cPickle as pickle
+from hashlib import sha1
 import os.path
 import re
 from rose.env import env_var_escape
 import shlex
+from stat import S_IWGRP, S_IWOTH
 import sys
 from tempfile import NamedTemporaryFile
+from time import time
 
 
 CHAR_ASSIGN = "="
@@ -112,6 +117,20 @@ STATE_SECT_IGNORED = "^"
 OPT_CONFIG_SETTING_COMMENT = " setting from opt config \"%s\" (%s)"
 
 
+def intern_key(key):
+    """Return the interned version of a string key, if possible.
+
+    Section and option names are repeated many times in large configurations,
+    e.g. in the many sections of STASH requests, so interning them saves
+    memory and makes dict look ups faster.
+
+    """
+    try:
+        return intern(key)
+    except TypeError:  # E.g. unicode
+        return key
+
+
 class ConfigNode(object):
 
     """Represent a node in a configuration file.
@@ -165,8 +184,7 @@ class ConfigNode(object):
 
     """
 
-    __slots__ = ["STATE_NORMAL", "STATE_USER_IGNORED",
-                 "STATE_SYST_IGNORED", "value", "state", "comments"]
+    __slots__ = ["value", "state", "_comments", "__weakref__"]
 
     STATE_NORMAL = ""
     """The default state of a ConfigNode."""
@@ -179,19 +197,34 @@ class ConfigNode(object):
     def __init__(self, value=None, state=STATE_NORMAL, comments=None):
         if value is None:
             value = {}
-        if comments is None:
-            comments = []
         self.value = value
         self.state = state
-        self.comments = comments
+        self._comments = comments
 
     def __repr__(self):
         return str({"value": self.value,
                     "state": self.state,
-                    "comments": self.comments})
+                    "comments": self._comments or []})
 
     __str__ = __repr__
 
+    @property
+    def comments(self):
+        """The list of comment lines of this node.
+
+        Most nodes have no comments, so the list is only created when it is
+        first used. Assign None to remove all comments.
+
+        """
+        if self._comments is None:
+            self._comments = []
+        return self._comments
+
+    @comments.setter
+    def comments(self, comments):
+        """Set the list of comment lines of this node."""
+        self._comments = comments
+
     def __len__(self):
         return len(self.value)
 
@@ -213,23 +246,54 @@ class ConfigNode(object):
         if self is other:
             return True
         try:
-            for keys_1, node_1 in self.walk(no_ignore=True):
-                node_2 = other.get(keys_1, no_ignore=True)
-                if (type(node_1) != type(node_2) or
-                        (not isinstance(node_1.value, dict) and
-                         node_1.value != node_2.value) or
-                        node_1.comments != node_2.comments):
-                    return False
-            for keys_2, node_2 in other.walk(no_ignore=True):
-                if self.get(keys_2, no_ignore=True) is None:
-                    return False
+            # An ignored root node hides all its settings.
+            if self.state and other.state:
+                return True
+            elif other.state:
+                return not self._has_normal_child()
+            elif self.state:
+                return not other._has_normal_child()
         except AttributeError:  # Should handle "other is None"
             return False
+        # Compare the normal settings of both nodes in a single traversal.
+        stack = [(self, other)]
+        while stack:
+            node_1, node_2 = stack.pop()
+            children_1 = node_1.value
+            if not isinstance(children_1, dict):
+                children_1 = {}
+            children_2 = node_2.value
+            if not isinstance(children_2, dict):
+                children_2 = {}
+            n_children = 0
+            for key, child_1 in children_1.items():
+                if child_1.state:
+                    continue
+                child_2 = children_2.get(key)
+                if (type(child_1) != type(child_2) or
+                        child_2.state or
+                        (not isinstance(child_1.value, dict) and
+                         child_1.value != child_2.value) or
+                        (child_1._comments or []) !=
+                        (child_2._comments or [])):
+                    return False
+                n_children += 1
+                stack.append((child_1, child_2))
+            for child_2 in children_2.values():
+                if not child_2.state:
+                    n_children -= 1
+            if n_children:
+                return False
         return True
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def _has_normal_child(self):
+        """Return True if this node has a child that is not ignored."""
+        return isinstance(self.value, dict) and any(
+            not child.state for child in self.value.values())
+
     def is_ignored(self):
         """Return True if current node is in the "ignored" state."""
         return self.state != self.STATE_NORMAL
@@ -278,24 +342,26 @@ class ConfigNode(object):
         if keys is None:
             keys = []
         start_node = self.get(keys, no_ignore)
-        stack = [(keys, start_node)]
-        if start_node is None:
-            stack = []
-        while stack:
-            node_keys, node = stack.pop(0)
+        if start_node is None or (no_ignore and self.state):
+            return
+        # Depth first, visiting the children of a node in reverse order of
+        # node.value.items(), with a stack of (keys, node) pairs.
+        stack = []
+        node_keys = keys
+        node = start_node
+        while True:
             if isinstance(node.value, dict):
-                for key in node.value.keys():
-                    child_keys = node_keys + [key]
-                    subnode = self.get(child_keys, no_ignore)
-                    if subnode is not None:
-                        stack.insert(0, (child_keys, subnode))
-            if node_keys == keys:
-                continue
-            if len(node_keys) == 1 and not isinstance(node.value, dict):
-                null_node_keys = [""] + node_keys
-                yield (null_node_keys, node)
-            else:
-                yield (node_keys, node)
+                for key, child in node.value.items():
+                    if not no_ignore or not child.state:
+                        stack.append((node_keys + [key], child))
+            if node is not start_node:
+                if len(node_keys) == 1 and not isinstance(node.value, dict):
+                    yield ([""] + node_keys, node)
+                else:
+                    yield (node_keys, node)
+            if not stack:
+                break
+            node_keys, node = stack.pop()
 
     def get(self, keys=None, no_ignore=False):
         """Return a node at the position of keys, if any.
@@ -479,7 +545,7 @@ class ConfigNode(object):
             if not isinstance(node.value, dict):
                 node.value = {}
             if key not in node.value:
-                node.value[key] = ConfigNode()
+                node.value[intern_key(key)] = ConfigNode()
             node = node.value[key]
         node.value = value
         if state is not None:
@@ -644,6 +710,36 @@ class ConfigNode(object):
         diff.set_from_configs(other_config_node, self)
         return diff
 
+    def __deepcopy__(self, memo):
+        """Return a deep copy of this node.
+
+        Faster than the generic copy.deepcopy. The tree of nodes is copied
+        structurally, and strings, which are immutable, are shared.
+
+        """
+        node = ConfigNode.__new__(type(self))
+        memo[id(self)] = node
+        value = self.value
+        if type(value) is dict:
+            node.value = {}
+            for key, child in value.items():
+                if type(child) is ConfigNode:
+                    node.value[key] = child.__deepcopy__(memo)
+                else:
+                    node.value[key] = copy.deepcopy(child, memo)
+        elif value is None or isinstance(value, basestring):
+            node.value = value
+        else:
+            node.value = copy.deepcopy(value, memo)
+        node.state = self.state
+        comments = self._comments
+        if type(comments) is list:
+            comments = list(comments) if comments else None
+        elif comments is not None:
+            comments = copy.deepcopy(comments, memo)
+        node._comments = comments
+        return node
+
     def __getstate__(self):
         """Avoid pickling the STATE constants within a deepcopy.
 
@@ -652,13 +748,13 @@ class ConfigNode(object):
         """
         return {"state": self.state,
                 "value": self.value,
-                "comments": self.comments}
+                "comments": self._comments}
 
     def __setstate__(self, state):
         """Read in the results of __getstate__."""
         self.state = state["state"]
         self.value = state["value"]
-        self.comments = state["comments"]
+        self._comments = state["comments"]
 
 
 class ConfigNodeDiff(object):
@@ -735,23 +831,52 @@ class ConfigNodeDiff(object):
             [(('foo',), (None, '', []))]
 
         """
-        settings_1 = {}
-        settings_2 = {}
-        for config_node, settings in [(config_node_1, settings_1),
-                                      (config_node_2, settings_2)]:
-            for keys, node in config_node.walk():
-                value = node.value
-                if type(node.value) is dict:
-                    value = None
-                settings[tuple(keys)] = (value, node.state, node.comments)
-        for keys in set(settings_2) - set(settings_1):
-            self.set_added_setting(keys, settings_2[keys])
-        for keys in set(settings_1) - set(settings_2):
-            self.set_removed_setting(keys, settings_1[keys])
-        for keys in set(settings_1).intersection(set(settings_2)):
-            if settings_1[keys] != settings_2[keys]:
-                self.set_modified_setting(keys, settings_1[keys],
-                                          settings_2[keys])
+        # Traverse both nodes together, comparing the children of each pair
+        # of nodes at the same position.
+        stack = [((), config_node_1, config_node_2)]
+        while stack:
+            keys, node_1, node_2 = stack.pop()
+            children_1 = {}
+            if node_1 is not None and isinstance(node_1.value, dict):
+                children_1 = node_1.value
+            children_2 = {}
+            if node_2 is not None and isinstance(node_2.value, dict):
+                children_2 = node_2.value
+            for key in set(children_1).union(children_2):
+                child_keys = keys + (key,)
+                child_1 = children_1.get(key)
+                child_2 = children_2.get(key)
+                keys_1, data_1 = self._get_keys_and_data(child_keys, child_1)
+                keys_2, data_2 = self._get_keys_and_data(child_keys, child_2)
+                if keys_1 == keys_2:
+                    if data_1 != data_2:
+                        self.set_modified_setting(keys_1, data_1, data_2)
+                else:
+                    if child_1 is not None:
+                        self.set_removed_setting(keys_1, data_1)
+                    if child_2 is not None:
+                        self.set_added_setting(keys_2, data_2)
+                if data_1 is None or data_1[0] is None or (
+                        data_2 is None or data_2[0] is None):
+                    stack.append((child_keys, child_1, child_2))
+
+    @staticmethod
+    def _get_keys_and_data(keys, node):
+        """Return (keys, (value, state, comments)) of node at keys.
+
+        As in ConfigNode.walk, keys of a top level option are prefixed with
+        a null string. The value of a section is None. Return (None, None) if
+        node is None.
+
+        """
+        if node is None:
+            return (None, None)
+        value = node.value
+        if type(value) is dict:
+            value = None
+        elif len(keys) == 1 and not isinstance(value, dict):
+            keys = ("",) + keys
+        return (keys, (value, node.state, node._comments or []))
 
     def get_as_opt_config(self):
         """Return a ConfigNode such that main + new_node = main + diff.
@@ -1070,8 +1195,8 @@ class ConfigDumper(object):
             handle = NamedTemporaryFile(prefix=os.path.basename(target),
                                         dir=target_dir, delete=False)
         blank = ""
-        if root.comments:
-            for comment in root.comments:
+        if root._comments:
+            for comment in root._comments:
                 handle.write(self._comment_format(comment))
             blank = "\n"
         root_keys = root.value.keys()
@@ -1095,7 +1220,7 @@ class ConfigDumper(object):
             section_node = root.value[section_key]
             handle.write(blank)
             blank = "\n"
-            for comment in section_node.comments:
+            for comment in section_node._comments or []:
                 handle.write(self._comment_format(comment))
             handle.write("%(open)s%(state)s%(key)s%(close)s\n" % {
                 "open": CHAR_SECTION_OPEN,
@@ -1124,7 +1249,7 @@ class ConfigDumper(object):
         """
         state = node.state
         values = node.value.split("\n")
-        for comment in node.comments:
+        for comment in node._comments or []:
             handle.write(self._comment_format(comment))
         value0 = values.pop(0)
         if env_escape_ok:
@@ -1169,8 +1294,12 @@ class ConfigLoader(object):
     TYPE_SECTION = "TYPE_SECTION"
     TYPE_OPTION = "TYPE_OPTION"
     UNKNOWN_NAME = "<???>"
+    RECORD_COMMENT = 0
+    RECORD_SECTION = 1
+    RECORD_OPTION = 2
 
-    def __init__(self, char_assign=CHAR_ASSIGN, char_comment=CHAR_COMMENT):
+    def __init__(self, char_assign=CHAR_ASSIGN, char_comment=CHAR_COMMENT,
+                 cache=None):
         """Initialise the configuration utility.
 
         Arguments:
@@ -1178,10 +1307,13 @@ class ConfigLoader(object):
         comment.
         char_assign -- the character to use to delimit a key=value
         assignment.
+        cache -- a ConfigLoaderCache to reuse the parsed results of
+        configuration files loaded by path, or None.
 
         """
         self.char_assign = char_assign
         self.char_comment = char_comment
+        self.cache = cache
         self.re_option = re.compile(
             r"^(?P<state>!?!?)(?P<option>[^\s" +
             char_assign + r"]+)\s*" +
@@ -1344,37 +1476,68 @@ class ConfigLoader(object):
         """
         if node is None:
             node = ConfigNode()
-        handle, file_name = self._get_file_and_name(source)
-        keys = []  # Currently position under root node
-        type_ = None  # Type of current node, section or option?
+        records = None
+        if self.cache is not None and not hasattr(source, "readline"):
+            cache_key, records = self.cache.get(self, source)
+        if records is None:
+            handle, file_name = self._get_file_and_name(source)
+            records = self._parse(handle, file_name)
+            if self.cache is not None and not hasattr(source, "readline"):
+                self.cache.put(cache_key, records)
+        return self._replay(records, node, default_comments)
+
+    __call__ = load
+
+    def _parse(self, handle, file_name):
+        """Parse the lines of handle into a list of records.
+
+        Each record is a tuple that represents a change to the configuration
+        node, in the order of the file:
+        (self.RECORD_COMMENT, comment) - a comment of the root node.
+        (self.RECORD_SECTION, section, state, comments) - a section header,
+            section is "" for the root node.
+        (self.RECORD_OPTION, option, value, state, comments) - an option.
+        The comments of a section or an option can be None, which means that
+        the comments of an existing node should be left alone.
+
+        """
+        char_assign = self.char_assign
+        char_comment = self.char_comment
+        re_section_match = self.RE_SECTION.match
+        re_option_match = self.re_option.match
+        comment_strip = self._comment_strip
+        records = []
+        option_values = None  # Value and continuation lines of an option
         comments = None  # Comments associated with next node
         line_num = 0
-        # Note: "for line in handle:" hangs for sys.stdin
-        while True:
-            line = handle.readline()
-            if not line:
-                break
+        for line in self._get_lines(handle):
             line_num += 1
             # White space and comments
             if line.isspace():
                 comments = []
                 continue
-            elif line.lstrip().startswith(self.char_comment):
+            line_lstrip = line.lstrip()
+            if line_lstrip.startswith(char_comment):
                 if comments is None:
-                    node.comments.append(self._comment_strip(line))
+                    records.append((self.RECORD_COMMENT, comment_strip(line)))
                 else:
-                    comments.append(self._comment_strip(line))
+                    comments.append(comment_strip(line))
                 continue
             # Handle option continuation.
-            if type_ == self.TYPE_OPTION and line[0].isspace():
-                value = node.get(keys[:]).value
+            if option_values is not None and line[0].isspace():
                 value_cont = line.strip()
-                if value_cont.startswith(self.char_assign):
+                if value_cont.startswith(char_assign):
                     value_cont = value_cont[1:]
-                node.set(keys[:], value + "\n" + value_cont)
+                option_values.append(value_cont)
                 continue
+            if option_values is not None and len(option_values) > 1:
+                records[-1] = records[-1][0:2] + (
+                    "\n".join(option_values),) + records[-1][3:]
+            option_values = None
             # Match a section header?
-            match = self.RE_SECTION.match(line)
+            match = None
+            if line_lstrip.startswith(CHAR_SECTION_OPEN):
+                match = re_section_match(line)
             if match:
                 head, section, state = match.group("head", "section", "state")
                 bad_index = self._check_section_value(section)
@@ -1382,45 +1545,66 @@ class ConfigLoader(object):
                     raise ConfigSyntaxError(
                         ConfigSyntaxError.BAD_CHAR,
                         file_name, line_num, len(head) + bad_index, line)
-                # Find position under root node
-                if type_ == self.TYPE_OPTION:
-                    keys.pop()
-                if keys:
-                    keys.pop()
-                section = section.strip()
-                if section:
-                    keys.append(section)
-                    type_ = self.TYPE_SECTION
-                else:
-                    keys = []
-                    type_ = None
-                section_node = node.get(keys[:])
-                if section_node is None:
-                    node.set(keys[:], {}, state, comments)
-                else:
-                    section_node.state = state
-                    if comments:
-                        section_node.comments += comments
+                records.append((
+                    self.RECORD_SECTION, intern_key(section.strip()), state,
+                    comments))
                 comments = []
                 continue
             # Match the start of an option setting?
-            match = self.re_option.match(line)
+            match = re_option_match(line)
             if not match:
                 raise ConfigSyntaxError(
                     ConfigSyntaxError.BAD_SYNTAX, file_name, line_num, 0, line)
             option, value, state = match.group("option", "value", "state")
-            if type_ == self.TYPE_OPTION:
-                keys.pop()
-            keys.append(option)
-            type_ = self.TYPE_OPTION
             value = value.strip()
-            if comments is not None and default_comments is not None:
-                comments += default_comments
-            node.set(keys[:], value.strip(), state, comments)
+            records.append(
+                (self.RECORD_OPTION, intern_key(option), value, state,
+                 comments))
+            option_values = [value]
             comments = []
-        return node
+        if option_values is not None and len(option_values) > 1:
+            records[-1] = records[-1][0:2] + (
+                "\n".join(option_values),) + records[-1][3:]
+        return records
 
-    __call__ = load
+    def _replay(self, records, node, default_comments=None):
+        """Apply records returned by self._parse to node.
+
+        Records are not modified, so they can be applied again.
+
+        """
+        section_node = node  # Current section node, or the root node
+        for record in records:
+            if record[0] == self.RECORD_OPTION:
+                option, value, state, comments = record[1:]
+                if comments is not None:
+                    comments = list(comments)
+                    if default_comments is not None:
+                        comments += default_comments
+                self._set_child(section_node, option, value, state, comments)
+            elif record[0] == self.RECORD_SECTION:
+                section, state, comments = record[1:]
+                if section:
+                    section_node = None
+                    if isinstance(node.value, dict):
+                        section_node = node.value.get(section)
+                    if section_node is None:
+                        if comments is not None:
+                            comments = list(comments)
+                        section_node = self._set_child(
+                            node, section, {}, state, comments)
+                    else:
+                        section_node.state = state
+                        if comments:
+                            section_node.comments += comments
+                else:
+                    section_node = node
+                    node.state = state
+                    if comments:
+                        node.comments += comments
+            else:  # record[0] == self.RECORD_COMMENT
+                node.comments += [record[1]]
+        return node
 
     @classmethod
     def _check_section_value(cls, section):
@@ -1476,6 +1660,42 @@ class ConfigLoader(object):
         """Strip comment character and whitespace from a comment."""
         return line.strip()[1:]
 
+    @staticmethod
+    def _get_lines(handle):
+        """Return an iterable of lines, including line breaks, of handle."""
+        if not hasattr(handle, "read"):
+            return iter(handle.readline, "")
+        text = handle.read()
+        if not text:
+            return []
+        lines = text.split("\n")
+        last = lines.pop()
+        lines = [line + "\n" for line in lines]
+        if last:
+            lines.append(last)
+        return lines
+
+    @staticmethod
+    def _set_child(node, key, value, state, comments):
+        """Set the child node of node at key, like node.set([key], ...).
+
+        Return the child node.
+
+        """
+        if not isinstance(node.value, dict):
+            node.value = {}
+        child = node.value.get(key)
+        if child is None:
+            child = ConfigNode()
+            node.value[key] = child
+        child.value = value
+        if state is not None:
+            child.state = state
+        if comments is not None:
+            # Do not keep empty lists of comments
+            child.comments = comments or None
+        return child
+
     def _get_file_and_name(self, file_):
         """Return file handle and file name of "file_"."""
         if hasattr(file_, "readline"):
@@ -1489,6 +1709,140 @@ class ConfigLoader(object):
         return (file_, file_name)
 
 
+class ConfigLoaderCache(object):
+
+    """A cache of the parsed results of configuration files.
+
+    A ConfigLoader with a cache only parses a configuration file when the
+    file is new to it or has changed since it was last parsed. Entries are
+    keyed on the path of the file and the assignment and comment characters
+    of the loader, and are valid while the inode, size and modification time
+    of the file stay the same.
+
+    The cache is held in memory. If "cache_dir" is specified, entries are
+    also stored in one file per configuration file under the directory, so
+    they can be reused by other processes. Any problem with reading or
+    writing the directory is ignored. Loading an entry file can run
+    arbitrary code, so the entries in the directory are only used if the
+    directory and the entry file are owned by the current user and cannot
+    be written to by anyone else.
+
+    Attributes:
+        cache.hits: The number of files loaded from the cache.
+        cache.misses: The number of files that need parsing.
+
+    """
+
+    FORMAT_VERSION = 1
+    # Files modified this close (in seconds) to now may be modified again
+    # within the resolution of the file system clock, so are not cached.
+    RACY_TIME = 2.0
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def clear(self):
+        """Remove all entries from memory."""
+        self._entries.clear()
+
+    def get(self, loader, path):
+        """Return (key, records) for the file at path, as parsed by loader.
+
+        records is None if the file is not in the cache or has changed since
+        it was cached, or if the file cannot be stat'ed. In the last case,
+        key is also None.
+
+        """
+        file_name = os.path.abspath(path)
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return (None, None)
+        key = (
+            file_name, loader.char_assign, loader.char_comment,
+            stat.st_ino, stat.st_size, stat.st_mtime)
+        if time() - stat.st_mtime < self.RACY_TIME:
+            self.misses += 1
+            return (None, None)
+        records = None
+        entry = self._entries.get(key[0:3])
+        if entry is not None and entry[0] == key:
+            records = entry[1]
+        elif self.cache_dir:
+            records = self._load_entry(key)
+            if records is not None:
+                self._entries[key[0:3]] = (key, records)
+        if records is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return (key, records)
+
+    def put(self, key, records):
+        """Store records of a file under key, as returned by self.get."""
+        if key is None:
+            return
+        self._entries[key[0:3]] = (key, records)
+        if self.cache_dir:
+            self._dump_entry(key, records)
+
+    def _get_entry_path(self, key):
+        """Return the path of the file in the cache directory for key."""
+        return os.path.join(
+            self.cache_dir, sha1(repr(key[0:3])).hexdigest() + ".pickle")
+
+    @staticmethod
+    def _is_private(stat):
+        """Return True if only the current user can write to a stat'ed file.
+
+        The file must be owned by the current user, and not writable by its
+        group or others.
+
+        """
+        return (
+            stat.st_uid == os.getuid() and
+            not stat.st_mode & (S_IWGRP | S_IWOTH))
+
+    def _load_entry(self, key):
+        """Load the records of key from the cache directory, if possible."""
+        try:
+            if not self._is_private(os.stat(self.cache_dir)):
+                return None
+            with open(self._get_entry_path(key), "rb") as handle:
+                if not self._is_private(os.fstat(handle.fileno())):
+                    return None
+                version, entry_key, records = pickle.load(handle)
+        except (IOError, OSError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError):
+            return None
+        if version != self.FORMAT_VERSION or entry_key != key:
+            return None
+        return records
+
+    def _dump_entry(self, key, records):
+        """Write the records of key to the cache directory, if possible."""
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0700)
+            handle = NamedTemporaryFile(
+                dir=self.cache_dir, prefix=".", delete=False)
+            try:
+                pickle.dump(
+                    (self.FORMAT_VERSION, key, records), handle,
+                    pickle.HIGHEST_PROTOCOL)
+                handle.close()
+                os.rename(handle.name, self._get_entry_path(key))
+            except BaseException:
+                handle.close()
+                os.unlink(handle.name)
+                raise
+        except (IOError, OSError, pickle.PicklingError):
+            pass
+
+
 class ConfigSyntaxError(Exception):
 
     """Exception raised for syntax error loading a configuration file.
@@ -19,14 +19,17 @@
 # ----------------------------------------------------------------------------
 """Process "file:*" sections in node of a rose.config_tree.ConfigTree."""
 
+import errno
 from fnmatch import fnmatch
 from glob import glob
+import hashlib
 import os
 from rose.checksum import (
-    get_checksum, get_checksum_func, guess_checksum_algorithm)
+    BLOCK_SIZE_MIN, ChecksumCacheEvent, get_checksum, get_checksum_cache,
+    get_checksum_func, guess_checksum_algorithm)
 from rose.config_processor import ConfigProcessError, ConfigProcessorBase
 from rose.env import env_var_process, UnboundEnvironmentVariableError
-from rose.fs_util import FileSystemUtil
+from rose.fs_util import copy_file_data, FileSystemUtil
 from rose.job_runner import JobManager, JobProxy, JobRunner
 from rose.popen import RosePopener
 from rose.reporter import Event
@@ -93,11 +96,16 @@ class ConfigProcessorForFile(ConfigProcessorBase):
             file_install_root = env_var_process(file_install_root)
             self.manager.fs_util.makedirs(file_install_root)
             self.manager.fs_util.chdir(file_install_root)
+        checksum_cache = get_checksum_cache()
+        n_hits, n_misses = checksum_cache.hits, checksum_cache.misses
         try:
             self._process(conf_tree, nodes, loc_dao, **kwargs)
         finally:
+            loc_dao.close()
             if cwd != os.getcwd():
                 self.manager.fs_util.chdir(cwd)
+        self.handle_event(ChecksumCacheEvent(
+            checksum_cache.hits - n_hits, checksum_cache.misses - n_misses))
 
     def _process(self, conf_tree, nodes, loc_dao, **kwargs):
         """Helper for self.process."""
@@ -316,7 +324,13 @@ class ConfigProcessorForFile(ConfigProcessorBase):
                 nproc = None
                 if nproc_str is not None:
                     nproc = int(nproc_str)
-                job_runner = JobRunner(self, nproc)
+                worker_type_keys = ["rose.config_processors.fileinstall",
+                                    "worker-type"]
+                worker_type = conf_tree.node.get_value(worker_type_keys)
+                if (worker_type is not None and
+                        worker_type not in JobRunner.WORKER_TYPES):
+                    raise ConfigProcessError(worker_type_keys, worker_type)
+                job_runner = JobRunner(self, nproc, worker_type)
                 job_runner(JobManager(jobs), conf_tree, loc_dao, work_dir)
             except ValueError as exc:
                 if exc.args and exc.args[0] in jobs:
@@ -384,7 +398,7 @@ class ConfigProcessorForFile(ConfigProcessorBase):
         Calculate the checksum(s) of (paths in) target.
 
         """
-        handle = None
+        blob_sources = []
         mod_bits = None
         is_first = True
         # Install target
@@ -395,18 +409,7 @@ class ConfigProcessorForFile(ConfigProcessorBase):
                 raise LocTypeError(target.name, source.name, target.loc_type,
                                    source.loc_type)
             if target.loc_type == target.TYPE_BLOB:
-                if handle is None:
-                    if not os.path.isfile(target.name):
-                        self.manager.fs_util.delete(target.name)
-                    handle = open(target.name, "wb")
-                f_bsize = os.statvfs(source.cache).f_bsize
-                source_handle = open(source.cache)
-                while True:
-                    bytes_ = source_handle.read(f_bsize)
-                    if not bytes_:
-                        break
-                    handle.write(bytes_)
-                source_handle.close()
+                blob_sources.append(source)
                 if mod_bits is None:
                     mod_bits = os.stat(source.cache).st_mode
                 else:
@@ -419,17 +422,98 @@ class ConfigProcessorForFile(ConfigProcessorBase):
                 cmd = self.manager.popen.get_cmd("rsync", *args)
                 self.manager.popen(*cmd)
             is_first = False
-        if handle is not None:
-            handle.close()
+        checksum = None
+        if blob_sources:
+            checksum = self._target_install_blob(
+                target, blob_sources, conf_tree)
         if mod_bits:
             os.chmod(target.name, mod_bits)
 
         # TODO: auto decompression of tar, gzip, etc?
 
         # Calculate target checksum(s)
+        if checksum is not None:
+            target.add_path("", checksum, os.stat(target.name).st_mode)
+            return
         for path, checksum, access_mode in get_checksum(target.name):
             target.add_path(path, checksum, access_mode)
 
+    def _target_install_blob(self, target, sources, conf_tree):
+        """Install a file target from the caches of the file "sources".
+
+        A single source is hard linked, if
+        [rose.config_processors.fileinstall]hardlink=true is set, and the
+        file system allows it. Otherwise its data is copied by the kernel, if
+        possible, see rose.fs_util.copy_file_data. Failing that, or if there
+        are multiple sources, the data is copied and checksummed in a single
+        pass.
+
+        Return the checksum of the target if it can be worked out without
+        reading the target again, or None.
+
+        """
+        if not os.path.isfile(target.name):
+            self.manager.fs_util.delete(target.name)
+        elif os.stat(target.name).st_nlink > 1:
+            # Don't write into the data of a hard link, e.g. a source
+            os.unlink(target.name)
+        checksum_func = get_checksum_func()
+        algorithm = getattr(checksum_func, "algorithm", None)
+        if len(sources) == 1:
+            hardlink_str = conf_tree.node.get_value(
+                ["rose.config_processors.fileinstall", "hardlink"])
+            is_copied = (
+                hardlink_str == "true" and
+                self._target_hardlink(target, sources[0].cache))
+            if not is_copied:
+                with open(sources[0].cache, "rb") as source_handle:
+                    with open(target.name, "wb") as handle:
+                        is_copied = bool(copy_file_data(source_handle, handle))
+            if is_copied:
+                # Target has the same content as the source, so use the
+                # source checksum, which is normally known or cached.
+                # N.B. mtime+size checksum is not about the content.
+                if algorithm is None:
+                    return None
+                if sources[0].cache_checksum is not None:
+                    return sources[0].cache_checksum
+                return get_checksum(sources[0].cache, checksum_func)[0][1]
+        hashobj = None
+        if algorithm is not None:
+            hashobj = hashlib.new(algorithm)
+        with open(target.name, "wb") as handle:
+            for source in sources:
+                with open(source.cache, "rb") as source_handle:
+                    block_size = max(
+                        BLOCK_SIZE_MIN,
+                        os.fstat(source_handle.fileno()).st_blksize)
+                    while True:
+                        bytes_ = source_handle.read(block_size)
+                        if not bytes_:
+                            break
+                        handle.write(bytes_)
+                        if hashobj is not None:
+                            hashobj.update(bytes_)
+        if hashobj is None:
+            return None
+        return hashobj.hexdigest()
+
+    def _target_hardlink(self, target, source):
+        """Hard link target to source, if possible.
+
+        Return True on success.
+
+        """
+        if os.path.exists(target.name):
+            os.unlink(target.name)
+        try:
+            os.link(source, target.name)
+        except OSError as exc:
+            if exc.errno in [errno.EXDEV, errno.EPERM, errno.EMLINK]:
+                return False
+            raise
+        return True
+
 
 class ChecksumError(Exception):
     """An exception raised on an unmatched checksum."""
@@ -476,6 +560,8 @@ class Loc(object):
     loc.key - An key to indicate if this source is modified or not
               (e.g. a SVN revision)
     loc.cache - A cache for this source
+    loc.cache_checksum - The checksum of loc.cache, if it is worked out
+                         while the cache is written, e.g. by a handler
     loc.used_by_names - This source is used by this list of target names
     loc.is_out_of_date - This loc is out of date
     loc.is_optional - A boolean to indicate if a source is optional or not
@@ -505,6 +591,7 @@ class Loc(object):
         self.paths = []
         self.key = None
         self.cache = None
+        self.cache_checksum = None
         self.used_by_names = []
         self.is_out_of_date = None  # boolean
         self.is_optional = False
@@ -537,6 +624,7 @@ class Loc(object):
         self.paths = other.paths
         self.key = other.key
         self.cache = other.cache
+        self.cache_checksum = other.cache_checksum
         self.is_out_of_date = other.is_out_of_date
 
 
@@ -596,11 +684,22 @@ class LocDAO(object):
         self.conn = None
         self.delete_locs = []
         self.update_locs = []
+        self.locs = None
+
+    def close(self):
+        """Close the connection to the database, if it is open."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
     def get_conn(self):
         """Return a Connection object to the database."""
         if self.conn is None:
             self.conn = sqlite3.connect(self.file_name)
+            try:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error:
+                pass  # Not supported, e.g. read-only location
         return self.conn
 
     def create(self):
@@ -669,25 +768,32 @@ class LocDAO(object):
         else:
             del self.delete_locs[:]
             del self.update_locs[:]
+            self.locs = None
 
-    def select(self, name):
-        """Query database for settings matching name.
+    def load(self):
+        """Load all locations in the database into self.locs.
 
-        Reconstruct setting as a Loc object and return it.
+        Read each table once, and reconstruct each location as a Loc object,
+        with its dependencies linked to other Loc objects in self.locs.
 
         """
         conn = self.get_conn()
-        row = conn.execute("""SELECT real_name,scheme,mode,loc_type,key""" +
-                           """ FROM locs WHERE name=?""", [name]).fetchone()
-        if row is None:
-            return
-        loc = Loc(name)
-        loc.real_name, loc.scheme, loc.mode, loc.loc_type, loc.key = row
+        locs = {}
+        for row in conn.execute(
+                """SELECT name,real_name,scheme,mode,loc_type,key""" +
+                """ FROM locs"""):
+            loc = Loc(row[0])
+            loc.real_name, loc.scheme, loc.mode, loc.loc_type, loc.key = (
+                row[1:])
+            locs[loc.name] = loc
 
         for row in conn.execute(
-                """SELECT path,checksum FROM paths WHERE name=?""",
-                [name]):
-            path, checksum_str = row
+                """SELECT name,path,checksum FROM paths""" +
+                """ ORDER BY name,path"""):
+            name, path, checksum_str = row
+            loc = locs.get(name)
+            if loc is None:
+                continue
             checksum = None
             access_mode = None
             if checksum_str:
@@ -701,13 +807,28 @@ class LocDAO(object):
             loc.add_path(path, checksum, access_mode)
 
         for row in conn.execute(
-                """SELECT dep_name FROM dep_names WHERE name=?""", [name]):
-            dep_name, = row
+                """SELECT name,dep_name FROM dep_names""" +
+                """ ORDER BY name,dep_name"""):
+            name, dep_name = row
+            loc = locs.get(name)
+            if loc is None:
+                continue
             if loc.dep_locs is None:
                 loc.dep_locs = []
-            loc.dep_locs.append(self.select(dep_name))
+            loc.dep_locs.append(locs.get(dep_name))
+
+        self.locs = locs
+
+    def select(self, name):
+        """Return the location matching name in the database as a Loc object.
+
+        Return None if there is no such location. On first call after the
+        database is modified, load all the locations with self.load().
 
-        return loc
+        """
+        if self.locs is None:
+            self.load()
+        return self.locs.get(name)
 
 
 class PullableLocHandlersManager(SchemeHandlersManager):
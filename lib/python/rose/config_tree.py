@@ -22,10 +22,14 @@
 
 import os
 from rose.c3 import mro
-from rose.config import ConfigNode, ConfigLoader
+from rose.config import ConfigNode, ConfigLoader, ConfigLoaderCache
+from rose.resource import ResourceLocator
 import shlex
 
 
+_CONFIG_LOADER_CACHE = None
+
+
 class BadOptionalConfigurationKeysError(Exception):
 
     """A error raised when bad optional configuration keys are specified."""
@@ -34,6 +38,27 @@ class BadOptionalConfigurationKeysError(Exception):
         return "Bad optional configuration key(s): " + ", ".join(self.args[0])
 
 
+def get_config_loader_cache():
+    """Return the configuration loader cache of this process.
+
+    Return None if the site/user configuration "config-cache" setting is
+    "false". If the "config-cache-dir" setting specifies a directory, the
+    cache is also stored in files in this directory.
+
+    """
+    global _CONFIG_LOADER_CACHE
+    if _CONFIG_LOADER_CACHE is None:
+        conf = ResourceLocator.default().get_conf()
+        if conf.get_value(["config-cache"], "true").lower() == "false":
+            _CONFIG_LOADER_CACHE = False
+        else:
+            cache_dir = conf.get_value(["config-cache-dir"])
+            if cache_dir:
+                cache_dir = os.path.expanduser(os.path.expandvars(cache_dir))
+            _CONFIG_LOADER_CACHE = ConfigLoaderCache(cache_dir)
+    return _CONFIG_LOADER_CACHE or None
+
+
 class ConfigTree(object):
 
     """A run time Rose configuration with linearised inheritance.
@@ -75,9 +100,17 @@ class ConfigTree(object):
 
 class ConfigTreeLoader(object):
 
-    """Load a Rose configuration with inheritance."""
+    """Load a Rose configuration with inheritance.
+
+    Unless a "cache" keyword argument is given, the configuration files are
+    loaded via the process-wide cache returned by get_config_loader_cache, so
+    unchanged files shared by many trees, e.g. metadata, are parsed once.
+
+    """
 
     def __init__(self, *args, **kwargs):
+        if "cache" not in kwargs:
+            kwargs["cache"] = get_config_loader_cache()
         self.node_loader = ConfigLoader(*args, **kwargs)
 
     def load(self, conf_dir, conf_name, conf_dir_paths=None, opt_keys=None,
@@ -188,7 +221,7 @@ class _Test(object):
         self.config_tree_loader = ConfigTreeLoader()
         self.config_dumper = ConfigDumper()
         self.test_num = 0
-        self.test_plan = "1..13"
+        self.test_plan = "1..19"
 
     def test(self, key, actual, expect):
         """Test if actual == expect."""
@@ -460,6 +493,46 @@ type=grilled
         self.test("t4.conf_dirs", conf_tree.conf_dirs,
                   [t4_conf_dir, t2_conf_dir, t1_conf_dir])
 
+    def test5(self):
+        """Test: as t4, but with a cache of parsed configuration files."""
+        os.chdir("../b")
+        file_names = [
+            "t4/rose-t.conf", "../a/t1/rose-t.conf", "../a/t2/rose-t.conf",
+            "../a/t1/opt/rose-t-go-large.conf"]
+        for file_name in file_names:
+            os.utime(file_name, (1000000000, 1000000000))
+        expect = self.config_tree_loader(
+            "t4", "rose-t.conf", conf_dir_paths=["../a"])
+        cache_dir = os.path.join(os.getcwd(), "cache")
+        cache = ConfigLoaderCache(cache_dir)
+        config_tree_loader = ConfigTreeLoader(cache=cache)
+        for _ in range(2):
+            conf_tree = config_tree_loader(
+                "t4", "rose-t.conf", conf_dir_paths=["../a"])
+        self.test("t5.node", conf_tree.node, expect.node)
+        self.test("t5.hits", (cache.hits, cache.misses), (3, 3))
+        cache = ConfigLoaderCache(cache_dir)
+        conf_tree = ConfigTreeLoader(cache=cache)(
+            "t4", "rose-t.conf", conf_dir_paths=["../a"])
+        self.test("t5.node-dir", conf_tree.node, expect.node)
+        self.test("t5.hits-dir", (cache.hits, cache.misses), (3, 0))
+        handle = open("t4/rose-t.conf", "ab")
+        handle.write("size=huge\n")
+        handle.close()
+        os.utime(file_names[0], (1000000001, 1000000001))
+        conf_tree = ConfigTreeLoader(cache=cache)(
+            "t4", "rose-t.conf", conf_dir_paths=["../a"])
+        self.test(
+            "t5.node-changed", conf_tree.node.get_value(["size"]), "huge")
+        # Entries that another user could have written are not loaded
+        for name in os.listdir(cache_dir):
+            os.chmod(os.path.join(cache_dir, name), 0660)
+        cache = ConfigLoaderCache(cache_dir)
+        ConfigTreeLoader(cache=cache)(
+            "t4", "rose-t.conf", conf_dir_paths=["../a"])
+        self.test("t5.hits-unsafe", (cache.hits, cache.misses), (0, 3))
+        os.chdir("../a")
+
     def run(self):
         """Run the tests."""
         print self.test_plan
@@ -477,6 +550,7 @@ type=grilled
             self.test3()
             self.test3_opt()
             self.test4()
+            self.test5()
         finally:
             os.chdir(cwd)
             rmtree(work_dir)
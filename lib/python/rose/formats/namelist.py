@@ -230,18 +230,6 @@ class NamelistValue(object):
         return value
 
 
-class _ParseContext(object):
-
-    def __init__(self):
-        self.files = []
-        self.handle = None
-        self.line = None
-        self.line_length = None
-        self.line_number = None
-        self.state = None
-        self.tail = None
-
-
 def parse(in_files):
     """Parse namelist groups in a list of input files "in_files".
     Return a list of NamelistGroup objects.
@@ -251,9 +239,7 @@ def parse(in_files):
                   "value": _handle_value,
                   "value-repeat": _handle_value}
     groups = []
-    ctx = _ParseContext()
-    ctx.files += in_files
-    for tag, filename, data in iter(lambda: _parse_func(ctx), None):
+    for tag, filename, data in _tokenize(in_files):
         if tag in handler_of:
             handler_of[tag](groups, filename, data)
     return groups
@@ -278,57 +264,83 @@ _PARSERS_FOR = {"": [[RE_GROUP_INIT, "group-init", "group"],
                            [RE_COMMENT, "comment", None]]}
 
 
-def _parse_func(ctx):
-    """The parsers at each "state" - each "state" has a set of parsers.
+def _get_state_parser(parsers):
+    """Combine the parsers of a "state" into a single regular expression.
 
-    Each parser contains a regular expression, the item type to return
-    on a match, and the name of the next state (if the match triggers
-    a state change).
+    Return the compiled regular expression and a dict that maps the index of
+    the group of each alternative, i.e. match.lastindex, to (tag, next state,
+    slice of match.groups() captured by the parser).
 
-    If the current string does not match, it will move on to the next
-    parser. A syntax error is raised if no more parsers are available
-    for the current state.
+    The alternatives are tried in order, like the separate parsers. The
+    "(?i)" flags of RE_REAL and RE_LOGICAL apply to the whole expression,
+    which does not change what the other parsers match.
 
     """
-    while ctx.files:
-        if ctx.handle is None:
-            ctx.handle = ctx.files[0]
-            if not isinstance(ctx.handle, file):
-                ctx.handle = open(ctx.handle, "r")
-            # FIXME: may be incorrect for already opened file
-            ctx.line_number = 0
-            ctx.state = ""
-        while ctx.handle is not None:
-            if ctx.tail:
-                for pattern, tag, next_state in _PARSERS_FOR[ctx.state]:
-                    rec = _rec(r"\A\s*(?:" + pattern + r")\s*(.*)\Z")
-                    match = rec.match(ctx.tail)
-                    if match:
-                        data = list(match.groups())
-                        ctx.tail = data.pop()
-                        if next_state is not None:
-                            ctx.state = next_state
-                        return [tag, ctx.handle.name, data]
-                e = SyntaxError()
-                e.filename = ctx.handle.name
-                e.lineno = ctx.line_number
-                e.offset = ctx.line_length - len(ctx.tail) + 1
-                e.text = ctx.line
-                raise e
-            else:
-                ctx.line = ctx.handle.readline()
-                ctx.line_number += 1
-                if ctx.line:
-                    ctx.line = ctx.line.rstrip()
-                    ctx.line_length = len(ctx.line)
-                    ctx.tail = ctx.line
-                    ctx.tail = ctx.tail.lstrip()
-                else:
-                    if ctx.files[0] != ctx.handle:
-                        ctx.handle.close()
-                    ctx.files.pop(0)
-                    ctx.handle = None
-    return None
+    alternatives = []
+    item_of = {}
+    n_groups = 0
+    for pattern, tag, next_state in parsers:
+        alternatives.append("(" + pattern + ")")
+        n_groups += 1
+        n_pattern_groups = _rec(pattern).groups
+        item_of[n_groups] = (
+            tag, next_state, slice(n_groups, n_groups + n_pattern_groups))
+        n_groups += n_pattern_groups
+    return (_rec(r"\s*(?:" + "|".join(alternatives) + r")\s*"), item_of)
+
+
+# The combined parser at each "state".
+_PARSER_OF = dict(
+    (state, _get_state_parser(parsers))
+    for state, parsers in _PARSERS_FOR.items())
+
+
+def _tokenize(in_files):
+    """Generate the items in a list of input files "in_files".
+
+    Yield each item as (tag, file name, data), where "data" is a list of
+    the groups captured by the item's regular expression.
+
+    The parsers at each "state" - each "state" has a set of parsers. Each
+    parser contains a regular expression, the item type to return on a
+    match, and the name of the next state (if the match triggers a state
+    change). The parsers of a "state" are combined into a single regular
+    expression, see _get_state_parser.
+
+    Each line is scanned in a single pass, keeping the position of the next
+    item in the line. If the line does not match any parser of the current
+    state at this position, a syntax error is raised.
+
+    """
+    for in_file in list(in_files):
+        handle = in_file
+        if not isinstance(handle, file):
+            handle = open(handle, "r")
+        # FIXME: may be incorrect for already opened file
+        line_number = 0
+        state = ""
+        for line in iter(handle.readline, ""):
+            line_number += 1
+            line = line.rstrip()
+            line_length = len(line)
+            pos = line_length - len(line.lstrip())
+            while pos < line_length:
+                rec, item_of = _PARSER_OF[state]
+                match = rec.match(line, pos)
+                if match is None:
+                    e = SyntaxError()
+                    e.filename = handle.name
+                    e.lineno = line_number
+                    e.offset = pos + 1
+                    e.text = line
+                    raise e
+                pos = match.end()
+                tag, next_state, data_slice = item_of[match.lastindex]
+                if next_state is not None:
+                    state = next_state
+                yield (tag, handle.name, list(match.groups()[data_slice]))
+        if handle is not in_file:
+            handle.close()
 
 
 def _handle_group(groups, file, data):
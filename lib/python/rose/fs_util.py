@@ -19,13 +19,26 @@
 # -----------------------------------------------------------------------------
 """File system utilities with event reporting."""
 
+import ctypes
+import ctypes.util
 import errno
+import fcntl
 import os
 from rose.reporter import Event
 import shutil
 import sys
 
 
+# From <linux/fs.h>, the ioctl request to share the data blocks of a file.
+FICLONE = 0x40049409
+# Errors that mean a method to copy data is not available for a file.
+_COPY_DATA_ERRNOS = (
+    errno.EBADF, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EOPNOTSUPP,
+    errno.EPERM, errno.EXDEV)
+_COPY_DATA_CHUNK_SIZE = 0x40000000
+_LIBC = None
+
+
 class FileSystemEvent(Event):
 
     """An event raised on a file system operation."""
@@ -182,3 +195,69 @@ class FileSystemUtil(object):
         open(path, "a").close()
         os.utime(path, None)
         self.handle_event(FileSystemEvent(FileSystemEvent.TOUCH, path))
+
+
+def copy_file_data(source_handle, target_handle):
+    """Copy all data of an open file to an empty open file in the kernel.
+
+    Try in order:
+    * A FICLONE ioctl, i.e. a reflink, which shares the data blocks on a
+      file system that supports copy-on-write.
+    * The copy_file_range system call.
+    * The sendfile system call.
+
+    Return the name of the method that copies the data, or None if none of
+    the methods is available, in which case the caller should copy the data.
+
+    """
+    source_fd = source_handle.fileno()
+    target_fd = target_handle.fileno()
+    try:
+        fcntl.ioctl(target_fd, FICLONE, source_fd)
+        return "reflink"
+    except (IOError, OSError) as exc:
+        if exc.errno not in _COPY_DATA_ERRNOS:
+            raise
+    for name in ["copy_file_range", "sendfile"]:
+        if _copy_file_data_by_call(name, source_fd, target_fd):
+            return name
+    return None
+
+
+def _copy_file_data_by_call(name, source_fd, target_fd):
+    """Helper for copy_file_data.
+
+    Copy data to the end of the target with the system call "name", via
+    libc. Return True on success, or False if the system call is not
+    available.
+
+    """
+    global _LIBC
+    if _LIBC is None:
+        try:
+            _LIBC = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        except OSError:
+            _LIBC = False
+    func = getattr(_LIBC, name, None)
+    if func is None:
+        return False
+    if name == "copy_file_range":
+        func.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int,
+                         ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint]
+        call = lambda count: func(source_fd, None, target_fd, None, count, 0)
+    else:  # sendfile
+        func.argtypes = [
+            ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t]
+        call = lambda count: func(target_fd, source_fd, None, count)
+    func.restype = ctypes.c_ssize_t
+    n_copied = 0
+    while True:
+        ret = call(_COPY_DATA_CHUNK_SIZE)
+        if ret < 0:
+            err = ctypes.get_errno()
+            if n_copied == 0 and err in _COPY_DATA_ERRNOS:
+                return False
+            raise OSError(err, os.strerror(err))
+        if ret == 0:
+            return True
+        n_copied += ret
@@ -17,12 +17,14 @@
 # You should have received a copy of the GNU General Public License
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
-"""A multiprocessing runner of jobs with dependencies."""
+"""A runner of jobs with dependencies, on a pool of processes or threads."""
 
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+from Queue import Queue
 from rose.reporter import Event
-from rose.resource import ResourceLocator
-from time import sleep
+from time import time
 
 
 class JobEvent(Event):
@@ -36,6 +38,17 @@ class JobEvent(Event):
         return str(self.args[0])
 
 
+class JobTimeEvent(Event):
+    """Event raised to report the timing of a completed job."""
+
+    LEVEL = Event.VV
+
+    def __str__(self):
+        job = self.args[0]
+        return "%s: time: queued=%.3fs, run=%.3fs" % (
+            job.name, job.get_queued_time(), job.get_run_time())
+
+
 class JobManager(object):
     """Manage a set of JobProxy objects and their states."""
 
@@ -142,81 +155,146 @@ class JobProxy(object):
         self.needed_by = {}
         self.state = self.ST_READY
         self.exc = None
+        self.time_submitted = None
+        self.time_started = None
+        self.time_ended = None
 
     def __str__(self):
         return str(self.context)
 
+    def get_queued_time(self):
+        """Return the seconds between job submission and start of run."""
+        if self.time_submitted is None or self.time_started is None:
+            return 0.0
+        return max(0.0, self.time_started - self.time_submitted)
+
+    def get_run_time(self):
+        """Return the seconds taken by the job processor to run the job."""
+        if self.time_started is None or self.time_ended is None:
+            return 0.0
+        return self.time_ended - self.time_started
+
     def update(self, other):
         """Update self.contextwith the values of "other.context"."""
         self.context.update(other.context)
 
 
 class JobRunner(object):
-    """Runs JobProxy objects with pool of workers."""
+    """Runs JobProxy objects with pool of workers.
+
+    The workers are either processes (the default) or threads. Threads are
+    cheaper to start and share the memory of the caller, so they are more
+    suitable for I/O bound jobs, e.g. jobs that spend most of their time
+    waiting for "rsync" or "svn" commands.
+
+    """
 
     NPROC = 6
-    POLL_DELAY = 0.05
+    WORKER_PROCESS = "process"
+    WORKER_THREAD = "thread"
+    WORKER_TYPES = [WORKER_PROCESS, WORKER_THREAD]
 
-    def __init__(self, job_processor, nproc=None):
+    def __init__(self, job_processor, nproc=None, worker_type=None):
         """
         Initialise a job runner.
 
         job_processor: the processor of a job. Must implement a process_job()
         and a post_process_job() methods. See the run() method for detail.
 
-        nproc: maximum number of processes in the pool. If None or not
+        nproc: maximum number of workers in the pool. If None or not
         specified, use self.NPROC.
 
+        worker_type: self.WORKER_PROCESS or self.WORKER_THREAD. If None or
+        not specified, use self.WORKER_PROCESS.
+
         """
         self.job_processor = job_processor
-        conf = ResourceLocator.default().get_conf()
         if nproc is None:
             nproc = self.NPROC
         self.nproc = nproc
+        if worker_type is None:
+            worker_type = self.WORKER_PROCESS
+        if worker_type not in self.WORKER_TYPES:
+            raise ValueError(worker_type)
+        self.worker_type = worker_type
 
     def run(self, job_manager, *args):
         """
         Start the job runner with an instance of JobManager.
 
-        Poll self.job_manager for ready jobs.
-
-        Put ready jobs in a worker pool, which calls
+        Put ready jobs from job_manager in a worker pool, which calls
             self.job_processor.process_job(job_proxy, *args)
 
-        When a job is completed, calls
+        Wait for a job to complete. When a job is completed, calls
             self.job_processor.post_process_job(job_proxy, *args)
+        and put any jobs that are now ready in the worker pool.
 
         """
         nproc = self.nproc
         if nproc > len(job_manager.jobs):
             nproc = len(job_manager.jobs)
-        pool = Pool(processes=nproc)
-
-        results = {}
-        while job_manager.has_jobs():
-            # Process results, if any is ready
-            for name, result in results.items():
-                if result.ready():
-                    results.pop(name)
-                    job_proxy, args_of_events = result.get()
-                    for args_of_event in args_of_events:
-                        self.job_processor.handle_event(*args_of_event)
-                    job = job_manager.put_job(job_proxy)
-                    if job_proxy.exc is None:
-                        self.job_processor.post_process_job(job, *args)
-                        self.job_processor.handle_event(JobEvent(job))
-                    else:
-                        self.job_processor.handle_event(job_proxy.exc)
-            # Add some more jobs into the worker pool, as they are ready
-            while job_manager.has_ready_jobs():
-                job = job_manager.get_job()
-                if job is None:
+        if nproc < 1:
+            nproc = 1
+        if self.worker_type == self.WORKER_THREAD:
+            pool = ThreadPool(processes=nproc)
+            job_run = _job_run_in_thread
+        else:
+            pool = Pool(processes=nproc)
+            job_run = _job_run
+        # Completed jobs are put in this queue by the result handler thread of
+        # the pool, so the loop below wakes up as soon as one is ready. The
+        # pool only calls back on success, so the job run functions never
+        # raise: a failure to run a job is returned as an exception.
+        done_queue = Queue()
+        n_working = 0
+        try:
+            while job_manager.has_jobs():
+                # Add some more jobs into the worker pool, as they are ready
+                while job_manager.has_ready_jobs():
+                    job = job_manager.get_job()
+                    if job is None:
+                        break
+                    job.time_submitted = time()
+                    job_run_args = [
+                        self.job_processor,
+                        JobProxy(job.context, event_level=job.event_level),
+                    ] + list(args)
+                    if job_run is _job_run:
+                        # Pickle here, so any error is raised here, rather
+                        # than in the task handler thread of the pool.
+                        job_run_args = [
+                            dumps(job_run_args, HIGHEST_PROTOCOL)]
+                    pool.apply_async(job_run, job_run_args, {},
+                                     done_queue.put)
+                    n_working += 1
+                if not n_working:
                     break
-                job_run_args = [self.job_processor, job] + list(args)
-                result = pool.apply_async(_job_run, job_run_args)
-                results[job.name] = result
-            if results:
-                sleep(self.POLL_DELAY)
+                # Wait for a job to complete
+                result = done_queue.get()
+                n_working -= 1
+                if job_run is _job_run:
+                    result = loads(result)
+                if isinstance(result, Exception):
+                    raise result
+                job_proxy, args_of_events = result
+                for args_of_event in args_of_events:
+                    self.job_processor.handle_event(*args_of_event)
+                job = job_manager.put_job(job_proxy)
+                job.time_started = job_proxy.time_started
+                job.time_ended = job_proxy.time_ended
+                self.job_processor.handle_event(JobTimeEvent(job))
+                if job_proxy.exc is None:
+                    self.job_processor.post_process_job(job, *args)
+                    self.job_processor.handle_event(JobEvent(job))
+                else:
+                    self.job_processor.handle_event(job_proxy.exc)
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
 
         dead_jobs = job_manager.get_dead_jobs()
         if dead_jobs:
@@ -225,17 +303,55 @@ class JobRunner(object):
     __call__ = run
 
 
-def _job_run(job_processor, job_proxy, *args):
-    """Helper for JobRunner."""
-    event_handler = JobRunnerWorkerEventHandler()
-    job_processor.set_event_handler(event_handler)
+def _job_run(job_run_args_pickle):
+    """Helper for JobRunner, run a job in a worker process.
+
+    Return the pickled (job_proxy, events) of the job, or the pickled error
+    if the job cannot be run or its result cannot be pickled. The arguments
+    and the result are pickled by the job runner and here rather than by
+    the pool, which does not call back if it cannot pickle them.
+
+    """
+    try:
+        job_run_args = loads(job_run_args_pickle)
+        job_processor, job_proxy = job_run_args[:2]
+        args = job_run_args[2:]
+        event_handler = JobRunnerWorkerEventHandler()
+        job_processor.set_event_handler(event_handler)
+        job_proxy.time_started = time()
+        try:
+            job_processor.process_job(job_proxy, *args)
+        except Exception as exc:
+            # The exception is sent back to the main process
+            try:
+                dumps(exc)
+            except Exception:
+                exc = JobRunnerWorkerError(type(exc).__name__, str(exc))
+            job_proxy.exc = exc
+        finally:
+            job_proxy.time_ended = time()
+            job_processor.set_event_handler(None)
+        return dumps((job_proxy, event_handler.events), HIGHEST_PROTOCOL)
+    except Exception as exc:
+        return dumps(JobRunnerWorkerError(type(exc).__name__, str(exc)),
+                     HIGHEST_PROTOCOL)
+
+
+def _job_run_in_thread(job_processor, job_proxy, *args):
+    """Helper for JobRunner, run a job in a worker thread.
+
+    The event handler of the job processor is shared by all threads, so it
+    is left alone. Events are reported as they are raised.
+
+    """
+    job_proxy.time_started = time()
     try:
         job_processor.process_job(job_proxy, *args)
     except Exception as exc:
         job_proxy.exc = exc
     finally:
-        job_processor.set_event_handler(None)
-    return (job_proxy, event_handler.events)
+        job_proxy.time_ended = time()
+    return (job_proxy, [])
 
 
 class JobRunnerWorkerEventHandler(object):
@@ -254,6 +370,12 @@ class JobRunnerWorkerEventHandler(object):
         self.events.append((message, kind, level, prefix, clip))
 
 
+class JobRunnerWorkerError(Exception):
+    """Error raised in a worker process that cannot be sent back as is."""
+    def __str__(self):
+        return "%s: %s" % self.args
+
+
 class JobRunnerNotCompletedError(Exception):
     """Error raised when there are no ready/working jobs but pending ones."""
     def __str__(self):
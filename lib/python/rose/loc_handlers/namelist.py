@@ -20,8 +20,9 @@
 """Process namelist: sections in a rose.config.ConfigNode matching a name."""
 
 
-import os
+import hashlib
 import re
+from rose.checksum import get_checksum_func
 import rose.config
 from rose.config_processor import ConfigProcessError
 from rose.env import env_var_process, UnboundEnvironmentVariableError
@@ -40,6 +41,8 @@ class NamelistLocHandler(object):
     """Handler of namelists."""
 
     SCHEME = "namelist"
+    BUFFER_SIZE = 65536
+    INDEX_ATTR = "namelist_section_index"
 
     def __init__(self, manager):
         self.manager = manager
@@ -53,11 +56,16 @@ class NamelistLocHandler(object):
         loc.loc_type = loc.TYPE_BLOB
         if loc.name.endswith("(:)"):
             name = loc.name[0:-2]
-            sections = [k for k in conf_tree.node.value.keys()
-                        if k.startswith(name)]
+            if name.index("(") == len(name) - 1:
+                sections = list(
+                    self._get_section_index(conf_tree).get(name, []))
+            else:
+                sections = [k for k in conf_tree.node.value.keys()
+                            if k.startswith(name)]
         else:
-            sections = [k for k in conf_tree.node.value.keys()
-                        if k == loc.name]
+            sections = []
+            if loc.name in conf_tree.node.value:
+                sections.append(loc.name)
         for section in list(sections):
             section_value = conf_tree.node.get_value([section])
             if section_value is None:
@@ -67,25 +75,60 @@ class NamelistLocHandler(object):
         return sections
 
     def pull(self, loc, conf_tree):
-        """Write namelist to loc.cache."""
+        """Write namelist to loc.cache.
+
+        Stream the namelist groups to loc.cache. If the checksum algorithm
+        is a hash, work out loc.cache_checksum while writing.
+
+        """
         sections = self.parse(loc, conf_tree)
         if loc.name.endswith("(:)"):
             sections.sort(rose.config.sort_settings)
-        f = open(loc.cache, "wb")
-        for section in sections:
-            section_value = conf_tree.node.get_value([section])
-            group = RE_NAMELIST_GROUP.match(section).group(1)
-            nlg = "&" + group + "\n"
-            for key, node in sorted(section_value.items()):
-                if node.state:
-                    continue
-                try:
-                    value = env_var_process(node.value)
-                except UnboundEnvironmentVariableError as e:
-                    raise ConfigProcessError([section, key], node.value, e)
-                nlg += "%s=%s,\n" % (key, value)
-            nlg += "/" + "\n"
-            f.write(nlg)
-            self.manager.handle_event(NamelistEvent(nlg))
-
-        f.close()
+        hashobj = None
+        algorithm = getattr(get_checksum_func(), "algorithm", None)
+        if algorithm is not None:
+            hashobj = hashlib.new(algorithm)
+        with open(loc.cache, "wb", self.BUFFER_SIZE) as handle:
+            for section in sections:
+                section_value = conf_tree.node.get_value([section])
+                group = RE_NAMELIST_GROUP.match(section).group(1)
+                lines = ["&" + group + "\n"]
+                for key, node in sorted(section_value.items()):
+                    if node.state:
+                        continue
+                    try:
+                        value = env_var_process(node.value)
+                    except UnboundEnvironmentVariableError as e:
+                        raise ConfigProcessError([section, key], node.value, e)
+                    lines.append("%s=%s,\n" % (key, value))
+                lines.append("/" + "\n")
+                nlg = "".join(lines)
+                handle.write(nlg)
+                if hashobj is not None:
+                    hashobj.update(nlg)
+                self.manager.handle_event(NamelistEvent(nlg))
+        if hashobj is not None:
+            loc.cache_checksum = hashobj.hexdigest()
+
+    def _get_section_index(self, conf_tree):
+        """Return the index of indexed namelist sections in conf_tree.
+
+        The index maps each prefix "namelist:NAME(" to the list of sections
+        "namelist:NAME(...)" in conf_tree.node.value, in the order of its
+        keys. The index is built once for the sections of a conf_tree, and
+        is kept with conf_tree, so it is shared by all calls, including
+        calls in worker processes that receive a copy of conf_tree.
+
+        """
+        sections = conf_tree.node.value
+        owner, n_sections, index = getattr(
+            conf_tree, self.INDEX_ATTR, (None, None, None))
+        if owner is sections and n_sections == len(sections):
+            return index
+        index = {}
+        for section in sections.keys():
+            if section.startswith(self.SCHEME + ":") and "(" in section:
+                prefix = section[0:section.index("(") + 1]
+                index.setdefault(prefix, []).append(section)
+        setattr(conf_tree, self.INDEX_ATTR, (sections, len(sections), index))
+        return index
@@ -48,6 +48,7 @@ import os
 import re
 import sys
 import traceback
+import weakref
 
 import rose.config
 import rose.config_tree
@@ -518,6 +519,180 @@ class MacroReport(object):
             self.section, self.option, self.value, self.info, self.is_warning))
 
 
+class MetadataIndex(object):
+
+    """An index of the metadata properties of the settings of a meta config.
+
+    Hold the properties of each metadata section as a dict that is built
+    once, and the metadata of each setting id (including modifier and
+    duplicate index variants such as "namelist:foo{bar}(1)=baz(2)") as
+    returned by "get_metadata_for_config_id".
+
+    The index of a setting id is checked against the metadata sections it
+    was built from on each lookup, so it is rebuilt if any of these
+    sections is added, removed, ignored or enabled, or has a property
+    added, removed, ignored, enabled or changed, e.g. by "rose config-edit".
+
+    Indexes only hold weak references to their meta configs, and are
+    dropped when their meta configs are.
+
+    Arguments:
+        meta_config (rose.config.ConfigNode): The metadata to index.
+
+    Example:
+        >>> meta_config = rose.config.ConfigNode()
+        >>> _ = meta_config.set(['namelist:foo=bar', 'title'], 'Bar')
+        >>> index = MetadataIndex.get_index(meta_config)
+        >>> index.get_metadata('namelist:foo=bar(2)')
+        {'id': 'namelist:foo=bar(2)', 'title': 'Bar (2)'}
+        >>> _ = meta_config.set(['namelist:foo=bar', 'title'], 'Baz')
+        >>> index.get_metadata('namelist:foo=bar(2)')
+        {'id': 'namelist:foo=bar(2)', 'title': 'Baz (2)'}
+
+    """
+
+    INDEXES = weakref.WeakKeyDictionary()  # {meta_config: index, ...}
+    LAST_INDEX = None  # fast path for consecutive lookups in one index
+
+    def __init__(self, meta_config):
+        self.meta_config_ref = weakref.ref(meta_config)
+        self._metadata = {}
+        self._properties = {}
+
+    @property
+    def meta_config(self):
+        """The meta config of this index."""
+        return self.meta_config_ref()
+
+    @classmethod
+    def get_index(cls, meta_config):
+        """Return the (cached) index of "meta_config"."""
+        if cls.LAST_INDEX is not None:
+            index = cls.LAST_INDEX()
+            if index is not None and index.meta_config_ref() is meta_config:
+                return index
+        index = cls.INDEXES.get(meta_config)
+        if index is None:
+            index = cls(meta_config)
+            cls.INDEXES[meta_config] = index
+        cls.LAST_INDEX = weakref.ref(index)
+        return index
+
+    def get_metadata(self, setting_id):
+        """Return a new dict of the metadata properties of "setting_id"."""
+        try:
+            sources, metadata = self._metadata[setting_id]
+        except KeyError:
+            pass
+        else:
+            get_source = self._get_source
+            for source in sources:
+                if get_source(source[0]) != source:
+                    break
+            else:
+                return dict(metadata)
+        sources, metadata = self._get_metadata(setting_id)
+        self._metadata[setting_id] = (sources, metadata)
+        return dict(metadata)
+
+    def _get_metadata(self, setting_id):
+        """Return (sources, metadata) of "setting_id".
+
+        "sources" is a tuple of the sources, see "_get_source", of the
+        metadata sections that "metadata" was built from.
+
+        """
+        metadata = {}
+        sources = []
+        if rose.CONFIG_DELIMITER in setting_id:
+            section, option = setting_id.split(rose.CONFIG_DELIMITER, 1)
+            search_option = REC_ID_STRIP_DUPL.sub("", option)
+        else:
+            section = setting_id
+            option = None
+        search_id = REC_ID_STRIP_DUPL.sub("", setting_id)
+        no_modifier_id = REC_MODIFIER.sub("", search_id)
+        if no_modifier_id != search_id:
+            # There is a modifier e.g. namelist:foo{bar}.
+            properties = self._get_properties(no_modifier_id, sources)
+            # Get metadata for namelist:foo
+            if properties is not None:
+                metadata.update(properties)
+                if option is None and rose.META_PROP_TITLE in metadata:
+                    # Handle section modifier titles
+                    modifier = search_id.replace(no_modifier_id, "")
+                    metadata[rose.META_PROP_TITLE] += " " + modifier
+                if (setting_id != search_id and
+                        rose.META_PROP_DUPLICATE in metadata):
+                    # foo{bar}(1) cannot inherit duplicate from foo.
+                    metadata.pop(rose.META_PROP_DUPLICATE)
+        properties = self._get_properties(search_id, sources)
+        # If modifier, get metadata for namelist:foo{bar}
+        if properties is not None:
+            metadata.update(properties)
+        if rose.META_PROP_TITLE in metadata:
+            # Handle duplicate (indexed) settings sharing a title
+            if option is None:
+                if search_id != setting_id:
+                    # Handle duplicate sections titles
+                    metadata.pop(rose.META_PROP_TITLE)
+            elif search_option != option:
+                # Handle duplicate options titles
+                index = option.replace(search_option, "")
+                metadata[rose.META_PROP_TITLE] += " " + index
+        if (rose.META_PROP_LENGTH in metadata and
+                option is not None and search_option != option and
+                REC_ID_SINGLE_ELEMENT.search(option)):
+            # Option is a single element in an array, not a slice.
+            metadata.pop(rose.META_PROP_LENGTH)
+        metadata.update({'id': setting_id})
+        return tuple(sources), metadata
+
+    def _get_properties(self, key, sources):
+        """Return the properties of the metadata section "key", or None.
+
+        Append the source of the section, see "_get_source", to "sources".
+
+        """
+        source = self._get_source(key)
+        sources.append(source)
+        if source[1] is None:
+            return None
+        try:
+            properties_source, properties = self._properties[key]
+        except KeyError:
+            pass
+        else:
+            if properties_source == source:
+                return properties
+        if self.meta_config.get([key], no_ignore=True) is None:
+            properties = None
+        else:
+            properties = {}
+            for opt, opt_node in self.meta_config.value[key].value.items():
+                if not opt_node.is_ignored():
+                    properties[opt] = opt_node.value
+        self._properties[key] = (source, properties)
+        return properties
+
+    def _get_source(self, key):
+        """Return the source of the metadata section "key".
+
+        Return (key, state, properties) where "state" is the state of the
+        section, or None if there is no such section, and "properties" is a
+        list of the (name, state, value) of its properties.
+
+        """
+        node = self.meta_config.value.get(key)
+        if node is None:
+            return (key, None, [])
+        if not isinstance(node.value, dict):
+            return (key, node.state, node.value)
+        return (key, node.state, [
+            (opt, opt_node.state, opt_node.value)
+            for opt, opt_node in node.value.items()])
+
+
 def add_meta_paths():
     """Call add_site_meta_paths and add_env_meta_paths."""
     add_site_meta_paths()
@@ -1020,54 +1195,7 @@ def get_metadata_for_config_id(setting_id, meta_config):
             test_cleanup(['rose-app.conf', 'meta/rose-meta.conf', 'meta'])
 
     """
-    metadata = {}
-    if rose.CONFIG_DELIMITER in setting_id:
-        section, option = setting_id.split(rose.CONFIG_DELIMITER, 1)
-        search_option = REC_ID_STRIP_DUPL.sub("", option)
-    else:
-        section = setting_id
-        option = None
-    search_id = REC_ID_STRIP_DUPL.sub("", setting_id)
-    no_modifier_id = REC_MODIFIER.sub("", search_id)
-    if no_modifier_id != search_id:
-        # There is a modifier e.g. namelist:foo{bar}.
-        node = meta_config.get([no_modifier_id], no_ignore=True)
-        # Get metadata for namelist:foo
-        if node is not None:
-            for opt, opt_node in node.value.items():
-                if not opt_node.is_ignored():
-                    metadata.update({opt: opt_node.value})
-            if option is None and rose.META_PROP_TITLE in metadata:
-                # Handle section modifier titles
-                modifier = search_id.replace(no_modifier_id, "")
-                metadata[rose.META_PROP_TITLE] += " " + modifier
-            if (setting_id != search_id and
-                    rose.META_PROP_DUPLICATE in metadata):
-                # foo{bar}(1) cannot inherit duplicate from foo.
-                metadata.pop(rose.META_PROP_DUPLICATE)
-    node = meta_config.get([search_id], no_ignore=True)
-    # If modifier, get metadata for namelist:foo{bar}
-    if node is not None:
-        for opt, opt_node in node.value.items():
-            if not opt_node.is_ignored():
-                metadata.update({opt: opt_node.value})
-    if rose.META_PROP_TITLE in metadata:
-        # Handle duplicate (indexed) settings sharing a title
-        if option is None:
-            if search_id != setting_id:
-                # Handle duplicate sections titles
-                metadata.pop(rose.META_PROP_TITLE)
-        elif search_option != option:
-            # Handle duplicate options titles
-            index = option.replace(search_option, "")
-            metadata[rose.META_PROP_TITLE] += " " + index
-    if (rose.META_PROP_LENGTH in metadata and
-            option is not None and search_option != option and
-            REC_ID_SINGLE_ELEMENT.search(option)):
-        # Option is a single element in an array, not a slice.
-        metadata.pop(rose.META_PROP_LENGTH)
-    metadata.update({'id': setting_id})
-    return metadata
+    return MetadataIndex.get_index(meta_config).get_metadata(setting_id)
 
 
 def run_macros(config_map, meta_config, config_name, macro_names,
@@ -18,14 +18,19 @@
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
+import __future__
 import ast
+from itertools import count
 import os
 import re
+from StringIO import StringIO
 import sys
+import tokenize
 
 import jinja2
 import jinja2.exceptions
 
+from rose.lru_cache import LRUCache
 import rose.macro
 import rose.variable
 
@@ -64,6 +69,60 @@ class RuleValueError(Exception):
         return "{0} - could not retrieve value. ".format(arg_string)
 
 
+class CompiledRule(object):
+
+    """A rule of a setting, compiled to evaluate without Jinja2.
+
+    The text of a pre-processed rule depends on the values of settings only
+    through the number of elements of the arrays in any(...), all(...) and
+    len(...). A shape of the rule, a Python expression and the setting ids
+    of its variables, is compiled for each tuple of these numbers.
+
+    A rule that is a Jinja2 template, a shape that uses syntax that Jinja2
+    may treat differently from Python, or a rule whose arrays vary with
+    the numbers of elements of other arrays, is evaluated with Jinja2.
+
+    Attributes:
+        rule: the rule.
+        setting_id: the setting id of "this".
+        array_ids: the setting ids of the arrays, in the order of lookup.
+        ids: the setting ids used by the rule, for all shapes so far.
+        shapes: {numbers_of_elements: (code, value_ids, constants), ...},
+            where code is None if the shape is evaluated with Jinja2.
+        is_template: True if the rule is always evaluated with Jinja2.
+
+    """
+
+    def __init__(self, rule, setting_id):
+        self.rule = rule
+        self.setting_id = setting_id
+        self.array_ids = None
+        self.ids = set()
+        self.shapes = {}
+        self.is_template = rule.startswith("{%") or rule.startswith("{-%")
+
+
+class _RuleValueId(object):
+
+    """A value of a setting id, to look up later, in a compiled rule.
+
+    Never equal to any value, so pre-processing gives it its own variable.
+
+    """
+
+    __slots__ = ["id_", "index"]
+
+    def __init__(self, id_, index):
+        self.id_ = id_
+        self.index = index
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+
 class FailureRuleChecker(rose.macro.MacroBase):
 
     """Check the fail-if and warn-if conditions"""
@@ -188,9 +247,191 @@ class RuleEvaluator(rose.macro.MacroBase):
                              (this\(\d+\))   (?# 'this' element)
                              (?:\W|$)        (?# Break or end)""", re.X)
     REC_VALUE = re.compile(r'("[^"]*")')
+    COMPILED_RULES = LRUCache(10000)
+    EXPR_AST_NODES = {
+        ast.Add, ast.And, ast.BinOp, ast.BoolOp, ast.Compare, ast.Div,
+        ast.Eq, ast.Expression, ast.FloorDiv, ast.Gt, ast.GtE, ast.In,
+        ast.List, ast.Load, ast.Lt, ast.LtE, ast.Mod, ast.Mult, ast.Name,
+        ast.Not, ast.NotEq, ast.NotIn, ast.Num, ast.Or, ast.Pow, ast.Str,
+        ast.Sub, ast.Tuple, ast.UAdd, ast.UnaryOp, ast.USub}
+    EXPR_CONSTANTS = {"True": True, "False": False, "None": None,
+                      "true": True, "false": False, "none": None}
+    EXPR_FLAGS = __future__.division.compiler_flag
+    EXPR_TEMPLATE_HEAD = "{% if "
+    EXPR_TEMPLATE_TAIL = " %}True{% else %}False{% endif %}"
+    REC_EXPR_NOT_PYTHON = re.compile(r"[^ -~]|[#\\`]|<>|{%|%}|{{|}}")
+    REC_EXPR_NUM = re.compile(r"(?:0|[1-9]\d*)(?:\.\d+)?\Z")
 
     def evaluate_rule(self, rule, setting_id, config, meta_config):
-        """Evaluate the logic in the provided rule based on config values."""
+        """Evaluate the logic in the provided rule based on config values.
+
+        Compile the rule once, see "compile_rule", then evaluate it against
+        the config values without Jinja2, where possible.
+
+        """
+        compiled_rule = self.compile_rule(rule, setting_id)
+        if compiled_rule.is_template:
+            return self._evaluate_rule_template(
+                rule, setting_id, config, meta_config)
+        this = self._get_value_from_id(
+            setting_id, config, meta_config, setting_id)
+        shape = None
+        if compiled_rule.array_ids is not None:
+            sizes = []
+            for id_ in compiled_rule.array_ids:
+                setting_value = self._get_value_from_id(
+                    id_, config, meta_config, setting_id)
+                sizes.append(
+                    len(rose.variable.array_split(str(setting_value))))
+            shape = compiled_rule.shapes.get(tuple(sizes))
+        if shape is None:
+            shape = self._compile_rule_shape(
+                compiled_rule, config, meta_config)
+        if shape is None or shape[0] is None:
+            return self._evaluate_rule_template(
+                rule, setting_id, config, meta_config)
+        code, value_ids, constants = shape
+        names = dict(self.EXPR_CONSTANTS)
+        names.update(constants)
+        names["this"] = this
+        for key, id_ in value_ids:
+            names[key] = self._get_value_from_id(
+                id_, config, meta_config, setting_id)
+        return bool(eval(code, names))
+
+    def compile_rule(self, rule, setting_id):
+        """Return the CompiledRule of a rule of setting_id.
+
+        Compiled rules are cached by rule and setting_id in
+        RuleEvaluator.COMPILED_RULES, so each rule is compiled once.
+
+        """
+        key = (rule, setting_id)
+        compiled_rule = self.COMPILED_RULES.get(key)
+        if compiled_rule is None:
+            compiled_rule = CompiledRule(rule, setting_id)
+            self.COMPILED_RULES.put(key, compiled_rule)
+        return compiled_rule
+
+    def _compile_rule_shape(self, compiled_rule, config, meta_config):
+        """Compile the shape of a rule for the sizes of arrays in config.
+
+        Pre-process the rule, looking up only the values of its arrays.
+        Return (code, value_ids, constants), or None if the rule must be
+        evaluated with Jinja2.
+
+        """
+        array_ids = []
+        sizes = []
+        value_ids = []
+        index = count()
+
+        def get_array_value_from_id(id_, config, meta_config, parent_id):
+            """Look up the value of an array, and record its size."""
+            array_ids.append(id_)
+            setting_value = self._get_value_from_id(
+                id_, config, meta_config, parent_id)
+            sizes.append(len(rose.variable.array_split(str(setting_value))))
+            return setting_value
+
+        def get_value_from_id(id_, config, meta_config, parent_id):
+            """Return a value to look up when the shape is evaluated."""
+            return _RuleValueId(id_, next(index))
+
+        rule_template_str, local_map = self._process_rule(
+            compiled_rule.rule, compiled_rule.setting_id, config, meta_config,
+            get_value_from_id=get_value_from_id,
+            get_array_value_from_id=get_array_value_from_id)
+        if compiled_rule.array_ids is None:
+            compiled_rule.array_ids = array_ids
+        elif compiled_rule.array_ids != array_ids:
+            compiled_rule.is_template = True
+            return None
+        constants = []
+        for key, value in local_map.items():
+            if isinstance(value, _RuleValueId):
+                if key != "this":
+                    value_ids.append((value.index, key, value.id_))
+                compiled_rule.ids.add(value.id_)
+            else:
+                constants.append((key, value))
+        compiled_rule.ids.update(array_ids)
+        value_ids = [(key, id_) for _, key, id_ in sorted(value_ids)]
+        code = self._compile_expression(rule_template_str, local_map)
+        shape = (code, value_ids, constants)
+        compiled_rule.shapes[tuple(sizes)] = shape
+        return shape
+
+    def _compile_expression(self, rule_template_str, local_map):
+        """Compile a pre-processed rule into Python code, or return None.
+
+        Return None unless the rule is an "if" expression that Python and
+        Jinja2 evaluate in the same way: only literals, variables of
+        local_map, arithmetic, comparison and logic.
+
+        """
+        if (not rule_template_str.startswith(self.EXPR_TEMPLATE_HEAD) or
+                not rule_template_str.endswith(self.EXPR_TEMPLATE_TAIL)):
+            return None
+        expr = rule_template_str[
+            len(self.EXPR_TEMPLATE_HEAD):-len(self.EXPR_TEMPLATE_TAIL)]
+        if self.REC_EXPR_NOT_PYTHON.search(expr):
+            return None
+        try:
+            tree = compile(expr, "<rule>", "eval",
+                           ast.PyCF_ONLY_AST | self.EXPR_FLAGS, True)
+            tokens = list(tokenize.generate_tokens(StringIO(expr).readline))
+        except (SyntaxError, tokenize.TokenError):
+            return None
+        for token_type, token_string, _, _, _ in tokens:
+            if ((token_type == tokenize.NUMBER and
+                    not self.REC_EXPR_NUM.match(token_string)) or
+                    (token_type == tokenize.STRING and
+                     (token_string[0] not in "'\"" or
+                      token_string[:3] in ["'''", '"""']))):
+                return None
+        if not self._get_is_jinja_expr_node(tree, None, local_map):
+            return None
+        return compile(tree, "<rule>", "eval", self.EXPR_FLAGS, True)
+
+    def _get_is_jinja_expr_node(self, node, parent, local_map):
+        """Return True if Jinja2 evaluates node like Python.
+
+        Jinja2 generates Python code from an expression, but it does not
+        parenthesise comparisons, it groups "**" from the left, it binds
+        unary operators more tightly than "**", and it writes constant
+        floats, including those of constant arithmetic, with str.
+
+        """
+        if type(node) not in self.EXPR_AST_NODES:
+            return False
+        if isinstance(node, ast.Name):
+            return node.id in local_map or node.id in self.EXPR_CONSTANTS
+        if isinstance(node, ast.Num):
+            return (not isinstance(node.n, float) or
+                    float(str(node.n)) == node.n)
+        if isinstance(node, ast.Compare) and (
+                len(node.ops) > 1 or
+                isinstance(parent, (ast.BinOp, ast.Compare)) or
+                isinstance(parent, ast.UnaryOp) and
+                not isinstance(parent.op, ast.Not)):
+            return False
+        if isinstance(node, ast.UnaryOp) and isinstance(
+                node.operand, ast.BinOp) and isinstance(
+                node.operand.op, ast.Pow):
+            return False
+        if isinstance(node, ast.BinOp) and isinstance(
+                node.right, ast.BinOp) and isinstance(node.right.op, ast.Pow):
+            return False
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)) and not any(
+                isinstance(sub_node, ast.Name) and sub_node.id in local_map
+                for sub_node in ast.walk(node)):
+            return False
+        return all(self._get_is_jinja_expr_node(child_node, node, local_map)
+                   for child_node in ast.iter_child_nodes(node))
+
+    def _evaluate_rule_template(self, rule, setting_id, config, meta_config):
+        """Evaluate the logic in the provided rule with Jinja2."""
         rule_template_str, rule_id_values = self._process_rule(
             rule, setting_id, config, meta_config)
         template = jinja2.Template(rule_template_str)
@@ -205,17 +446,27 @@ class RuleEvaluator(rose.macro.MacroBase):
         return log_ids
 
     def _process_rule(self, rule, setting_id, config, meta_config,
-                      log_ids=None):
-        """Pre-process the provided rule into valid jinja2."""
-        if log_ids is None:
+                      log_ids=None, get_value_from_id=None,
+                      get_array_value_from_id=None):
+        """Pre-process the provided rule into valid jinja2.
+
+        get_value_from_id and get_array_value_from_id, if specified, replace
+        _get_value_from_id to look up values of settings, and of the arrays
+        of any(...), all(...) and len(...).
+
+        """
+        if get_value_from_id is None and log_ids is None:
             get_value_from_id = self._get_value_from_id
-        else:
+        elif get_value_from_id is None:
             get_value_from_id = (
                 lambda id_, conf, m_conf, p_id: self._log_id_usage(
                     id_, conf, m_conf, p_id, log_ids)
             )
+        if get_array_value_from_id is None:
+            get_array_value_from_id = get_value_from_id
         if not (rule.startswith('{%') or rule.startswith('{-%')):
-            rule = "{% if " + rule + " %}True{% else %}False{% endif %}"
+            rule = (self.EXPR_TEMPLATE_HEAD + rule +
+                    self.EXPR_TEMPLATE_TAIL)
 
         # Start processing out our additional syntax.
         local_map = {"this": get_value_from_id(
@@ -229,7 +480,7 @@ class RuleEvaluator(rose.macro.MacroBase):
                 start, var_id, operator, value, end = search_result
                 if var_id == "this":
                     var_id = setting_id
-                setting_value = get_value_from_id(
+                setting_value = get_array_value_from_id(
                     var_id, config, meta_config, setting_id)
                 array_value = rose.variable.array_split(str(setting_value))
                 new_string = start + "("
@@ -246,7 +497,7 @@ class RuleEvaluator(rose.macro.MacroBase):
             start, var_id, end = search_result
             if var_id == "this":
                 var_id = setting_id
-            setting_value = get_value_from_id(
+            setting_value = get_array_value_from_id(
                 var_id, config, meta_config, setting_id)
             array_value = rose.variable.array_split(str(setting_value))
             new_string = start + str(len(array_value)) + end
@@ -18,7 +18,6 @@
 # along with Rose. If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
-import copy
 import os
 
 import rose.config
@@ -65,7 +64,11 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                     if values == []:
                         id_value_dict.update({trig_id: [None]})
                 self.trigger_family_lookup.update({setting_id: id_value_dict})
-        self._trigger_involved_ids = self.get_all_ids()
+        self._trigger_involved_ids = set(self.get_all_ids())
+        self._triggered_ids = set()
+        for id_value_dict in self.trigger_family_lookup.values():
+            self._triggered_ids.update(id_value_dict)
+        self._ranked_trigger_ids = None
 
     def transform(self, config, meta_config=None):
         """Apply metadata trigger expressions to variables."""
@@ -81,7 +84,7 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                      trig_ignored: 'trig-ignored',
                      user_ignored: 'user-ignored'}
         id_list = []
-        prev_ignoreds = {trig_ignored: [], user_ignored: []}
+        prev_ignoreds = {trig_ignored: set(), user_ignored: set()}
         for keylist, node in config.walk():
             if len(keylist) == 1:
                 n_id = keylist[0]
@@ -89,11 +92,18 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                 n_id = self._get_id_from_section_option(*keylist)
             id_list.append(n_id)
             if node.state in prev_ignoreds:
-                prev_ignoreds[node.state].append(n_id)
+                prev_ignoreds[node.state].add(n_id)
 
+        config_sections = self._get_config_sections(config)
+        config_sections_duplicate_map = self._get_duplicate_config_sections(
+            config, config_sections=config_sections)
+        config_sections = set(config_sections)
         ranked_ids = self._get_ranked_trigger_ids()
         for rank, var_id in sorted(ranked_ids):
-            self.update(var_id, config, meta_config)
+            self.update(
+                var_id, config, meta_config,
+                config_sections=config_sections,
+                config_sections_duplicate_map=config_sections_duplicate_map)
 
         # Report any discrepancies in ignored status.
         for var_id in id_list:
@@ -102,7 +112,7 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
             old, new = None, None
             if var_id in self.ignored_dict:
                 node.state = trig_ignored
-                if not any([var_id in v for k, v in prev_ignoreds.items()]):
+                if not any(var_id in v for v in prev_ignoreds.values()):
                     old, new = state_map[enabled], state_map[trig_ignored]
             elif var_id in prev_ignoreds[trig_ignored]:
                 node.state = enabled
@@ -120,7 +130,8 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                 self.add_report(section, option, value, info)
         return config, self.reports
 
-    def update(self, var_id, config_data, meta_config):
+    def update(self, var_id, config_data, meta_config,
+               config_sections=None, config_sections_duplicate_map=None):
         """Update enabled and ignored ids starting with var_id.
 
         var_id - a setting id to start the triggering update at.
@@ -138,11 +149,21 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
             }
         }
         meta_config - a rose.config.ConfigNode.
+        config_sections, config_sections_duplicate_map - (optional) the set
+        of sections and the map of duplicate sections of config_data, for
+        many updates of the same config_data.
 
         """
-        config_sections = self._get_config_sections(config_data)
-        config_sections_duplicate_map = self._get_duplicate_config_sections(
-            config_data, config_sections=config_sections)
+        if config_sections is None:
+            config_sections = self._get_config_sections(config_data)
+            if config_sections_duplicate_map is None:
+                config_sections_duplicate_map = (
+                    self._get_duplicate_config_sections(
+                        config_data, config_sections=config_sections))
+            config_sections = set(config_sections)
+        elif config_sections_duplicate_map is None:
+            config_sections_duplicate_map = (
+                self._get_duplicate_config_sections(config_data))
         start_ids = [var_id]
         alt_ids = self._get_id_duplicates(
             var_id, config_data, meta_config,
@@ -159,8 +180,7 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                     start_id not in self.ignored_dict):
                 # Definitely enabled.
                 is_ignored = False
-            if not sum([var_id in v for v in
-                        self.trigger_family_lookup.values()]):
+            if var_id not in self._triggered_ids:
                 # Not triggered by anything, so must be enabled.
                 is_ignored = False
             section, option = self._get_section_option_from_id(start_id)
@@ -171,9 +191,31 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
             # If the id is missing, anything it triggers should be ignored.
             is_ignored = is_ignored or not is_node_present
             id_stack.append((start_id, is_ignored))
+        # Each (id, has_ignored_parent) item sets the state of its children
+        # with respect to the id, then the items of its children, section
+        # options and duplicates follow it, depth first. The same item may
+        # be reached by many paths, so walk the items in reverse order, visit
+        # each item once, and keep the first (i.e. the last applied) state
+        # of each child and parent pair.
+        update_ids = set()
         update_id_list = []
+        child_states = {}  # {(child_id, parent_id): help_text or None}
+        child_state_keys = []
+        done_items = set()
         while id_stack:
-            this_id, has_ignored_parent = id_stack[0]
+            item = id_stack.pop()
+            if isinstance(item, list):
+                # The children states of an item, in reverse order.
+                for key, help_text in item:
+                    if key not in child_states:
+                        child_states[key] = help_text
+                        child_state_keys.append(key)
+                continue
+            if item in done_items:
+                continue
+            done_items.add(item)
+            this_id, has_ignored_parent = item
+            next_items = []
             # For each id, examine its duplicates (if any) and all children.
             alt_ids = self._get_id_duplicates(
                 this_id, config_data, meta_config,
@@ -182,20 +224,20 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
             if alt_ids:
                 this_id = alt_ids.pop(0)
             for alt_id in alt_ids:
-                id_stack.insert(1, (alt_id, has_ignored_parent))
-            is_duplicate = self._check_is_id_dupl(this_id, meta_config)
+                next_items.append((alt_id, has_ignored_parent))
             # Triggered sections need their options to trigger sub children.
             if this_id in config_sections:
-                options = []
                 for option in self._get_config_section_options(config_data,
                                                                this_id):
                     skip_id = self._get_id_from_section_option(
                         this_id, option)
                     if skip_id in self.trigger_family_lookup:
-                        id_stack.insert(1, (skip_id, has_ignored_parent))
-            update_id_list.append(this_id)
+                        next_items.append((skip_id, has_ignored_parent))
+            if this_id not in update_ids:
+                update_ids.add(this_id)
+                update_id_list.append(this_id)
             if not self.check_is_id_trigger(this_id, meta_config):
-                id_stack.pop(0)
+                id_stack.extend(reversed(next_items))
                 continue
             if not has_ignored_parent:
                 section, option = self._get_section_option_from_id(this_id)
@@ -208,61 +250,51 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
             # Check the children of this id
             id_val_map = self._get_family_dict(
                 this_id, config_data, meta_config)
+            states = []
             for child_id, vals in id_val_map.items():
+                help_text = None  # Enabled by this id.
                 if has_ignored_parent or value is None:
                     help_text = self.IGNORED_STATUS_PARENT.format(this_id)
-                    self.ignored_dict.setdefault(child_id, {})
-                    self.ignored_dict[child_id].update({this_id: help_text})
-                    if child_id in self.enabled_dict:
-                        child_list = self.enabled_dict[child_id]
-                        if this_id in child_list:
-                            child_list.remove(this_id)
-                        if not child_list:
-                            self.enabled_dict.pop(child_id)
-                    id_stack.insert(1, (child_id, True))
-                else:  # Enabled parent
-                    if vals == [None]:
-                        # Enabled parent with a value, don't care what it is.
-                        self.enabled_dict.setdefault(child_id, [])
-                        if this_id not in self.enabled_dict[child_id]:
-                            self.enabled_dict[child_id].append(this_id)
-                        if this_id in self.ignored_dict.get(child_id, {}):
-                            self.ignored_dict[child_id].pop(this_id)
-                        if (child_id in self.ignored_dict and
-                                self.ignored_dict[child_id] == {}):
-                            self.ignored_dict.pop(child_id)
-                        id_stack.insert(1, (child_id, False))
-                    elif not self._check_values_ok(value, this_id, vals):
-                        # Enabled parent, with the wrong values.
-                        repr_value = self.PARENT_VALUE.format(value)
-                        if len(vals) == 1:
-                            help_text = self.IGNORED_STATUS_VALUE.format(
-                                this_id, repr_value, repr(vals[0]))
-                        else:
-                            help_text = self.IGNORED_STATUS_VALUES.format(
-                                this_id, repr_value, repr(vals))
-                        self.ignored_dict.setdefault(child_id, {})
-                        self.ignored_dict[child_id].update(
-                            {this_id: help_text})
-                        if child_id in self.enabled_dict:
-                            child_list = self.enabled_dict[child_id]
-                            if this_id in child_list:
-                                child_list.remove(this_id)
-                            if not child_list:
-                                self.enabled_dict.pop(child_id)
-                        id_stack.insert(1, (child_id, True))
+                elif vals == [None]:
+                    # Enabled parent with a value, don't care what it is.
+                    pass
+                elif not self._check_values_ok(value, this_id, vals):
+                    # Enabled parent, with the wrong values.
+                    repr_value = self.PARENT_VALUE.format(value)
+                    if len(vals) == 1:
+                        help_text = self.IGNORED_STATUS_VALUE.format(
+                            this_id, repr_value, repr(vals[0]))
                     else:
-                        # Enabled parent, value is ok.
-                        self.enabled_dict.setdefault(child_id, [])
-                        if this_id not in self.enabled_dict[child_id]:
-                            self.enabled_dict[child_id].append(this_id)
-                        if this_id in self.ignored_dict.get(child_id, {}):
-                            self.ignored_dict[child_id].pop(this_id)
-                        if (child_id in self.ignored_dict and
-                                self.ignored_dict[child_id] == {}):
-                            self.ignored_dict.pop(child_id)
-                        id_stack.insert(1, (child_id, False))
-            id_stack.pop(0)
+                        help_text = self.IGNORED_STATUS_VALUES.format(
+                            this_id, repr_value, repr(vals))
+                states.append(((child_id, this_id), help_text))
+                next_items.append((child_id, help_text is not None))
+            states.reverse()
+            id_stack.append(states)
+            id_stack.extend(reversed(next_items))
+        # Apply the states in the order they were set.
+        child_state_keys.reverse()
+        for key in child_state_keys:
+            child_id, this_id = key
+            help_text = child_states[key]
+            if help_text is not None:
+                self.ignored_dict.setdefault(child_id, {})
+                self.ignored_dict[child_id].update({this_id: help_text})
+                if child_id in self.enabled_dict:
+                    child_list = self.enabled_dict[child_id]
+                    if this_id in child_list:
+                        child_list.remove(this_id)
+                    if not child_list:
+                        self.enabled_dict.pop(child_id)
+            else:
+                self.enabled_dict.setdefault(child_id, [])
+                if this_id not in self.enabled_dict[child_id]:
+                    self.enabled_dict[child_id].append(this_id)
+                if this_id in self.ignored_dict.get(child_id, {}):
+                    self.ignored_dict[child_id].pop(this_id)
+                if (child_id in self.ignored_dict and
+                        self.ignored_dict[child_id] == {}):
+                    self.ignored_dict.pop(child_id)
         return update_id_list
 
     def _get_ranked_trigger_ids(self):
@@ -272,27 +304,31 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
         parent statuses correct and trickled down.
 
         """
-        # Starting stack has each starting point id with a default depth of 0.
-        # The depth will be overwritten with whatever is the maximum depth
-        # eventually found for that id.
-        stack = [(id_, 0) for id_ in self.trigger_family_lookup]
-
-        # Create a dictionary to store the maximum depth (rank) for each id.
-        id_ranks = dict(stack)
-
-        # Loop over the stack, going down all possible trigger chains.
+        if self._ranked_trigger_ids is not None:
+            return self._ranked_trigger_ids
+        # Find the longest chain to each id in topological order, visiting
+        # each trigger once, starting with the ids not triggered by others.
+        n_parents = {}
+        for id_ in self.trigger_family_lookup:
+            n_parents.setdefault(id_, 0)
+            for child_id in self.trigger_family_lookup[id_]:
+                n_parents[child_id] = n_parents.get(child_id, 0) + 1
+        id_ranks = dict((id_, 0) for id_ in n_parents)
+        stack = [id_ for id_, n in n_parents.items() if n == 0]
         while stack:
-            parent_id, depth = stack.pop(0)
-            child_ids = self.trigger_family_lookup.get(parent_id, [])
-            for child_id in child_ids:
-                id_ranks.setdefault(child_id, depth + 1)
-                if depth + 1 > id_ranks[child_id]:
-                    id_ranks[child_id] = depth + 1
-                stack.append((child_id, depth + 1))
+            parent_id = stack.pop()
+            depth = id_ranks[parent_id] + 1
+            for child_id in self.trigger_family_lookup.get(parent_id, []):
+                if depth > id_ranks[child_id]:
+                    id_ranks[child_id] = depth
+                n_parents[child_id] -= 1
+                if n_parents[child_id] == 0:
+                    stack.append(child_id)
         ranked_ids = []
         for id_, rank in id_ranks.items():
             ranked_ids.append((rank, id_))
         ranked_ids.sort()
+        self._ranked_trigger_ids = ranked_ids
         return ranked_ids
 
     def validate(self, config, meta_config=None):
@@ -312,21 +348,27 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
                                                              meta_config)
         if invalid_trigger_reports:
             return invalid_trigger_reports
-        macro_config = copy.deepcopy(config)
-        trig_config, reports = self.transform(macro_config, meta_config)
-        transform_reports = copy.deepcopy(reports)
-        del self.reports[:]
-        for report in transform_reports:
-            config_node = config.get([report.section, report.option])
-            trig_config_node = trig_config.get([report.section, report.option])
-            if report.option is None:
-                value = None
-            else:
-                value = trig_config_node.value
-            after_state_string = state_map[trig_config_node.state].strip()
-            info = self.ERROR_BAD_STATE.format(after_state_string)
-            self.add_report(report.section, report.option,
-                            value, info)
+        # Transform the config in place, and restore its states after, as
+        # the transform only changes the states of its nodes.
+        node_states = [(node, node.state) for _, node in config.walk()]
+        try:
+            trig_config, reports = self.transform(config, meta_config)
+            transform_reports = list(reports)
+            del self.reports[:]
+            for report in transform_reports:
+                trig_config_node = trig_config.get(
+                    [report.section, report.option])
+                if report.option is None:
+                    value = None
+                else:
+                    value = trig_config_node.value
+                after_state_string = state_map[trig_config_node.state].strip()
+                info = self.ERROR_BAD_STATE.format(after_state_string)
+                self.add_report(report.section, report.option,
+                                value, info)
+        finally:
+            for node, state in node_states:
+                node.state = state
         return self.reports
 
     def validate_dependencies(self, config, meta_config):
@@ -337,8 +379,8 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
         if not hasattr(self, 'trigger_family_lookup'):
             self._setup_triggers(meta_config)
         config_sections = config.value.keys()
-        meta_settings = [k for k in meta_config.value.keys()
-                         if not meta_config.value[k].is_ignored()]
+        meta_settings = set(k for k in meta_config.value.keys()
+                            if not meta_config.value[k].is_ignored())
         allowed_repetitions = {}
         trigger_ids = self.trigger_family_lookup.keys()
         trigger_ids.sort()
@@ -526,11 +568,11 @@ class TriggerMacro(rose.macro.MacroBaseRoseEdit):
 
     def get_all_ids(self):
         """Return all setting ids involved in the triggers."""
-        ids = []
-        for trigger_id in self.trigger_family_lookup.keys():
-            ids.append(trigger_id)
+        ids = self.trigger_family_lookup.keys()
+        id_set = set(ids)
         for id_value_dict in self.trigger_family_lookup.values():
             for triggered_id in id_value_dict:
-                if triggered_id not in ids:
+                if triggered_id not in id_set:
+                    id_set.add(triggered_id)
                     ids.append(triggered_id)
         return ids
@@ -144,7 +144,7 @@ class ResourceLocator(object):
             if util is None:
                 util = os.getenv("ROSE_UTIL")
             return namespace + separator + util
-        except KeyError:
+        except (KeyError, TypeError):
             return os.path.basename(sys.argv[0])
 
     def get_version(self):
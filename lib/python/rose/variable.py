@@ -42,6 +42,9 @@ REC_RANGE_RANGE = re.compile(
     "(" + RE_REAL + "?)" +
     "(?<!^:)$")  # Expression can't just be a colon.
 REC_FULL_URL = re.compile("^(\w+://|www\.)")
+REC_SCAN_ESC_OR_QUOTE = re.compile(r"""[\\'"]""")
+REC_SCAN_QUOTE_PAIR_END = re.compile(r"""(''|"")$""")
+_SCAN_SPECIAL_RECS = {}  # {delim: regular expression of special characters}
 
 # Ignored types used in rose.variable.ignored_reason,
 # used by macros and user switches.
@@ -166,41 +169,86 @@ def array_join(array):
 
 
 def _scan_string(value, delim=',', remove_esc_char=False):
-    """Split "value" by "delim", handling quotes."""
-    item = ''
-    skip_inds = []
-    for quote_pair_match in re.finditer(r"""(''|"")$""", value):
-        skip_inds.extend([quote_pair_match.start(0), quote_pair_match.end(0)])
-    is_in_quotes = {'"': False, "'": False}
-    other_quote = {'"': "'", "'": '"'}
+    """Split "value" by "delim", handling quotes.
+
+    Return a list of the (unstripped) items. Look only at the quote, escape
+    and delimiter characters, so the time taken is linear in the length of
+    "value".
+
+    """
+    if len(delim) == 1 and not REC_SCAN_ESC_OR_QUOTE.search(value):
+        if not value:
+            return []
+        return value.split(delim)
+    if delim not in _SCAN_SPECIAL_RECS:
+        _SCAN_SPECIAL_RECS[delim] = re.compile(
+            "[" + re.escape("\\'\"" + delim) + "]")
+    # A quote pair at the end of value, e.g. '' or "", does not open quotes.
+    skip_index = None
+    match = REC_SCAN_QUOTE_PAIR_END.search(value)
+    if match:
+        skip_index = match.start()
     esc_char = "\\"
+    esc_or_delim_chars = delim + esc_char
+    items = []
+    item = []  # pieces of the current item
+    quote = None  # the quote character of the open quotes, if any
     was_escaped = False
     is_escaped = False
     letter = None
-    for i, letter in enumerate(value):
-        if (letter in is_in_quotes and
-                i not in skip_inds and
-                not is_in_quotes[other_quote[letter]] and
+    rec_special = _SCAN_SPECIAL_RECS[delim]
+    start = 0
+    while True:
+        match = rec_special.search(value, start)
+        if match is None:
+            break
+        i = match.start()
+        if i > start:
+            # Other characters just end any escape.
+            item.append(value[start:i])
+            is_escaped = False
+            was_escaped = False
+        start = i + 1
+        letter = value[i]
+        if (letter in "'\"" and
+                i != skip_index and
+                quote in (None, letter) and
                 not is_escaped):
-            is_in_quotes[letter] = not is_in_quotes[letter]
+            if quote is None:
+                quote = letter
+                # Take quoted text without escapes as is, up to and
+                # including its closing quote.
+                end = value.find(letter, start)
+                if (end not in (-1, skip_index) and
+                        letter not in delim and
+                        value.find(esc_char, start, end) == -1):
+                    item.append(value[i:end + 1])
+                    quote = None
+                    start = end + 1
+                    continue
+            else:
+                quote = None
         was_escaped = is_escaped
         is_escaped = (letter == esc_char and not is_escaped)
-        if remove_esc_char and was_escaped and letter in (delim + esc_char):
-            item = item[:-1] + letter
-        elif (letter == delim and
-                not any(is_in_quotes.values()) and
-                not was_escaped):
-            yield item
-            item = ''
-        elif item + letter == value:
-            item += letter
-            yield item
-            item = ''
+        if (remove_esc_char and was_escaped and
+                letter in esc_or_delim_chars):
+            # Replace the escape character.
+            if item:
+                piece = item.pop()[:-1]
+                if piece:
+                    item.append(piece)
+            item.append(letter)
+        elif letter == delim and quote is None and not was_escaped:
+            items.append("".join(item))
+            item = []
         else:
-            item += letter
-    if (item or (letter == delim and
-                 not any(is_in_quotes.values()) and not was_escaped)):
-        yield item
+            item.append(letter)
+    if start < len(value):
+        item.append(value[start:])
+        letter = value[-1]
+    if (item or (letter == delim and quote is None and not was_escaped)):
+        items.append("".join(item))
+    return items
 
 
 def expand_format_string(format_string, variable):
@@ -733,6 +733,7 @@ class MainWindow(gtk.Window):
         """Handles the destruction of the window."""
         self.local_updater.stop()
         self.hist.store_history()
+        self.ws_client.close()
         gtk.main_quit()
 
     def handle_edit(self, *args):
@@ -24,6 +24,7 @@ Classes:
 
 """
 
+import os
 import sqlalchemy as al
 
 
@@ -31,6 +32,8 @@ LATEST_TABLE_NAME = "latest"
 MAIN_TABLE_NAME = "main"
 META_TABLE_NAME = "meta"
 OPTIONAL_TABLE_NAME = "optional"
+SEARCH_TABLE_NAME = "search"
+SEARCH_WORD_LEN_MIN = 3  # Shortest word the trigram index can match
 
 
 def _col_by_key(table, key):
@@ -45,6 +48,23 @@ def _col_keys(table):
     return [c.key for c in table.c]
 
 
+def get_search_words(values):
+    """Return the text to store in the search index for a suite revision.
+
+    "values" should contain the values of all main table columns of the
+    suite revision, followed by the names and values of its optional fields.
+
+    """
+    words = []
+    for value in values:
+        if value is None:
+            continue
+        if not isinstance(value, unicode):
+            value = str(value).decode("utf-8")
+        words.append(value)
+    return u"\n".join(words)
+
+
 class DAO(object):
 
     """Retrieves data from the suite database.
@@ -62,30 +82,150 @@ class DAO(object):
                        "match", "startswith"]
     TEXT_ST_DELETED = "D "
 
-    def __init__(self, db_url):
+    POOL_SIZE = 5
+    SQLITE_PREFIX = "sqlite:///"
+
+    def __init__(self, db_url, pool_size=None):
         self.db_url = db_url
+        if pool_size is None:
+            pool_size = self.POOL_SIZE
+        self.pool_size = pool_size
         self.db_engine = None
-        self.db_connection = None
         self.db_metadata = None
+        self.db_file_stamp = None
+        self.db_schema_version = None
         self.results = None
         self.tables = {}
 
     def _connect(self):
-        """Connect to the database file."""
-        self.db_engine = al.create_engine(self.db_url)
-        self.db_connection = self.db_engine.connect()
-        self.db_metadata = al.MetaData(self.db_engine)
+        """Connect to the database file.
+
+        The engine and its connection pool are kept for the life of this
+        object. Table metadata is reflected on first use, and again only if
+        the database file is replaced or its schema changes.
+
+        """
         self.results = None
+        file_stamp = self._get_db_file_stamp()
+        if self.db_engine is None or file_stamp != self.db_file_stamp:
+            self._dispose()
+            kwargs = {"pool_size": self.pool_size, "max_overflow": 0}
+            if self.db_url.startswith(self.SQLITE_PREFIX):
+                # Pooled connections are handed between server threads.
+                kwargs["poolclass"] = al.pool.QueuePool
+                kwargs["connect_args"] = {"check_same_thread": False}
+            self.db_engine = al.create_engine(self.db_url, **kwargs)
+            self.db_file_stamp = file_stamp
+        schema_version = self._get_db_schema_version()
+        if not self.tables or schema_version != self.db_schema_version:
+            self.db_metadata = al.MetaData(self.db_engine)
+            tables = {}
+            for name in [LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME,
+                         OPTIONAL_TABLE_NAME]:
+                tables[name] = al.Table(name, self.db_metadata, autoload=True)
+            if self.db_engine.has_table(SEARCH_TABLE_NAME):
+                tables[SEARCH_TABLE_NAME] = al.Table(
+                    SEARCH_TABLE_NAME, self.db_metadata, autoload=True)
+            self.tables = tables
+            self.db_schema_version = schema_version
+
+    def _dispose(self):
+        """Close all pooled connections and forget cached table metadata."""
+        if self.db_engine is not None:
+            self.db_engine.dispose()
+        self.db_engine = None
+        self.db_metadata = None
+        self.db_file_stamp = None
+        self.db_schema_version = None
         self.tables = {}
-        for name in [LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME,
-                     OPTIONAL_TABLE_NAME]:
-            self.tables[name] = al.Table(name, self.db_metadata, autoload=True)
+
+    def _get_db_file_stamp(self):
+        """Return (device, inode) of an SQLite database file, or None."""
+        if not self.db_url.startswith(self.SQLITE_PREFIX):
+            return None
+        try:
+            stat = os.stat(self.db_url[len(self.SQLITE_PREFIX):])
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _get_db_schema_version(self):
+        """Return the SQLite schema version number, or None.
+
+        SQLite increments this number whenever the schema changes, so it is
+        a cheap way to tell whether the reflected tables are still valid.
+
+        """
+        if not self.db_url.startswith(self.SQLITE_PREFIX):
+            return None
+        return self.db_engine.execute("PRAGMA schema_version").scalar()
 
     def _execute(self, query):
         """Execute the query and store the database results."""
-        rows = self.db_connection.execute(query)
-        self.results = [list(row) for row in rows]
-        return self.results
+        db_connection = self.db_engine.connect()
+        try:
+            rows = db_connection.execute(query)
+            results = [list(row) for row in rows]
+        finally:
+            db_connection.close()
+        self.results = results
+        return results
+
+    def _execute_to_maps(self, query, cols):
+        """Execute the query and store the results as maps.
+
+        Translate the result rows as they are fetched, without keeping
+        a copy of all the rows.
+
+        """
+        results = list(self._iter_maps(query, cols))
+        self.results = results
+        return results
+
+    def _iter_maps(self, query, cols):
+        """Return a generator of the results of the query as maps.
+
+        The query is executed when the generator is first used. Rows are
+        fetched and translated as the generator is consumed.
+
+        """
+        db_connection = self.db_engine.connect()
+        try:
+            for result in self._rows_to_maps(
+                    db_connection.execute(query), cols):
+                yield result
+        finally:
+            db_connection.close()
+
+    def _get_page_where(self, where, from_obj, limit=None, offset=0,
+                        after=None):
+        """Restrict a where clause to a page of suites.
+
+        Return (where, order_by). The page contains at most "limit" suites,
+        ordered by (idx, branch, revision). Skip the first "offset" suites,
+        and any suites at or before the (idx, branch, revision) in "after".
+
+        """
+        main_table = self.tables[MAIN_TABLE_NAME]
+        id_cols = [main_table.c.idx, main_table.c.branch,
+                   main_table.c.revision]
+        if after:
+            after_where = al.tuple_(*id_cols) > al.tuple_(*after)
+            if where is None:
+                where = after_where
+            else:
+                where = al.and_(where, after_where)
+        if limit is None and not offset:
+            return where, id_cols
+        ids_select = al.sql.select(
+            id_cols, whereclause=where, from_obj=from_obj).distinct()
+        ids_select = ids_select.order_by(*id_cols).offset(offset)
+        if limit is not None:
+            ids_select = ids_select.limit(limit)
+        page_where = al.tuple_(*id_cols).in_(ids_select)
+        if where is None:
+            return page_where, id_cols
+        return al.and_(where, page_where), id_cols
 
     def _get_join_and_columns(self):
         """Create a join of the latest information.
@@ -123,8 +263,8 @@ class DAO(object):
         Return the joined tables object and columns.
 
         """
-        main_table = self.tables["main"]
-        optional_table = self.tables["optional"]
+        main_table = self.tables[MAIN_TABLE_NAME]
+        optional_table = self.tables[OPTIONAL_TABLE_NAME]
         joined_column_keys = [c.key for c in main_table.c]
         joined_column_keys += ["name", "value"]
         join_optional_clause = main_table.c.idx == optional_table.c.idx
@@ -144,38 +284,60 @@ class DAO(object):
     def get_common_keys(self, *_):
         """Return the names of the main and changeset table fields."""
         self._connect()
-        self.results = _col_keys(self.tables["main"])
+        self.results = _col_keys(self.tables[MAIN_TABLE_NAME])
         return self.results
 
     def get_known_keys(self):
         """Return all known field names."""
         common_keys = self.get_common_keys()
         meta_table = self.tables[META_TABLE_NAME]
-        self._connect()
         where = (meta_table.c.name == "known_keys")
         select = al.sql.select([meta_table.c.value],
                                whereclause=where)
-        self.results = [r[0] for r in self._execute(select)]  # De-proxy.
-        if any(self.results):
-            self.results = self.results[0].split()  # shlex.split garbles it.
-        self.results = common_keys + self.results
-        self.results.sort()
-        return self.results
+        results = [r[0] for r in self._execute(select)]  # De-proxy.
+        if any(results):
+            results = results[0].split()  # shlex.split garbles it.
+        results = common_keys + results
+        results.sort()
+        self.results = results
+        return results
 
     def get_optional_keys(self, *_):
         """Return the names of the optional fields."""
         self._connect()
-        select = al.sql.select([self.tables["optional"].c.name])
-        self._execute(select.distinct())
-        self.results = [r.pop() for r in self.results]
-        self.results.sort()
+        select = al.sql.select([self.tables[OPTIONAL_TABLE_NAME].c.name])
+        results = [r.pop() for r in self._execute(select.distinct())]
+        results.sort()
+        self.results = results
+        return results
+
+    def get_revision(self, *_):
+        """Return the latest repository revision loaded in the database.
+
+        The post-commit hook records it in the meta table, so this is a
+        single key lookup. A database without the entry (i.e. not updated
+        since the hook started recording it) falls back to the main table.
+
+        """
+        self._connect()
+        meta_table = self.tables[META_TABLE_NAME]
+        where = (meta_table.c.name == "revision")
+        select = al.sql.select([meta_table.c.value], whereclause=where)
+        results = self._execute(select)
+        if results:
+            self.results = int(results[0][0])
+        else:
+            main_table = self.tables[MAIN_TABLE_NAME]
+            select = al.sql.select([al.func.max(main_table.c.revision)])
+            self.results = self._execute(select)[0][0]
         return self.results
 
     def get_query_operators(self, *_):
         """Return the query operators."""
         return self.QUERY_OPERATORS
 
-    def query(self, filters, all_revs=0):
+    def query(self, filters, all_revs=0, limit=None, offset=0, after=None,
+              stream=False):
         """Return the results of a series of filters on both tables.
 
         filters is a list of tuples, each tuple containing:
@@ -208,6 +370,15 @@ class DAO(object):
         of suites will be returned.
         If all_revs == 0, they won't be.
 
+        If any of "limit", "offset" or "after" is specified, return a page
+        of matching suites ordered by (idx, branch, revision). "limit" is
+        the maximum number of suites to return. "offset" is the number of
+        suites to skip. "after" is the (idx, branch, revision) of the last
+        suite of the previous page.
+
+        If "stream" is True, return a generator of the results, which are
+        fetched from the database as it is consumed, instead of a list.
+
         """
         self._connect()
         if all_revs:
@@ -215,11 +386,17 @@ class DAO(object):
         else:
             from_obj, cols = self._get_join_and_columns()
         where = self.parse_filters_to_expr(filters, from_obj)
+        order_by = None
+        if limit is not None or offset or after:
+            where, order_by = self._get_page_where(
+                where, from_obj, limit, offset, after)
         statement = al.sql.select(cols, whereclause=where, from_obj=from_obj)
         statement = statement.distinct()
-        values_list = self._execute(statement)
-        return_maps = self._rows_to_maps(values_list, cols)
-        return return_maps
+        if order_by is not None:
+            statement = statement.order_by(*order_by)
+        if stream:
+            return self._iter_maps(statement, cols)
+        return self._execute_to_maps(statement, cols)
 
     def parse_filters_to_expr(self, filters, from_obj=None):
         """Construct an SQL expression from a list of string-tuples."""
@@ -329,13 +506,21 @@ class DAO(object):
             items.insert(i - 1, expr)
         return items.pop()
 
-    def search(self, s, all_revs=0):
+    def search(self, s, all_revs=0, limit=None, offset=0, after=None,
+               stream=False):
         """Search database for rows with values matching the words in "s".
 
         If all_revs == 1, matching deleted suites and old revisions
         of suites will be returned.
         If all_revs == 0, they won't be.
 
+        If the database has a full text search index, use it to narrow
+        down the suites to search. The same matching is applied to the
+        remaining rows as without the index, so the results are the same.
+
+        "limit", "offset", "after" and "stream" are as for the "query"
+        method.
+
         """
         self._connect()
         if all_revs:
@@ -359,32 +544,82 @@ class DAO(object):
                 where &= expr
         if where is None:
             where = False
+        else:
+            index_expr = self._get_search_index_expr(s)
+            if index_expr is not None:
+                where = al.and_(index_expr, where)
+        order_by = None
+        if limit is not None or offset or after:
+            where, order_by = self._get_page_where(
+                where, from_obj, limit, offset, after)
         statement = al.sql.select(cols, whereclause=where, from_obj=from_obj)
-        values_list = self._execute(statement)
-        return_maps = self._rows_to_maps(values_list, cols)
-        return return_maps
+        if order_by is not None:
+            statement = statement.order_by(*order_by)
+        if stream:
+            return self._iter_maps(statement, cols)
+        return self._execute_to_maps(statement, cols)
+
+    def _get_search_index_expr(self, words):
+        """Return an expression to select suites in the search index.
+
+        Return None if there is no search index or if none of the words can
+        be looked up in it.
+
+        """
+        if SEARCH_TABLE_NAME not in self.tables:
+            return None
+        phrases = []
+        for word in words:
+            if not isinstance(word, unicode):
+                word = str(word).decode("utf-8")
+            # Words with LIKE wildcards may match text not in the index.
+            if len(word) < SEARCH_WORD_LEN_MIN or "%" in word or "_" in word:
+                continue
+            phrases.append(u'"%s"' % word.replace(u'"', u'""'))
+        if not phrases:
+            return None
+        search_table = self.tables[SEARCH_TABLE_NAME]
+        main_table = self.tables[MAIN_TABLE_NAME]
+        select = al.sql.select(
+            [search_table.c.idx, search_table.c.branch,
+             search_table.c.revision],
+            whereclause=search_table.c.words.match(u" AND ".join(phrases)))
+        return al.tuple_(
+            main_table.c.idx, main_table.c.branch,
+            main_table.c.revision).in_(select)
 
     @staticmethod
     def _rows_to_maps(rows, cols):
-        """Translate each result row into a map with optional values."""
-        results = []
+        """Translate each result row into a map with optional values.
+
+        Return a generator. Consecutive rows of the same suite are merged
+        into a single map.
+
+        """
         col_keys = [c.key for c in cols]
-        id_keys = ["idx", "branch", "revision"]
+        id_indexes = [col_keys.index(key) for key in ["idx", "branch",
+                                                      "revision"]]
+        name_index = col_keys.index("name")
+        value_index = col_keys.index("value")
+        result = None
         prev_id = None
         for row in rows:
-            row = [r for r in row]
-            id_ = [row[col_keys.index(key)] for key in id_keys]
+            row = list(row)
+            id_ = [row[i] for i in id_indexes]
             if id_ != prev_id:
+                if result is not None:
+                    yield result
                 prev_id = id_
-                results.append({})
+                result = {}
                 for column, value in zip(cols, row):
                     if column.key not in ["name", "value"]:
-                        results[-1].update({column.key: value})
-            name = row[col_keys.index("name")]
+                        result[column.key] = value
+            name = row[name_index]
             if name is None:
                 continue
-            value = row[col_keys.index("value")]
+            value = row[value_index]
             if name.endswith("-list") and value is not None:
                 value = value.split()
-            results[-1].update({name: value})
-        return results
+            result[name] = value
+        if result is not None:
+            yield result
@@ -29,7 +29,8 @@ from rose.popen import RosePopener
 from rose.reporter import Reporter, Event
 from rose.resource import ResourceLocator
 from rosie.db import (
-    LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME, OPTIONAL_TABLE_NAME)
+    LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME, OPTIONAL_TABLE_NAME,
+    SEARCH_TABLE_NAME, get_search_words)
 from rosie.svn_post_commit import RosieSvnPostCommitHook
 
 
@@ -51,6 +52,27 @@ class RosieDatabaseCreateSkipEvent(Event):
         return "%s: DB already exists, skip." % (self.args[0])
 
 
+class RosieDatabaseSearchIndexCreateEvent(Event):
+
+    """Event raised when a Rosie database search index is created."""
+
+    LEVEL = Event.V
+
+    def __str__(self):
+        return "%s: search index created, %d entries." % self.args
+
+
+class RosieDatabaseSearchIndexSkipEvent(Event):
+
+    """Event raised when a Rosie database search index is not supported."""
+
+    KIND = Event.KIND_ERR
+    LEVEL = Event.V
+
+    def __str__(self):
+        return "%s: search index not supported, skip." % (self.args[0])
+
+
 class RosieDatabaseLoadEvent(Event):
 
     """Event raised when a Rosie database has loaded with I of N revisions."""
@@ -78,6 +100,10 @@ class RosieDatabaseInitiator(object):
     LEN_DB_STRING = 1024
     LEN_STATUS = 2
     SQLITE_PREFIX = "sqlite:///"
+    SEARCH_TABLE_DDL = (
+        "CREATE VIRTUAL TABLE %s USING fts5(" +
+        "idx UNINDEXED, branch UNINDEXED, revision UNINDEXED, words, " +
+        "tokenize='trigram')") % SEARCH_TABLE_NAME
 
     def __init__(self, event_handler=None, popen=None, fs_util=None):
         if event_handler is None:
@@ -102,7 +128,8 @@ class RosieDatabaseInitiator(object):
         try:
             self.create(db_url)
         except al.exc.OperationalError:
-            pass
+            # Database already exists, but it may predate the search index.
+            self.create_search_index(db_url)
         else:
             self.load(repos_path)
 
@@ -170,6 +197,47 @@ class RosieDatabaseInitiator(object):
         except al.exc.OperationalError as exc:
             self.handle_event(RosieDatabaseCreateSkipEvent(db_url))
             raise exc
+        self.create_search_index(db_url)
+
+    def create_search_index(self, db_url):
+        """Create the full text search index table, if possible.
+
+        Populate it from any existing content in the database. Do nothing if
+        the table already exists. Skip if the database is not SQLite or does
+        not support FTS5 with the trigram tokenizer.
+
+        """
+        if not db_url.startswith(self.SQLITE_PREFIX):
+            self.handle_event(RosieDatabaseSearchIndexSkipEvent(db_url))
+            return
+        engine = al.create_engine(db_url)
+        if engine.has_table(SEARCH_TABLE_NAME):
+            return
+        try:
+            engine.execute(self.SEARCH_TABLE_DDL)
+        except al.exc.OperationalError:
+            self.handle_event(RosieDatabaseSearchIndexSkipEvent(db_url))
+            return
+        metadata = al.MetaData(engine)
+        main_table = al.Table(MAIN_TABLE_NAME, metadata, autoload=True)
+        optional_table = al.Table(OPTIONAL_TABLE_NAME, metadata, autoload=True)
+        search_table = al.Table(SEARCH_TABLE_NAME, metadata, autoload=True)
+        values_map = {}
+        for row in engine.execute(main_table.select()):
+            values_map[(row.idx, row.branch, row.revision)] = list(row)
+        for row in engine.execute(optional_table.select()):
+            key = (row.idx, row.branch, row.revision)
+            if key in values_map:
+                values_map[key] += [row.name, row.value]
+        entries = []
+        for (idx, branch, revision), values in sorted(values_map.items()):
+            entries.append({
+                "idx": idx, "branch": branch, "revision": revision,
+                "words": get_search_words(values)})
+        if entries:
+            engine.execute(search_table.insert(), entries)
+        self.handle_event(
+            RosieDatabaseSearchIndexCreateEvent(db_url, len(entries)))
 
     def load(self, repos_path):
         """Load database contents from a repository."""
@@ -77,7 +77,10 @@ def get_suite_data(prefix, properties=None):
         prefixes=[prefix],
         event_handler=rose.reporter.Reporter()
     )
-    suite_data = ws_client.search(prefix, all_revs=1)[0][0]
+    try:
+        suite_data = ws_client.search(prefix, all_revs=1)[0][0]
+    finally:
+        ws_client.close()
     for dict_row in sorted(suite_data, key=lambda _: _["revision"]):
         suite_id = rosie.suite_id.SuiteId.from_idx_branch_revision(
             dict_row["idx"],
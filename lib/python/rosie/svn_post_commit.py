@@ -36,7 +36,8 @@ from rose.reporter import Reporter
 from rose.resource import ResourceLocator
 from rose.scheme_handler import SchemeHandlersManager
 from rosie.db import (
-    LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME, OPTIONAL_TABLE_NAME)
+    LATEST_TABLE_NAME, MAIN_TABLE_NAME, META_TABLE_NAME, OPTIONAL_TABLE_NAME,
+    SEARCH_TABLE_NAME, get_search_words)
 import shlex
 from smtplib import SMTP
 import socket
@@ -53,9 +54,9 @@ class RosieWriteDAO(object):
     """Data Access Object for writing to the Rosie web service database."""
 
     def __init__(self, db_url):
-        engine = al.create_engine(db_url)
-        self.connection = engine.connect()
-        self.metadata = al.MetaData(engine)
+        self.engine = al.create_engine(db_url)
+        self.connection = self.engine.connect()
+        self.metadata = al.MetaData(self.engine)
         self.tables = {}
 
     def _get_table(self, key):
@@ -76,6 +77,10 @@ class RosieWriteDAO(object):
         statement = table.delete(whereclause=where)
         self.connection.execute(statement)
 
+    def has_table(self, key):
+        """Return True if table key exists in the database."""
+        return key in self.tables or self.engine.has_table(key)
+
     def insert(self, key, **kwargs):
         """Insert values kwargs into table key."""
         statement = self._get_table(key).insert().values(**kwargs)
@@ -169,6 +174,9 @@ class RosieSvnPostCommitHook(object):
             if not no_notification and branch_attribs["branch"] == "trunk":
                 self._notify_trunk_changes(
                     changeset_attribs, branch_attribs)
+        # Record the latest loaded revision in the meta table
+        if branch_attribs_dict:
+            self._update_meta(dao, u"revision", unicode(revision))
 
     def _get_suite_branch_changes(self, repos, revision):
         """Retrieve changed statuses."""
@@ -418,6 +426,9 @@ class RosieSvnPostCommitHook(object):
             except AttributeError:
                 pass
         dao.insert(MAIN_TABLE_NAME, **cols)
+        search_values = [cols.get(key) for key in [
+            "idx", "branch", "revision", "owner", "project", "title",
+            "author", "date", "status", "from_idx"]]
         # Optional table
         for name in branch_attribs[info_key].value:
             if name in ["owner", "project", "title"]:
@@ -429,6 +440,12 @@ class RosieSvnPostCommitHook(object):
             cols.update({
                 "name": name.decode("utf-8"), "value": value.decode("utf-8")})
             dao.insert(OPTIONAL_TABLE_NAME, **cols)
+            search_values += [cols["name"], cols["value"]]
+        # Search index table, if the database has one
+        if dao.has_table(SEARCH_TABLE_NAME):
+            dao.insert(
+                SEARCH_TABLE_NAME, words=get_search_words(search_values),
+                **vc_attrs)
 
     def _update_known_keys(self, dao, changeset_attribs):
         """Update the known_keys in the meta table."""
@@ -438,12 +455,15 @@ class RosieSvnPostCommitHook(object):
             "cat", "-r", revision, repos, self.KNOWN_KEYS_FILE_PATH)
         keys_str = " ".join(shlex.split(keys_str)).decode("utf-8")
         if keys_str:
-            try:
-                dao.insert(META_TABLE_NAME, name=u"known_keys", value=keys_str)
-            except al.exc.IntegrityError:
-                dao.update(
-                    META_TABLE_NAME, (u"name",),
-                    name=u"known_keys", value=keys_str)
+            self._update_meta(dao, u"known_keys", keys_str)
+
+    @staticmethod
+    def _update_meta(dao, name, value):
+        """Insert or update a name=value entry in the meta table."""
+        try:
+            dao.insert(META_TABLE_NAME, name=name, value=value)
+        except al.exc.IntegrityError:
+            dao.update(META_TABLE_NAME, (u"name",), name=name, value=value)
 
 
 def main():
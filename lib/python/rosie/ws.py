@@ -30,15 +30,21 @@ from isodatetime.data import get_timepoint_from_seconds_since_unix_epoch
 import jinja2
 import simplejson
 from rose.host_select import HostSelector
+from rose.lru_cache import LRUCache
 from rose.resource import ResourceLocator
 import rosie.db
 from rosie.suite_id import SuiteId
+from threading import Lock
+
+
+JSON_CHUNK_SIZE = 65536
 
 
 class RosieDiscoServiceRoot(object):
 
     """Serves the Rosie discovery service index page."""
 
+    CACHE_SIZE = 64
     NS = "rosie"
     UTIL = "disco"
     TITLE = "Rosie Suites Discovery"
@@ -56,6 +62,12 @@ class RosieDiscoServiceRoot(object):
                 self.props["host_name"] = (
                     self.props["host_name"].split(".", 1)[0])
         self.props["rose_version"] = ResourceLocator.default().get_version()
+        self.props["db_pool_size"] = rose_conf.get_value(
+            ["rosie-disco", "db-pool-size"])
+        if self.props["db_pool_size"] is not None:
+            self.props["db_pool_size"] = int(self.props["db_pool_size"])
+        self.props["cache_size"] = int(rose_conf.get_value(
+            ["rosie-disco", "cache-size"], self.CACHE_SIZE))
         self.props["template_env"] = jinja2.Environment(
             loader=jinja2.FileSystemLoader(
                 ResourceLocator.default().get_util_home(
@@ -84,7 +96,15 @@ class RosieDiscoServiceRoot(object):
 
 class RosieDiscoService(object):
 
-    """Serves the index page of the database of a given prefix."""
+    """Serves the index page of the database of a given prefix.
+
+    Cache the results of queries and searches until the database is loaded
+    with a new revision of the repository. Tag the responses with the
+    revision, so clients can send conditional requests. JSON results that
+    are not in the cache are streamed as they are fetched from the database,
+    and are cached once all of them have been sent.
+
+    """
 
     HELLO = "Hello %s\n"
 
@@ -98,7 +118,11 @@ class RosieDiscoService(object):
         self.source_url = ""
         if source_url_node is not None:
             self.source_url = source_url_node.value
-        self.dao = rosie.db.DAO(db_url)
+        self.dao = rosie.db.DAO(db_url, self.props.get("db_pool_size"))
+        self.cache = LRUCache(self.props.get(
+            "cache_size", RosieDiscoServiceRoot.CACHE_SIZE))
+        self.cache_revision = None
+        self.cache_lock = Lock()
 
     def __call__(self):
         """Dummy."""
@@ -125,27 +149,52 @@ class RosieDiscoService(object):
         return data
 
     @cherrypy.expose
-    def query(self, q, all_revs=0, format=None):
-        """Search database for rows with data matching the query string."""
+    def query(self, q, all_revs=0, format=None, limit=None, offset=0,
+              cursor=None):
+        """Search database for rows with data matching the query string.
+
+        "limit", "offset" and "cursor" select a page of the results, ordered
+        by suite. "limit" is the maximum number of suites to return. "offset"
+        is the number of suites to skip. "cursor" is "IDX/BRANCH@REVISION" of
+        the last suite of the previous page.
+
+        """
         all_revs = int(all_revs)
         filters = []
         if not isinstance(q, list):
             q = [q]
         filters = [_query_parse_string(q_str) for q_str in q]
-        data = self.dao.query(filters, all_revs)
+        data = self._get_data(
+            self.dao.query, _query_normalise_filters(filters), all_revs,
+            limit, offset, cursor, stream=(format == "json"))
         if format == "json":
-            return simplejson.dumps(data)
+            return _dump_json(data)
         return self._render(all_revs, data, filters=filters)
 
+    query._cp_config = {"response.stream": True}
+
     @cherrypy.expose
-    def search(self, s, all_revs=0, format=None):
-        """Search database for rows with data matching the query string."""
+    def search(self, s, all_revs=0, format=None, limit=None, offset=0,
+               cursor=None):
+        """Search database for rows with data matching the query string.
+
+        "limit", "offset" and "cursor" select a page of the results, as for
+        the "query" method.
+
+        """
         all_revs = int(all_revs)
-        data = self.dao.search(s, all_revs)
+        words = s
+        if not isinstance(words, list):
+            words = [words]
+        data = self._get_data(
+            self.dao.search, tuple(words), all_revs, limit, offset, cursor,
+            stream=(format == "json"))
         if format == "json":
-            return simplejson.dumps(data)
+            return _dump_json(data)
         return self._render(all_revs, data, s=s)
 
+    search._cp_config = {"response.stream": True}
+
     @cherrypy.expose
     def get_known_keys(self, format=None):
         """Return the names of the common fields."""
@@ -164,9 +213,54 @@ class RosieDiscoService(object):
         if format == "json":
             return simplejson.dumps(self.dao.get_optional_keys())
 
+    def _get_data(self, dao_method, args, all_revs, limit, offset, cursor,
+                  stream=False):
+        """Return the (cached) results of a DAO query or search method.
+
+        If "stream" is True and the results are not in the cache, return a
+        generator of the results as they are fetched from the database.
+
+        """
+        try:
+            if limit is not None:
+                limit = int(limit)
+            offset = int(offset)
+            after = None
+            if cursor:
+                after = _cursor_parse_string(cursor)
+        except ValueError:
+            raise cherrypy.HTTPError(400)
+        revision = self.dao.get_revision()
+        cherrypy.response.headers["ETag"] = '"%s"' % revision
+        cherrypy.lib.cptools.validate_etags()
+        with self.cache_lock:
+            if revision != self.cache_revision:
+                self.cache.clear()
+                self.cache_revision = revision
+        key = (revision, dao_method.__name__, args, all_revs, limit, offset,
+               after)
+        data = self.cache.get(key)
+        if data is None and stream:
+            return self._iter_and_cache(key, dao_method(
+                list(args), all_revs, limit, offset, after, stream=True))
+        if data is None:
+            data = dao_method(list(args), all_revs, limit, offset, after)
+            self.cache.put(key, data)
+        return data
+
+    def _iter_and_cache(self, key, results):
+        """Yield each item of results, then cache all of them under key."""
+        data = []
+        for item in results:
+            data.append(item)
+            yield item
+        self.cache.put(key, data)
+
     def _render(self, all_revs=0, data=None, filters=None, s=None):
         """Render return data with a template."""
         if data:
+            # Don't modify the items in the cache
+            data = [dict(item) for item in data]
             for item in data:
                 suite_id = SuiteId.from_idx_branch_revision(
                     item["idx"], item["branch"], item["revision"])
@@ -189,6 +283,53 @@ class RosieDiscoService(object):
             data=data)
 
 
+def _cursor_parse_string(cursor):
+    """Split a paging cursor "IDX/BRANCH@REVISION" into component parts.
+
+    Raise ValueError if "cursor" is not in this form.
+
+    """
+    head, revision = cursor.rsplit("@", 1)
+    idx, branch = head.split("/", 1)
+    return (idx, branch, int(revision))
+
+
+def _dump_json(items):
+    """Return a generator of chunks of a JSON list of "items".
+
+    "items" can be a generator, which is only consumed as the chunks are.
+
+    """
+    encoder = simplejson.JSONEncoder()
+    chunks = ["["]
+    size = 1
+    separator = ""
+    for item in items:
+        chunk = separator + encoder.encode(item)
+        separator = ", "
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= JSON_CHUNK_SIZE:
+            yield "".join(chunks)
+            chunks = []
+            size = 0
+    chunks.append("]")
+    yield "".join(chunks)
+
+
+def _query_normalise_filters(filters):
+    """Return a hashable normalised form of a list of query filters.
+
+    The conjunction of the first filter is superfluous, so it is always set
+    to "and".
+
+    """
+    filters = [tuple(filt) for filt in filters]
+    if filters:
+        filters[0] = ("and",) + filters[0][1:]
+    return tuple(filters)
+
+
 def _query_parse_string(q_str):
     """Split a query filter string into component parts."""
     conjunction, tail = q_str.split(" ", 1)
@@ -25,7 +25,10 @@ Classes:
 """
 
 
-from multiprocessing import Pool
+from hashlib import sha1
+from multiprocessing.pool import ThreadPool
+import os
+from Queue import Queue
 import requests
 from rosie.suite_id import SuiteId
 from rosie.ws_client_auth import RosieWSClientAuthManager
@@ -34,7 +37,8 @@ from rose.reporter import Reporter
 from rose.resource import ResourceLocator
 import shlex
 import simplejson
-from time import sleep
+from tempfile import NamedTemporaryFile
+from threading import current_thread, Lock
 
 
 class RosieWSClientConfError(Exception):
@@ -63,10 +67,22 @@ class RosieWSClientQuerySplitError(RosieWSClientError):
 
 class RosieWSClient(object):
 
-    """A client for the Rosie web service."""
+    """A client for the Rosie web service.
+
+    Requests to the web services of different prefixes are sent in parallel
+    by a pool of threads. Each thread has its own HTTP session for each
+    prefix, so that its connection can be kept alive between requests
+    without sharing a session between threads. Call the "close" method to
+    shut these down.
+
+    If "[rosie-id]ws-cache-dir" is set in the site/user configuration,
+    responses are cached in that directory. A cached response is used if
+    the server reports that it is not modified, i.e. the repository has no
+    new revisions.
+
+    """
 
     MAX_LOCAL_QUERIES = 64
-    POLL_DELAY = 0.1
     REMOVABLE_PARAMS = ["all_revs=0", "format=json"]
 
     def __init__(self, prefixes=None, prompt_func=None, popen=None,
@@ -81,10 +97,17 @@ class RosieWSClient(object):
         self.prefixes = []
         self.unreachable_prefixes = []
         self.auth_managers = {}
+        self.sessions = {}  # {(thread_ident, prefix): session, ...}
+        self.sessions_lock = Lock()
+        self.pool = None
         conf = ResourceLocator.default().get_conf()
         conf_rosie_id = conf.get(["rosie-id"], no_ignore=True)
         if conf_rosie_id is None:
             raise RosieWSClientConfError()
+        self.cache_dir = conf_rosie_id.get_value(["ws-cache-dir"])
+        if self.cache_dir:
+            self.cache_dir = os.path.expanduser(
+                os.path.expandvars(self.cache_dir))
         for key, node in conf_rosie_id.value.items():
             if node.is_ignored() or not key.startswith("prefix-ws."):
                 continue
@@ -155,48 +178,42 @@ class RosieWSClient(object):
             raise RosieWSClientError(method, kwargs)
 
         # Process the requests in parallel
-        pool = Pool(len(request_details))
-        results = {}
-        for url, request_detail in request_details.items():
-            results[url] = pool.apply_async(
-                requests.get, [url], request_detail["requests_kwargs"])
-        while results:
-            for url, result in results.items():
-                if not result.ready():
-                    continue
-                results.pop(url)
+        results = Queue()
+        n_pending = 0
+        for request_detail in request_details.values():
+            self._cache_load(request_detail)
+            self._send(request_detail, results, len(request_details) > 1)
+            n_pending += 1
+        while n_pending:
+            url, response, exc = results.get()
+            n_pending -= 1
+            if exc is not None:
+                if not isinstance(exc, (requests.exceptions.ConnectionError,
+                                        requests.exceptions.MissingSchema)):
+                    raise exc
+                self.event_handler(RosieWSClientError(url, exc), level=1)
+                continue
+            request_detail = request_details[url]
+            # Retry request once, if it fails with a 401
+            if (response.status_code == requests.codes["unauthorized"] and
+                    request_detail["can_retry"]):
+                requests_kwargs = request_detail["requests_kwargs"]
+                auth_manager = request_detail["auth_manager"]
+                prev_auth = requests_kwargs["auth"]
                 try:
-                    response = result.get()
-                except (requests.exceptions.ConnectionError,
-                        requests.exceptions.MissingSchema) as exc:
-                    self.event_handler(
-                        RosieWSClientError(url, exc), level=1)
-                    continue
-                request_detail = request_details[url]
-                # Retry request once, if it fails with a 401
-                if (response.status_code == requests.codes["unauthorized"] and
-                        request_detail["can_retry"]):
-                    requests_kwargs = request_detail["requests_kwargs"]
-                    auth_manager = request_detail["auth_manager"]
-                    prev_auth = requests_kwargs["auth"]
-                    try:
-                        requests_kwargs["auth"] = auth_manager.get_auth(
-                            is_retry=True)
-                    except KeyboardInterrupt as exc:
-                        error = RosieWSClientError(url, kwargs, exc)
-                        self.event_handler(error, level=1)
-                        request_detail["can_retry"] = False
-                    else:
-                        results[url] = pool.apply_async(
-                            requests.get, [url], requests_kwargs)
-                        request_detail["can_retry"] = (
-                            prev_auth != requests_kwargs["auth"])
-                    continue
-                request_detail["response"] = response
-            if results:
-                sleep(self.POLL_DELAY)
-        pool.close()
-        pool.join()
+                    requests_kwargs["auth"] = auth_manager.get_auth(
+                        is_retry=True)
+                except KeyboardInterrupt as exc:
+                    error = RosieWSClientError(url, kwargs, exc)
+                    self.event_handler(error, level=1)
+                    request_detail["can_retry"] = False
+                else:
+                    self._send(request_detail, results, n_pending > 0)
+                    n_pending += 1
+                    request_detail["can_retry"] = (
+                        prev_auth != requests_kwargs["auth"])
+                continue
+            request_detail["response"] = response
 
         # Process and return the results
         ret = []
@@ -215,9 +232,16 @@ class RosieWSClient(object):
                 continue
             if request_detail["auth_manager"] is not None:
                 request_detail["auth_manager"].store_password()
-            response_url = self._remove_params(response.url)
+            if (response.status_code == requests.codes["not_modified"] and
+                    request_detail["cache"] is not None):
+                response_url = request_detail["cache"]["url"]
+                response_text = request_detail["cache"]["text"]
+            else:
+                response_url = self._remove_params(response.url)
+                response_text = response.text
+                self._cache_dump(request_detail, response, response_url)
             try:
-                response_data = simplejson.loads(response.text)
+                response_data = simplejson.loads(response_text)
                 if return_ok_prefixes:
                     ret.append(request_detail["prefix"])
                 else:
@@ -230,6 +254,106 @@ class RosieWSClient(object):
             raise RosieWSClientError(method, kwargs)
         return ret
 
+    def _send(self, request_detail, results, is_async):
+        """Helper for "_get". Send a request.
+
+        Put (url, response, exception) in the "results" queue on completion.
+        If "is_async", send the request in the thread pool.
+
+        """
+        args = [
+            request_detail["prefix"], request_detail["url"],
+            request_detail["requests_kwargs"]]
+        if is_async:
+            if self.pool is None:
+                self.pool = ThreadPool(max(1, len(self.auth_managers)))
+            self.pool.apply_async(
+                self._send_request, args, callback=results.put)
+        else:
+            results.put(self._send_request(*args))
+
+    def _send_request(self, prefix, url, requests_kwargs):
+        """Helper for "_send". Return (url, response, exception).
+
+        Any exception is returned rather than raised, so that the callback of
+        the thread pool, which puts the result in the queue, is always called.
+
+        """
+        try:
+            return (url, self._get_session(prefix).get(url, **requests_kwargs),
+                    None)
+        except Exception as exc:
+            return (url, None, exc)
+
+    def _get_session(self, prefix):
+        """Helper for "_send_request". Return the HTTP session of a prefix.
+
+        A session is not thread safe, so each thread has its own.
+
+        """
+        key = (current_thread().ident, prefix)
+        with self.sessions_lock:
+            if key not in self.sessions:
+                self.sessions[key] = requests.Session()
+            return self.sessions[key]
+
+    def _get_cache_path(self, request_detail):
+        """Helper for "_cache_*". Return path to cache file of a request."""
+        params = sorted(request_detail["requests_kwargs"]["params"].items())
+        key = sha1(simplejson.dumps([request_detail["url"], params]))
+        return os.path.join(
+            self.cache_dir, request_detail["prefix"], key.hexdigest())
+
+    def _cache_load(self, request_detail):
+        """Helper for "_get". Load the cached response of a request.
+
+        If there is one, set the "If-None-Match" header of the request to its
+        entity tag, so the server only responds with the full content if it
+        has changed.
+
+        """
+        if not self.cache_dir:
+            return
+        try:
+            with open(self._get_cache_path(request_detail)) as handle:
+                request_detail["cache"] = simplejson.load(handle)
+        except (IOError, ValueError):
+            return
+        requests_kwargs = request_detail["requests_kwargs"]
+        requests_kwargs["headers"] = dict(requests_kwargs.get("headers", {}))
+        requests_kwargs["headers"]["If-None-Match"] = (
+            request_detail["cache"]["etag"])
+
+    def _cache_dump(self, request_detail, response, response_url):
+        """Helper for "_get". Cache a response with an entity tag."""
+        etag = response.headers.get("ETag")
+        if not self.cache_dir or not etag:
+            return
+        path = self._get_cache_path(request_detail)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            handle = NamedTemporaryFile(
+                dir=os.path.dirname(path), delete=False)
+            simplejson.dump(
+                {"etag": etag, "url": response_url, "text": response.text},
+                handle)
+            handle.close()
+            os.rename(handle.name, path)
+        except (IOError, OSError):
+            pass
+
+    def close(self):
+        """Shut down the thread pool and close HTTP sessions."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        with self.sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
     @classmethod
     def _remove_params(cls, url):
         """Remove removable parameters from url."""
@@ -247,6 +371,7 @@ class RosieWSClient(object):
             "url": url,
             "prefix": prefix,
             "auth_manager": auth_manager,
+            "cache": None,
             "can_retry": False,
             "requests_kwargs": requests_kwargs,
             "response": None,
@@ -265,6 +390,7 @@ class RosieWSClient(object):
                 requests_kwargs.pop("auth")
         return {
             "auth_manager": auth_manager,
+            "cache": None,
             "can_retry": can_retry,
             "requests_kwargs": requests_kwargs,
             "response": None,
@@ -100,8 +100,11 @@ def hello(argv):
     opts = opt_parser.parse_args(argv)[0]
     report = Reporter(opts.verbosity - opts.quietness)
     ws_client = RosieWSClient(prefixes=opts.prefixes, event_handler=report)
-    for response_data, response_url in ws_client.hello():
-        report("%s: %s" % (response_url, response_data), level=0)
+    try:
+        for response_data, response_url in ws_client.hello():
+            report("%s: %s" % (response_url, response_data), level=0)
+    finally:
+        ws_client.close()
 
 
 def list_local_suites(argv):
@@ -116,12 +119,16 @@ def list_local_suites(argv):
         report(UserSpecificRoses(alternative_roses_dir), prefix=None)
 
     ws_client = RosieWSClient(prefixes=opts.prefixes, event_handler=report)
-    if ws_client.unreachable_prefixes:
-        bad_prefix_string = " ".join(ws_client.unreachable_prefixes)
-        report(
-            RosieWSClientError(
-                ERR_PREFIX_UNREACHABLE.format(bad_prefix_string)))
-    _display_maps(opts, ws_client, ws_client.query_local_copies(opts.user))
+    try:
+        if ws_client.unreachable_prefixes:
+            bad_prefix_string = " ".join(ws_client.unreachable_prefixes)
+            report(
+                RosieWSClientError(
+                    ERR_PREFIX_UNREACHABLE.format(bad_prefix_string)))
+        _display_maps(
+            opts, ws_client, ws_client.query_local_copies(opts.user))
+    finally:
+        ws_client.close()
 
 
 def lookup(argv):
@@ -156,8 +163,11 @@ def lookup(argv):
         if opts.debug_mode:
             traceback.print_exc(exc)
         sys.exit(str(exc))
-    for data, url in data_and_url_list:
-        _display_maps(opts, ws_client, data, url)
+    else:
+        for data, url in data_and_url_list:
+            _display_maps(opts, ws_client, data, url)
+    finally:
+        ws_client.close()
 
 
 def _align(rows, keys):
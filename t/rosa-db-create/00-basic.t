@@ -52,6 +52,17 @@ echo \$? >$PWD/rosa-svn-post-commit.rc
 __POST_COMMIT__
 chmod +x repos/foo/hooks/post-commit
 export LANG=C
+
+db_dump() {
+    # Dump the database, except the search index, if any, whose content
+    # depends on the SQLite version.
+    sqlite3 "$1" '.dump' | sed \
+        -e '/^\/\* WARNING:/d' \
+        -e '/^PRAGMA writable_schema=/d' \
+        -e "/^INSERT INTO \"\?sqlite_\(master\|schema\)\"\?(.*'search'/d" \
+        -e "/^CREATE TABLE IF NOT EXISTS 'search_/d" \
+        -e '/^INSERT INTO "\?search_[a-z]*"\? VALUES/d'
+}
 #-------------------------------------------------------------------------------
 TEST_KEY="$TEST_KEY_BASE-0"
 run_pass "$TEST_KEY" $ROSE_HOME/sbin/rosa db-create
@@ -59,7 +70,7 @@ file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<__OUT__
 [INFO] sqlite:///$PWD/repos/foo.db: DB created.
 __OUT__
 file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
-sqlite3 $PWD/repos/foo.db '.dump' >"$TEST_KEY.dump"
+db_dump $PWD/repos/foo.db >"$TEST_KEY.dump"
 file_cmp "$TEST_KEY.dump" "$TEST_KEY.dump" "$TEST_SOURCE_DIR/$TEST_KEY.dump"
 #-------------------------------------------------------------------------------
 TEST_KEY="$TEST_KEY_BASE-1"
@@ -79,7 +90,7 @@ file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<__OUT__
 [INFO] $PWD/repos/foo: DB loaded, r1 of 1.
 __OUT__
 file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
-sqlite3 $PWD/repos/foo.db '.dump' >"$TEST_KEY.dump"
+db_dump $PWD/repos/foo.db >"$TEST_KEY.dump"
 sed "s/\\\$USER/$USER/" "$TEST_SOURCE_DIR/$TEST_KEY.dump" >"$TEST_KEY.dump.expected"
 file_cmp "$TEST_KEY.dump" "$TEST_KEY.dump" "$TEST_KEY.dump.expected"
 #-------------------------------------------------------------------------------
@@ -111,7 +122,7 @@ file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<__OUT__
 [INFO] $PWD/repos/foo: DB loaded, r3 of 3.
 __OUT__
 file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
-sqlite3 $PWD/repos/foo.db '.dump' >"$TEST_KEY.dump"
+db_dump $PWD/repos/foo.db >"$TEST_KEY.dump"
 sed "s/\\\$USER/$USER/" "$TEST_SOURCE_DIR/$TEST_KEY.dump" >"$TEST_KEY.dump.expected"
 file_cmp "$TEST_KEY.dump" "$TEST_KEY.dump" "$TEST_KEY.dump.expected"
 #-------------------------------------------------------------------------------
@@ -126,7 +137,7 @@ file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<__OUT__
 [INFO] $PWD/repos/foo: DB loaded, r4 of 4.
 __OUT__
 file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
-sqlite3 $PWD/repos/foo.db '.dump' >"$TEST_KEY.dump"
+db_dump $PWD/repos/foo.db >"$TEST_KEY.dump"
 sed "s/\\\$USER/$USER/" "$TEST_SOURCE_DIR/$TEST_KEY.dump" >"$TEST_KEY.dump.expected"
 file_cmp "$TEST_KEY.dump" "$TEST_KEY.dump" "$TEST_KEY.dump.expected"
 #-------------------------------------------------------------------------------
@@ -53,7 +53,7 @@ export LANG=C
 $ROSE_HOME/sbin/rosa db-create -q || exit 1
 Q_LATEST='SELECT * FROM latest'
 Q_MAIN='SELECT idx,branch,revision,owner,project,title,author,status,from_idx FROM main'
-Q_META='SELECT * FROM meta'
+Q_META='SELECT * FROM meta ORDER BY name'
 Q_OPTIONAL='SELECT * FROM optional'
 #-------------------------------------------------------------------------------
 TEST_KEY="$TEST_KEY_BASE-create"
@@ -235,7 +235,9 @@ file_cmp "$TEST_KEY-main.out" "$TEST_KEY-main.out" <<__OUT__
 foo-ROSIE|trunk|6|rosie|meta|configuration metadata for discovery information|$LOGNAME|A |
 __OUT__
 sqlite3 $PWD/repos/foo.db "$Q_META" >"$TEST_KEY-meta.out" || exit 1
-file_cmp "$TEST_KEY-meta.out" "$TEST_KEY-meta.out" </dev/null
+file_cmp "$TEST_KEY-meta.out" "$TEST_KEY-meta.out" <<'__OUT__'
+revision|6
+__OUT__
 sqlite3 $PWD/repos/foo.db "$Q_LATEST WHERE idx=='foo-ROSIE'" \
     >"$TEST_KEY-latest.out"
 file_cmp "$TEST_KEY-latest.out" "$TEST_KEY-latest.out" <<'__OUT__'
@@ -265,6 +267,7 @@ __OUT__
 sqlite3 $PWD/repos/foo.db "$Q_META" >"$TEST_KEY-meta.out"
 file_cmp "$TEST_KEY-meta.out" "$TEST_KEY-meta.out" <<'__OUT__'
 known_keys|world galaxy universe
+revision|7
 __OUT__
 sqlite3 $PWD/repos/foo.db "$Q_LATEST WHERE idx=='foo-ROSIE'" \
     >"$TEST_KEY-latest.out"
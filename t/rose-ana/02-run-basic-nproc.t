@@ -0,0 +1,82 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test rose_ana built-in application, tasks run by a pool of processes
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+#-------------------------------------------------------------------------------
+N_TESTS=6
+tests $N_TESTS
+#-------------------------------------------------------------------------------
+# Run the tasks of the basic usage suite in 4 processes
+mkdir -p conf
+cat >conf/rose.conf <<'__CONF__'
+[rose-ana]
+kgo-database=.true.
+nproc=4
+__CONF__
+
+# Run the suite.
+export ROSE_CONF_PATH=$PWD/conf
+TEST_KEY=$TEST_KEY_BASE
+mkdir -p $HOME/cylc-run
+SUITE_RUN_DIR=$(mktemp -d --tmpdir=$HOME/cylc-run 'rose-test-battery.XXXXXX')
+NAME=$(basename $SUITE_RUN_DIR)
+run_fail "$TEST_KEY" \
+    rose suite-run -C $TEST_SOURCE_DIR/00-run-basic --name=$NAME \
+    --no-gcontrol --host=localhost -- --debug
+#-------------------------------------------------------------------------------
+# Test that the output of each task is reported in task order
+OUTPUT=$HOME/cylc-run/$NAME/log/job/1/rose_ana_t1/01/job.out
+TEST_KEY=$TEST_KEY_BASE-order
+for I in $(seq 1 27); do
+    echo "Running task #$I"
+    echo "Task #$I"
+done >"$TEST_KEY.expected"
+sed -n '/\* Summary \*/q;
+    s/^.*\(Running task #[0-9]*\).*$/\1/p;
+    s/^.*\(Task #[0-9]*\) \(passed\|did not pass\).*$/\1/p' \
+    $OUTPUT >"$TEST_KEY.out"
+file_cmp "$TEST_KEY" "$TEST_KEY.out" "$TEST_KEY.expected"
+TEST_KEY=$TEST_KEY_BASE-summary
+file_grep $TEST_KEY "13/27 Tasks did not pass" $OUTPUT
+#-------------------------------------------------------------------------------
+# Test that the comparisons of the tasks are in the comparison database
+OUTPUT=$HOME/cylc-run/$NAME/log/job/1/db_check/01/job.out
+COMP_NUMBER="[0-9][0-9]*"
+COMP_FILES=".*\(\w*\)/kgo.txt | .*\1/results.txt"
+TEST_KEY=$TEST_KEY_BASE-db_check_rose_ana_t1_success
+file_grep $TEST_KEY "$COMP_NUMBER | rose_ana_t1 | 0" $OUTPUT
+
+TASK_NAME="rose_ana_t1 - grepper.FilePattern(Test of Exact Numeric Match Success)"
+TASK_STATUS=" OK "
+TEST_KEY=$TEST_KEY_BASE-db_check_t1_exact_numeric_success
+REGEXP="$COMP_NUMBER | $TASK_NAME | $COMP_FILES | $TASK_STATUS"
+file_grep $TEST_KEY "$REGEXP" $OUTPUT
+
+TASK_NAME="rose_ana_t1 - grepper.FilePattern(Test of Exact Numeric Match Fail)"
+TASK_STATUS="FAIL"
+TEST_KEY=$TEST_KEY_BASE-db_check_t1_exact_numeric_fail
+REGEXP="$COMP_NUMBER | $TASK_NAME | $COMP_FILES | $TASK_STATUS"
+file_grep $TEST_KEY "$REGEXP" $OUTPUT
+#-------------------------------------------------------------------------------
+#Clean suite
+rose suite-clean -q -y $NAME
+#-------------------------------------------------------------------------------
+exit 0
@@ -0,0 +1,95 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test rose_ana tasks run by a pool of processes, with commands and a worker
+# process that dies.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+#-------------------------------------------------------------------------------
+tests 3
+#-------------------------------------------------------------------------------
+TEST_KEY=$TEST_KEY_BASE
+run_pass "$TEST_KEY" timeout 60 python - <<'__PYTHON__'
+import os
+import signal
+from rose.apps.rose_ana import AnalysisTask, RoseAnaApp
+from rose.config import ConfigNode
+from rose.popen import RosePopener
+from rose.reporter import Reporter
+
+
+class Task(AnalysisTask):
+    def run_analysis(self):
+        name = self.options["full_task_name"]
+        self.parent.reporter("Run " + name)
+        if name == "die":
+            os.kill(os.getpid(), signal.SIGKILL)
+        elif name == "command":
+            self.parent.app_runner.popen.run("true")
+        self.passed = name != "fail"
+
+
+class AppRunner(object):
+    popen = RosePopener(event_handler=Reporter(3))
+
+
+app = RoseAnaApp(manager=None)
+app.reporter = Reporter(3)
+app.app_runner = AppRunner()
+app.kgo_db = None
+app.rose_conf = ConfigNode()
+app.rose_conf.set(["rose-ana", "nproc"], "3")
+app.analysis_tasks = [
+    Task(app, {"full_task_name": name})
+    for name in ["pass", "command", "die", "fail", "command", "pass"]]
+for task, passed, exception in app._run_tasks():
+    app.reporter("Result %s %s" % (passed, exception and "error"))
+__PYTHON__
+sed 's/^\[INFO\] [^ ]* //; s/^\** \(Running task #[0-9]*\) \**$/\1/' \
+    "$TEST_KEY.out" >"$TEST_KEY.out.1"
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out.1" <<'__OUT__'
+Running task #1
+Method: pass
+Run pass
+Result True None
+Running task #2
+Method: command
+Run command
+true
+Result True None
+Running task #3
+Method: die
+Result False error
+Running task #4
+Method: fail
+Run fail
+Result False None
+Running task #5
+Method: command
+Run command
+true
+Result True None
+Running task #6
+Method: pass
+Run pass
+Result True None
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+exit 0
@@ -0,0 +1,80 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose app-run" file install, with thread and process workers.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+
+mkdir "${TEST_DIR}/etc"
+for I in 1 2 3 4 5 6 7 8; do
+    echo "Hello ${I}" >"${TEST_DIR}/etc/hello${I}.txt"
+done
+
+#-------------------------------------------------------------------------------
+tests 10
+#-------------------------------------------------------------------------------
+for WORKER_TYPE in 'thread' 'process'; do
+    TEST_KEY="${TEST_KEY_BASE}-${WORKER_TYPE}"
+    cat >"${TEST_DIR}/rose-app.conf" <<__CONFIG__
+[command]
+default=true
+
+[file:hello.txt]
+source=${TEST_DIR}/etc/hello1.txt ${TEST_DIR}/etc/hello2.txt
+
+[file:hello-all.txt]
+source=${TEST_DIR}/etc/hello*.txt
+
+[rose.config_processors.fileinstall]
+nproc=4
+worker-type=${WORKER_TYPE}
+__CONFIG__
+    test_init <"${TEST_DIR}/rose-app.conf"
+    test_setup
+    run_pass "${TEST_KEY}" rose app-run --config='../config'
+    file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" <'/dev/null'
+    file_cmp "${TEST_KEY}-hello.txt" 'hello.txt' <<'__TXT__'
+Hello 1
+Hello 2
+__TXT__
+    cat "${TEST_DIR}/etc/hello"*'.txt' >"${TEST_KEY}-hello-all.txt"
+    file_cmp "${TEST_KEY}-hello-all.txt" 'hello-all.txt' \
+        "${TEST_KEY}-hello-all.txt"
+    test_teardown
+done
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-bad"
+test_init <<__CONFIG__
+[command]
+default=true
+
+[file:hello.txt]
+source=${TEST_DIR}/etc/hello1.txt
+
+[rose.config_processors.fileinstall]
+worker-type=elf
+__CONFIG__
+test_setup
+run_fail "${TEST_KEY}" rose app-run --config='../config'
+file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" <<'__ERR__'
+[FAIL] rose.config_processors.fileinstall=worker-type=elf: bad or missing value
+__ERR__
+test_teardown
+#-------------------------------------------------------------------------------
+exit
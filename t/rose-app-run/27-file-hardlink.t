@@ -0,0 +1,67 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose app-run" file install, with hard links.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+
+test_init <<__CONFIG__
+[command]
+default=true
+
+[file:hello.txt]
+source=${TEST_DIR}/etc/hello.txt
+
+[file:hello-twice.txt]
+source=${TEST_DIR}/etc/hello.txt ${TEST_DIR}/etc/hello.txt
+
+[rose.config_processors.fileinstall]
+hardlink=true
+__CONFIG__
+
+mkdir "${TEST_DIR}/etc"
+echo 'Hello' >"${TEST_DIR}/etc/hello.txt"
+
+#-------------------------------------------------------------------------------
+tests 7
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}"
+test_setup
+run_pass "${TEST_KEY}" rose app-run --config='../config'
+file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" <'/dev/null'
+run_pass "${TEST_KEY}-inode" \
+    test "$(stat -c'%i' "${TEST_DIR}/etc/hello.txt")" \
+    = "$(stat -c'%i' 'hello.txt')"
+file_cmp "${TEST_KEY}-hello-twice.txt" 'hello-twice.txt' <<'__TXT__'
+Hello
+Hello
+__TXT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-unchanged"
+run_pass "${TEST_KEY}" rose app-run --config='../config' -v
+sed -n '/\[INFO\] unchanged:/p' "${TEST_KEY}.out" | LANG=C sort \
+    >"${TEST_KEY}.out.edited"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out.edited" <<'__OUT__'
+[INFO] unchanged: hello-twice.txt
+[INFO] unchanged: hello.txt
+__OUT__
+file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" <'/dev/null'
+test_teardown
+#-------------------------------------------------------------------------------
+exit
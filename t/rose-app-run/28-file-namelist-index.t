@@ -0,0 +1,86 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose app-run" file install, with indexed namelist sources, and the
+# checksums of the namelist files worked out while they are written.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+
+cat >"${TEST_DIR}/foo.nl" <<'__NL__'
+&foo
+n=1,
+/
+&foo
+n=2,
+/
+&foo
+n=10,
+/
+__NL__
+cat >"${TEST_DIR}/bar.nl" <<'__NL__'
+&bar
+greeting='hello',
+/
+__NL__
+FOO_MD5="$(md5sum <"${TEST_DIR}/foo.nl" | cut -d' ' -f1)"
+BAR_MD5="$(md5sum <"${TEST_DIR}/bar.nl" | cut -d' ' -f1)"
+
+test_init <<__CONFIG__
+[command]
+default=true
+
+[file:foo.nl]
+checksum=${FOO_MD5}
+source=namelist:foo(:)
+
+[file:bar.nl]
+checksum=${BAR_MD5}
+source=namelist:bar
+
+[namelist:bar]
+greeting='hello'
+
+[namelist:foo(1)]
+n=1
+
+[namelist:foo(10)]
+n=10
+
+[namelist:foo(2)]
+n=2
+
+[!namelist:foo(3)]
+n=3
+
+[namelist:foobar(1)]
+n=4
+__CONFIG__
+
+#-------------------------------------------------------------------------------
+tests 4
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}"
+test_setup
+run_pass "${TEST_KEY}" rose app-run --config='../config'
+file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" <'/dev/null'
+file_cmp "${TEST_KEY}-foo.nl" 'foo.nl' "${TEST_DIR}/foo.nl"
+file_cmp "${TEST_KEY}-bar.nl" 'bar.nl' "${TEST_DIR}/bar.nl"
+test_teardown
+#-------------------------------------------------------------------------------
+exit
@@ -24,7 +24,7 @@ if ! python -c 'import cherrypy' 2>'/dev/null'; then
     skip_all '"cherrypy" not installed'
 fi
 
-tests 7
+tests 10
 
 ROSE_CONF_PATH= rose_ws_init 'rose' 'bush'
 if [[ -z "${TEST_ROSE_WS_PORT}" ]]; then
@@ -105,6 +105,17 @@ rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
     "[('entries', ${ECHO2}, 'logs', 'job.err', 'path_in_tar'), '${ECHO2_JOB}.err']" \
     "[('entries', ${ECHO2}, 'logs', 'job.out', 'path_in_tar'), '${ECHO2_JOB}.out']"
 #-------------------------------------------------------------------------------
+# View a job log in the tar file, again from the cache
+TEST_KEY="${TEST_KEY_BASE}-200-curl-view-tar"
+run_pass "${TEST_KEY}" curl \
+    "${TEST_ROSE_WS_URL}/view/${USER}/${SUITE_NAME}?path=log/${TAR_FILE}&path_in_tar=${ECHO1_JOB}"
+cp "${TEST_KEY}.out" 'view-tar.out'
+TEST_KEY="${TEST_KEY_BASE}-200-curl-view-tar-again"
+run_pass "${TEST_KEY}" curl \
+    "${TEST_ROSE_WS_URL}/view/${USER}/${SUITE_NAME}?path=log/${TAR_FILE}&path_in_tar=${ECHO1_JOB}"
+sed -i 's/[0-9]*-[0-9]*-[0-9]*T[0-9:]*Z//g' "${TEST_KEY}.out" 'view-tar.out'
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" 'view-tar.out'
+#-------------------------------------------------------------------------------
 # Tidy up
 rose_ws_kill
 rm -fr "${SUITE_DIR}" 2>'/dev/null'
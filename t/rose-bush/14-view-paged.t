@@ -0,0 +1,127 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test for "rose bush", view a large file in pages, and its tail.
+#-------------------------------------------------------------------------------
+. "$(dirname "$0")/test_header"
+if ! python -c 'import cherrypy' 2>'/dev/null'; then
+    skip_all '"cherrypy" not installed'
+fi
+
+tests 20
+
+mkdir 'conf'
+cat >'conf/rose.conf' <<'__ROSE_CONF__'
+[rose-bush]
+view-size-max=100
+__ROSE_CONF__
+
+ROSE_CONF_PATH="${PWD}/conf" rose_ws_init 'rose' 'bush'
+if [[ -z "${TEST_ROSE_WS_PORT}" ]]; then
+    exit 1
+fi
+
+mkdir -p "${HOME}/cylc-run"
+SUITE_DIR="$(mktemp -d --tmpdir="${HOME}/cylc-run" "rtb-rose-bush-14-XXXXXXXX")"
+SUITE_NAME="$(basename "${SUITE_DIR}")"
+mkdir -p "${SUITE_DIR}/log"
+LOG_FILE='log/big.txt'
+# 30 lines of 8 bytes
+for I in $(seq 1 30); do
+    printf 'line %02d\n' "${I}"
+done >"${SUITE_DIR}/${LOG_FILE}"
+URL="${TEST_ROSE_WS_URL}/viewpage/${USER}/${SUITE_NAME}?path=${LOG_FILE}"
+TAIL_URL="${TEST_ROSE_WS_URL}/viewtail/${USER}/${SUITE_NAME}?path=${LOG_FILE}"
+#-------------------------------------------------------------------------------
+# First page, at most view-size-max bytes of whole lines
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewpage"
+run_pass "${TEST_KEY}" curl "${URL}&offset=0"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 0]" \
+    "[('next_offset',), 96]" \
+    "[('size',), 240]" \
+    "[('line',), 1]" \
+    "[('lines', 0), 'line 01']" \
+    "[('lines', 11), 'line 12']" \
+    "[('partial',), False]"
+#-------------------------------------------------------------------------------
+# Page from a line
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewpage-line"
+run_pass "${TEST_KEY}" curl "${URL}&line=13&max_bytes=16"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 96]" \
+    "[('next_offset',), 112]" \
+    "[('line',), 13]" \
+    "[('lines',), ['line 13', 'line 14']]"
+#-------------------------------------------------------------------------------
+# Tail, whole lines in the last view-size-max bytes
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewtail"
+run_pass "${TEST_KEY}" curl "${TAIL_URL}"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 144]" \
+    "[('next_offset',), 240]" \
+    "[('line',), 19]" \
+    "[('lines', 0), 'line 19']" \
+    "[('lines', 11), 'line 30']"
+#-------------------------------------------------------------------------------
+# Follow, lines appended since the previous offset
+printf 'line 31\n' >>"${SUITE_DIR}/${LOG_FILE}"
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewtail-offset"
+run_pass "${TEST_KEY}" curl "${TAIL_URL}&offset=240"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 240]" \
+    "[('next_offset',), 248]" \
+    "[('line',), 31]" \
+    "[('lines',), ['line 31']]" \
+    "[('partial',), False]"
+#-------------------------------------------------------------------------------
+# Follow, an unterminated line is returned again until it is complete
+printf 'line 3' >>"${SUITE_DIR}/${LOG_FILE}"
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewtail-partial"
+run_pass "${TEST_KEY}" curl "${TAIL_URL}&offset=248"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 248]" \
+    "[('next_offset',), 248]" \
+    "[('line',), 32]" \
+    "[('lines',), ['line 3']]" \
+    "[('partial',), True]"
+#-------------------------------------------------------------------------------
+# Bad offset, line or max_bytes
+for ARGS in 'offset=-1' 'line=0' 'max_bytes=-1' 'offset=x'; do
+    TEST_KEY="${TEST_KEY_BASE}-400-curl-viewpage-${ARGS}"
+    run_pass "${TEST_KEY}" curl -I "${URL}&${ARGS}"
+    file_grep "${TEST_KEY}.out" 'HTTP/.* 400 Bad Request' "${TEST_KEY}.out"
+done
+#-------------------------------------------------------------------------------
+# A line longer than max_bytes is split, and the next page continues from
+# the middle of the line
+printf '%0250d\n' 0 >"${SUITE_DIR}/log/long.txt"
+LONG_URL="${TEST_ROSE_WS_URL}/viewpage/${USER}/${SUITE_NAME}?path=log/long.txt"
+TEST_KEY="${TEST_KEY_BASE}-200-curl-viewpage-long-line"
+run_pass "${TEST_KEY}" curl "${LONG_URL}&offset=100"
+rose_ws_json_greps "${TEST_KEY}.out" "${TEST_KEY}.out" \
+    "[('offset',), 100]" \
+    "[('next_offset',), 200]" \
+    "[('line',), 1]" \
+    "[('partial',), False]"
+#-------------------------------------------------------------------------------
+# Tidy up
+rose_ws_kill
+rm -fr "${SUITE_DIR}" 2>'/dev/null'
+exit 0
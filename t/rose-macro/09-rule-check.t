@@ -21,7 +21,7 @@
 #-------------------------------------------------------------------------------
 . $(dirname $0)/test_header
 #-------------------------------------------------------------------------------
-tests 6
+tests 9
 #-------------------------------------------------------------------------------
 # Check fail-if and warn-if checking.
 TEST_KEY=$TEST_KEY_BASE-ok
@@ -476,4 +476,25 @@ file_cmp "$TEST_KEY.err" "$TEST_KEY.err" <<'__CONTENT__'
 __CONTENT__
 teardown
 #-------------------------------------------------------------------------------
+# Check rules that Jinja2 and Python read differently evaluate as in Jinja2.
+TEST_KEY=$TEST_KEY_BASE-jinja2
+setup
+init <<'__CONFIG__'
+[jinja2]
+foo=3
+__CONFIG__
+init_meta <<__META_CONFIG__
+[jinja2=foo]
+fail-if=-this ** 2 < 0; (this > 2) + 1 == 2; 2 ** 3 ** 2 == this * 64 + 320;
+       ={% if this > 2 %}True{% else %}False{% endif %}
+__META_CONFIG__
+run_fail "$TEST_KEY" rose macro --config=../config rose.macros.DefaultValidators
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" </dev/null
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" <<'__CONTENT__'
+[V] rose.macros.DefaultValidators: issues: 1
+    jinja2=foo=3
+        failed because: {% if this > 2 %}True{% else %}False{% endif %}
+__CONTENT__
+teardown
+#-------------------------------------------------------------------------------
 exit
@@ -193,7 +193,7 @@ one_value_triggered=.false.
 two_values_triggered=.false.
 __CONFIG__
 #-------------------------------------------------------------------------------
-tests 8
+tests 12
 #-------------------------------------------------------------------------------
 # Check trigger changing.
 TEST_KEY=$TEST_KEY_BASE-change
@@ -996,4 +996,62 @@ qux=0
 __CONFIG__
 teardown
 #-------------------------------------------------------------------------------
+# Check triggering through chains that share settings.
+TEST_KEY=$TEST_KEY_BASE-shared-chains
+setup
+init <<'__CONFIG__'
+[env]
+A=1
+B=1
+C=0
+D=1
+E=1
+F=1
+G=1
+__CONFIG__
+init_meta <<'__META_CONFIG__'
+[env=A]
+trigger=env=B: 1;
+       =env=C: 1;
+
+[env=B]
+trigger=env=D: 1;
+       =env=E: 1;
+
+[env=C]
+trigger=env=D: 1;
+       =env=E: 0;
+
+[env=D]
+trigger=env=F;
+
+[env=E]
+trigger=env=F;
+       =env=G;
+
+[env=F]
+
+[env=G]
+__META_CONFIG__
+run_pass "$TEST_KEY" rose macro --non-interactive --fix --config=../config
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+[T] rose.macros.DefaultTransforms: changes: 2
+    env=D=1
+        enabled      -> trig-ignored
+    env=F=1
+        enabled      -> trig-ignored
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+file_cmp "$TEST_KEY.config" ../config/rose-app.conf <<'__CONFIG__'
+[env]
+A=1
+B=1
+C=0
+!!D=1
+E=1
+!!F=1
+G=1
+__CONFIG__
+teardown
+#-------------------------------------------------------------------------------
 exit
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+"""Test "rose.bush_log.RoseBushLogIndex" against a scan of each line.
+
+Write each TEXT in turn to a log file, which grows or shrinks, and update
+one index to its size. Print the size and the number of lines indexed,
+and exit non-zero if an offset or a line number from the index is not the
+one found by a scan of the text.
+
+"""
+
+import os
+from rose.bush_log import RoseBushLogIndex
+import sys
+from tempfile import NamedTemporaryFile
+
+
+def check(index, handle, text):
+    """Compare lookups in index with a scan of text. Return errors."""
+    starts = [0] + [i + 1 for i, char in enumerate(text) if char == "\n"]
+    n_lines = len(starts) - 1
+    errors = []
+    for line in range(n_lines + 3):
+        if line <= n_lines:
+            expected = starts[line]
+        else:
+            expected = len(text)
+        offset = index.get_offset(handle, line)
+        if offset != expected:
+            errors.append(
+                "get_offset(%d): %d != %d" % (line, offset, expected))
+    for offset in range(len(text) + 3):
+        expected = text[:offset].count("\n")
+        line = index.get_line(handle, offset)
+        if line != expected:
+            errors.append("get_line(%d): %d != %d" % (offset, line, expected))
+    return errors
+
+
+def main():
+    """CLI: 00-index.py INTERVAL TEXT ..."""
+    interval = int(sys.argv[1])
+    index = RoseBushLogIndex(interval)
+    index.CHUNK_SIZE = 5  # split lines and line breaks across chunks
+    errors = []
+    with NamedTemporaryFile() as log_file:
+        for text in sys.argv[2:]:
+            if len(text) < os.fstat(log_file.fileno()).st_size:
+                log_file.truncate(0)
+            log_file.seek(0)
+            log_file.write(text)
+            log_file.flush()
+            with open(log_file.name, "rb") as handle:
+                index.update(handle, os.fstat(handle.fileno()).st_size)
+                print index.size, index.n_lines
+                errors += check(index, handle, text)
+    if errors:
+        sys.exit("\n".join(errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose.bush_log.RoseBushLogIndex", for a log file that grows or shrinks.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+TEST_PARSER="python $TEST_SOURCE_DIR/$TEST_KEY_BASE.py"
+#-------------------------------------------------------------------------------
+tests 15
+#-------------------------------------------------------------------------------
+# Empty file
+TEST_KEY=$TEST_KEY_BASE-empty
+run_pass "$TEST_KEY" $TEST_PARSER 3 ''
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'0 0'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# No line break
+TEST_KEY=$TEST_KEY_BASE-no-line-break
+run_pass "$TEST_KEY" $TEST_PARSER 3 'no line break'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'13 0'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# File grows, with an unterminated last line, then with blank lines
+TEST_KEY=$TEST_KEY_BASE-grow
+run_pass "$TEST_KEY" $TEST_PARSER 3 \
+    $'a\nbb\nccc\ndddd\ne\nf\ng\nhh\n' \
+    $'a\nbb\nccc\ndddd\ne\nf\ng\nhh\niii\njj' \
+    $'a\nbb\nccc\ndddd\ne\nf\ng\nhh\niii\njjjj\nk\n\n\n'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+23 8
+29 9
+36 13
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# File shrinks, i.e. it is rewritten, then grows again
+TEST_KEY=$TEST_KEY_BASE-shrink
+run_pass "$TEST_KEY" $TEST_PARSER 2 \
+    $'a\nbb\nccc\ndddd\ne\nf\n' $'xx\ny' $'xx\nyy\nzz\n'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+18 6
+4 1
+9 3
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Many lines, at the default interval
+TEST_KEY=$TEST_KEY_BASE-many
+run_pass "$TEST_KEY" $TEST_PARSER 1000 \
+    "$(seq 1 1500)" "$(seq 1 2500)"$'\n' "$(seq 1 3000)"$'\n'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+6392 1499
+11393 2500
+13893 3000
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+exit
@@ -0,0 +1,98 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose.checksum" > "get_checksum" with a checksum cache file.
+#-------------------------------------------------------------------------------
+. "$(dirname "$0")/test_header"
+tests 10
+
+if [[ -n "${PYTHONPATH:-}" ]]; then
+    export PYTHONPATH="${TEST_SOURCE_DIR}:${PYTHONPATH}"
+else
+    export PYTHONPATH="${TEST_SOURCE_DIR}"
+fi
+mkdir 'conf'
+cat >'conf/rose.conf' <<__CONF__
+checksum-method=md5
+checksum-cache=${TEST_DIR}/cache/checksum.db
+__CONF__
+export ROSE_CONF_PATH="${TEST_DIR}/conf" ROSE_NS='rose' ROSE_UTIL='checksum'
+
+mkdir -p 'hello/world'
+echo 'Earth' >'hello/earth.txt'
+echo 'Mars' >'hello/world/mars.txt'
+echo 'Venus' >'hello/world/venus.txt'
+chmod 600 'hello/world/venus.txt'
+touch -d '2000-01-01 00:00:00' 'hello/earth.txt' 'hello/world/'*
+EARTH_MD5="$(md5sum <'hello/earth.txt' | cut -d' ' -f1)"
+MARS_MD5="$(md5sum <'hello/world/mars.txt' | cut -d' ' -f1)"
+VENUS_MD5="$(md5sum <'hello/world/venus.txt' | cut -d' ' -f1)"
+MARS2_MD5="$(echo 'Mars 2' | md5sum | cut -d' ' -f1)"
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-file"
+run_pass "${TEST_KEY}" python -m 't_checksum' 'hello/earth.txt'
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<__OUT__
+ ${EARTH_MD5} 644
+hits=0, misses=1
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-tree-1"
+run_pass "${TEST_KEY}" python -m 't_checksum' 'hello'
+LANG=C sort "${TEST_KEY}.out" >"${TEST_KEY}.out.sorted"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out.sorted" <<__OUT__
+/
+earth.txt ${EARTH_MD5} 644
+hits=1, misses=2
+world/
+world/mars.txt ${MARS_MD5} 644
+world/venus.txt ${VENUS_MD5} 600
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-tree-2"
+run_pass "${TEST_KEY}" python -m 't_checksum' 'hello'
+LANG=C sort "${TEST_KEY}.out" >"${TEST_KEY}.out.sorted"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out.sorted" <<__OUT__
+/
+earth.txt ${EARTH_MD5} 644
+hits=3, misses=0
+world/
+world/mars.txt ${MARS_MD5} 644
+world/venus.txt ${VENUS_MD5} 600
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-tree-modified"
+echo 'Mars 2' >'hello/world/mars.txt'
+touch -d '2000-01-02 00:00:00' 'hello/world/mars.txt'
+run_pass "${TEST_KEY}" python -m 't_checksum' 'hello'
+LANG=C sort "${TEST_KEY}.out" >"${TEST_KEY}.out.sorted"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out.sorted" <<__OUT__
+/
+earth.txt ${EARTH_MD5} 644
+hits=2, misses=1
+world/
+world/mars.txt ${MARS2_MD5} 644
+world/venus.txt ${VENUS_MD5} 600
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-tree-new"
+echo 'Jupiter' >'hello/world/jupiter.txt'
+run_pass "${TEST_KEY}" python -m 't_checksum' 'hello'
+file_grep "${TEST_KEY}.out" '^hits=3, misses=1$' "${TEST_KEY}.out"
+#-------------------------------------------------------------------------------
+exit 0
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Test rose.checksum.get_checksum and its cache."""
+
+
+import sys
+from rose.checksum import get_checksum, get_checksum_cache
+
+
+def main():
+    """CLI."""
+    for path, checksum, mode in get_checksum(*sys.argv[1:]):
+        if mode is None:
+            print "%s/" % path
+        else:
+            print "%s %s %o" % (path, checksum, mode & 0777)
+    cache = get_checksum_cache()
+    print "hits=%d, misses=%d" % (cache.hits, cache.misses)
+
+
+if __name__ == "__main__":
+    main()
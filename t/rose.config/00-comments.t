@@ -0,0 +1,111 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose.config" > "ConfigNode.comments" can be modified in place, and is
+# not shared between nodes or their copies.
+#-------------------------------------------------------------------------------
+. "$(dirname "$0")/test_header"
+tests 7
+#-------------------------------------------------------------------------------
+cat >'rose-app.conf' <<'__CONF__'
+[foo]
+bar=1
+baz=2
+
+#Qux
+[qux]
+__CONF__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-modify"
+run_pass "${TEST_KEY}" python - <<'__PYTHON__'
+import copy
+import rose.config
+
+root = rose.config.load("rose-app.conf")
+root.get(["foo", "bar"]).comments.append("Bar")
+root.get(["foo", "baz"]).comments.extend(["Baz", "Baz again"])
+root.get(["qux"]).comments.insert(0, "Qux before")
+root_copy = copy.deepcopy(root)
+root_copy.get(["foo", "bar"]).comments.append("Bar copy")
+root_copy.get(["foo"]).comments.append("Foo copy")
+root_copy.get(["qux"]).comments.pop()
+rose.config.dump(root)
+print "#" * 8
+rose.config.dump(root_copy)
+__PYTHON__
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+[foo]
+#Bar
+bar=1
+#Baz
+#Baz again
+baz=2
+
+#Qux before
+#Qux
+[qux]
+########
+#Foo copy
+[foo]
+#Bar
+#Bar copy
+bar=1
+#Baz
+#Baz again
+baz=2
+
+#Qux before
+[qux]
+__OUT__
+file_cmp "${TEST_KEY}.err" "${TEST_KEY}.err" </dev/null
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-dump"
+run_pass "${TEST_KEY}" python - <<'__PYTHON__'
+from StringIO import StringIO
+import rose.config
+
+root = rose.config.load("rose-app.conf")
+rose.config.dump(root, StringIO())
+repr(root)
+print [], root._comments
+for keys, node in root.walk():
+    print keys, node._comments
+__PYTHON__
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+[] None
+['foo'] None
+['foo', 'bar'] None
+['foo', 'baz'] None
+['qux'] ['Qux']
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-unset"
+run_pass "${TEST_KEY}" python - <<'__PYTHON__'
+import rose.config
+
+root = rose.config.ConfigNode()
+root.set(["foo"], comments=["Foo"])
+root.set(["foo", "bar"], "1")
+root.get(["foo"]).comments = None
+print repr(root.get(["foo"]).comments)
+__PYTHON__
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+[]
+__OUT__
+exit 0
@@ -0,0 +1,93 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose.macro" > "get_metadata_for_config_id" after in-place edits of the
+# metadata, which must not return properties indexed before the edits, and
+# check that the index of the metadata does not keep it alive.
+#-------------------------------------------------------------------------------
+. "$(dirname "$0")/test_header"
+tests 6
+
+if [[ -n "${PYTHONPATH:-}" ]]; then
+    export PYTHONPATH="${TEST_SOURCE_DIR}:${PYTHONPATH}"
+else
+    export PYTHONPATH="${TEST_SOURCE_DIR}"
+fi
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-option"
+run_pass "${TEST_KEY}" python -m 't_metadata_index' 'namelist:foo=bar' \
+    'set namelist:foo=bar,values 1,2' \
+    'set namelist:foo=bar,values 1,2,3' \
+    'set namelist:foo=bar,title Bar' \
+    'ignore namelist:foo=bar,values' \
+    'enable namelist:foo=bar,values' \
+    'unset namelist:foo=bar,title' \
+    'ignore namelist:foo=bar' \
+    'enable namelist:foo=bar'
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+[('id', 'namelist:foo=bar'), ('values', '1,2')]
+[('id', 'namelist:foo=bar'), ('values', '1,2,3')]
+[('id', 'namelist:foo=bar'), ('title', 'Bar'), ('values', '1,2,3')]
+[('id', 'namelist:foo=bar'), ('title', 'Bar')]
+[('id', 'namelist:foo=bar'), ('title', 'Bar'), ('values', '1,2,3')]
+[('id', 'namelist:foo=bar'), ('values', '1,2,3')]
+[('id', 'namelist:foo=bar')]
+[('id', 'namelist:foo=bar'), ('values', '1,2,3')]
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-duplicate-modifier"
+run_pass "${TEST_KEY}" python -m 't_metadata_index' 'namelist:foo{x}(2)=bar(1)' \
+    'set namelist:foo=bar,title Bar' \
+    'set namelist:foo{x}=bar,title X Bar' \
+    'set namelist:foo{x}=bar,length 3' \
+    'set namelist:foo=bar,values 1,2' \
+    'set namelist:foo=bar,values 1' \
+    'ignore namelist:foo{x}=bar,title'
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'Bar (1)')]
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'X Bar (1)')]
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'X Bar (1)')]
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'X Bar (1)'), ('values', '1,2')]
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'X Bar (1)'), ('values', '1')]
+[('id', 'namelist:foo{x}(2)=bar(1)'), ('title', 'Bar (1)'), ('values', '1')]
+__OUT__
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-release"
+run_pass "${TEST_KEY}" python - <<'__PYTHON__'
+import weakref
+from rose.config import ConfigNode
+from rose.macro import get_metadata_for_config_id, MetadataIndex
+meta_configs = [ConfigNode(), ConfigNode()]
+for meta_config in meta_configs:
+    meta_config.set(["namelist:foo=bar", "title"], "Bar")
+    get_metadata_for_config_id("namelist:foo=bar(1)", meta_config)
+refs = [weakref.ref(meta_config) for meta_config in meta_configs]
+index_refs = [
+    weakref.ref(MetadataIndex.get_index(meta_config))
+    for meta_config in meta_configs]
+print len(MetadataIndex.INDEXES)
+del meta_config, meta_configs
+print [ref() for ref in refs + index_refs], len(MetadataIndex.INDEXES)
+__PYTHON__
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<'__OUT__'
+2
+[None, None, None, None] 0
+__OUT__
+#-------------------------------------------------------------------------------
+exit 0
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Test rose.macro.MetadataIndex with in-place edits of the metadata.
+
+Apply each edit to a metadata configuration and print the metadata of a
+setting after each, one line per edit.
+
+"""
+
+
+import sys
+
+from rose.config import ConfigNode
+from rose.macro import get_metadata_for_config_id
+
+
+def main():
+    """CLI: t_metadata_index SETTING-ID [OPERATION KEYS [VALUE]] ..."""
+    setting_id = sys.argv[1]
+    meta_config = ConfigNode()
+    for item in sys.argv[2:]:
+        operation, keys, value = (item.split(" ", 2) + [None])[:3]
+        keys = keys.split(",")
+        if operation == "set":
+            meta_config.set(keys, value)
+        elif operation == "ignore":
+            meta_config.get(keys).state = ConfigNode.STATE_USER_IGNORED
+        elif operation == "enable":
+            meta_config.get(keys).state = ConfigNode.STATE_NORMAL
+        elif operation == "unset":
+            meta_config.unset(keys)
+        metadata = get_metadata_for_config_id(setting_id, meta_config)
+        print sorted(metadata.items())
+
+
+if __name__ == "__main__":
+    main()
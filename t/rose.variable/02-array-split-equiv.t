@@ -0,0 +1,40 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rose.variable" > "array_split" against the original scanner, with
+# random values of quotes, escapes and delimiters.
+#-------------------------------------------------------------------------------
+. "$(dirname "$0")/test_header"
+tests 4
+
+if [[ -n "${PYTHONPATH:-}" ]]; then
+    export PYTHONPATH="${TEST_SOURCE_DIR}:${PYTHONPATH}"
+else
+    export PYTHONPATH="${TEST_SOURCE_DIR}"
+fi
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}"
+run_pass "${TEST_KEY}" python -m 't_array_split_equiv' 20000 0
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'20000 values, 0 differ'
+#-------------------------------------------------------------------------------
+TEST_KEY="${TEST_KEY_BASE}-seed"
+run_pass "${TEST_KEY}" python -m 't_array_split_equiv' 20000 1
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'20000 values, 0 differ'
+#-------------------------------------------------------------------------------
+exit
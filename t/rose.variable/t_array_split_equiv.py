@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Check that rose.variable.array_split splits random values as the original
+character by character scanner did.
+
+Usage: t_array_split_equiv.py [N-VALUES [SEED]]
+
+"""
+
+
+import random
+import re
+import sys
+
+from rose.variable import array_split
+
+
+ALPHABET = ["a", "1", " ", ",", ";", "'", '"', "\\", "\n", "''", '""']
+DELIMS = [None, ",", " ", ";", "\\", "'", ", "]
+
+
+def old_scan_string(value, delim=',', remove_esc_char=False):
+    """The original character by character scanner."""
+    item = ''
+    skip_inds = []
+    for quote_pair_match in re.finditer(r"""(''|"")$""", value):
+        skip_inds.extend([quote_pair_match.start(0), quote_pair_match.end(0)])
+    is_in_quotes = {'"': False, "'": False}
+    other_quote = {'"': "'", "'": '"'}
+    esc_char = "\\"
+    was_escaped = False
+    is_escaped = False
+    letter = None
+    for i, letter in enumerate(value):
+        if (letter in is_in_quotes and
+                i not in skip_inds and
+                not is_in_quotes[other_quote[letter]] and
+                not is_escaped):
+            is_in_quotes[letter] = not is_in_quotes[letter]
+        was_escaped = is_escaped
+        is_escaped = (letter == esc_char and not is_escaped)
+        if remove_esc_char and was_escaped and letter in (delim + esc_char):
+            item = item[:-1] + letter
+        elif (letter == delim and
+                not any(is_in_quotes.values()) and
+                not was_escaped):
+            yield item
+            item = ''
+        elif item + letter == value:
+            item += letter
+            yield item
+            item = ''
+        else:
+            item += letter
+    if (item or (letter == delim and
+                 not any(is_in_quotes.values()) and not was_escaped)):
+        yield item
+
+
+def old_array_split(value, only_this_delim=None, remove_esc_char=False):
+    """The original array_split."""
+    delim = ","
+    if only_this_delim is not None:
+        delim = only_this_delim
+    if delim not in value and only_this_delim is None:
+        delim = ' '
+    lex = old_scan_string(value.strip(), delim, remove_esc_char)
+    return [item.strip() for item in lex]
+
+
+def main():
+    """Compare array_split with the original for N-VALUES random values."""
+    n_values = 10000
+    seed = 0
+    if len(sys.argv) > 1:
+        n_values = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        seed = int(sys.argv[2])
+    rng = random.Random(seed)
+    n_bad = 0
+    for _ in range(n_values):
+        value = "".join(
+            rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+        args = (value, rng.choice(DELIMS), rng.choice([False, True]))
+        expected = old_array_split(*args)
+        actual = array_split(*args)
+        if actual != expected:
+            n_bad += 1
+            print "%r: %r != %r" % (args, actual, expected)
+    print "%d values, %d differ" % (n_values, n_bad)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rosie disco" paging, conditional requests and the results cache.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+if ! python -c 'import cherrypy, sqlalchemy' 2>/dev/null; then
+    skip_all '"cherrypy" or "sqlalchemy" not installed'
+fi
+#-------------------------------------------------------------------------------
+tests 18
+#-------------------------------------------------------------------------------
+cat >rose.conf <<__ROSE_CONF__
+[rosie-db]
+db.foo=sqlite:///$PWD/foo.db.sqlite
+__ROSE_CONF__
+export ROSE_CONF_PATH=$PWD
+# Load revisions FIRST .. LAST into the database, one new suite each.
+load() {
+    python - "sqlite:///$PWD/foo.db.sqlite" "$1" "$2" <<'__PYTHON__'
+import os, sys
+from rose.config import ConfigNode
+from rosie.db_create import RosieDatabaseInitiator
+from rosie.svn_post_commit import RosieSvnPostCommitHook, RosieWriteDAO
+db_url, first, last = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+if not os.path.exists(db_url[len("sqlite:///"):]):
+    RosieDatabaseInitiator().create(db_url)
+dao = RosieWriteDAO(db_url)
+hook = RosieSvnPostCommitHook()
+for revision in range(first, last + 1):
+    info = ConfigNode()
+    info.set(["owner"], "fred")
+    info.set(["project"], "test")
+    info.set(["title"], "Suite %d" % revision)
+    hook._update_info_db(
+        dao,
+        {"prefix": "foo", "revision": str(revision), "author": "fred",
+         "date": 1000000000 + revision},
+        {"sid": "aa%03d" % (revision - 1), "branch": "trunk",
+         "from_path": None, "info": info, "status": "A",
+         "status_info_file": hook.ST_EMPTY})
+hook._update_meta(dao, u"revision", unicode(last))
+__PYTHON__
+}
+# Print the "idx" of each suite in a JSON file on one line.
+ids() {
+    python -c 'import json, sys
+print " ".join(item["idx"] for item in json.load(open(sys.argv[1])))' "$1"
+}
+load 1 5
+#-------------------------------------------------------------------------------
+rose_ws_init 'rosie' 'disco'
+if [[ -z "${TEST_ROSE_WS_PORT}" ]]; then
+    exit 1
+fi
+URL_FOO_Q="${TEST_ROSE_WS_URL}/foo/query?q=project+eq+test&format=json"
+#-------------------------------------------------------------------------------
+# Page with a limit and an offset
+TEST_KEY="${TEST_KEY_BASE}-offset"
+run_pass "${TEST_KEY}" curl -s "${URL_FOO_Q}&limit=2&offset=2"
+ids "${TEST_KEY}.out" >"${TEST_KEY}.ids"
+file_cmp "${TEST_KEY}.ids" "${TEST_KEY}.ids" <<<'foo-aa002 foo-aa003'
+#-------------------------------------------------------------------------------
+# Page with a limit and a cursor
+TEST_KEY="${TEST_KEY_BASE}-cursor"
+run_pass "${TEST_KEY}" curl -s "${URL_FOO_Q}&limit=2&cursor=foo-aa001/trunk@2"
+ids "${TEST_KEY}.out" >"${TEST_KEY}.ids"
+file_cmp "${TEST_KEY}.ids" "${TEST_KEY}.ids" <<<'foo-aa002 foo-aa003'
+TEST_KEY="${TEST_KEY_BASE}-cursor-last"
+run_pass "${TEST_KEY}" curl -s "${URL_FOO_Q}&limit=2&cursor=foo-aa003/trunk@4"
+ids "${TEST_KEY}.out" >"${TEST_KEY}.ids"
+file_cmp "${TEST_KEY}.ids" "${TEST_KEY}.ids" <<<'foo-aa004'
+#-------------------------------------------------------------------------------
+# Bad cursor and bad limit
+TEST_KEY="${TEST_KEY_BASE}-bad-cursor"
+run_pass "${TEST_KEY}" \
+    curl -s -o /dev/null -w '%{http_code}\n' "${URL_FOO_Q}&cursor=foo-aa001"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'400'
+TEST_KEY="${TEST_KEY_BASE}-bad-limit"
+run_pass "${TEST_KEY}" \
+    curl -s -o /dev/null -w '%{http_code}\n' "${URL_FOO_Q}&limit=two"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'400'
+#-------------------------------------------------------------------------------
+# ETag of the loaded revision, and conditional request
+TEST_KEY="${TEST_KEY_BASE}-etag"
+run_pass "${TEST_KEY}" curl -s -D - -o /dev/null "${URL_FOO_Q}"
+file_grep "${TEST_KEY}.out" '^ETag: "5"' "${TEST_KEY}.out"
+TEST_KEY="${TEST_KEY_BASE}-if-none-match"
+run_pass "${TEST_KEY}" curl -s -o /dev/null -w '%{http_code}\n' \
+    -H 'If-None-Match: "5"' "${URL_FOO_Q}"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'304'
+#-------------------------------------------------------------------------------
+# Load a new revision, cached results should be dropped
+load 6 6
+TEST_KEY="${TEST_KEY_BASE}-if-none-match-new"
+run_pass "${TEST_KEY}" curl -s -D "${TEST_KEY}.head" -o "${TEST_KEY}.json" \
+    -w '%{http_code}\n' -H 'If-None-Match: "5"' "${URL_FOO_Q}&limit=2&offset=4"
+file_cmp "${TEST_KEY}.out" "${TEST_KEY}.out" <<<'200'
+file_grep "${TEST_KEY}.head" '^ETag: "6"' "${TEST_KEY}.head"
+ids "${TEST_KEY}.json" >"${TEST_KEY}.ids"
+file_cmp "${TEST_KEY}.ids" "${TEST_KEY}.ids" <<<'foo-aa004 foo-aa005'
+#-------------------------------------------------------------------------------
+rose_ws_kill
+exit 0
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+"""Test that search results are the same with and without a search index.
+
+Load the same suites into three databases: one without a search index, one
+whose index is updated as each suite is loaded by the post-commit hook, and
+one whose index is created after the suites are loaded. Print the suite ids
+found by each search.
+
+"""
+
+import ast
+import os
+from shutil import rmtree
+import sys
+from rose.config import ConfigNode
+from rosie.db import DAO, SEARCH_TABLE_NAME
+from rosie.db_create import RosieDatabaseInitiator
+from rosie.svn_post_commit import RosieSvnPostCommitHook, RosieWriteDAO
+from tempfile import mkdtemp
+
+
+SUITES = [
+    ("aa000", "Shiny new suite", "Very shiny."),
+    ("aa001", "Dull old suite", "Not at all shiny 100%."),
+    ("aa002", "Another suite", None),
+]
+INDEX_NONE, INDEX_ON_LOAD, INDEX_AFTER_LOAD = range(3)
+
+
+def populate(db_url, index_mode):
+    """Create a database with SUITES."""
+    initiator = RosieDatabaseInitiator()
+    initiator.create(db_url)
+    dao = RosieWriteDAO(db_url)
+    if index_mode != INDEX_ON_LOAD:
+        dao.engine.execute("DROP TABLE %s" % SEARCH_TABLE_NAME)
+    hook = RosieSvnPostCommitHook()
+    for revision, (sid, title, description) in enumerate(SUITES, 1):
+        info = ConfigNode()
+        info.set(["owner"], "fred")
+        info.set(["project"], "test")
+        info.set(["title"], title)
+        if description is not None:
+            info.set(["description"], description)
+        changeset_attribs = {
+            "prefix": "foo",
+            "revision": str(revision),
+            "author": "fred",
+            "date": 1000000000 + revision}
+        branch_attribs = {
+            "sid": sid,
+            "branch": "trunk",
+            "from_path": None,
+            "info": info,
+            "status": hook.ST_ADDED,
+            "status_info_file": hook.ST_EMPTY}
+        hook._update_info_db(dao, changeset_attribs, branch_attribs)
+    if index_mode == INDEX_AFTER_LOAD:
+        initiator.create_search_index(db_url)
+
+
+if __name__ == "__main__":
+    work_dir = mkdtemp()
+    try:
+        daos = []
+        for index_mode in [INDEX_NONE, INDEX_ON_LOAD, INDEX_AFTER_LOAD]:
+            db_url = "sqlite:///" + os.path.join(
+                work_dir, "%d.db" % index_mode)
+            populate(db_url, index_mode)
+            daos.append(DAO(db_url))
+        words = ast.literal_eval(sys.argv[1])
+        results = [dao.search(words) for dao in daos]
+    finally:
+        rmtree(work_dir)
+    for result in results[1:]:
+        if result != results[0]:
+            sys.exit("results differ: %s" % results)
+    print " ".join(sorted(result["idx"] for result in results[0]))
@@ -0,0 +1,67 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test rosie.db search, with and without a search index.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+TEST_PARSER="python $TEST_SOURCE_DIR/$TEST_KEY_BASE.py"
+#-------------------------------------------------------------------------------
+if ! python -c 'import sqlalchemy' 2>/dev/null; then
+    skip_all '"sqlalchemy" not installed'
+fi
+if ! python -c 'import sqlite3
+sqlite3.connect(":memory:").execute(
+    "CREATE VIRTUAL TABLE t USING fts5(x, tokenize=\"trigram\")")' \
+    2>/dev/null
+then
+    skip_all '"sqlite3" does not support FTS5 trigram'
+fi
+tests 15
+#-------------------------------------------------------------------------------
+# Single word.
+TEST_KEY=$TEST_KEY_BASE-single
+run_pass "$TEST_KEY" $TEST_PARSER '["shiny"]'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'foo-aa000 foo-aa001'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Multiple words, all must match.
+TEST_KEY=$TEST_KEY_BASE-multiple
+run_pass "$TEST_KEY" $TEST_PARSER '["suite", "DULL"]'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'foo-aa001'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Short word, cannot use the index.
+TEST_KEY=$TEST_KEY_BASE-short
+run_pass "$TEST_KEY" $TEST_PARSER '["02"]'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'foo-aa001 foo-aa002'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Word with wildcard, cannot use the index.
+TEST_KEY=$TEST_KEY_BASE-wildcard
+run_pass "$TEST_KEY" $TEST_PARSER '["Dull%suite"]'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<'foo-aa001'
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# No match.
+TEST_KEY=$TEST_KEY_BASE-none
+run_pass "$TEST_KEY" $TEST_PARSER '["nothing"]'
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<<''
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+exit
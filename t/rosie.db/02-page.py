@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+"""Test paging of query and search results.
+
+Print the suites of each page of the results of a query or search, paged
+with a cursor, one page per line. Check that the pages are the same when
+paged with an offset, that they add up to the unpaged results, and that
+streamed results are the same as listed results.
+
+"""
+
+import ast
+import os
+from shutil import rmtree
+import sys
+from rose.config import ConfigNode
+from rosie.db import DAO
+from rosie.db_create import RosieDatabaseInitiator
+from rosie.svn_post_commit import RosieSvnPostCommitHook, RosieWriteDAO
+from tempfile import mkdtemp
+
+
+# (sid, branch, title, status) of each revision
+CHANGES = [
+    ("aa000", "trunk", "Shiny new suite", "A"),
+    ("aa001", "trunk", "Dull old suite", "A"),
+    ("aa002", "trunk", "Another suite", "A"),
+    ("aa001", "trunk", "Dull older suite", "M"),
+    ("aa001", "shiny", "Dull older suite", "A"),
+    ("aa003", "trunk", "Yet another suite", "A"),
+    ("aa000", "trunk", "Shiny old suite", "M"),
+]
+
+
+def populate(db_url):
+    """Create a database with CHANGES."""
+    RosieDatabaseInitiator().create(db_url)
+    dao = RosieWriteDAO(db_url)
+    hook = RosieSvnPostCommitHook()
+    for revision, (sid, branch, title, status) in enumerate(CHANGES, 1):
+        info = ConfigNode()
+        info.set(["owner"], "fred")
+        info.set(["project"], "test")
+        info.set(["title"], title)
+        changeset_attribs = {
+            "prefix": "foo",
+            "revision": str(revision),
+            "author": "fred",
+            "date": 1000000000 + revision}
+        branch_attribs = {
+            "sid": sid,
+            "branch": branch,
+            "from_path": None,
+            "info": info,
+            "status": status,
+            "status_info_file": hook.ST_EMPTY}
+        hook._update_info_db(dao, changeset_attribs, branch_attribs)
+
+
+def get_id(result):
+    """Return the (idx, branch, revision) of a result."""
+    return (result["idx"], result["branch"], result["revision"])
+
+
+def main():
+    """CLI: 02-page.py query|search ARG ALL-REVS LIMIT"""
+    method_name, arg, all_revs, limit = sys.argv[1:]
+    arg = ast.literal_eval(arg)
+    all_revs = int(all_revs)
+    limit = int(limit)
+    work_dir = mkdtemp()
+    try:
+        db_url = "sqlite:///" + os.path.join(work_dir, "foo.db")
+        populate(db_url)
+        method = getattr(DAO(db_url), method_name)
+        results = method(arg, all_revs)
+        streamed_results = list(method(arg, all_revs, stream=True))
+        cursor_pages = []
+        after = None
+        while True:
+            page = method(arg, all_revs, limit, after=after)
+            if not page:
+                break
+            cursor_pages.append(page)
+            after = get_id(page[-1])
+        offset_pages = []
+        offset = 0
+        while True:
+            page = method(arg, all_revs, limit, offset)
+            if not page:
+                break
+            offset_pages.append(page)
+            offset += limit
+    finally:
+        rmtree(work_dir)
+    for page in cursor_pages:
+        print " ".join("%s/%s@%s" % get_id(result) for result in page)
+    if streamed_results != results:
+        sys.exit("streamed results differ: %s" % streamed_results)
+    if offset_pages != cursor_pages:
+        sys.exit("offset pages differ: %s" % offset_pages)
+    if sorted(sum(cursor_pages, []), key=get_id) != sorted(
+            results, key=get_id):
+        sys.exit("pages differ from results: %s" % results)
+
+
+if __name__ == "__main__":
+    main()
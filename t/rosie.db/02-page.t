@@ -0,0 +1,77 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test rosie.db query and search paging, with an offset or with a cursor.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+TEST_PARSER="python $TEST_SOURCE_DIR/$TEST_KEY_BASE.py"
+#-------------------------------------------------------------------------------
+if ! python -c 'import sqlalchemy' 2>/dev/null; then
+    skip_all '"sqlalchemy" not installed'
+fi
+tests 15
+#-------------------------------------------------------------------------------
+# Query, latest revisions.
+TEST_KEY=$TEST_KEY_BASE-query
+run_pass "$TEST_KEY" $TEST_PARSER query '[("and", "project", "eq", "test")]' 0 2
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+foo-aa000/trunk@7 foo-aa001/shiny@5
+foo-aa001/trunk@4 foo-aa002/trunk@3
+foo-aa003/trunk@6
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Query, all revisions.
+TEST_KEY=$TEST_KEY_BASE-query-all-revs
+run_pass "$TEST_KEY" $TEST_PARSER query '[("and", "project", "eq", "test")]' 1 3
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+foo-aa000/trunk@1 foo-aa000/trunk@7 foo-aa001/shiny@5
+foo-aa001/trunk@2 foo-aa001/trunk@4 foo-aa002/trunk@3
+foo-aa003/trunk@6
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Query, no match.
+TEST_KEY=$TEST_KEY_BASE-query-none
+run_pass "$TEST_KEY" \
+    $TEST_PARSER query '[("and", "title", "contains", "nothing")]' 0 2
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" </dev/null
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Search, latest revisions.
+TEST_KEY=$TEST_KEY_BASE-search
+run_pass "$TEST_KEY" $TEST_PARSER search '["suite"]' 0 2
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+foo-aa000/trunk@7 foo-aa001/shiny@5
+foo-aa001/trunk@4 foo-aa002/trunk@3
+foo-aa003/trunk@6
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+# Search, all revisions, one suite per page.
+TEST_KEY=$TEST_KEY_BASE-search-all-revs
+run_pass "$TEST_KEY" $TEST_PARSER search '["shiny"]' 1 1
+file_cmp "$TEST_KEY.out" "$TEST_KEY.out" <<'__OUT__'
+foo-aa000/trunk@1
+foo-aa000/trunk@7
+foo-aa001/shiny@5
+__OUT__
+file_cmp "$TEST_KEY.err" "$TEST_KEY.err" </dev/null
+#-------------------------------------------------------------------------------
+exit
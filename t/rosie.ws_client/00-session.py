@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+"""Test "rosie.ws_client.RosieWSClient" against stub web services.
+
+Serve the prefixes "bar" and "foo" from a stub server, whose responses are
+tagged with its revision. Print what the client returns, and what the
+server responds, for new requests, for requests that the cache satisfies,
+and after a new revision. Then check that an unreachable prefix is
+reported, and that a request that fails in a thread of the pool is raised,
+rather than waited for forever.
+
+"""
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+import os
+import requests
+from rose.reporter import Reporter
+from rose.resource import ResourceLocator
+from rosie.ws_client import RosieWSClient
+from shutil import rmtree
+import simplejson
+import socket
+from SocketServer import ThreadingMixIn
+import sys
+from tempfile import mkdtemp
+from threading import current_thread, Thread
+from urlparse import urlparse
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+
+    """A stub Rosie web service server."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StubRequestHandler)
+        self.revision = 1
+        self.responses = []  # [(prefix, method, status), ...]
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+
+    """Respond to "GET /PREFIX/METHOD" with [PREFIX, METHOD, REVISION]."""
+
+    def do_GET(self):
+        """Respond, or respond 304 if the client has the same revision."""
+        prefix, method = urlparse(self.path).path.strip("/").split("/")
+        etag = '"%d"' % self.server.revision
+        if self.headers.get("If-None-Match") == etag:
+            self.server.responses.append((prefix, method, 304))
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.server.responses.append((prefix, method, 200))
+        body = simplejson.dumps([prefix, method, self.server.revision])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        """Do not log requests."""
+        pass
+
+
+def get_free_port():
+    """Return a port on localhost that nothing listens to."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def call(function, *args):
+    """Call function in a thread, exit if it does not return in time.
+
+    Return its return value, or the exception it raised.
+
+    """
+    ret = []
+
+    def target():
+        try:
+            ret.append(function(*args))
+        except Exception as exc:
+            ret.append(exc)
+
+    thread = Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    thread.join(60)
+    if thread.is_alive():
+        sys.exit("%s: no result after 60 seconds" % function.__name__)
+    return ret[0]
+
+
+def main():
+    """Run the tests."""
+    server = StubServer()
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    root = "http://127.0.0.1:%d/" % server.server_address[1]
+    work_dir = mkdtemp()
+    with open(os.path.join(work_dir, "rose.conf"), "w") as handle:
+        handle.write("[rosie-id]\n")
+        handle.write("ws-cache-dir=%s\n" % os.path.join(work_dir, "cache"))
+        for prefix in ["bar", "foo"]:
+            handle.write("prefix-ws.%s=%s%s\n" % (prefix, root, prefix))
+        handle.write("prefix-ws.baz=http://127.0.0.1:%d/baz\n" % (
+            get_free_port()))
+    os.environ["ROSE_CONF_PATH"] = work_dir
+    ResourceLocator.default(reset=True)
+
+    # Record the threads that use each session
+    session_threads = {}
+    session_get = requests.Session.get
+
+    def get(session, url, **kwargs):
+        """Record the thread of a request, then send it."""
+        session_threads.setdefault(id(session), set()).add(
+            current_thread().ident)
+        return session_get(session, url, **kwargs)
+
+    requests.Session.get = get
+    try:
+        client = RosieWSClient(["bar", "foo"], event_handler=Reporter(0))
+        for revision in [1, 1, 2]:
+            server.revision = revision
+            del server.responses[:]
+            for data, _ in call(client._get, "get_known_keys"):
+                print "data:", " ".join(str(item) for item in data)
+            for response in sorted(server.responses):
+                print "response:", " ".join(str(item) for item in response)
+        print "sessions:", len(client.sessions) >= 2, all(
+            len(threads) == 1 for threads in session_threads.values())
+
+        # Unreachable prefix
+        call(client.set_prefixes, ["bar", "baz", "foo"])
+        print "prefixes:", " ".join(client.prefixes)
+        print "unreachable prefixes:", " ".join(client.unreachable_prefixes)
+
+        # Any other failure, in a thread of the pool
+        def get_timeout(session, url, **kwargs):
+            """Time out requests to "foo"."""
+            if "/foo/" in url:
+                raise requests.exceptions.Timeout(url)
+            return session_get(session, url, **kwargs)
+
+        requests.Session.get = get_timeout
+        print "timeout:", type(call(client._get, "hello")).__name__
+        client.close()
+        print "closed sessions:", len(client.sessions)
+    finally:
+        requests.Session.get = session_get
+        server.shutdown()
+        rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/bin/bash
+#-------------------------------------------------------------------------------
+# (C) British Crown Copyright 2012-7 Met Office.
+#
+# This file is part of Rose, a framework for meteorological suites.
+#
+# Rose is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Rose is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Rose. If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "rosie.ws_client", sessions, cached responses and failed requests.
+#-------------------------------------------------------------------------------
+. $(dirname $0)/test_header
+TEST_PARSER="python $TEST_SOURCE_DIR/$TEST_KEY_BASE.py"
+#-------------------------------------------------------------------------------
+if ! python -c 'import requests, simplejson' 2>/dev/null; then
+    skip_all '"requests" or "simplejson" not installed'
+fi
+tests 3
+#-------------------------------------------------------------------------------
+run_pass "$TEST_KEY_BASE" $TEST_PARSER
+file_cmp "$TEST_KEY_BASE.out" "$TEST_KEY_BASE.out" <<'__OUT__'
+data: bar get_known_keys 1
+data: foo get_known_keys 1
+response: bar get_known_keys 200
+response: foo get_known_keys 200
+data: bar get_known_keys 1
+data: foo get_known_keys 1
+response: bar get_known_keys 304
+response: foo get_known_keys 304
+data: bar get_known_keys 2
+data: foo get_known_keys 2
+response: bar get_known_keys 200
+response: foo get_known_keys 200
+sessions: True True
+prefixes: bar foo
+unreachable prefixes: baz
+timeout: Timeout
+closed sessions: 0
+__OUT__
+file_cmp "$TEST_KEY_BASE.err" "$TEST_KEY_BASE.err" </dev/null
+#-------------------------------------------------------------------------------
+exit